@@ -25,3 +25,10 @@ if workspace not in sys.path:
 os.environ["DJANGO_SETTINGS_MODULE"] = "gchub_db.settings"
 
 application = get_wsgi_application()
+
+# Compile the templates now rather than on the first request for each page.
+# Templates that don't compile are logged and left to fail when used;
+# "manage.py warm_templates" reports them.
+from gchub_db.includes.template_tools import warm_templates  # noqa: E402
+
+warm_templates(strict=False)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Benchmark of the color_mgt stats pages against the live database, comparing
+the per-definition fsb_usage_count()/avg_delta() queries they used to make
+with the grouped query and array sorting in color_analytics.ColorStats.
+
+    bin/benchmark_color_stats.py [repeat]
+"""
+
+import sys
+import time
+
+# Setup the Django environment
+import bin_functions
+
+bin_functions.setup_paths()
+import django
+
+django.setup()
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from gchub_db.apps.color_mgt.color_analytics import GROUPS, ColorStats
+from gchub_db.apps.color_mgt.models import ColorDefinition
+
+
+def legacy_groups():
+    """What color_stats_sorted() used to do: a couple of queries per definition."""
+    groups = dict((group, []) for group in GROUPS)
+    for z in ColorDefinition.objects.all():
+        if z.fsb_usage_count() == 0:
+            continue
+        z.avg_delta()
+        if z.lch_c and z.lch_c <= 15.7:
+            groups["grays"].append(z)
+        elif z.lch_h and z.lch_h >= 0 and z.lch_h < 67:
+            groups["reds"].append(z)
+        elif z.lch_h and z.lch_h >= 67 and z.lch_h < 106:
+            groups["yellows"].append(z)
+        elif z.lch_h and z.lch_h >= 106 and z.lch_h < 222:
+            groups["greens"].append(z)
+        elif z.lch_h and z.lch_h >= 222 and z.lch_h < 295:
+            groups["blues"].append(z)
+        elif z.lch_h and z.lch_h >= 295 and z.lch_h < 359.999:
+            groups["reds"].append(z)
+        else:
+            groups["errors"].append(z)
+    return groups
+
+
+def new_groups():
+    return ColorStats().groups
+
+
+def measure(func, repeat):
+    """Best wall time of repeat runs, the query count, and the result."""
+    best = None
+    for num in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(queries), result
+
+
+"""
+Begin main program logic
+"""
+repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+legacy_time, legacy_queries, legacy = measure(legacy_groups, repeat)
+new_time, new_queries, new = measure(new_groups, repeat)
+
+for group in GROUPS:
+    if [color.id for color in legacy[group]] != [color.id for color in new[group]]:
+        print("MISMATCH in %s" % group)
+print("%d measured colors" % sum(len(colors) for colors in new.values()))
+print("per-color   %8.3f s  %6d queries" % (legacy_time, legacy_queries))
+print("ColorStats  %8.3f s  %6d queries" % (new_time, new_queries))
+print("%.1fx faster" % (legacy_time / max(new_time, 1e-6)))
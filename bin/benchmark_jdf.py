@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of JDF ticket generation and processed JDF parsing, comparing
+the ElementTree based xml_io classes against the minidom code they replaced.
+
+    bin/benchmark_jdf.py [iterations]
+"""
+
+import sys
+import timeit
+from xml.dom import minidom
+
+# Setup the Django environment
+import bin_functions
+
+bin_functions.setup_paths()
+import django
+
+django.setup()
+from gchub_db.apps.xml_io.jdf_reader import JDFReader
+from gchub_db.apps.xml_io.jdf_writer import ItemJDF
+
+FILES = ["file://fs/JobStorage/60001/1_Final_Files/60001-%d.pdf" % num for num in range(1, 9)]
+TASKS = (
+    ("rip_1up", "/swft/FSB Smart Contract Proofing"),
+    ("rgb_pdf", "/batchbrix.pdfout/AutosavePDF"),
+    ("rgb_jpg", "/LINKEDGETASK/FSB_JPG for Rendering"),
+)
+# A processed JDF as Backstage writes it back, with an aborted sub-task.
+PROCESSED_TASK = """<JDF xmlns="http://www.CIP4.org/JDFSchema_1_1" xmlns:eg="http://www.esko-graphics.com/EGschema1_0"
+ DescriptiveName="RIP1up" ID="n%04d" Status="Aborted" Type="eg:BackStageTask" Version="1.2">
+<ResourcePool><eg:BackStageTaskParams Class="Parameter" ID="TaskParamLink" eg:TicketName="/swft/Ticket %d"/></ResourcePool>
+<AuditPool><Notification Class="Event"><Comment>Missing font %d</Comment></Notification>
+<ProcessRun EndStatus="Aborted"/></AuditPool></JDF>"""
+PROCESSED_JDF = """<?xml version="1.0"?>
+<JDF xmlns="http://www.CIP4.org/JDFSchema_1_2" DescriptiveName="GOLD JDF Task" ID="n0001" Status="Aborted"
+ Type="ProcessGroup" Version="1.2">%s<AuditPool><ProcessRun EndStatus="Aborted"/></AuditPool></JDF>""" % "".join(
+    PROCESSED_TASK % (num, num, num) for num in range(2, 6)
+)
+
+
+def legacy_ticket():
+    """The ticket as the minidom ItemJDF built it."""
+    doc = minidom.Document()
+    root = doc.createElement("JDF")
+    for key, value in (
+        ("DescriptiveName", "GOLD JDF Task"),
+        ("ID", "n0001"),
+        ("Status", "Waiting"),
+        ("Type", "ProcessGroup"),
+        ("Version", "1.2"),
+        ("xmlns", "http://www.CIP4.org/JDFSchema_1_2"),
+        ("xmlns:eg", "http://www.esko-graphics.com/EGschema1_0"),
+    ):
+        root.setAttribute(key, value)
+    doc.appendChild(root)
+    resource_pool = doc.createElement("ResourcePool")
+    runlist_param = doc.createElement("RunList")
+    for key, value in (("Class", "Parameter"), ("ID", "SourceFileList"), ("PartIDKeys", "Run"), ("Status", "Available")):
+        runlist_param.setAttribute(key, value)
+    for num, sfile in enumerate(FILES, 1):
+        runlist_run = doc.createElement("RunList")
+        runlist_run.setAttribute("Run", "Run%04d" % num)
+        layout_element = doc.createElement("LayoutElement")
+        filespec = doc.createElement("FileSpec")
+        filespec.setAttribute("URL", sfile)
+        layout_element.appendChild(filespec)
+        runlist_run.appendChild(layout_element)
+        runlist_param.appendChild(runlist_run)
+    resource_pool.appendChild(runlist_param)
+    root.appendChild(resource_pool)
+    for num, (task_type, ticket_name) in enumerate(TASKS, 1):
+        node = doc.createElement("JDF")
+        for key, value in (
+            ("DescriptiveName", task_type),
+            ("ID", "n%04d" % num),
+            ("Status", "Waiting"),
+            ("Type", "eg:BackStageTask"),
+            ("Version", "1.2"),
+            ("xmlns", "http://www.CIP4.org/JDFSchema_1_1"),
+            ("xmlns:eg", "http://www.esko-graphics.com/EGschema1_0"),
+        ):
+            node.setAttribute(key, value)
+        node_info = doc.createElement("NodeInfo")
+        node_info.setAttribute("JobPriority", "50")
+        node.appendChild(node_info)
+        pool = doc.createElement("ResourcePool")
+        params = doc.createElement("eg:BackStageTaskParams")
+        for key, value in (
+            ("Class", "Parameter"),
+            ("ID", task_type),
+            ("Status", "Available"),
+            ("eg:TicketName", ticket_name),
+            ("eg:Hold", "false"),
+        ):
+            params.setAttribute(key, value)
+        pool.appendChild(params)
+        node.appendChild(pool)
+        link_pool = doc.createElement("ResourceLinkPool")
+        for tag, usage, ref in (
+            ("eg:BackStageTaskParamsLink", "Input", task_type),
+            ("RunListLink", "Input", "SourceFileList"),
+            ("RunListLink", "Output", "TIFFList"),
+        ):
+            link = doc.createElement(tag)
+            link.setAttribute("Usage", usage)
+            link.setAttribute("rRef", ref)
+            link_pool.appendChild(link)
+        node.appendChild(link_pool)
+        root.appendChild(node)
+    return doc.toxml()
+
+
+def new_ticket():
+    jdf = ItemJDF(None, {"SourceFileList": FILES})
+    for task_type, ticket_name in TASKS:
+        jdf.add_task(task_type, ticket_name)
+    return jdf.get_xml_doc_string()
+
+
+def legacy_read(path):
+    """What the minidom JDFReader did with an aborted JDF."""
+    doc = minidom.parse(path)
+    aborted = any(run.getAttribute("EndStatus") == "Aborted" for run in doc.getElementsByTagName("ProcessRun"))
+    comments = []
+    if aborted:
+        for task in doc.getElementsByTagName("JDF"):
+            pool = task.getElementsByTagName("AuditPool")[0]
+            notes = [node for node in pool.childNodes if getattr(node, "tagName", None) == "Notification"]
+            comments.append("\n\r".join(note.getElementsByTagName("Comment")[0].childNodes[0].data for note in notes))
+    ticket = doc.getElementsByTagName("eg:BackStageTaskParams")[0].getAttribute("eg:TicketName")
+    return aborted, comments, ticket
+
+
+def new_read(path):
+    jdf = JDFReader(path)
+    return jdf.has_aborted_tasks, [task.return_comments() for task in jdf.jdf_tasks], jdf.ticket_name
+
+
+def report(name, legacy, new, iterations):
+    legacy_time = min(timeit.repeat(legacy, number=iterations, repeat=3)) / iterations
+    new_time = min(timeit.repeat(new, number=iterations, repeat=3)) / iterations
+    print("%-18s minidom %8.1f us   ElementTree %8.1f us   %.1fx" % (name, legacy_time * 1e6, new_time * 1e6, legacy_time / new_time))
+
+
+"""
+Begin main program logic
+"""
+iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+jdf_path = "/tmp/60001-1-benchmark.jdf"
+with open(jdf_path, "w") as f:
+    f.write(PROCESSED_JDF)
+
+report("ticket generation", legacy_ticket, new_ticket, iterations)
+report("processed JDF read", lambda: legacy_read(jdf_path), lambda: new_read(jdf_path), iterations)
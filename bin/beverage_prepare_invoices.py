@@ -29,9 +29,7 @@ def create_invoice(job, charge_set, inactive, past=False):
     new_invoice = BevInvoice(job=job)
     new_invoice.save()
     # Link each charge to be invoiced to the newly created invoice object.
-    for charge in charge_set:
-        charge.bev_invoice = new_invoice
-        charge.save()
+    charge_set.update(bev_invoice=new_invoice)
     # Send a notification to the job's analyst if it is billing
     # out as 45-day inactive.
     if inactive:
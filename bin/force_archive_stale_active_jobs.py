@@ -1,23 +1,25 @@
 #!/usr/bin/env python
-"""Archive jobs with no activity, move symlinks to Archive dir."""
+"""
+Archive jobs with no activity, move symlinks to Archive dir.
 
-import time
-from datetime import timedelta
+Only the jobs in JOB_SET are considered. Takes the same options as
+archive_stale_active_jobs.py.
+"""
+
+import os
+import sys
 
 # Setup the Django environment
 import bin_functions
 
 bin_functions.setup_paths()
-from gchub_db.apps.workflow.models import Job
+import django
 
-# Back to the ordinary imports
-from gchub_db.includes import fs_api
+django.setup()
+from gchub_db.apps.workflow.archiving import ARCHIVE_STATE_FILE, ARCHIVE_WORKERS, StaleJobArchiver
 
-# Jobs with no activity for more than this number of days will be archived.
-ARCHIVAL_CUTOFF_DATE = 180
-# Jobs with no activity that are complete for more than this number
-# of days will be archived.
-COMPLETE_CUTOFF_DATE = 120
+# Kept apart from the regular run's progress, which is through all the jobs.
+STATE_FILE = os.path.splitext(ARCHIVE_STATE_FILE)[0] + "_forced.json"
 
 JOB_SET = (
     370,
@@ -855,38 +857,13 @@ print("set:", len(JOB_SET))
 
 def main():
     """Entry point: archive the listed JOB_SET jobs when they meet archival criteria."""
-    # jobs = Job.objects.filter(archive_disc='', workflow__name="Foodservice").order_by('id')
-    jobs = Job.objects.filter(id__in=JOB_SET).order_by("id")
-    from django.utils import timezone
-
-    archival_cutoff_date = timezone.now() - timedelta(days=ARCHIVAL_CUTOFF_DATE)
-    complete_cutoff_date = timezone.now() - timedelta(days=COMPLETE_CUTOFF_DATE)
-    print("Cutoff date:", archival_cutoff_date)
-
-    print("jobs:", jobs.count())
-
-    counter = 0
-    for job in jobs:
-        last_joblog = job.job_set.all().order_by("-event_time")
-        if last_joblog:
-            last_joblog_date = last_joblog[0].event_time
-            if last_joblog_date < archival_cutoff_date or (last_joblog_date < complete_cutoff_date and job.status == "Complete"):
-                print("Archiving", job)
-                try:
-                    job.delete_folder_symlink()
-                except fs_api.NoResultsFound:
-                    pass
-                print(" - Symlink deleted.")
-                job.archive_disc = "1"
-                job.save()
-                print(" - Entry saved.")
-                job.create_folder_symlink(force_archive=True)
-                print(" - Symlink created.")
-                job.lock_folder()
-                counter += 1
-                time.sleep(0.1)
-                counter += 1
-    print("Archiving of %d jobs is complete." % counter)
+    args = sys.argv[1:]
+    workers = ARCHIVE_WORKERS
+    for arg in args:
+        if arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+    archiver = StaleJobArchiver(workers=workers, dry_run="--dry-run" in args, state_file=STATE_FILE)
+    archiver.run(job_ids=JOB_SET, resume="--resume" in args)
 
 
 if __name__ == "__main__":
@@ -13,6 +13,7 @@ from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.template import loader
 
+from gchub_db.apps.queues.outbox import enqueue_email
 from gchub_db.apps.workflow.models import Item, Job
 
 """
@@ -375,7 +376,7 @@ if empty_folders or missing_folders or errors:
     # send the email
     msg = EmailMultiAlternatives(mail_subject, mail_body.render(mail_context), mail_from, mail_send_to)
     msg.content_subtype = "html"
-    msg.send()
-    print("Email sent.")
+    enqueue_email(msg)
+    print("Email queued.")
 
 print("Job folder audit complete.")
@@ -1,17 +1,48 @@
 #!/usr/bin/env python
-"""Locks job folders under JobStorage once they are marked for archival."""
+"""
+Locks job folders under JobStorage once they are marked for archival.
 
-import time
+Run this on master: the folders are chmodded directly, by a pool of
+workers, rather than through the GOLD FS server. Each job's result is kept
+in the database, so a pass only locks jobs that have never been locked,
+failed last time or are due a re-check. The work is done by
+workflow/archiving.py.
+
+    bin/lock_archived_jobs.py [--workers=N] [--all]
+
+--all locks every archived job folder again, whatever its recorded state.
+"""
+
+import sys
 
 # Setup the Django environment
 import bin_functions
 
 bin_functions.setup_paths()
+import django
+
+django.setup()
 # Back to the ordinary imports
+from gchub_db.apps.workflow.archiving import LOCK_WORKERS, FolderLocker
 from gchub_db.apps.workflow.models import Job
 
-archived_jobs = Job.objects.exclude(archive_disc="").order_by("-id")
 
-for job in archived_jobs:
-    job.lock_folder()
-    time.sleep(0.1)
+def main():
+    args = sys.argv[1:]
+    workers = LOCK_WORKERS
+    for arg in args:
+        if arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+    job_ids = None
+    if "--all" in args:
+        job_ids = list(Job.objects.exclude(archive_disc="").order_by("-id").values_list("id", flat=True))
+
+    locker = FolderLocker(workers=workers)
+    locker.run(job_ids)
+    if locker.failed:
+        print("Could not lock %d job folders:" % len(locker.failed))
+        print(", ".join(str(job_id) for job_id in locker.failed))
+
+
+if __name__ == "__main__":
+    main()
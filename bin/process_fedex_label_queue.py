@@ -1,5 +1,16 @@
 #!/usr/bin/env python
-"""Looks through the Fedex label queue and prints labels as needed."""
+"""
+Looks through the Fedex label queue and prints labels as needed.
+
+    bin/process_fedex_label_queue.py [--device=PATH] [--batch-size=N]
+
+--device writes the labels to another device node, file or pipe instead of
+the FEDEX_LABEL_PRINTER setting. The work is done by
+fedexsys/label_spooler.py; several of these can run at once without
+printing a label twice.
+"""
+
+import sys
 
 # Setup the Django environment
 import bin_functions
@@ -8,18 +19,26 @@ bin_functions.setup_paths()
 import django
 
 django.setup()
-from gchub_db.apps.fedexsys.models import Shipment
+# Back to the ordinary imports
+from gchub_db.apps.fedexsys.label_spooler import LABEL_BATCH_SIZE, LabelSpooler
+from gchub_db.apps.fedexsys.models import LABEL_PRINTER
 
-"""
-Begin main program logic
-"""
-# If there is no label print date, the label needs to be printed.
-label_shipments = Shipment.objects.filter(date_label_printed=None)
 
-for shipment in label_shipments:
-    shipment.print_label()
+def main():
+    device = LABEL_PRINTER
+    batch_size = LABEL_BATCH_SIZE
+    for arg in sys.argv[1:]:
+        if arg.startswith("--device="):
+            device = arg.split("=", 1)[1]
+        elif arg.startswith("--batch-size="):
+            batch_size = int(arg.split("=", 1)[1])
+
+    spooler = LabelSpooler(device=device, batch_size=batch_size)
+    spooler.run()
+    if spooler.failed:
+        print("Could not print the labels for shipments:")
+        print(", ".join(str(shipment_id) for shipment_id in spooler.failed))
+
 
-    if shipment.is_international():
-        # International labels get two copies.
-        shipment.print_label()
-        shipment.print_label()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+"""
+Refreshes the item fact snapshot used by the trend and billing reports.
+
+Only items changed since the last run are extracted again. Pass --full to
+rebuild the whole snapshot, which also picks up deleted charges.
+"""
+
+import sys
+import time
+
+# Setup the Django environment
+import bin_functions
+
+bin_functions.setup_paths()
+import django
+
+django.setup()
+from gchub_db.apps.workflow.item_facts import refresh_item_facts
+
+"""
+Begin main program logic
+"""
+start = time.time()
+facts, extracted = refresh_item_facts(full="--full" in sys.argv[1:])
+print("Extracted %d of %d items in %.1f seconds." % (extracted, len(facts), time.time() - start))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+"""
+Sends the messages waiting in the email outbox over one SMTP connection.
+
+Drains the outbox on each run. Pass --forever to keep polling it instead of
+exiting once it is empty.
+"""
+
+import sys
+
+# Setup the Django environment
+import bin_functions
+
+bin_functions.setup_paths()
+import django
+
+django.setup()
+from gchub_db.apps.queues.outbox import OutboxSender
+
+"""
+Begin main program logic
+"""
+OutboxSender().drain(forever="--forever" in sys.argv[1:])
@@ -3,7 +3,12 @@
 This script syncs GOLD's color database with Esko's bg_cms_data share.
 
 It keeps GOLD's color accuracy tracking via CAT Scanner up to date with the
-latest Esko colorbook standards.
+latest Esko colorbook standards. Colorbooks that haven't changed since the
+last sync are skipped.
+
+Usage: sync_esko_colorbook.py [--force] [--dry-run] [colorbook coating ...]
+
+With no colorbooks given, everything in settings.ESKO_COLORBOOKS is synced.
 """
 
 import sys
@@ -12,38 +17,41 @@ import sys
 import bin_functions
 
 bin_functions.setup_paths()
-# Back to the ordinary imports
-from gchub_db.apps.color_mgt.models import ColorDefinition
-from gchub_db.includes.esko_color.colorbook_reader import EskoColorBook
-
-
-def sync_colorbook(cb_name, coating):
-    """
-    Sync a colorbook into GOLD for the given coating.
-
-    cb_name is the identifier for the Esko colorbook. coating indicates which
-    coating variant to target (e.g., 'U' or 'C').
-    """
-    cbook = EskoColorBook("FSB_Pantone_Uncoated")
-    esko_color_names = cbook.get_color_name_list()
-    esko_set = set(esko_color_names)
+import django
 
-    gold_color_names = ColorDefinition.objects.filter(coating=coating).values_list("name", flat=True)
-    gold_set = set(gold_color_names)
-
-    # In GOLD but not Esko.
-    colors_to_delete = gold_set - esko_set
-    # In Esko but not GOLD.
-    # print esko_set - gold_set
-
-    gold_colors_to_delete = ColorDefinition.objects.filter(name__in=colors_to_delete)
-    print("DELETE FROM GOLD")
-    print(gold_colors_to_delete)
-    for col in gold_colors_to_delete:
-        print("%s - %d" % (col, col.itemcolor_set.count()))
-
-
-sync_colorbook("FSB_Pantone_Uncoated", "U")
+django.setup()
+# Back to the ordinary imports
+from gchub_db.apps.color_mgt.colorbook_sync import ESKO_COLORBOOKS, ColorBookSync
+
+args = sys.argv[1:]
+force = "--force" in args
+dry_run = "--dry-run" in args
+args = [arg for arg in args if not arg.startswith("--")]
+if args:
+    colorbooks = list(zip(args[::2], args[1::2]))
+else:
+    colorbooks = ESKO_COLORBOOKS
+
+for cb_name, coating in colorbooks:
+    result = ColorBookSync(cb_name, coating, force=force, dry_run=dry_run).run()
+    if result["skipped"]:
+        print("%s (%s): unchanged, skipping." % (cb_name, coating))
+        continue
+    print(
+        "%s (%s): %d created, %d updated, %d deleted%s"
+        % (
+            cb_name,
+            coating,
+            len(result["created"]),
+            len(result["updated"]),
+            len(result["deleted"]),
+            " (dry run)" if dry_run else "",
+        )
+    )
+    if result["empty"]:
+        print("  No spectral data could be read, nothing deleted.")
+    for name in result["stale_in_use"]:
+        print("  Not in Esko but still in use, kept: %s" % name)
 
 # Doneskates.
 sys.exit(0)
@@ -3,7 +3,9 @@
 Generate billing efficiency and volume trend Excel reports.
 
 Reports include yearly, monthly, and breakdowns by artist, salesperson,
-quality, and plant for Foodservice workflow data.
+quality, and plant for Foodservice workflow data. The yearly and quality
+breakdowns are grouped from the item fact snapshot (see
+bin/refresh_item_facts.py) instead of querying per spreadsheet cell.
 """
 
 import bin_functions
@@ -15,12 +17,15 @@ import django
 django.setup()
 from datetime import date
 
+import numpy as np
 from django.contrib.auth.models import Permission, User
-from django.db.models import Q, Sum
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
 
 from gchub_db.apps.joblog import app_defs as joblog_defs
 from gchub_db.apps.joblog.models import JobLog
 from gchub_db.apps.workflow.app_defs import ITEM_TYPES
+from gchub_db.apps.workflow.item_facts import ItemFacts
 from gchub_db.apps.workflow.models import Charge, Item, Job
 
 # Setup the Worksheet
@@ -160,7 +165,9 @@ master_job_list = (
 print("Master job count:", master_job_list.count())
 
 master_item_list = Item.objects.filter(job__in=master_job_list)
-print("Master item count:", master_item_list.count())
+facts = ItemFacts.load()
+master_facts = facts.where(np.isin(facts["job_id"], list(master_job_list.values_list("id", flat=True))))
+print("Master item count:", len(master_facts))
 
 # Establish sets for all data, to be picked apart later.
 all_filedout_items = master_item_list.filter(id__in=file_outs)
@@ -174,15 +181,23 @@ def _calculate_billing_data(item_set):
     # Calculate charges of billed items.
     charges = Charge.objects.filter(item__in=item_ids)
     if charges:
-        total_charges = round(charges.aggregate(total=Sum("amount"))["total"], 2)
+        total_charges = charges.aggregate(total=Sum("amount"))["total"]
         billed_charges = charges.filter(invoice_date__isnull=False)
-        total_billed_charges = round(billed_charges.aggregate(total=Sum("amount"))["total"], 2)
-        unbilled_charges = round((total_charges - total_billed_charges), 2)
-        unbilled_percentage = round((float(unbilled_charges / total_charges)) * 100, 2)
+        total_billed_charges = billed_charges.aggregate(total=Sum("amount"))["total"] or 0
     else:
         total_charges = 0
         total_billed_charges = 0
-        unbilled_charges = 0
+    return _billing_data(total_charges, total_billed_charges)
+
+
+def _billing_data(total_charges, total_billed_charges):
+    """Return billing information for charge totals."""
+    total_charges = round(float(total_charges), 2)
+    total_billed_charges = round(float(total_billed_charges), 2)
+    unbilled_charges = round((total_charges - total_billed_charges), 2)
+    if total_charges:
+        unbilled_percentage = round((unbilled_charges / total_charges) * 100, 2)
+    else:
         unbilled_percentage = 0
 
     billing_dict = {}
@@ -226,54 +241,55 @@ def _do_yearly_breakdown():
     docSheet1.cell(row=1, column=8).value = "Charges Unbilled"
     docSheet1.cell(row=1, column=9).value = "Unbilled Portion"
 
+    # Get jobs & items for each year, grouped by the job's creation year.
+    # Do not exlcude Cancelled items, as we want to look at those, too.
+    job_counts = {
+        row["year"]: row["count"]
+        for row in master_job_list.order_by().annotate(year=ExtractYear("creation_date")).values("year").annotate(count=Count("id"))
+    }
+    job_years = master_facts.years("job_created")
+    item_counts = master_facts.count_by(job_years)
+    # Determine which of the items in each year were filed out.
+    filed_out_counts = master_facts.count_by(job_years, master_facts.has("filed_out"))
+    charge_totals = master_facts.sum_by("charges", job_years)
+    billed_totals = master_facts.sum_by("billed_charges", job_years)
+
     i = 1
     for year in year_set:
         # print year
         docSheet1.cell(row=i + 1, column=1).value = year
 
-        # Get jobs & items for given year.
-        # Do not exlcude Cancelled items, as we want to look at those, too.
-        all_jobs = master_job_list.filter(creation_date__year=year)
-
-        job_count = all_jobs.count()
+        job_count = job_counts.get(year, 0)
         # print "No. Jobs:", job_count
         docSheet1.cell(row=i + 1, column=2).value = job_count
 
-        all_items = Item.objects.filter(job__in=all_jobs)
-        all_item_count = all_items.count()
+        all_item_count = item_counts.get(year, 0)
         # print "No. Items:", all_item_count
         docSheet1.cell(row=i + 1, column=3).value = all_item_count
 
-        # Determine which of the items in the given year were filed out.
-        filed_out_items = all_items.filter(id__in=file_outs)
-        filed_out_item_count = filed_out_items.count()
+        filed_out_item_count = filed_out_counts.get((year, True), 0)
         # print "No. Filed Out:", filed_out_item_count
         docSheet1.cell(row=i + 1, column=4).value = filed_out_item_count
 
         # Calculate the hit ratio (ratio between all items and those filed out.)
-        hit_ratio = round((float(filed_out_item_count) / float(all_item_count)) * 100, 2)
+        hit_ratio = round((float(filed_out_item_count) / float(all_item_count)) * 100, 2) if all_item_count else 0
         # print "Hit Ratio:", hit_ratio
         docSheet1.cell(row=i + 1, column=5).value = hit_ratio
 
         # Calculate charges of billed items.
-        all_charges = Charge.objects.filter(item__in=all_items)
-        total_charges = round(all_charges.aggregate(total=Sum("amount"))["total"], 2)
-        all_billed_charges = all_charges.filter(invoice_date__isnull=False)
-        total_billed_charges = round(all_billed_charges.aggregate(total=Sum("amount"))["total"], 2)
+        billing = _billing_data(charge_totals.get(year, 0), billed_totals.get(year, 0))
 
         # All charges applied to items in the given year.
         # print "Charges applied: $", total_charges
-        docSheet1.cell(row=i + 1, column=6).value = total_charges
+        docSheet1.cell(row=i + 1, column=6).value = billing["total_charges"]
 
         # All charges applied to items in the given year that were transferred to the plant.
         # print "Charges billed: $", total_billed_charges
-        docSheet1.cell(row=i + 1, column=7).value = total_billed_charges
+        docSheet1.cell(row=i + 1, column=7).value = billing["billed_charges"]
 
-        unbilled_charges = round((total_charges - total_billed_charges), 2)
-        unbilled_percentage = round((float(unbilled_charges / total_charges)) * 100, 2)
         # print "Unbilled charges: $", unbilled_charges, unbilled_percentage, "%"
-        docSheet1.cell(row=i + 1, column=8).value = unbilled_charges
-        docSheet1.cell(row=i + 1, column=9).value = unbilled_percentage
+        docSheet1.cell(row=i + 1, column=8).value = billing["unbilled_charges"]
+        docSheet1.cell(row=i + 1, column=9).value = billing["unbilled_percentage"]
 
         # print "==========="
         i += 1
@@ -575,29 +591,36 @@ def _do_quality_breakdown():
 
     quality_set = ("A", "B", "C")
 
+    item_years = master_facts.years("item_created")
+    quality_counts = master_facts.count_by(item_years, "quality")
+    filed_out_counts = master_facts.count_by(item_years, "quality", master_facts.has("filed_out"))
+    charge_totals = master_facts.sum_by("charges", item_years, "quality")
+    billed_totals = master_facts.sum_by("billed_charges", item_years, "quality")
+
     i = 1
     for year in year_set:
-        docSheet7.write(i, 0, year)
+        docSheet7.cell(row=i + 1, column=1).value = year
         for qual in quality_set:
-            docSheet7.write(i, 7, qual)
+            docSheet7.cell(row=i + 1, column=8).value = qual
             # Total of given quality.
-            quality_items = master_item_list.filter(quality=qual, creation_date__year=year)
-            quality_items_count = quality_items.count()
-            docSheet7.write(i, 1, quality_items_count)
+            quality_items_count = quality_counts.get((year, qual), 0)
+            docSheet7.cell(row=i + 1, column=2).value = quality_items_count
             # Num. filed out
-            quality_items_filedout = quality_items.filter(id__in=file_outs)
-            quality_items_filedout_count = quality_items_filedout.count()
-            docSheet7.write(i, 2, quality_items_filedout_count)
+            quality_items_filedout_count = filed_out_counts.get((year, qual, True), 0)
+            docSheet7.cell(row=i + 1, column=3).value = quality_items_filedout_count
             # Calc. hit ratio.
-            quality_ratio = round(
-                (float(quality_items_filedout_count) / float(quality_items_count)) * 100,
-                2,
-            )
-            docSheet7.write(i, 3, quality_ratio)
-            billing = _calculate_billing_data(quality_items)
-            docSheet7.write(i, 4, billing["total_charges"])
-            docSheet7.write(i, 5, billing["unbilled_charges"])
-            docSheet7.write(i, 6, billing["unbilled_percentage"])
+            if quality_items_count:
+                quality_ratio = round(
+                    (float(quality_items_filedout_count) / float(quality_items_count)) * 100,
+                    2,
+                )
+            else:
+                quality_ratio = 0
+            docSheet7.cell(row=i + 1, column=4).value = quality_ratio
+            billing = _billing_data(charge_totals.get((year, qual), 0), billed_totals.get((year, qual), 0))
+            docSheet7.cell(row=i + 1, column=5).value = billing["total_charges"]
+            docSheet7.cell(row=i + 1, column=6).value = billing["unbilled_charges"]
+            docSheet7.cell(row=i + 1, column=7).value = billing["unbilled_percentage"]
             i += 1
 
 
@@ -2,7 +2,8 @@
 """
 Create volume trend reports across workflows and years.
 
-Produces an Excel spreadsheet summarizing item counts per workflow.
+Produces an Excel spreadsheet summarizing item counts per workflow, from the
+item fact snapshot (see bin/refresh_item_facts.py).
 """
 
 import bin_functions
@@ -14,19 +15,23 @@ import django
 django.setup()
 from datetime import date
 
-from gchub_db.apps.workflow.models import Item
+import numpy as np
+
+from gchub_db.apps.workflow.item_facts import ItemFacts
 
 # Setup the Worksheet
 workBookDocument = openpyxl.Workbook()
 # Setup the first sheet to be the summary sheet
 
 start_date = date(2000, 1, 1)
-item_set = Item.objects.filter(
-    creation_date__gte=start_date,
-    job__prepress_supplier__in=("", None, "OPT", "Optihue"),
-).exclude(job__status="Cancelled")
+facts = ItemFacts.load()
+item_set = facts.where(
+    facts["item_created"] >= np.datetime64(start_date),
+    prepress_supplier=("", "OPT", "Optihue"),
+).exclude(job_status="Cancelled")
 
-print("Total items:", item_set.count())
+print("Total items:", len(item_set))
+counts = item_set.count_by(item_set.years("item_created"), "workflow")
 
 # Create a new sheet for each plant.
 docSheet1 = workBookDocument.active
@@ -41,12 +46,9 @@ docSheet1.cell(row=1, column=4).value = "Cont"
 year = start_date.year
 for x in range(11):
     docSheet1.cell(row=x + 2, column=1).value = year
-    items = item_set.filter(creation_date__year=year, job__workflow__name="Foodservice")
-    docSheet1.cell(row=x + 2, column=2).value = items.count()
-    items = item_set.filter(creation_date__year=year, job__workflow__name="Beverage")
-    docSheet1.cell(row=x + 2, column=3).value = items.count()
-    items = item_set.filter(creation_date__year=year, job__workflow__name="Container")
-    docSheet1.cell(row=x + 2, column=4).value = items.count()
+    docSheet1.cell(row=x + 2, column=2).value = counts.get((year, "Foodservice"), 0)
+    docSheet1.cell(row=x + 2, column=3).value = counts.get((year, "Beverage"), 0)
+    docSheet1.cell(row=x + 2, column=4).value = counts.get((year, "Container"), 0)
     year += 1
 
 # Freeze the top row of column headings.
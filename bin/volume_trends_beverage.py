@@ -2,7 +2,8 @@
 """
 Create beverage workflow volume trend reports.
 
-Exports monthly item counts for the Beverage workflow.
+Exports monthly item counts for the Beverage workflow, from the item fact
+snapshot (see bin/refresh_item_facts.py).
 """
 
 import bin_functions
@@ -14,7 +15,9 @@ import django
 django.setup()
 from datetime import date
 
-from gchub_db.apps.workflow.models import Item
+import numpy as np
+
+from gchub_db.apps.workflow.item_facts import ItemFacts
 
 # Setup the Worksheet
 workBookDocument = openpyxl.Workbook()
@@ -23,13 +26,15 @@ workBookDocument = openpyxl.Workbook()
 workflow = "Beverage"
 
 start_date = date(2007, 1, 1)
-item_set = Item.objects.filter(
-    creation_date__gte=start_date,
-    workflow__name=workflow,
-    job__prepress_supplier__in=("", None, "OPT", "Optihue"),
-).exclude(job__status="Cancelled")
+facts = ItemFacts.load()
+item_set = facts.where(
+    facts["item_created"] >= np.datetime64(start_date),
+    workflow=workflow,
+    prepress_supplier=("", "OPT", "Optihue"),
+).exclude(job_status="Cancelled")
 
-print("Total items:", item_set.count())
+print("Total items:", len(item_set))
+counts = item_set.count_by(item_set.years("item_created"), item_set.months("item_created"))
 
 # Create a new sheet for each plant.
 docSheet1 = workBookDocument.active
@@ -46,8 +51,7 @@ for x in range(39):
     str_date = str(month) + "-" + str(year)
     print(str_date)
     docSheet1.cell(row=x + 2, column=1).value = str_date
-    monthly_items = item_set.filter(creation_date__year=year, creation_date__month=month)
-    docSheet1.cell(row=x + 1, column=2).value = monthly_items.count()
+    docSheet1.cell(row=x + 2, column=2).value = counts.get((year, month), 0)
     month += 1
     if month == 13:
         month = 1
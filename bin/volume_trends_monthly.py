@@ -2,7 +2,8 @@
 """
 Create monthly volume and charges report across workflows.
 
-Generates an Excel file with monthly items and charge totals.
+Generates an Excel file with monthly items and charge totals, from the item
+fact snapshot (see bin/refresh_item_facts.py).
 """
 
 import bin_functions
@@ -14,21 +15,27 @@ import django
 django.setup()
 from datetime import date
 
-from django.db.models import Sum
+import numpy as np
 
-from gchub_db.apps.workflow.models import Charge, Item
+from gchub_db.apps.workflow.item_facts import ItemFacts
 
 # Setup the Worksheet
 workBookDocument = openpyxl.Workbook()
 # Setup the first sheet to be the summary sheet
 
 start_date = date(2000, 1, 1)
-item_set = Item.objects.filter(
-    creation_date__gte=start_date,
-    job__prepress_supplier__in=("", None, "OPT", "Optihue"),
-).exclude(job__status="Cancelled")
+facts = ItemFacts.load()
+item_set = facts.where(
+    facts["item_created"] >= np.datetime64(start_date),
+    prepress_supplier=("", "OPT", "Optihue"),
+).exclude(job_status="Cancelled")
 
-print("Total items:", item_set.count())
+print("Total items:", len(item_set))
+created_years = item_set.years("item_created")
+created_months = item_set.months("item_created")
+item_counts = item_set.count_by(created_years, created_months)
+# Total charges for each month's items.
+charge_totals = item_set.sum_by("charges", created_years, created_months)
 
 # Create a new sheet for each plant.
 docSheet1 = workBookDocument.active
@@ -46,15 +53,8 @@ for x in range(126):
     str_date = str(month) + "-" + str(year)
     print(str_date)
     docSheet1.cell(row=x + 2, column=1).value = str_date
-    monthly_items = item_set.filter(creation_date__year=year, creation_date__month=month)
-    docSheet1.cell(row=x + 2, column=2).value = monthly_items.count()
-    # Total charges for these items.
-    monthly_charges = Charge.objects.filter(item__in=monthly_items)
-    total = monthly_charges.aggregate(total=Sum("amount"))["total"]
-    if total:
-        docSheet1.cell(row=x + 2, column=3).value = total
-    else:
-        docSheet1.cell(row=x + 2, column=3).value = 0
+    docSheet1.cell(row=x + 2, column=2).value = item_counts.get((year, month), 0)
+    docSheet1.cell(row=x + 2, column=3).value = charge_totals.get((year, month), 0)
     month += 1
     if month == 13:
         month = 1
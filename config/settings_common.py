@@ -267,6 +267,16 @@ PRINTED_PROOFS_DIR = os.path.join(WORKFLOW_ROOT_DIR, "Tickets/")
 # Path to temporary location for Art Request before submission
 ARTREQFILES_DIR = os.path.join(DROPFOLDERS_DIR, "ArtReqFiles/")
 
+# How proofs, final files, TIFFs and database documents are sent to the
+# browser (see includes/file_response.py). None streams them through Django,
+# "x-accel" hands them off to nginx with X-Accel-Redirect, and "x-sendfile"
+# does the same for Apache/lighttpd. Both are opt-in: the web server must also
+# be set up to serve the files (see the /protected-workflow/ location in
+# deploy/nginx.conf).
+FILE_SERVE_BACKEND = None
+# Filesystem prefix -> nginx internal location, used by "x-accel".
+FILE_SERVE_ACCEL_LOCATIONS = {WORKFLOW_ROOT_DIR: "/protected-workflow/"}
+
 # This is needed for JMF+JDF to work right
 APPEND_SLASH = False
 # Backstage's JMF web connector address and port in host:port format.
@@ -669,7 +679,8 @@ TEMPLATES = [
             "builtins": ["gchub_db.templatetags.legacy_tags"],
             "loaders": [
                 # List of callables that know how to import templates from various
-                # sources.
+                # sources. gchub_db/settings.py sets no loaders, so there Django
+                # wraps them in the cached loader itself.
                 "django.template.loaders.filesystem.Loader",
                 "django.template.loaders.app_directories.Loader",
             ],
@@ -4,44 +4,63 @@ Command handlers for the GOLD FS UDP server.
 Each incoming UDP packet is expected to be in the form: <command> [arg1 [arg2 ...]].
 Handler functions are looked up using getattr() with the prefix 'cmd_'.
 This module contains small, well-scoped handlers used by the UDP server.
+
+Handlers run on the reactor thread, so anything touching the filesystem is
+handed to server.work_queue rather than done inline. A handler may return a
+string, which is sent back to the client along with its acknowledgement.
 """
 
+import json
+
+from django.conf import settings
+
 from gchub_db.includes import fs_api
 
+# Threads each lock/unlock spreads its chmods over.
+CHMOD_WORKERS = getattr(settings, "GOLD_FS_CHMOD_WORKERS", 4)
+
 
 def cmd_lock_job_folder(args, server):
     """
     Lock job folders recursively.
 
-    Only integers are accepted as the job number.
+    Only integers are accepted as the job number. Files and folders already
+    locked are left alone, so locking a locked folder is just a walk of it.
+    Which archived jobs are locked is recorded in their JobFolderLock by
+    bin/lock_archived_jobs.py, not by the daemon.
     """
-    job_num = args[0]
-    # print "@ Locking job folder:", args[0]
+    job_num = int(args[0])
 
-    try:
-        fs_api.direct_lock_job_folder(job_num)
-    except OSError:
-        # Intentionally ignore filesystem-level locking errors here; callers
-        # will retry or log as appropriate in higher-level code.
-        pass
+    def lock():
+        try:
+            fs_api.direct_lock_job_folder(job_num, workers=CHMOD_WORKERS)
+        except FileNotFoundError:
+            # No folder, nothing to lock.
+            pass
+
+    server.work_queue.submit(job_num, "lock_job_folder", lock)
 
 
 def cmd_unlock_job_folder(args, server):
     """Unlock a job folder identified by job number."""
-    job_num = args[0]
-    # print "@ Unlocking job folder:", args[0]
+    job_num = int(args[0])
+
+    def unlock():
+        try:
+            fs_api.direct_unlock_job_folder(job_num, workers=CHMOD_WORKERS)
+        except FileNotFoundError:
+            pass
+
+    server.work_queue.submit(job_num, "unlock_job_folder", unlock)
+
 
-    try:
-        fs_api.direct_unlock_job_folder(job_num)
-    except Exception as exc:
-        # Keep behavior identical: swallow broad errors but document intent.
-        # Using 'except Exception as exc' satisfies lint rules without changing
-        # runtime semantics.
-        _ = exc
-        pass
+def cmd_stats(args, server):
+    """Report queue depth and per-command latency as JSON."""
+    return json.dumps(server.work_queue.stats())
 
 
 def cmd_shutdown(args, server):
     """Kill the daemon."""
     print("@ Shutting down.")
+    server.work_queue.shutdown()
     server.reactor.stop()
@@ -1,16 +1,35 @@
-# ruff: noqa
 #!/usr/bin/env python
+"""
+GOLD FS UDP server. Runs on master and does the filesystem work (locking and
+unlocking job folders) that the web servers aren't allowed to do.
+
+Datagrams are <command> [args], optionally prefixed with a request id as
+@<id> <command> [args]. Requests with an id are answered with
+"ack <id> [reply]" once the command has been accepted (or "nak <id> <error>"),
+so clients can re-send until they hear back. See fs_api._send_fs_server_request().
+"""
+
+import os
+import sys
 
 sys.path.insert(
     0,
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
 )
-os.environ["DJANGO_SETTINGS_MODULE"] = "gchub_db.settings"
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gchub_db.settings")
 
+from django.conf import settings
 from twisted.internet import reactor
 from twisted.internet.protocol import DatagramProtocol
 
-from . import handlers
+from gchub_db.daemons.gold_fs import handlers
+from gchub_db.daemons.gold_fs.work_queue import WorkQueue
+
+# Number of filesystem commands worked on at once.
+WORKERS = getattr(settings, "GOLD_FS_WORKERS", 4)
+# UDP port listened on. The web servers send to FS_SERVER_PORT, so the two
+# have to match for requests to be acknowledged.
+LISTEN_PORT = getattr(settings, "GOLD_FS_LISTEN_PORT", 8000)
 
 
 class EchoUDP(DatagramProtocol):
@@ -21,13 +40,30 @@ class EchoUDP(DatagramProtocol):
     the `handlers` module using a `cmd_<name>` naming convention.
     """
 
-    def __init__(self, reactor):
+    def __init__(self, reactor, work_queue):
         self.reactor = reactor
+        self.work_queue = work_queue
+
+    def _reply(self, address, status, request_id, text=None):
+        if request_id is None:
+            return
+        message = "%s %s" % (status, request_id)
+        if text:
+            message += " " + text
+        self.transport.write(message.encode(), address)
 
     def datagramReceived(self, datagram, address):
         """Parse the datagram and pass it to the correct command handler in handlers.py."""
-        cmd_split = datagram.split()
-        # print "SPLIT", cmd_split
+        cmd_split = datagram.decode("utf-8", "replace").split()
+        if not cmd_split:
+            return
+
+        request_id = None
+        if cmd_split[0].startswith("@"):
+            request_id = cmd_split[0][1:]
+            cmd_split = cmd_split[1:]
+            if not cmd_split:
+                return
 
         cmd_name = cmd_split[0]
         cmd_args = cmd_split[1:]
@@ -36,9 +72,16 @@ class EchoUDP(DatagramProtocol):
             cmd_func = getattr(handlers, cmd_function_str)
         except AttributeError:
             print("! Invalid command: %s" % cmd_name)
+            self._reply(address, "nak", request_id, "invalid command")
             return
 
-        cmd_func(cmd_args, self)
+        try:
+            reply = cmd_func(cmd_args, self)
+        except (IndexError, ValueError) as inst:
+            print("! Bad arguments for %s: %s" % (cmd_name, cmd_args))
+            self._reply(address, "nak", request_id, str(inst))
+            return
+        self._reply(address, "ack", request_id, reply)
 
 
 def main():
@@ -48,7 +91,8 @@ def main():
     This function is intentionally small so it can be run as a script to
     start the daemon from the command line.
     """
-    reactor.listenUDP(8000, EchoUDP(reactor))
+    work_queue = WorkQueue(workers=WORKERS)
+    reactor.listenUDP(LISTEN_PORT, EchoUDP(reactor, work_queue))
     print("* GOLD FS server started.")
     reactor.run()
 
@@ -0,0 +1,99 @@
+"""
+De-duplicating work queue for the GOLD FS daemon.
+
+Filesystem commands (like re-chmodding a whole job folder) can take minutes
+on a big job, so the UDP listener only queues them. A pool of worker threads
+does the actual work. Commands are keyed (by job number for lock/unlock), and
+a key that is already waiting is replaced rather than queued twice, so a
+burst of lock/unlock requests for one job collapses into its latest state.
+A key never runs on two workers at once.
+"""
+
+import queue
+import threading
+import time
+
+
+class WorkQueue(object):
+    """A keyed, de-duplicating queue drained by a pool of worker threads."""
+
+    def __init__(self, workers=4):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # key -> (command name, callable, time queued) for waiting work.
+        self._pending = {}
+        # Keys currently being worked on.
+        self._running = set()
+        # command name -> {"count", "errors", "total", "max", "last"} in seconds.
+        self._latency = {}
+        self._threads = []
+        for num in range(workers):
+            thread = threading.Thread(target=self._worker, name="gold-fs-worker-%d" % num, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, command_name, func):
+        """
+        Queues func() to run under key. Returns False if the key was already
+        waiting, in which case func replaces the waiting work.
+        """
+        with self._lock:
+            merged = key in self._pending
+            queued_at = self._pending[key][2] if merged else time.monotonic()
+            self._pending[key] = (command_name, func, queued_at)
+            if not merged and key not in self._running:
+                self._queue.put(key)
+        return not merged
+
+    def _worker(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            with self._lock:
+                command_name, func, queued_at = self._pending.pop(key)
+                self._running.add(key)
+            failed = False
+            try:
+                func()
+            except Exception as inst:
+                failed = True
+                print("! %s %s failed: %s" % (command_name, key, inst))
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+                    # Re-submitted while running, so it's our job to queue it.
+                    if key in self._pending:
+                        self._queue.put(key)
+                    self._record(command_name, time.monotonic() - queued_at, failed)
+
+    def _record(self, command_name, seconds, failed):
+        stats = self._latency.setdefault(command_name, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+        stats["count"] += 1
+        stats["errors"] += int(failed)
+        stats["total"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        stats["last"] = seconds
+
+    def stats(self):
+        """Returns queue depth, in-flight work and per-command latency."""
+        with self._lock:
+            latency = {}
+            for command_name, stats in self._latency.items():
+                latency[command_name] = dict(stats, mean=stats["total"] / stats["count"])
+            return {
+                "queued": len(self._pending),
+                "running": len(self._running),
+                "latency": latency,
+            }
+
+    def shutdown(self, wait=False):
+        """
+        Stops the workers once the work already queued is done. With wait,
+        returns only after they have stopped.
+        """
+        for _thread in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
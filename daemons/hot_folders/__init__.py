@@ -0,0 +1,6 @@
+"""
+GOLD hot folder daemon package.
+
+This package contains the server and the folder handlers for the daemon
+that imports files dropped into the production hot folders.
+"""
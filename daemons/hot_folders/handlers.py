@@ -0,0 +1,71 @@
+"""
+The hot folders watched by the daemon and what is done with their files.
+
+Each handler is called with the path of a file that has finished arriving.
+Handlers run on the work queue's threads, so they close stale database
+connections around their work like a request would.
+"""
+
+import os
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from gchub_db.apps.workflow.printed_proofs import PRINTED_PROOFS_DIR, ItemNotFound, is_proof_xml, record_printed_proof
+from gchub_db.apps.xml_io import processed_jdfs
+from gchub_db.apps.xml_io.ink_coverage_queue import IGNORED_FILES, InkCoverageQueue
+from gchub_db.includes.hot_folder import HotFolder, RetryLater
+
+# Shared, so coverages for one item stay spaced out across files.
+ink_coverage_queue = InkCoverageQueue()
+
+
+def with_connections(func):
+    """Wraps a handler so it starts and ends with usable database connections."""
+
+    def handler(path):
+        close_old_connections()
+        try:
+            return func(path)
+        finally:
+            close_old_connections()
+
+    return handler
+
+
+@with_connections
+def handle_ink_coverage(path):
+    ink_coverage_queue.import_waiting_file(os.path.basename(path))
+
+
+@with_connections
+def handle_processed_jdf(path):
+    processed_jdfs.process_processed_jdf(path)
+
+
+@with_connections
+def handle_printed_proof(path):
+    try:
+        record_printed_proof(path)
+    except ItemNotFound as error:
+        # The item may not have been entered yet.
+        raise RetryLater(str(error))
+
+
+def hot_folders():
+    """The HotFolders the daemon watches."""
+    return [
+        HotFolder(
+            "ink_coverage",
+            settings.INK_COVERAGE_DIR,
+            handle_ink_coverage,
+            accept=lambda name: name not in IGNORED_FILES,
+        ),
+        HotFolder(
+            "processed_jdf",
+            processed_jdfs.PROCESSED_DIR,
+            handle_processed_jdf,
+            accept=lambda name: name not in processed_jdfs.IGNORED_FILES,
+        ),
+        HotFolder("printed_proof", PRINTED_PROOFS_DIR, handle_printed_proof, accept=is_proof_xml),
+    ]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+GOLD hot folder daemon. Runs on master and imports the files Backstage and
+the RIP drop into the production hot folders (ink coverages, processed JDFs,
+printed proof records) as they arrive, instead of cron jobs listing the
+folders every few seconds.
+
+See gchub_db.includes.hot_folder for how folders are watched.
+"""
+
+import os
+import signal
+import sys
+
+sys.path.insert(
+    0,
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gchub_db.settings")
+
+import django
+
+django.setup()
+
+from django.conf import settings
+
+from gchub_db.daemons.gold_fs.work_queue import WorkQueue
+from gchub_db.daemons.hot_folders import handlers
+from gchub_db.includes.hot_folder import HotFolderWatcher, SeenLedger
+
+# Number of files worked on at once.
+WORKERS = getattr(settings, "HOT_FOLDER_WORKERS", 4)
+# Where the record of handled files is kept between restarts.
+LEDGER_FILE = getattr(settings, "HOT_FOLDER_LEDGER_FILE", os.path.join(os.path.dirname(__file__), "seen_ledger"))
+
+
+def main():
+    """
+    Start watching the hot folders. Runs until killed; SIGTERM (launchctl
+    stop) finishes the current pass and closes the ledger.
+    """
+    work_queue = WorkQueue(workers=WORKERS)
+    ledger = SeenLedger(LEDGER_FILE)
+    watcher = HotFolderWatcher(handlers.hot_folders(), ledger=ledger, work_queue=work_queue)
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    print("* GOLD hot folder daemon started.")
+    # Picked up by the watcher's first scan.
+    requeued = handlers.ink_coverage_queue.requeue_abandoned()
+    if requeued:
+        print("* %d abandoned ink coverage files requeued." % len(requeued))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Handlers still running record their files in the ledger.
+        work_queue.shutdown(wait=True)
+        ledger.close()
+        print("* Stopped. %s" % watcher.stats)
+
+
+if __name__ == "__main__":
+    main()
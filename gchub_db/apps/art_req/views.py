@@ -29,6 +29,7 @@ from gchub_db.apps.art_req.models import (
     CORRUGATED_TYPE_CHOICES,
 )
 from gchub_db.apps.qad_data.models import QAD_PrintGroups, QAD_CasePacks
+from gchub_db.apps.queues.outbox import enqueue_email
 from gchub_db.apps.workflow.models import (
     Job,
     Item,
@@ -42,24 +43,21 @@ from gchub_db.apps.workflow.models.general import ItemCatalog
 from gchub_db.apps.workflow.views.job_views import CSR_PERMISSION
 from gchub_db.apps.joblog import app_defs as joblog_defs
 from gchub_db.includes import general_funcs, fs_api
+from gchub_db.includes.choice_lists import USER_LIST_MODELS, CachedModelChoiceField
 from gchub_db.middleware import threadlocals
 from gchub_db.includes.gold_json import JSMessage
+from gchub_db.includes.widgets import AutocompleteSelect
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 
 
 # The following "Custom" classes let us change how choices are displayed.
-class CustomPrintGroupChoice(ModelChoiceField):
-    def label_from_instance(self, obj):
-        return obj.description + "-" + obj.name
-
-
-class CustomSalesRepChoice(ModelChoiceField):
+class CustomSalesRepChoice(CachedModelChoiceField):
     def label_from_instance(self, obj):
         return obj.first_name + " " + obj.last_name
 
 
-class CustomCasePackChoice(ModelChoiceField):
+class CustomCasePackChoice(CachedModelChoiceField):
     def label_from_instance(self, obj):
         return obj.case_pack
 
@@ -68,12 +66,21 @@ class NewArtReqForm(ModelForm):
     """Form used for adding a new art request."""
 
     # Use those custom choices we defined earlier.
-    printgroup = CustomPrintGroupChoice(queryset=QAD_PrintGroups.objects.all().order_by("description"))
+    # Labelled like the print group search and its autocomplete, with the
+    # "New Print Group" entry offered first.
+    printgroup = ModelChoiceField(
+        queryset=QAD_PrintGroups.objects.all().order_by("description"),
+        widget=AutocompleteSelect("printgroup_autocomplete", query={"include_new": 1}, min_length=0),
+    )
     sales_rep = CustomSalesRepChoice(
         queryset=User.objects.filter(is_active=True, groups__name="Salesperson")
         .exclude(groups__name="Evergreen Analyst")
-        .order_by("last_name")
+        .order_by("last_name"),
+        cache_name="artreq_sales_reps",
+        cache_models=USER_LIST_MODELS,
     )
+    # Queryset is set in __init__.
+    csr = CachedModelChoiceField(queryset=User.objects.none(), cache_name="artreq_csrs", cache_models=USER_LIST_MODELS)
     save_address = forms.BooleanField(label="", required=False, help_text="Save to address book")
 
     class Meta:
@@ -143,7 +150,9 @@ class ProductForm(ModelForm):
     """
 
     # Use those custom choices we defined earlier.
-    case_pack = CustomCasePackChoice(required=False, queryset=QAD_CasePacks.objects.all())
+    case_pack = CustomCasePackChoice(required=False, queryset=QAD_CasePacks.objects.all(), cache_name="artreq_case_packs")
+    # Queryset is set in __init__.
+    size = CachedModelChoiceField(queryset=ItemCatalog.objects.none(), cache_name="artreq_product_sizes")
 
     def __init__(self, *args, **kwargs):
         super(ProductForm, self).__init__(*args, **kwargs)
@@ -619,7 +628,7 @@ def art_req_process(request, artreq_id, temp_id):
             # send the email
             msg = EmailMultiAlternatives(mail_subject, mail_body.render(mail_context), mail_from, mail_send_to)
             msg.content_subtype = "html"
-            msg.send()
+            enqueue_email(msg)
     except Exception as ex:
         print("Something went wrong with art_req_process() in the Art Req view.")
         print(str(ex))
@@ -3,7 +3,6 @@
 import io
 import os
 import threading
-import time
 
 from django import forms
 from django.contrib.auth.models import User
@@ -23,6 +22,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.generic.list import ListView
 
 from gchub_db.apps.auto_corrugated.elements.fsb_elements import (
+    CORRUGATED_BARCODE_DIR,
     barcodeFileExists,
     triggerBarcodeCreation,
 )
@@ -35,7 +35,7 @@ from gchub_db.apps.auto_corrugated.models import (
 from gchub_db.apps.joblog.app_defs import JOBLOG_TYPE_NOTE
 from gchub_db.apps.joblog.models import JobLog
 from gchub_db.apps.workflow.models import Job, Plant, PlatePackage
-from gchub_db.includes import fs_api, general_funcs
+from gchub_db.includes import fs_api, general_funcs, hot_folder
 
 # Update these imports to the correct paths if the modules have moved, or ensure the files exist in the specified locations.
 # Example fallback if the modules are in a different location:
@@ -494,7 +494,7 @@ def label_search_form(request):
 
 def check_and_create_barcode(box, argArr, type="box_pdf"):
     """
-    This function will check for and create the barcode files if they do not exist in a blocking while loop.
+    This function will check for and create the barcode files if they do not exist, blocking until they are written.
     argArr = [fullpath, method, save_to_job] for type=box_pdf and [] for type=label
 
     The type is either box_pdf, or label, if we want to generate an entire autocorrugated box, or just a label
@@ -505,19 +505,10 @@ def check_and_create_barcode(box, argArr, type="box_pdf"):
         # start the barcode creation process
         triggerBarcodeCreation(box.id, type)
 
-        # check to see if barcode file exists (returns true if does, so while not true)
-        barcodeReady = False
-        counter = 0
-        while not barcodeReady:
-            barcodeReady = barcodeFileExists(box.id, type)
-            # a condition to check if we are approaching an infinite loop. 90 seconds here as the max time we want to wait
-            # the polling interval of automation engine is 60 seconds
-            if counter > 90:
-                timeout = True
-                break
-            # increment out counter with a time mechanic so we dont wait forever if there is an error
-            counter = counter + 1
-            time.sleep(1)
+        # wait for the barcode files to show up, checking again whenever something is written to the barcode folder.
+        # 90 seconds here as the max time we want to wait, the polling interval of automation engine is 60 seconds
+        barcodeReady = hot_folder.wait_for(lambda: barcodeFileExists(box.id, type), CORRUGATED_BARCODE_DIR, timeout=90)
+        timeout = not barcodeReady
 
     # if we get here, check to see if we timed out and if not, then generate the box. If not timeout, we should have barcodes
     if timeout:
@@ -11,9 +11,12 @@ class AutoFTPTiffAdmin(admin.ModelAdmin):
         "destination",
         "date_queued",
         "date_processed",
+        "bytes_uploaded",
+        "upload_seconds",
+        "attempts",
     )
     list_display_links = ("id", "job")
-    exclude = ("job", "items")
+    exclude = ("job", "items", "uploaded_items")
 
 
 admin.site.register(AutoFTPTiff, AutoFTPTiffAdmin)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auto_ftp", "0005_alter_autoftptiff_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="autoftptiff",
+            name="bytes_uploaded",
+            field=models.BigIntegerField(default=0, verbose_name="Bytes Uploaded"),
+        ),
+        migrations.AddField(
+            model_name="autoftptiff",
+            name="upload_seconds",
+            field=models.FloatField(blank=True, null=True, verbose_name="Upload Time (s)"),
+        ),
+    ]
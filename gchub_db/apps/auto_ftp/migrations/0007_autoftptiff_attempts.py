@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auto_ftp", "0006_autoftptiff_upload_throughput"),
+        ("workflow", "0051_cachegeneration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="autoftptiff",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0, verbose_name="Attempts"),
+        ),
+        migrations.AddField(
+            model_name="autoftptiff",
+            name="uploaded_items",
+            field=models.ManyToManyField(blank=True, related_name="+", to="workflow.item"),
+        ),
+    ]
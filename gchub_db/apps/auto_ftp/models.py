@@ -27,6 +27,13 @@ class AutoFTPTiff(models.Model):
     destination = models.IntegerField(choices=DESTINATION_CHOICES)
     date_queued = models.DateTimeField("Date Queued", auto_now_add=True)
     date_processed = models.DateTimeField("Date Processed", blank=True, null=True)
+    # Filled in by the upload worker, for upload throughput.
+    bytes_uploaded = models.BigIntegerField("Bytes Uploaded", default=0)
+    upload_seconds = models.FloatField("Upload Time (s)", blank=True, null=True)
+    # Runs that have tried this upload, and the items that made it, so a
+    # retry only sends the items that failed.
+    attempts = models.PositiveIntegerField("Attempts", default=0)
+    uploaded_items = models.ManyToManyField("workflow.Item", blank=True, related_name="+")
 
     class Meta:
         ordering = ["-date_queued"]
@@ -71,6 +78,12 @@ class AutoFTPTiff(models.Model):
         remote_dir = sdict["ROOT_DIR"]
         return "%s/%s_%s" % (remote_dir, self.job.id, stripped_name)
 
+    def upload_rate(self):
+        """Upload throughput in MB/s, or None if nothing has been uploaded."""
+        if not self.bytes_uploaded or not self.upload_seconds:
+            return None
+        return self.bytes_uploaded / self.upload_seconds / (1024 * 1024)
+
     def mark_as_processed(self):
         """
         The items have been uploaded or the attempt has been made. Removes
@@ -0,0 +1,184 @@
+"""
+Tests for streaming plate zips to an SFTP server, using the local stand-in.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from gchub_db.apps.auto_ftp.models import DESTINATION_FUSION_FLEXO, AutoFTPTiff
+from gchub_db.apps.joblog import app_defs as joblog_defs
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.auto_ftp.uploader import (
+    AUTO_FTP_MAX_ATTEMPTS,
+    MANIFEST_SUFFIX,
+    AutoFTPUploader,
+    LocalSFTP,
+    UploadError,
+    UploadStream,
+    plate_zip_manifest,
+    upload_plate_zip,
+)
+from gchub_db.apps.workflow.models import ChargeType, Item, ItemCatalog, Job, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory
+from gchub_db.includes import fs_api
+
+
+class UploadPlateZipTest(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tiff_dir = os.path.join(self.temp_dir, "tiffs")
+        os.mkdir(self.tiff_dir)
+        tiffs = []
+        for num, name in enumerate(("60001-1 C.tif", "60001-1 K.tif")):
+            path = os.path.join(self.tiff_dir, name)
+            with open(path, "wb") as f:
+                f.write(os.urandom(200000 + num))
+            tiffs.append({"file_name": name, "file_path": path})
+        self.proof = os.path.join(self.tiff_dir, "60001-1-l.pdf")
+        with open(self.proof, "wb") as f:
+            f.write(b"%PDF-1.4 proof" * 1000)
+
+        patches = (
+            mock.patch.object(fs_api, "list_item_tiffs", return_value=tiffs),
+            mock.patch.object(fs_api, "get_item_proof", return_value=self.proof),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.sftp = LocalSFTP(os.path.join(self.temp_dir, "remote"))
+        self.sftp.chdir("/incoming")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def expected_zip(self):
+        """The zip as streamed to the server (not seekable, so not as BytesIO would get it)."""
+        buffer = io.BytesIO()
+        fs_api.write_ftp_plate_zip(60001, 1, UploadStream(buffer))
+        return buffer.getvalue()
+
+    def remote(self, name):
+        with open(os.path.join(self.temp_dir, "remote", "incoming", name), "rb") as f:
+            return f.read()
+
+    def write_partial(self, data, manifest=True):
+        """Leaves a .part file as an interrupted upload of the current files would."""
+        with self.sftp.open("60001-1-C.zip.part", "wb") as f:
+            f.write(data)
+        if manifest:
+            with self.sftp.open("60001-1-C.zip.part" + MANIFEST_SUFFIX, "wb") as f:
+                f.write(plate_zip_manifest(fs_api.ftp_plate_zip_sources(60001, 1)))
+
+    def test_upload_streams_stored_tiffs(self):
+        stream = upload_plate_zip(self.sftp, 60001, 1, "60001-1-C.zip")
+        self.assertFalse(self.sftp.exists("60001-1-C.zip.part"))
+        with zipfile.ZipFile(io.BytesIO(self.remote("60001-1-C.zip"))) as uploaded:
+            self.assertEqual(uploaded.namelist(), ["60001-1 C.tif", "60001-1 K.tif", "60001-1.pdf"])
+            self.assertEqual(uploaded.getinfo("60001-1 C.tif").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(uploaded.getinfo("60001-1.pdf").compress_type, zipfile.ZIP_DEFLATED)
+            self.assertIsNone(uploaded.testzip())
+        self.assertEqual(stream.sent, stream.size)
+        self.assertFalse(self.sftp.exists("60001-1-C.zip.part" + MANIFEST_SUFFIX))
+
+    def test_interrupted_upload_resumes(self):
+        expected = self.expected_zip()
+        self.write_partial(expected[:150000])
+
+        stream = upload_plate_zip(self.sftp, 60001, 1, "60001-1-C.zip")
+        self.assertEqual(stream.sent, len(expected) - 150000)
+        self.assertEqual(self.remote("60001-1-C.zip"), expected)
+
+    def test_partial_of_other_files_starts_over(self):
+        self.write_partial(self.expected_zip()[:150000])
+        # A tiff is re-ripped after the upload was cut off.
+        with open(os.path.join(self.tiff_dir, "60001-1 K.tif"), "wb") as f:
+            f.write(os.urandom(300000))
+        expected = self.expected_zip()
+
+        stream = upload_plate_zip(self.sftp, 60001, 1, "60001-1-C.zip")
+        self.assertEqual(stream.sent, len(expected))
+        self.assertEqual(self.remote("60001-1-C.zip"), expected)
+
+    def test_partial_without_manifest_starts_over(self):
+        self.write_partial(b"x" * 1000, manifest=False)
+        stream = upload_plate_zip(self.sftp, 60001, 1, "60001-1-C.zip")
+        self.assertEqual(stream.sent, stream.size)
+        self.assertEqual(self.remote("60001-1-C.zip"), self.expected_zip())
+
+    def test_mismatched_partial_is_thrown_away(self):
+        expected = self.expected_zip()
+        self.write_partial(b"x" * 1000)
+
+        with self.assertRaises(UploadError):
+            upload_plate_zip(self.sftp, 60001, 1, "60001-1-C.zip")
+        self.assertFalse(self.sftp.exists("60001-1-C.zip.part"))
+        self.assertFalse(self.sftp.exists("60001-1-C.zip"))
+
+        upload_plate_zip(self.sftp, 60001, 1, "60001-1-C.zip")
+        self.assertEqual(self.remote("60001-1-C.zip"), expected)
+
+
+class AutoFTPUploaderTest(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        # Saving a Foodservice item looks this up.
+        ChargeType.objects.create(type="Art Request", category=ChargeCategory.objects.create(name="Art"), base_amount=0, workflow=site)
+        self.job = Job.objects.create(name="FTP Job", workflow=site, status="Active", due_date=date.today())
+        size = ItemCatalog.objects.create(size="SMR-16", workflow=site)
+        self.upload = AutoFTPTiff.objects.create(job=self.job, destination=DESTINATION_FUSION_FLEXO)
+        self.upload.items.add(
+            Item.objects.create(workflow=site, job=self.job, size=size, num_in_job=1),
+            Item.objects.create(workflow=site, job=self.job, size=size, num_in_job=2),
+        )
+        patches = (
+            mock.patch.object(Item, "final_file_date", return_value=timezone.now()),
+            mock.patch.object(Item, "bev_nomenclature", return_value="C"),
+            mock.patch.object(AutoFTPTiff, "get_settings_dict", return_value={}),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_uploader(self, failing=()):
+        """Runs the uploader, with the items numbered in failing failing. Returns the item numbers sent."""
+        sent = []
+
+        def send_item(upload, sdict, item):
+            sent.append(item.num_in_job)
+            return 100, 0.0, 1.0, item.num_in_job not in failing
+
+        with mock.patch.object(AutoFTPUploader, "send_item", side_effect=send_item):
+            AutoFTPUploader(workers=1).run(verbose=False)
+        self.upload.refresh_from_db()
+        return sorted(sent)
+
+    def test_failed_upload_is_queued_again(self):
+        self.assertEqual(self.run_uploader(failing=[2]), [1, 2])
+        self.assertIsNone(self.upload.date_processed)
+        self.assertEqual(self.upload.bytes_uploaded, 200)
+        self.assertEqual(self.upload.attempts, 1)
+
+        # Only the item that failed is sent again.
+        self.assertEqual(self.run_uploader(), [2])
+        self.assertIsNotNone(self.upload.date_processed)
+        self.assertEqual(self.upload.bytes_uploaded, 300)
+        self.assertEqual(self.upload.attempts, 2)
+        self.assertEqual(AutoFTPUploader().claim(), [])
+
+    def test_gives_up_after_max_attempts(self):
+        for _ in range(AUTO_FTP_MAX_ATTEMPTS):
+            self.run_uploader(failing=[1])
+        self.assertEqual(self.upload.attempts, AUTO_FTP_MAX_ATTEMPTS)
+        self.assertIsNotNone(self.upload.date_processed)
+        self.assertEqual(AutoFTPUploader().claim(), [])
+        errors = JobLog.objects.filter(job=self.job, type=joblog_defs.JOBLOG_TYPE_ERROR)
+        self.assertEqual(errors.count(), 1)
+        self.assertIn("item(s) 1 ", errors[0].log_text)
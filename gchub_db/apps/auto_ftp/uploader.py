@@ -0,0 +1,415 @@
+"""
+Auto FTP upload worker.
+
+Each item's tiffs and low res proof are zipped straight into the SFTP upload
+as the zip is built (fs_api.write_ftp_plate_zip()), so a big beverage plate
+set is never held in memory. Several items are uploaded at once, reusing
+SFTP sessions from a small pool per destination, so one big item doesn't
+hold up the rest of the queue.
+
+Uploads are written to "<name>.part" and only renamed once the whole file
+is on the server and verified, so the platemaker never picks up half a zip.
+If an upload is cut off, the next attempt carries on after the bytes
+already on the server: the zip comes out byte for byte the same as long as
+the item's files haven't changed. To make sure they haven't, a manifest of
+the files' names, sizes and modification times is kept next to the .part
+file, and an upload whose manifest doesn't match starts over. The finished
+file is verified by size, and by checksum where the server supports the
+check-file extension; a mismatch throws the partial file away so the next
+attempt starts over.
+
+An upload with an item that failed is put back on the queue for the next
+run, which only sends the items that haven't made it yet. After
+AUTO_FTP_MAX_ATTEMPTS runs it is given up on with an error in the joblog.
+
+With AUTO_FTP_LOCAL_ROOT set, uploads go into that local directory through
+LocalSFTP instead of a real server, for testing.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from traceback import format_exc
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+try:
+    import pysftp
+
+    PYSFTP_AVAILABLE = True
+except ImportError:
+    PYSFTP_AVAILABLE = False
+
+from gchub_db.apps.auto_ftp.models import AutoFTPTiff
+from gchub_db.apps.joblog import app_defs as joblog_defs
+from gchub_db.includes import fs_api
+
+# Number of items uploaded at once.
+AUTO_FTP_WORKERS = getattr(settings, "AUTO_FTP_WORKERS", 3)
+# Runs that try an upload before it's given up on.
+AUTO_FTP_MAX_ATTEMPTS = getattr(settings, "AUTO_FTP_MAX_ATTEMPTS", 5)
+# When set, "upload" into this local directory instead of connecting anywhere.
+AUTO_FTP_LOCAL_ROOT = getattr(settings, "AUTO_FTP_LOCAL_ROOT", None)
+# Hash used to verify uploads with the SFTP check-file extension.
+CHECKSUM_ALGORITHM = "sha1"
+PART_SUFFIX = ".part"
+# Added to the .part file's name for its manifest.
+MANIFEST_SUFFIX = ".manifest"
+
+
+class UploadError(Exception):
+    """An upload didn't arrive intact."""
+
+    pass
+
+
+class UploadStream(object):
+    """
+    Write-only stream for zipfile. Passes everything after the first `skip`
+    bytes (already on the server) on to the remote file, while hashing and
+    counting all of it. It has no seek() or tell(), so zipfile writes the
+    zip in streaming mode rather than going back to patch headers.
+    """
+
+    def __init__(self, remote_file, skip=0):
+        self.remote_file = remote_file
+        self.skip = skip
+        # Total size of the zip, and how much of it was sent this time.
+        self.size = 0
+        self.sent = 0
+        self.hash = hashlib.new(CHECKSUM_ALGORITHM)
+
+    def write(self, data):
+        self.hash.update(data)
+        start = self.size
+        self.size += len(data)
+        if self.size > self.skip:
+            chunk = bytes(data[max(self.skip - start, 0) :])
+            self.remote_file.write(chunk)
+            self.sent += len(chunk)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class LocalSFTPFile(io.FileIO):
+    """A local file with the SFTP check-file extension, for LocalSFTP."""
+
+    def check(self, hash_algorithm, offset=0, length=0, block_size=0):
+        file_hash = hashlib.new(hash_algorithm)
+        with open(self.name, "rb") as f:
+            f.seek(offset)
+            remaining = length or None
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                file_hash.update(chunk)
+                if remaining == 0:
+                    break
+        return file_hash.digest()
+
+
+class LocalSFTP(object):
+    """
+    Stand-in for a pysftp.Connection that works on a local directory, with
+    the subset of methods the uploader uses. Remote paths are relative to
+    root.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.cwd = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, path):
+        if path.startswith("/"):
+            return os.path.join(self.root, path.lstrip("/"))
+        return os.path.join(self.cwd, path)
+
+    def chdir(self, path):
+        self.cwd = self._path(path)
+        os.makedirs(self.cwd, exist_ok=True)
+
+    def open(self, path, mode="r"):
+        return LocalSFTPFile(self._path(path), mode.replace("b", ""))
+
+    def stat(self, path):
+        return os.stat(self._path(path))
+
+    def exists(self, path):
+        return os.path.exists(self._path(path))
+
+    def rename(self, old_path, new_path):
+        os.rename(self._path(old_path), self._path(new_path))
+
+    def remove(self, path):
+        os.remove(self._path(path))
+
+    def close(self):
+        pass
+
+
+def connect_sftp(sdict):
+    """Opens a session to an FTP destination (see AutoFTPTiff.get_settings_dict()) in its root directory."""
+    if AUTO_FTP_LOCAL_ROOT:
+        sftp = LocalSFTP(AUTO_FTP_LOCAL_ROOT)
+    else:
+        # Disable sftp hostkey.
+        cnopts = pysftp.CnOpts()
+        cnopts.hostkeys = None
+        # Connect and login to the FTP server.
+        sftp = pysftp.Connection(
+            host=sdict["HOST"],
+            username=sdict["USERNAME"],
+            password=sdict["PASSWORD"],
+            cnopts=cnopts,
+        )
+    # Navigate to the root directory.
+    sftp.chdir(sdict["ROOT_DIR"])
+    return sftp
+
+
+class SFTPSessionPool(object):
+    """Idle SFTP sessions per destination, reused across uploads."""
+
+    def __init__(self, connect=connect_sftp):
+        self._connect = connect
+        self._lock = threading.Lock()
+        # (host, username, root dir) -> idle sessions.
+        self._idle = {}
+
+    @contextmanager
+    def session(self, sdict):
+        """
+        Lends out a session to the destination. A session that hits an error
+        is closed rather than reused.
+        """
+        key = (sdict["HOST"], sdict["USERNAME"], sdict["ROOT_DIR"])
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            sftp = idle.pop() if idle else None
+        if sftp is None:
+            sftp = self._connect(sdict)
+        try:
+            yield sftp
+        except Exception:
+            sftp.close()
+            raise
+        with self._lock:
+            self._idle[key].append(sftp)
+
+    def close(self):
+        with self._lock:
+            for sessions in self._idle.values():
+                for sftp in sessions:
+                    sftp.close()
+            self._idle = {}
+
+
+def _remote_size(sftp, path):
+    try:
+        return sftp.stat(path).st_size
+    except (IOError, OSError):
+        return None
+
+
+def _remote_checksum(sftp, path):
+    """The remote file's checksum, or None if the server can't work it out."""
+    try:
+        with sftp.open(path, "rb") as remote_file:
+            return remote_file.check(CHECKSUM_ALGORITHM)
+    except (IOError, OSError, AttributeError):
+        return None
+
+
+def _remote_contents(sftp, path):
+    """The remote file's contents, or None if it can't be read."""
+    try:
+        with sftp.open(path, "rb") as remote_file:
+            return remote_file.read()
+    except (IOError, OSError):
+        return None
+
+
+def plate_zip_manifest(sources):
+    """
+    Identifies the files a plate zip is built from (see
+    fs_api.ftp_plate_zip_sources()) by name, size and modification time.
+    The zip's bytes only change when one of these does.
+    """
+    entries = []
+    for file_path, zip_name, compress_type in sources:
+        file_stat = os.stat(file_path)
+        entries.append([zip_name, compress_type, file_stat.st_size, file_stat.st_mtime_ns])
+    return json.dumps(entries).encode()
+
+
+def upload_plate_zip(sftp, jobnum, itemnum, send_name):
+    """
+    Streams an item's plate zip to send_name on the server, resuming a
+    partial upload made from the same files if there is one, and verifies
+    it. Returns the UploadStream, whose sent attribute is the number of
+    bytes sent now.
+    """
+    part_name = send_name + PART_SUFFIX
+    manifest_name = part_name + MANIFEST_SUFFIX
+    sources = fs_api.ftp_plate_zip_sources(jobnum, itemnum)
+    manifest = plate_zip_manifest(sources)
+    skip = _remote_size(sftp, part_name) or 0
+    if skip and _remote_contents(sftp, manifest_name) != manifest:
+        # Made from other files, so its bytes can't be carried on from.
+        skip = 0
+    with sftp.open(part_name, "ab" if skip else "wb") as remote_file:
+        if not skip:
+            # Only written once the old part has been emptied.
+            with sftp.open(manifest_name, "wb") as manifest_file:
+                manifest_file.write(manifest)
+        if hasattr(remote_file, "set_pipelined"):
+            # Don't wait for each write to be acknowledged.
+            remote_file.set_pipelined(True)
+        stream = UploadStream(remote_file, skip)
+        fs_api.write_ftp_plate_zip(jobnum, itemnum, stream, sources=sources)
+
+    remote_size = _remote_size(sftp, part_name)
+    checksum = _remote_checksum(sftp, part_name) if remote_size == stream.size else None
+    if remote_size != stream.size or checksum not in (None, stream.hash.digest()):
+        sftp.remove(part_name)
+        raise UploadError(
+            "%s arrived as %s bytes instead of %s%s."
+            % (send_name, remote_size, stream.size, "" if remote_size != stream.size else " (checksum mismatch)")
+        )
+
+    if sftp.exists(send_name):
+        # SFTP won't rename over an existing file.
+        sftp.remove(send_name)
+    sftp.rename(part_name, send_name)
+    sftp.remove(manifest_name)
+    return stream
+
+
+class AutoFTPUploader(object):
+    """Claims queued AutoFTPTiff uploads and sends their items concurrently."""
+
+    def __init__(self, workers=AUTO_FTP_WORKERS, connect=connect_sftp):
+        self.workers = workers
+        self.sessions = SFTPSessionPool(connect)
+
+    def claim(self):
+        """
+        Takes the waiting uploads off the queue, so another run can't
+        process them too. Returns the claimed uploads; release() puts one
+        back.
+        """
+        claimed = []
+        for upload in AutoFTPTiff.objects.filter(date_processed__isnull=True).select_related("job"):
+            now = timezone.now()
+            if AutoFTPTiff.objects.filter(id=upload.id, date_processed__isnull=True).update(date_processed=now):
+                upload.date_processed = now
+                claimed.append(upload)
+        return claimed
+
+    def release(self, upload):
+        """Puts a claimed upload back on the queue, to be tried again next run."""
+        AutoFTPTiff.objects.filter(id=upload.id).update(date_processed=None)
+        upload.date_processed = None
+
+    def send_item(self, upload, sdict, item):
+        """
+        Uploads one item's zip and notes the outcome in the joblog. Runs on a
+        worker thread. Returns (bytes sent, start time, end time, whether it
+        was uploaded).
+        """
+        started = time.monotonic()
+        sent = 0
+        uploaded = False
+        try:
+            # Set up the zip file name using beverage nomenclature.
+            send_name = "%s-%s-%s.zip" % (item.job.id, item.num_in_job, item.bev_nomenclature())
+            with self.sessions.session(sdict) as sftp:
+                sent = upload_plate_zip(sftp, item.job.id, item.num_in_job, send_name).sent
+        except Exception:
+            error_msg = "Item %d tiff failed to upload due to error:\n%s" % (item.num_in_job, format_exc())
+            item.do_create_joblog_entry(joblog_defs.JOBLOG_TYPE_ERROR, error_msg)
+            print(error_msg)
+            item.do_create_joblog_entry(
+                joblog_defs.JOBLOG_TYPE_WARNING,
+                "Item %d has partially or completely failed to upload." % item.num_in_job,
+            )
+        else:
+            uploaded = True
+            item.do_create_joblog_entry(
+                joblog_defs.JOBLOG_TYPE_FTP,
+                "Item %d has been uploaded to FTP." % item.num_in_job,
+            )
+        finally:
+            # Worker threads each have their own database connection.
+            connection.close()
+        return sent, started, time.monotonic(), uploaded
+
+    def run(self, verbose=True):
+        """Uploads everything waiting in the queue. Returns the number of bytes sent."""
+        uploads = self.claim()
+        total_bytes = 0
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                sending = []
+                for upload in uploads:
+                    # Make sure the items have been final filed out, and
+                    # skip those an earlier run already sent.
+                    uploaded_ids = set(upload.uploaded_items.values_list("id", flat=True))
+                    ready_items = [
+                        prospect for prospect in upload.items.all() if prospect.final_file_date and prospect.id not in uploaded_ids
+                    ]
+                    if not ready_items:
+                        print("No items are ready for proofing and FTP'ing yet.")
+                        continue
+                    sdict = upload.get_settings_dict()
+                    print("Sending Items:")
+                    futures = []
+                    for sent_item in ready_items:
+                        print("* %s (%s)" % (sent_item, sent_item.bev_nomenclature()))
+                        futures.append(pool.submit(self.send_item, upload, sdict, sent_item))
+                    sending.append((upload, ready_items, futures))
+
+                for upload, ready_items, futures in sending:
+                    sent, starts, ends, uploaded = zip(*[future.result() for future in futures])
+                    # Totals over all the attempts.
+                    upload.bytes_uploaded += sum(sent)
+                    upload.upload_seconds = (upload.upload_seconds or 0) + max(ends) - min(starts)
+                    upload.attempts += 1
+                    upload.save(update_fields=["bytes_uploaded", "upload_seconds", "attempts"])
+                    total_bytes += sum(sent)
+                    upload.uploaded_items.add(*[item for item, ok in zip(ready_items, uploaded) if ok])
+                    failed = [item for item, ok in zip(ready_items, uploaded) if not ok]
+                    if not failed:
+                        continue
+                    if upload.attempts < AUTO_FTP_MAX_ATTEMPTS:
+                        print("Upload %d had failures, it will be tried again next run." % upload.id)
+                        self.release(upload)
+                    else:
+                        error_msg = "Gave up uploading item(s) %s to FTP after %d attempts." % (
+                            ", ".join(str(item.num_in_job) for item in failed),
+                            upload.attempts,
+                        )
+                        print("Upload %d: %s" % (upload.id, error_msg))
+                        upload.job.do_create_joblog_entry(joblog_defs.JOBLOG_TYPE_ERROR, error_msg)
+        finally:
+            self.sessions.close()
+
+        if verbose:
+            elapsed = max(time.monotonic() - started, 0.001)
+            print(
+                "%d uploads, %.1f MB in %.1fs, %.2f MB/s"
+                % (len(uploads), total_bytes / 1048576.0, elapsed, total_bytes / 1048576.0 / elapsed)
+            )
+        return total_bytes
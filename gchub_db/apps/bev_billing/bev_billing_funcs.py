@@ -2,32 +2,51 @@
 import os
 
 from django.conf import settings
+from django.db.models import Prefetch
 from reportlab.graphics import renderPDF
-from reportlab.graphics.shapes import Drawing, Group
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
-from svglib.svglib import svg2rlg
 
 from gchub_db.apps.bev_billing.models import BevInvoice
 from gchub_db.apps.workflow.models import Charge
+from gchub_db.includes.reportlib.util import svg_drawing
 
 
-def generate_pdf_invoice(invoice_id, invoice_pdf):
+def invoices_for_rendering(invoice_ids):
+    """
+    The given invoices with everything generate_pdf_invoice() draws loaded
+    along with them, in the same few queries however many invoices there are.
+    """
+    return (
+        BevInvoice.objects.filter(id__in=invoice_ids)
+        .select_related("job__temp_printlocation__plant")
+        .prefetch_related(
+            Prefetch("charge_set", queryset=Charge.objects.select_related("item", "description__category")),
+            "job__item_set",
+        )
+    )
+
+
+def generate_pdf_invoice(invoice_id, invoice_pdf, invoice=None):
     """
     Generate an Invoice for the given invoice id.
     An invoice will only contain charges from one Job.
+
+    invoice may be passed in already loaded by invoices_for_rendering(), in
+    which case nothing more is read from the database.
     """
-    invoice = BevInvoice.objects.get(id=invoice_id)
+    if invoice is None:
+        invoice = invoices_for_rendering([invoice_id]).get()
 
     # Get invoiced charges, plates included.
-    invoiced_charges = Charge.objects.filter(bev_invoice=invoice)
+    invoiced_charges = invoice.charge_set.all()
 
     # Let's just double check to make sure that all the charges are
     # for the same job...
-    job_test = invoiced_charges[0].item.job
+    job_test = invoiced_charges[0].item.job_id
     for charge in invoiced_charges:
-        if charge.item.job != job_test:
+        if charge.item.job_id != job_test:
             print("SOMETHING BAD HAS HAPPENED! MULTIPLE JOBS ON ONE INVOICE!")
             break
 
@@ -49,11 +68,7 @@ def generate_pdf_invoice(invoice_id, invoice_pdf):
     # Draw GPI log on top left of invoice.
     # file_path = os.path.join(settings.MEDIA_ROOT, 'img/ip_logo.svg')
     file_path = os.path.join(settings.MEDIA_ROOT, "img/GPI_Black_logo.svg")
-    graphic = svg2rlg(file_path)
-    d = Drawing()
-    graphic_group = Group(graphic)
-    d.add(graphic_group)
-    renderPDF.draw(d, c, 0.5 * inch, 10 * inch)
+    renderPDF.draw(svg_drawing(file_path), c, 0.5 * inch, 10 * inch)
 
     # Setup all the headers for the invoice.
     c.setFont("Helvetica-Bold", 16)
@@ -159,9 +174,6 @@ def generate_pdf_invoice(invoice_id, invoice_pdf):
         # Setup the starting line of the item to be that of the current
         # cursor position.
         item_start_y = y_cursor
-        print("Drawing Item", item)
-        print("Y Cursor", y_cursor)
-        print("Item Start Y", item_start_y)
         item_name_written = False
         item_art_charges = 0
         item_plate_charges = 0
@@ -0,0 +1,128 @@
+"""
+Batch rendering of beverage invoice PDFs, for bin/invoice_pdf_generator.py.
+
+The invoices are loaded with invoices_for_rendering() a batch at a time, so a
+batch costs the same few queries however many invoices are in it. The
+loaded invoices are then drawn by a pool of RENDER_WORKERS processes.
+The workers never touch the database: everything they draw comes with
+the pickled invoice, and the logo is parsed once per worker rather than
+once per invoice. Each PDF comes back to this process to be written out,
+either into a directory or, if the destination ends in .zip, a ZIP file.
+"""
+
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.conf import settings
+
+from gchub_db.apps.bev_billing.bev_billing_funcs import generate_pdf_invoice, invoices_for_rendering
+from gchub_db.apps.bev_billing.models import BevInvoice
+from gchub_db.includes.reportlib.util import svg_drawing
+
+# Processes drawing invoices at once.
+RENDER_WORKERS = getattr(settings, "INVOICE_RENDER_WORKERS", 4)
+# Invoices loaded per round of queries.
+RENDER_BATCH_SIZE = 100
+
+
+def month_invoice_ids(year, month):
+    """Ids of the invoices created in the given month, in order."""
+    invoices = BevInvoice.objects.filter(creation_date__year=year, creation_date__month=month)
+    return list(invoices.order_by("id").values_list("id", flat=True))
+
+
+def invoice_file_name(invoice):
+    """The name an invoice's PDF is saved under."""
+    if invoice.invoice_number:
+        return "%s.pdf" % invoice.invoice_number.replace("/", "-")
+    return "invoice_%d.pdf" % invoice.id
+
+
+def _start_worker():
+    """
+    Sets up Django, where the worker wasn't forked from a process that has
+    already done so, and the invoice assets in a new worker process.
+    """
+    django.setup()
+    svg_drawing(os.path.join(settings.MEDIA_ROOT, "img/GPI_Black_logo.svg"))
+
+
+def _render(invoice):
+    """
+    Draws one loaded invoice. Returns its id, the PDF and the seconds taken,
+    or its id, None and the error.
+    """
+    start = time.time()
+    invoice_pdf = BytesIO()
+    try:
+        generate_pdf_invoice(invoice.id, invoice_pdf, invoice=invoice)
+    except Exception as error:
+        return invoice.id, None, "%s: %s" % (error.__class__.__name__, error)
+    return invoice.id, invoice_pdf.getvalue(), time.time() - start
+
+
+class InvoiceRenderer(object):
+    """Renders beverage invoice PDFs into a directory or a ZIP file."""
+
+    def __init__(self, workers=RENDER_WORKERS, batch_size=RENDER_BATCH_SIZE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.failed = []
+
+    def _results(self, invoices, pool):
+        """Renders the invoices, in the pool if there is one."""
+        if pool is None:
+            return map(_render, invoices)
+        return pool.map(_render, invoices)
+
+    def run(self, invoice_ids, destination):
+        """
+        Renders the given invoices into destination. Returns the number
+        rendered; the ids of the invoices that couldn't be are in failed.
+        """
+        start = time.time()
+        print("%d invoices to render." % len(invoice_ids))
+        rendered = 0
+
+        if destination.endswith(".zip"):
+            archive = zipfile.ZipFile(destination, "w", zipfile.ZIP_DEFLATED)
+        else:
+            archive = None
+            os.makedirs(destination, exist_ok=True)
+        # With one worker there's no point starting another process.
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_start_worker)
+
+        try:
+            for position in range(0, len(invoice_ids), self.batch_size):
+                invoices = {
+                    invoice.id: invoice for invoice in invoices_for_rendering(invoice_ids[position : position + self.batch_size])
+                }
+                for invoice_id, data, result in self._results(invoices.values(), pool):
+                    invoice = invoices[invoice_id]
+                    if data is None:
+                        print("! Could not render %s: %s" % (invoice, result))
+                        self.failed.append(invoice_id)
+                        continue
+                    file_name = invoice_file_name(invoice)
+                    if archive is not None:
+                        archive.writestr(file_name, data)
+                    else:
+                        with open(os.path.join(destination, file_name), "wb") as pdf:
+                            pdf.write(data)
+                    rendered += 1
+                    print("%s rendered in %.2f seconds." % (file_name, result))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if archive is not None:
+                archive.close()
+
+        elapsed = time.time() - start
+        print("%d invoices rendered, %d failed, in %.1f seconds." % (rendered, len(self.failed), elapsed))
+        return rendered
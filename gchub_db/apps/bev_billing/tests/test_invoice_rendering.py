@@ -0,0 +1,107 @@
+"""
+Tests for batch rendering of beverage invoice PDFs.
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from io import BytesIO
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from gchub_db.apps.bev_billing.bev_billing_funcs import generate_pdf_invoice, invoices_for_rendering
+from gchub_db.apps.bev_billing.invoice_rendering import InvoiceRenderer, month_invoice_ids
+from gchub_db.apps.bev_billing.models import BevInvoice
+from gchub_db.apps.workflow.models import Charge, ChargeType, Item, ItemCatalog, Job, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory, Plant, PrintLocation, Press
+from gchub_db.includes.reportlib import util
+
+LOGO = """<svg xmlns="http://www.w3.org/2000/svg" width="72" height="36">
+<rect x="0" y="0" width="72" height="36" fill="black"/>
+</svg>
+"""
+
+
+class InvoiceRenderingTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, "media", "img"))
+        with open(os.path.join(self.temp_dir, "media", "img", "GPI_Black_logo.svg"), "w") as logo:
+            logo.write(LOGO)
+        self.settings_override = override_settings(MEDIA_ROOT=os.path.join(self.temp_dir, "media"))
+        self.settings_override.enable()
+        util.svg_drawing.cache_clear()
+
+        site = Site.objects.create(name="Beverage", domain="bev.example.com")
+        category = ChargeCategory.objects.create(name="Art")
+        art = ChargeType.objects.create(type="Art Request", category=category, base_amount=0, workflow=site)
+        plates = ChargeType.objects.create(type="Plates", category=category, base_amount=0, workflow=site)
+        size = ItemCatalog.objects.create(size="Q-32", workflow=site)
+        printlocation = PrintLocation.objects.create(
+            plant=Plant.objects.create(name="Plant City", workflow=site),
+            press=Press.objects.create(name="Kidder", short_name="KID", workflow=site),
+        )
+        self.invoices = []
+        for num in range(3):
+            job = Job.objects.create(
+                name="Job %d" % num, workflow=site, status="Active", due_date=date.today(), temp_printlocation=printlocation
+            )
+            invoice = BevInvoice.objects.create(job=job, invoice_number="INV-%d" % num)
+            for item_num in (1, 2):
+                item = Item.objects.create(workflow=site, job=job, size=size, num_in_job=item_num)
+                Charge.objects.create(item=item, description=art, amount=100, bev_invoice=invoice)
+                Charge.objects.create(item=item, description=plates, amount=25.5, bev_invoice=invoice)
+            self.invoices.append(invoice)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        util.svg_drawing.cache_clear()
+        shutil.rmtree(self.temp_dir)
+
+    def test_batch_loads_in_constant_queries(self):
+        def render_all(invoice_ids):
+            with CaptureQueriesContext(connection) as queries:
+                for invoice in invoices_for_rendering(invoice_ids):
+                    generate_pdf_invoice(invoice.id, BytesIO(), invoice=invoice)
+            return len(queries)
+
+        self.assertEqual(render_all([self.invoices[0].id]), render_all([invoice.id for invoice in self.invoices]))
+
+    def test_logo_is_parsed_once(self):
+        with mock.patch.object(util, "svg2rlg", wraps=util.svg2rlg) as svg2rlg:
+            for invoice in self.invoices:
+                generate_pdf_invoice(invoice.id, BytesIO())
+        self.assertEqual(svg2rlg.call_count, 1)
+
+    def test_single_invoice(self):
+        invoice_pdf = BytesIO()
+        generate_pdf_invoice(self.invoices[0].id, invoice_pdf)
+        self.assertTrue(invoice_pdf.getvalue().startswith(b"%PDF"))
+
+    def test_renders_month_into_zip(self):
+        self.assertEqual(month_invoice_ids(date.today().year, date.today().month), [invoice.id for invoice in self.invoices])
+        destination = os.path.join(self.temp_dir, "invoices.zip")
+        renderer = InvoiceRenderer(workers=1, batch_size=2)
+        self.assertEqual(renderer.run([invoice.id for invoice in self.invoices], destination), 3)
+        with zipfile.ZipFile(destination) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["INV-0.pdf", "INV-1.pdf", "INV-2.pdf"])
+            self.assertTrue(archive.read("INV-1.pdf").startswith(b"%PDF"))
+
+    def test_renders_in_worker_processes(self):
+        destination = os.path.join(self.temp_dir, "invoices")
+        renderer = InvoiceRenderer(workers=2)
+        self.assertEqual(renderer.run([invoice.id for invoice in self.invoices], destination), 3)
+        self.assertEqual(sorted(os.listdir(destination)), ["INV-0.pdf", "INV-1.pdf", "INV-2.pdf"])
+
+    def test_failures_are_collected(self):
+        Charge.objects.filter(bev_invoice=self.invoices[1]).delete()
+        destination = os.path.join(self.temp_dir, "invoices")
+        renderer = InvoiceRenderer(workers=1)
+        self.assertEqual(renderer.run([invoice.id for invoice in self.invoices], destination), 2)
+        self.assertEqual(renderer.failed, [self.invoices[1].id])
+        self.assertEqual(sorted(os.listdir(destination)), ["INV-0.pdf", "INV-2.pdf"])
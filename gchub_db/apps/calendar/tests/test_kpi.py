@@ -0,0 +1,45 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from gchub_db.apps.calendar.models import Event
+from gchub_db.includes import kpi
+
+
+class KPIAggregationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="kpi_user", password="testpass123")
+        for event_type, day in (("VA", 2), ("VA", 3), ("HV", 4), ("SD", 5), ("VA", 6)):
+            Event.objects.create(
+                description="Time off",
+                type=event_type,
+                event_date=datetime.date(2023, 3, day),
+                employee=self.user,
+            )
+        # Outside the year, should not be counted.
+        Event.objects.create(
+            description="Time off",
+            type="VA",
+            event_date=datetime.date(2024, 1, 1),
+            employee=self.user,
+        )
+
+    def test_grouped_counts_single_query(self):
+        start, end = kpi.year_bounds(2023, aware=False)
+        events = Event.objects.filter(employee=self.user, event_date__gte=start, event_date__lt=end)
+        with self.assertNumQueries(1):
+            counts = kpi.grouped_counts(events, {"VA": {"type": "VA"}, "HV": {"type": "HV"}, "SH": {"type": "SH"}})
+        self.assertEqual(counts, {"total": 5, "VA": 3, "HV": 1, "SH": 0})
+
+    def test_closed_year_is_cached(self):
+        compute = mock.Mock(return_value={"total": 1})
+        kpi.cached_for_year("test", 2001, compute)
+        kpi.cached_for_year("test", 2001, compute)
+        self.assertEqual(compute.call_count, 1)
+        kpi.invalidate_year("test", 2001)
+        kpi.cached_for_year("test", 2001, compute)
+        self.assertEqual(compute.call_count, 2)
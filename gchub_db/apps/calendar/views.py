@@ -2,7 +2,7 @@ from __future__ import division
 
 import calendar
 import time
-from datetime import timedelta
+from datetime import date, timedelta
 
 from django import forms
 from django.conf import settings
@@ -16,7 +16,9 @@ from django.shortcuts import render
 from django.template import loader
 
 from gchub_db.apps.calendar.models import EVENT_TYPES, Event
+from gchub_db.apps.queues.outbox import enqueue_email
 from gchub_db.includes.gold_json import JSMessage
+from gchub_db.includes.kpi import grouped_counts, year_bounds
 from gchub_db.middleware import threadlocals
 
 HOUR_CHOICES = (
@@ -102,15 +104,23 @@ def month_overview(request, year_num, month_num):
 
     current_day = current_time[2]
 
-    events_for_month = Event.objects.filter(event_date__year=year_num, event_date__month=month_num)
-
-    vacation_used_full = Event.objects.filter(employee__username=request.user.username, type="VA", event_date__year=year_num).count()
-    vacation_used_half = Event.objects.filter(employee__username=request.user.username, type="HV", event_date__year=year_num).count()
-    vacation_used = vacation_used_full + (vacation_used_half / 2)
-
-    sick_used_full = Event.objects.filter(employee__username=request.user.username, type="SD", event_date__year=year_num).count()
-    sick_used_half = Event.objects.filter(employee__username=request.user.username, type="SH", event_date__year=year_num).count()
-    sick_used = sick_used_full + (sick_used_half / 2)
+    events_for_month = Event.objects.filter(
+        event_date__gte=date(year_num, month_num, 1),
+        event_date__lt=date(next_year, next_month_num, 1),
+    )
+
+    # Full and half days of vacation and sick time used this year, in one query.
+    year_start, year_end = year_bounds(year_num, aware=False)
+    time_off = grouped_counts(
+        Event.objects.filter(
+            employee__username=request.user.username,
+            event_date__gte=year_start,
+            event_date__lt=year_end,
+        ),
+        {"VA": {"type": "VA"}, "HV": {"type": "HV"}, "SD": {"type": "SD"}, "SH": {"type": "SH"}},
+    )
+    vacation_used = time_off["VA"] + (time_off["HV"] / 2)
+    sick_used = time_off["SD"] + (time_off["SH"] / 2)
 
     # Return a list of weeks in the month. Each week is represented by a list
     # of days represented by integers. If a day is equal to 0, it isn't in
@@ -279,7 +289,7 @@ def event_add(request, year_num="0", month_num="0", day_num="0"):
                     mail_send_to,
                 )
                 msg.content_subtype = "html"
-                msg.send()
+                enqueue_email(msg)
 
             # Used when managers assigns an event to another employee
             if employee_override != "None":
@@ -348,7 +358,7 @@ def event_add(request, year_num="0", month_num="0", day_num="0"):
                 # Attach the file and specify type.
                 email.attach(filename, data.render(mail_context), "text/calendar")
                 # Poof goes the mail.
-                email.send(fail_silently=False)
+                enqueue_email(email)
 
             if event_length > 1:
                 while repeater < event_length:
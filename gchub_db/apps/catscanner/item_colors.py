@@ -0,0 +1,88 @@
+"""
+Cached summary of an item's colors for the catscanner endpoints.
+
+A scan calls color_data and send_measurement once per color of the item,
+and each used to load the job, the item and its item colors again to find
+the one at color_num. item_color_summary() keeps the item's id and its
+(ItemColor id, definition id) pairs in the cache instead, under a
+generation per job that changes when one of the job's items or item colors
+is saved (other than for a measurement) or deleted.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from gchub_db.apps.workflow.models import Item, ItemColor, Job
+
+# Seconds a summary is kept, as a backstop to the signals.
+CATSCANNER_SUMMARY_TIMEOUT = getattr(settings, "CATSCANNER_SUMMARY_TIMEOUT", 15 * 60)
+# ItemColor fields send_measurement() writes, which the summary doesn't hold.
+MEASUREMENT_FIELDS = (
+    "delta_e",
+    "delta_e_passes",
+    "measured_lab_l",
+    "measured_lab_a",
+    "measured_lab_b",
+    "proof_out_override_reason",
+)
+
+
+def _summary_key(job_id, item_num):
+    return "catscanner_colors_%s_%s" % (job_id, int(item_num))
+
+
+def _generation_key(job_id):
+    return "catscanner_colors_gen_%s" % job_id
+
+
+def invalidate_job_colors(job_id):
+    """
+    Drops the summaries of the job's items. Only needed after writes that
+    don't send signals, like bulk_create() and bulk_update().
+    """
+    cache.set(_generation_key(job_id), uuid.uuid4().hex, CATSCANNER_SUMMARY_TIMEOUT)
+
+
+def item_color_summary(job_id, item_num):
+    """
+    Returns (item id, [(ItemColor id, definition id), ...]) for the job's
+    item_num'th item, its colors in the usual order. Like looking the item up
+    directly, raises Job.DoesNotExist or IndexError if it doesn't exist.
+    """
+    key = _summary_key(job_id, item_num)
+    generation_key = _generation_key(job_id)
+    # One round trip for the summary and the generation it has to match.
+    found = cache.get_many([key, generation_key])
+    generation = found.get(generation_key)
+    entry = found.get(key)
+    if entry is not None and entry["generation"] == generation:
+        return entry["item_id"], entry["colors"]
+
+    item = Job.objects.get(id=job_id).get_item_num(item_num)
+    colors = list(item.itemcolor_set.values_list("id", "definition_id"))
+    cache.set(key, {"generation": generation, "item_id": item.id, "colors": colors}, CATSCANNER_SUMMARY_TIMEOUT)
+    return item.id, colors
+
+
+def _item_changed(sender, instance, **kwargs):
+    invalidate_job_colors(instance.job_id)
+
+
+def _itemcolor_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= set(MEASUREMENT_FIELDS):
+        return
+    if ItemColor.item.is_cached(instance):
+        job_id = instance.item.job_id
+    else:
+        job_id = Item.objects.filter(id=instance.item_id).values_list("job_id", flat=True).first()
+    if job_id is not None:
+        invalidate_job_colors(job_id)
+
+
+post_save.connect(_item_changed, sender=Item, dispatch_uid="catscanner_item_save")
+post_delete.connect(_item_changed, sender=Item, dispatch_uid="catscanner_item_delete")
+post_save.connect(_itemcolor_changed, sender=ItemColor, dispatch_uid="catscanner_itemcolor_save")
+post_delete.connect(_itemcolor_changed, sender=ItemColor, dispatch_uid="catscanner_itemcolor_delete")
@@ -1,4 +1,7 @@
-"""Stub models module for catscanner used during import diagnostics."""
+"""
+catscanner has no models of its own. Importing item_colors here connects
+the signals that keep its cached item color summaries fresh in every
+process, not only the ones serving catscanner requests.
+"""
 
-# No models required for tests that import this module; keep minimal.
-__all__ = []
+from gchub_db.apps.catscanner import item_colors  # noqa: F401
@@ -0,0 +1,57 @@
+"""
+Tests for the catscanner endpoints answering from the cached item color summary.
+"""
+
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.apps.workflow.models import ChargeType, Item, ItemCatalog, ItemColor, Job, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory
+
+
+@override_settings(ROOT_URLCONF="gchub_db.apps.catscanner.urls")
+class ItemColorSummaryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        site = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        # Saving a Foodservice item looks this up.
+        ChargeType.objects.create(type="Art Request", category=ChargeCategory.objects.create(name="Art"), base_amount=0, workflow=site)
+        self.job = Job.objects.create(name="Scan Job", workflow=site, status="Active", due_date=date.today())
+        item = Item.objects.create(
+            workflow=site, job=self.job, size=ItemCatalog.objects.create(size="SMR-16", workflow=site), num_in_job=1
+        )
+        self.definition = ColorDefinition.objects.create(name="PMS 300", coating="C", lab_l=50, lab_a=-10, lab_b=-40)
+        self.colors = [
+            ItemColor.objects.create(item=item, definition=self.definition, color="PMS 300"),
+            ItemColor.objects.create(item=item, color="Process Black"),
+        ]
+        self.client = Client()
+
+    def workflow_queries(self, url):
+        """Fetches url, returning the response and the queries it made against workflow tables."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query["sql"] for query in queries if "workflow_" in query["sql"]]
+
+    def test_color_data_from_summary(self):
+        self.assertEqual(self.client.get("/color_data/%d/1/0/" % self.job.id).content, b"0|50.000000|-10.000000|-40.000000")
+        # The summary and the color index are warm now.
+        response, queries = self.workflow_queries("/color_data/%d/1/1/" % self.job.id)
+        self.assertEqual(response.content, b"1|0.0|0.0|0.0")
+        self.assertEqual(queries, [])
+
+    def test_measurement_keeps_summary_and_new_color_drops_it(self):
+        url = "/send_measurement/%d/1/0/?passes=yes&delta_e=1.5&lab_l=51&lab_a=-10&lab_b=-39" % self.job.id
+        self.assertEqual(self.client.get(url).content, b"success")
+        color = ItemColor.objects.get(id=self.colors[0].id)
+        self.assertEqual((color.delta_e, color.delta_e_passes, color.measured_lab_l), (1.5, True, 51.0))
+        response, queries = self.workflow_queries("/color_data/%d/1/0/" % self.job.id)
+        self.assertEqual(queries, [])
+
+        ItemColor.objects.create(item=self.colors[0].item, definition=self.definition, color="PMS 300 Screened")
+        self.assertEqual(self.client.get("/color_data/%d/1/2/" % self.job.id).content, b"0|50.000000|-10.000000|-40.000000")
@@ -2,7 +2,10 @@ from string import Template
 
 from django.http import HttpResponse
 
-from gchub_db.apps.workflow.models import Job
+from gchub_db.apps.catscanner.item_colors import MEASUREMENT_FIELDS, item_color_summary
+from gchub_db.apps.color_mgt.color_index import color_index
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.apps.workflow.models import ItemColor, Job
 
 
 def item_data(request, job_id, item_num):
@@ -45,18 +48,16 @@ def item_data(request, job_id, item_num):
 
 def color_data(request, job_id, item_num, color_num):
     """Returns color data for an item's color."""
-    job = Job.objects.get(id=job_id)
-    item = job.get_item_num(item_num)
-    colors = item.itemcolor_set.all()
+    item_id, colors = item_color_summary(job_id, item_num)
     # Get the ItemColor matching the specified index in the color array.
-    color = colors[int(color_num)]
-    # Shortened name
-    colordef = color.definition
+    color_id, definition_id = colors[int(color_num)]
 
-    if colordef is None:
+    if definition_id is None:
         # No color definition found for this ItemColor. Don't compare it.
         return HttpResponse("1|0.0|0.0|0.0")
     else:
+        # Definitions added in the last few seconds may not be indexed yet.
+        colordef = color_index().get(definition_id) or ColorDefinition.objects.get(id=definition_id)
         # Some colors are not for comparison. QPO, Process, etc.
         if colordef.do_compare:
             dont_compare = 0
@@ -82,10 +83,8 @@ def send_measurement(request, job_id, item_num, color_num):
     Optional GET Keys:
      * proof_out_override_reason
     """
-    job = Job.objects.get(id=job_id)
-    item = job.get_item_num(item_num)
-    colors = item.itemcolor_set.all()
-    color = colors[int(color_num)]
+    item_id, colors = item_color_summary(job_id, item_num)
+    color = ItemColor.objects.get(id=colors[int(color_num)][0])
 
     pass_fail = request.GET["passes"]
     if pass_fail == "yes":
@@ -98,6 +97,7 @@ def send_measurement(request, job_id, item_num, color_num):
     color.measured_lab_a = float(request.GET["lab_a"])
     color.measured_lab_b = float(request.GET["lab_b"])
     color.proof_out_override_reason = request.GET.get("proof_out_override_reason", None)
-    color.save()
+    # Measurements don't change the item's cached color summary.
+    color.save(update_fields=MEASUREMENT_FIELDS)
 
     return HttpResponse("success")
@@ -0,0 +1,129 @@
+"""
+Foodservice color measurement statistics for the color_mgt pages.
+
+The stats pages used to call ColorDefinition.fsb_usage_count() and
+avg_delta() for every definition in the catalog, a query or two each.
+ColorStats instead gets the usage count, delta-e average and maximum, and
+average measured Lab of every definition in one grouped query, lines them
+up against the definitions in NumPy arrays, and sorts them into hue groups
+in one go.
+"""
+
+import numpy as np
+from django.db.models import Avg, Count, Max
+
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.apps.workflow.models import ItemColor
+
+# An average delta-e at or above this gets a warning on the stats pages.
+AVG_DELTA_WARNING = 2
+# Colors with a chroma at or below this are grays, whatever their hue.
+GRAY_MAX_CHROMA = 15.7
+# (group, first hue, end hue) in degrees. Reds wrap around past 295.
+HUE_GROUPS = (
+    ("reds", 0, 67),
+    ("yellows", 67, 106),
+    ("greens", 106, 222),
+    ("blues", 222, 295),
+    ("reds", 295, 359.999),
+)
+# Colors missing a chroma or hue to compare go in errors.
+GROUPS = ("grays", "reds", "yellows", "greens", "blues", "errors")
+
+
+def fsb_measurements():
+    """Foodservice ItemColors that have been measured."""
+    return ItemColor.objects.filter(item__job__workflow__name="Foodservice", delta_e__isnull=False)
+
+
+def hue_groups(lch_c, lch_h):
+    """
+    Indexes into GROUPS for arrays of chroma and hue (NaN where missing).
+    A chroma or hue of exactly zero counts as missing, as it always has.
+    """
+    has_chroma = (lch_c != 0) & ~np.isnan(lch_c)
+    has_hue = (lch_h != 0) & ~np.isnan(lch_h)
+    conditions = [has_chroma & (lch_c <= GRAY_MAX_CHROMA)]
+    choices = [GROUPS.index("grays")]
+    for group, start, end in HUE_GROUPS:
+        conditions.append(has_hue & (lch_h >= start) & (lch_h < end))
+        choices.append(GROUPS.index(group))
+    return np.select(conditions, choices, default=GROUPS.index("errors"))
+
+
+class ColorUsage(object):
+    """
+    A measured color definition and its Foodservice stats. Stands in for the
+    ColorDefinition in the templates.
+    """
+
+    def __init__(self, definition, usage_count, avg_delta, max_delta, lab_offset):
+        self.definition = definition
+        self.fsb_usage_count = usage_count
+        self.avg_delta = avg_delta
+        self.max_delta = max_delta
+        self.avg_delta_warning = avg_delta >= AVG_DELTA_WARNING
+        # Delta-e (CIE76) from the definition's Lab to the average measurement.
+        self.lab_offset = lab_offset
+
+    def __str__(self):
+        return str(self.definition)
+
+    def __getattr__(self, name):
+        return getattr(self.definition, name)
+
+
+class ColorStats(object):
+    """Foodservice measurement stats for every color definition that has been measured."""
+
+    def __init__(self):
+        rows = list(
+            fsb_measurements()
+            .filter(definition__isnull=False)
+            .values_list("definition")
+            .annotate(
+                Count("id"),
+                Avg("delta_e"),
+                Max("delta_e"),
+                Avg("measured_lab_l"),
+                Avg("measured_lab_a"),
+                Avg("measured_lab_b"),
+            )
+            .order_by("definition")
+        )
+        definitions = list(ColorDefinition.objects.all())
+
+        # One row per measured definition, in id order. None comes out as NaN.
+        measured = np.array(rows, dtype="f8").reshape(-1, 7)
+        measured_ids = measured[:, 0].astype("i8")
+        # Definition id, chroma, hue and Lab, in name order.
+        standards = np.array(
+            [(color.id, color.lch_c, color.lch_h, color.lab_l, color.lab_a, color.lab_b) for color in definitions],
+            dtype="f8",
+        ).reshape(-1, 6)
+
+        # Line the measurements up with the definitions that have any.
+        positions = np.searchsorted(measured_ids, standards[:, 0].astype("i8"))
+        positions[positions == len(measured_ids)] = 0
+        if len(measured_ids):
+            used = np.flatnonzero(measured_ids[positions] == standards[:, 0])
+        else:
+            used = np.empty(0, dtype="i8")
+        measured = measured[positions[used]]
+        standards = standards[used]
+
+        lab_offsets = np.sqrt(((measured[:, 4:7] - standards[:, 3:6]) ** 2).sum(axis=1))
+        groups = hue_groups(standards[:, 1], standards[:, 2])
+
+        self.colors = []
+        self.groups = dict((group, []) for group in GROUPS)
+        for num, index in enumerate(used):
+            usage = ColorUsage(
+                definitions[index],
+                int(measured[num, 1]),
+                float(measured[num, 2]),
+                float(measured[num, 3]),
+                None if np.isnan(lab_offsets[num]) else float(lab_offsets[num]),
+            )
+            self.colors.append(usage)
+            self.groups[GROUPS[groups[num]]].append(usage)
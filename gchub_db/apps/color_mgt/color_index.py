@@ -0,0 +1,246 @@
+"""
+In-process lookup index of the color definitions.
+
+ColorIndex holds every ColorDefinition by id and by normalized name, and a
+KD-tree of their Lab values per coating, so finding a definition by ink
+name or the closest definitions to a measured Lab (by CIEDE2000) doesn't
+touch the database. color_index() returns a shared index, rebuilt after a
+definition is saved or deleted in this process, or (checked at most every
+COLOR_INDEX_CHECK_INTERVAL seconds) in another one.
+
+The KD-tree works in plain Lab distance, which isn't CIEDE2000: nearest()
+takes a shortlist of the closest definitions by Lab distance and ranks that
+by CIEDE2000. For a measurement close to a definition, as press and proof
+measurements are, the CIEDE2000 nearest is practically always in the
+shortlist; for a Lab a long way from any definition (where the two
+distances disagree most) it can now and then return a runner-up instead.
+"""
+
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.includes.choice_lists import model_generation, watch_model
+
+# Seconds between checks for definition changes made by other processes.
+COLOR_INDEX_CHECK_INTERVAL = getattr(settings, "COLOR_INDEX_CHECK_INTERVAL", 30)
+# Points per KD-tree leaf, which are compared by brute force.
+LEAF_SIZE = 16
+# Candidates taken from the KD-tree (by Lab distance) to rank by CIEDE2000.
+SHORTLIST_SIZE = 24
+
+
+def normalize_name(name):
+    """Ink names are matched ignoring case and runs of whitespace."""
+    return " ".join(name.lower().split())
+
+
+def ciede2000(lab, labs):
+    """
+    CIEDE2000 color differences (kL = kC = kH = 1) between one Lab color
+    and an N x 3 array of them, following Sharma, Wu and Dalal (2005).
+    """
+    L1, a1, b1 = lab
+    L2, a2, b2 = labs[:, 0], labs[:, 1], labs[:, 2]
+    C_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    G = 0.5 * (1 - np.sqrt(C_bar**7 / (C_bar**7 + 25.0**7)))
+    a1p = (1 + G) * a1
+    a2p = (1 + G) * a2
+    C1p = np.hypot(a1p, b1)
+    C2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+    achromatic = C1p * C2p == 0
+
+    dLp = L2 - L1
+    dCp = C2p - C1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(achromatic, 0, dhp)
+    dHp = 2 * np.sqrt(C1p * C2p) * np.sin(np.radians(dhp) / 2)
+
+    Lp_bar = (L1 + L2) / 2
+    Cp_bar = (C1p + C2p) / 2
+    h_sum = h1p + h2p
+    hp_bar = np.where(
+        achromatic,
+        h_sum,
+        np.where(np.abs(h1p - h2p) <= 180, h_sum / 2, np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)),
+    )
+    T = (
+        1
+        - 0.17 * np.cos(np.radians(hp_bar - 30))
+        + 0.24 * np.cos(np.radians(2 * hp_bar))
+        + 0.32 * np.cos(np.radians(3 * hp_bar + 6))
+        - 0.20 * np.cos(np.radians(4 * hp_bar - 63))
+    )
+    d_theta = 30 * np.exp(-(((hp_bar - 275) / 25) ** 2))
+    R_C = 2 * np.sqrt(Cp_bar**7 / (Cp_bar**7 + 25.0**7))
+    S_L = 1 + 0.015 * (Lp_bar - 50) ** 2 / np.sqrt(20 + (Lp_bar - 50) ** 2)
+    S_C = 1 + 0.045 * Cp_bar
+    S_H = 1 + 0.015 * Cp_bar * T
+    R_T = -np.sin(np.radians(2 * d_theta)) * R_C
+
+    lightness = dLp / S_L
+    chroma = dCp / S_C
+    hue = dHp / S_H
+    return np.sqrt(np.maximum(lightness**2 + chroma**2 + hue**2 + R_T * chroma * hue, 0))
+
+
+class LabTree(object):
+    """KD-tree over an N x 3 array of Lab values, searched by Lab distance."""
+
+    def __init__(self, points):
+        self.points = points
+        self.order = np.arange(len(points))
+        # Per node: first and end position in order, split axis and value,
+        # and child node numbers (-1 on leaves).
+        self.nodes = []
+        if len(points):
+            self._build(0, len(points))
+
+    def _build(self, start, end):
+        node = len(self.nodes)
+        self.nodes.append([start, end, 0, 0.0, -1, -1])
+        if end - start <= LEAF_SIZE:
+            return node
+        members = self.order[start:end]
+        spread = self.points[members].max(axis=0) - self.points[members].min(axis=0)
+        axis = int(spread.argmax())
+        middle = (end - start) // 2
+        members[:] = members[np.argpartition(self.points[members, axis], middle)]
+        split = self.points[members[middle], axis]
+        left = self._build(start, start + middle)
+        right = self._build(start + middle, end)
+        self.nodes[node][2:] = [axis, split, left, right]
+        return node
+
+    def _search(self, point, radius_for):
+        """
+        Visits the leaves that can hold points within radius_for() of point,
+        nearest side first. radius_for() is called again before each visit,
+        so it can shrink as matches are found. Yields arrays of indexes.
+        """
+        if not self.nodes:
+            return
+        stack = [(0.0, 0)]
+        while stack:
+            gap, node = stack.pop()
+            if gap > radius_for():
+                continue
+            start, end, axis, split, left, right = self.nodes[node]
+            if left < 0:
+                yield self.order[start:end]
+                continue
+            offset = point[axis] - split
+            near, far = (left, right) if offset < 0 else (right, left)
+            stack.append((max(gap, abs(offset)), far))
+            stack.append((gap, near))
+
+    def nearest(self, point, count):
+        """Indexes of the count points nearest to point, by Lab distance."""
+        best = np.empty(0, dtype="i8")
+        best_distances = np.empty(0)
+
+        def radius_for():
+            return best_distances.max() if len(best) == count else np.inf
+
+        for members in self._search(point, radius_for):
+            distances = np.sqrt(((self.points[members] - point) ** 2).sum(axis=1))
+            best = np.concatenate((best, members))
+            best_distances = np.concatenate((best_distances, distances))
+            if len(best) > count:
+                keep = np.argpartition(best_distances, count - 1)[:count]
+                best = best[keep]
+                best_distances = best_distances[keep]
+        return best
+
+
+class _CoatingColors(object):
+    """The definitions of one coating that have Lab values, and their KD-tree."""
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self.labs = np.array([(color.lab_l, color.lab_a, color.lab_b) for color in definitions], dtype="f8").reshape(-1, 3)
+        self.tree = LabTree(self.labs)
+
+
+class ColorIndex(object):
+    """Color definitions by id, by normalized name and coating, and by Lab."""
+
+    def __init__(self, definitions):
+        self.definitions = {}
+        self._by_name = {}
+        by_coating = {}
+        for definition in definitions:
+            self.definitions[definition.id] = definition
+            self._by_name.setdefault((normalize_name(definition.name), definition.coating), []).append(definition)
+            if None not in (definition.lab_l, definition.lab_a, definition.lab_b):
+                by_coating.setdefault(definition.coating, []).append(definition)
+        self._coatings = dict((coating, _CoatingColors(colors)) for coating, colors in by_coating.items())
+
+    def get(self, definition_id):
+        """The definition with the given id, or None."""
+        return self.definitions.get(definition_id)
+
+    def exact(self, name, coating):
+        """
+        The definition named name (ignoring case and spacing) for the coating,
+        or None. Raises ColorDefinition.MultipleObjectsReturned if the name is
+        ambiguous.
+        """
+        found = self._by_name.get((normalize_name(name), coating), [])
+        if len(found) > 1:
+            raise ColorDefinition.MultipleObjectsReturned("More than one %s %s color definition." % (found[0].name, coating))
+        return found[0] if found else None
+
+    def nearest(self, lab, coating, count=1):
+        """
+        The count definitions of the coating closest to a Lab color by
+        CIEDE2000, as (definition, delta-e) pairs, closest first. See the
+        module docstring for how close a match has to be to be sure.
+        """
+        colors = self._coatings.get(coating)
+        if colors is None:
+            return []
+        lab = np.asarray(lab, dtype="f8")
+        shortlist = colors.tree.nearest(lab, min(max(count, SHORTLIST_SIZE), len(colors.definitions)))
+        differences = ciede2000(lab, colors.labs[shortlist])
+        ranked = np.argsort(differences, kind="stable")[:count]
+        return [(colors.definitions[shortlist[rank]], float(differences[rank])) for rank in ranked]
+
+
+_lock = threading.Lock()
+_index = None
+_index_generation = None
+_last_checked = 0.0
+
+
+def color_index():
+    """The shared ColorIndex, rebuilt when the definitions have changed."""
+    global _index, _index_generation, _last_checked
+    with _lock:
+        now = time.monotonic()
+        if _index is not None and now - _last_checked < COLOR_INDEX_CHECK_INTERVAL:
+            return _index
+        generation = model_generation(ColorDefinition)
+        if _index is None or generation != _index_generation:
+            _index = ColorIndex(ColorDefinition.objects.all())
+            _index_generation = generation
+        _last_checked = now
+        return _index
+
+
+def _definition_changed(sender, **kwargs):
+    global _index
+    _index = None
+
+
+post_save.connect(_definition_changed, sender=ColorDefinition, dispatch_uid="color_index_save")
+post_delete.connect(_definition_changed, sender=ColorDefinition, dispatch_uid="color_index_delete")
+# Saves made here start a new generation, so other processes rebuild too.
+watch_model(ColorDefinition)
@@ -0,0 +1,209 @@
+"""
+Syncs GOLD's ColorDefinitions with the colorbooks on Esko's bg_cms_data share.
+
+Each colorbook's .res index and spectral file are parsed once into an
+in-memory table of color name -> Lab, which is diffed against the GOLD
+definitions for the colorbook's coating. Creates, updates and deletes are
+then applied in bulk. Colorbooks whose files haven't changed since the last
+sync (by mtime/size, then by content hash) are skipped entirely, so the sync
+is cheap enough to run frequently.
+
+Stale definitions (in GOLD but no longer in the colorbook's .res index) are
+only deleted when nothing references them, since deleting a ColorDefinition
+cascades to its ItemColors and ColorWarnings. In-use stale definitions are
+reported. A colorbook that yields no spectral data at all is taken to be
+broken or half-written, so nothing is deleted for it and it is retried on
+the next run.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.includes import fs_api
+from gchub_db.includes.choice_lists import invalidate_choice_lists
+from gchub_db.includes.esko_color.color_reader import EskoColor
+from gchub_db.includes.esko_color.colorbook_reader import EskoColorBook
+
+# (Esko colorbook name, GOLD coating) pairs to keep in sync.
+ESKO_COLORBOOKS = getattr(settings, "ESKO_COLORBOOKS", [("FSB_Pantone_Uncoated", "U")])
+
+# Lab values closer than this are considered unchanged.
+LAB_TOLERANCE = 0.005
+
+LAB_FIELDS = ("lab_l", "lab_a", "lab_b", "lch_c", "lch_h", "hexvalue")
+
+
+def colorbook_lab_table(cbook):
+    """
+    Returns {color name: {lab_l, lab_a, lab_b, lch_c, lch_h, hexvalue}} for
+    every color in the colorbook that has spectral data.
+    """
+    from colormath.color_conversions import convert_color
+    from colormath.color_objects import LCHabColor, sRGBColor
+
+    spectral_table = cbook.get_spectral_table()
+    table = {}
+    for name in cbook.get_color_name_list():
+        values = spectral_table.get(EskoColor.header_name(name))
+        if values is None:
+            continue
+        lab = cbook.get_color(name).get_lab_color_obj()
+        lch = convert_color(lab, LCHabColor)
+        rgb = convert_color(lab, sRGBColor)
+        table[name] = {
+            "lab_l": round(lab.lab_l, 4),
+            "lab_a": round(lab.lab_a, 4),
+            "lab_b": round(lab.lab_b, 4),
+            "lch_c": round(lch.lch_c, 4),
+            "lch_h": round(lch.lch_h, 4),
+            "hexvalue": sRGBColor(
+                rgb.clamped_rgb_r,
+                rgb.clamped_rgb_g,
+                rgb.clamped_rgb_b,
+            ).get_rgb_hex(),
+        }
+    return table
+
+
+def _needs_update(definition, values):
+    for field in ("lab_l", "lab_a", "lab_b", "lch_c", "lch_h"):
+        current = getattr(definition, field)
+        if current is None or abs(current - values[field]) > LAB_TOLERANCE:
+            return True
+    return definition.hexvalue != values["hexvalue"]
+
+
+def diff_colorbook(esko_table, gold_definitions, colorbook_names=None):
+    """
+    Compares a colorbook table with the existing definitions for its coating.
+
+    gold_definitions is a dict of name -> ColorDefinition. colorbook_names
+    is every color the colorbook defines, with or without spectral data,
+    and defaults to the names in esko_table; only definitions missing from
+    it are stale. Returns (names_to_create, definitions_to_update,
+    stale_definitions); the definitions to update already carry their new
+    values.
+    """
+    if colorbook_names is None:
+        colorbook_names = esko_table
+    colorbook_names = set(colorbook_names)
+    to_create = sorted(set(esko_table) - set(gold_definitions))
+    to_update = []
+    for name, definition in gold_definitions.items():
+        values = esko_table.get(name)
+        if values is not None and _needs_update(definition, values):
+            for field in LAB_FIELDS:
+                setattr(definition, field, values[field])
+            to_update.append(definition)
+    stale = [definition for name, definition in gold_definitions.items() if name not in colorbook_names]
+    return to_create, to_update, stale
+
+
+class ColorBookSync(object):
+    """Syncs one Esko colorbook into GOLD's ColorDefinitions for a coating."""
+
+    def __init__(self, colorbook_name, coating, force=False, dry_run=False):
+        self.colorbook_name = colorbook_name
+        self.coating = coating
+        self.force = force
+        self.dry_run = dry_run
+        self.cache_key = "esko_colorbook_sync_%s_%s" % (colorbook_name.replace(" ", "_"), coating)
+
+    def _paths(self, cbook):
+        return (cbook.resfile_path, cbook.spec_file_path)
+
+    def _stamps(self, cbook):
+        """Returns [mtime, size] pairs for the colorbook's .res and spectral files."""
+        stamps = []
+        for path in self._paths(cbook):
+            file_stat = os.stat(path)
+            stamps.append([file_stat.st_mtime_ns, file_stat.st_size])
+        return stamps
+
+    def _hashes(self, cbook):
+        return [fs_api.file_sha1(path) for path in self._paths(cbook)]
+
+    def is_unchanged(self, cbook):
+        """
+        True if the colorbook's files match the last successful sync. The
+        stat is checked first, then the content hash, so a touched but
+        otherwise identical colorbook still counts as unchanged.
+        """
+        previous = cache.get(self.cache_key)
+        if not previous:
+            return False
+        stamps = self._stamps(cbook)
+        if previous["stamps"] == stamps:
+            return True
+        if previous["sha1"] == self._hashes(cbook):
+            # Same content, just remember the new stat.
+            cache.set(self.cache_key, {"stamps": stamps, "sha1": previous["sha1"]}, None)
+            return True
+        return False
+
+    def run(self):
+        """
+        Runs the sync and returns a dict describing what was (or, for a dry
+        run, would be) done.
+        """
+        cbook = EskoColorBook(self.colorbook_name)
+        result = {
+            "colorbook": self.colorbook_name,
+            "coating": self.coating,
+            "skipped": False,
+            "created": [],
+            "updated": [],
+            "deleted": [],
+            "stale_in_use": [],
+            "empty": False,
+        }
+        if not self.force and self.is_unchanged(cbook):
+            result["skipped"] = True
+            return result
+        # Taken before parsing, so a colorbook saved mid-sync is picked up next time.
+        state = {"stamps": self._stamps(cbook), "sha1": self._hashes(cbook)}
+
+        esko_table = colorbook_lab_table(cbook)
+        gold_definitions = {definition.name: definition for definition in ColorDefinition.objects.filter(coating=self.coating)}
+        to_create, to_update, stale = diff_colorbook(esko_table, gold_definitions, cbook.get_color_name_list())
+        if not esko_table:
+            # Nothing parsed; don't take that as every color having gone.
+            result["empty"] = True
+            stale = []
+
+        # Stale definitions still referenced by item colors or warnings must stay.
+        from gchub_db.apps.workflow.models import ColorWarning, ItemColor
+
+        stale_ids = [definition.id for definition in stale]
+        in_use_ids = set(ItemColor.objects.filter(definition_id__in=stale_ids).values_list("definition_id", flat=True))
+        in_use_ids |= set(ColorWarning.objects.filter(definition_id__in=stale_ids).values_list("definition_id", flat=True))
+        to_delete = [definition for definition in stale if definition.id not in in_use_ids]
+
+        result["created"] = to_create
+        result["updated"] = [definition.name for definition in to_update]
+        result["deleted"] = [definition.name for definition in to_delete]
+        result["stale_in_use"] = [definition.name for definition in stale if definition.id in in_use_ids]
+        if self.dry_run:
+            return result
+
+        with transaction.atomic():
+            ColorDefinition.objects.bulk_create(
+                [ColorDefinition(name=name, coating=self.coating, **esko_table[name]) for name in to_create],
+                batch_size=500,
+            )
+            ColorDefinition.objects.bulk_update(to_update, LAB_FIELDS, batch_size=500)
+            ColorDefinition.objects.filter(id__in=[definition.id for definition in to_delete]).delete()
+        # Bulk writes don't send signals, so the color pulldowns must be told.
+        invalidate_choice_lists(ColorDefinition)
+        if esko_table:
+            cache.set(self.cache_key, state, None)
+        return result
+
+
+def sync_all_colorbooks(force=False, dry_run=False):
+    """Syncs every colorbook in ESKO_COLORBOOKS. Returns a list of results."""
+    return [ColorBookSync(name, coating, force=force, dry_run=dry_run).run() for name, coating in ESKO_COLORBOOKS]
@@ -0,0 +1,74 @@
+"""
+Tests for the grouped color measurement stats behind the color_mgt pages.
+"""
+
+from datetime import date
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from gchub_db.apps.color_mgt.color_analytics import GROUPS, ColorStats, hue_groups
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.apps.workflow.models import ChargeType, Item, ItemCatalog, ItemColor, Job, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory
+
+
+class HueGroupsTest(SimpleTestCase):
+    def test_bins(self):
+        lch_c = np.array([10.0, 50.0, 50.0, 50.0, 50.0, 50.0, 0.0, np.nan, 50.0, 50.0])
+        lch_h = np.array([90.0, 30.0, 80.0, 150.0, 250.0, 330.0, 0.0, 80.0, np.nan, 359.9995])
+        self.assertEqual(
+            [GROUPS[group] for group in hue_groups(lch_c, lch_h)],
+            ["grays", "reds", "yellows", "greens", "blues", "reds", "errors", "yellows", "errors", "errors"],
+        )
+
+
+class ColorStatsTest(TestCase):
+    def setUp(self):
+        fsb = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        bev = Site.objects.create(name="Beverage", domain="bev.example.com")
+        # Saving a Foodservice item looks this up.
+        ChargeType.objects.create(type="Art Request", category=ChargeCategory.objects.create(name="Art"), base_amount=0, workflow=fsb)
+        self.blue = ColorDefinition.objects.create(name="PMS 300", coating="C", lab_l=50, lab_a=0, lab_b=-40, lch_c=40, lch_h=260)
+        self.gray = ColorDefinition.objects.create(name="PMS Cool Gray", coating="C", lab_l=60, lab_a=0, lab_b=0, lch_c=1, lch_h=90)
+        self.unused = ColorDefinition.objects.create(name="PMS 100", coating="C", lch_c=60, lch_h=95)
+        for site, definition, delta_e, lab_l in (
+            (fsb, self.blue, 1.0, 52.0),
+            (fsb, self.blue, 3.0, 54.0),
+            (fsb, self.gray, 0.5, None),
+            (fsb, self.unused, None, None),
+            (bev, self.unused, 1.0, None),
+        ):
+            job = Job.objects.create(name="Color Job", workflow=site, status="Active", due_date=date.today())
+            item = Item.objects.create(
+                workflow=site,
+                job=job,
+                size=ItemCatalog.objects.get_or_create(size="SMR-16", defaults={"workflow": site})[0],
+                num_in_job=1,
+            )
+            ItemColor.objects.create(
+                item=item,
+                definition=definition,
+                color=definition.name,
+                delta_e=delta_e,
+                measured_lab_l=lab_l,
+                measured_lab_a=0,
+                measured_lab_b=-40,
+            )
+
+    def test_matches_per_definition_methods(self):
+        stats = ColorStats()
+        self.assertEqual([color.definition for color in stats.colors], [self.blue, self.gray])
+        for color in stats.colors:
+            self.assertEqual(color.fsb_usage_count, color.definition.fsb_usage_count())
+            self.assertAlmostEqual(color.avg_delta, color.definition.avg_delta())
+            self.assertEqual(color.avg_delta_warning, color.definition.avg_delta_warning())
+        self.assertEqual(stats.groups["blues"], stats.colors[:1])
+        self.assertEqual(stats.groups["grays"], stats.colors[1:])
+
+    def test_lab_offset_and_template_attributes(self):
+        blue, gray = ColorStats().colors
+        self.assertEqual(blue.max_delta, 3.0)
+        self.assertAlmostEqual(blue.lab_offset, 3.0)
+        self.assertIsNone(gray.lab_offset)
+        self.assertEqual((str(blue), blue.coating), (str(self.blue), "C"))
@@ -0,0 +1,55 @@
+"""
+Tests for the in-process color definition index.
+"""
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from gchub_db.apps.color_mgt.color_index import ColorIndex, ciede2000
+from gchub_db.apps.color_mgt.models import ColorDefinition
+
+# Reference pairs from Sharma, Wu and Dalal's CIEDE2000 test data.
+SHARMA_PAIRS = (
+    ((50.0, 2.6772, -79.7751), (50.0, 0.0, -82.7485), 2.0425),
+    ((50.0, 0.0, 0.0), (50.0, -1.0, 2.0), 2.3669),
+    ((50.0, -0.001, 2.49), (50.0, 0.0009, -2.49), 4.8045),
+    ((50.0, 2.5, 0.0), (73.0, 25.0, -18.0), 27.1492),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((2.0776, 0.0795, -1.135), (0.9033, -0.0636, -0.5514), 0.9082),
+)
+
+
+class ColorIndexTest(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.labs = np.column_stack((rng.uniform(5, 98, 2000), rng.uniform(-80, 80, 2000), rng.uniform(-80, 90, 2000)))
+        self.colorbook = [
+            ColorDefinition(id=num, name="PMS %d" % num, coating="C", lab_l=lab_l, lab_a=lab_a, lab_b=lab_b)
+            for num, (lab_l, lab_a, lab_b) in enumerate(self.labs, 1)
+        ]
+        self.colorbook.append(ColorDefinition(id=5000, name="Process  Black", coating="U"))
+        self.index = ColorIndex(self.colorbook)
+        self.rng = rng
+
+    def test_ciede2000_reference_values(self):
+        for lab1, lab2, expected in SHARMA_PAIRS:
+            self.assertAlmostEqual(float(ciede2000(np.array(lab1), np.array([lab2]))[0]), expected, places=4)
+
+    def test_nearest_matches_brute_force(self):
+        for num in range(300):
+            # A measurement near one of the standards, as from a press proof.
+            lab = self.labs[self.rng.integers(len(self.labs))] + self.rng.normal(0, 1, 3)
+            ((definition, delta_e),) = self.index.nearest(lab, "C")
+            differences = ciede2000(lab, self.labs)
+            self.assertEqual(definition.id, int(differences.argmin()) + 1)
+            self.assertAlmostEqual(delta_e, differences.min())
+
+    def test_exact_names(self):
+        self.assertEqual(self.index.exact("pms 12", "C").id, 12)
+        self.assertEqual(self.index.exact(" process black ", "U").id, 5000)
+        self.assertIsNone(self.index.exact("PMS 12", "U"))
+        self.assertEqual(self.index.nearest((50, 0, 0), "U"), [])
+
+        ambiguous = ColorIndex(self.colorbook[:1] + [ColorDefinition(id=9000, name="pms 1", coating="C")])
+        with self.assertRaises(ColorDefinition.MultipleObjectsReturned):
+            ambiguous.exact("PMS 1", "C")
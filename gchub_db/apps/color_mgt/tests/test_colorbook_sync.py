@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from gchub_db.apps.color_mgt import colorbook_sync
+from gchub_db.apps.color_mgt.colorbook_sync import ColorBookSync, diff_colorbook
+from gchub_db.apps.color_mgt.models import ColorDefinition
+
+
+def lab(l_value, hexvalue="FFFFFF"):
+    return {"lab_l": l_value, "lab_a": 1.0, "lab_b": 2.0, "lch_c": 3.0, "lch_h": 4.0, "hexvalue": hexvalue}
+
+
+class ColorBookDiffTest(SimpleTestCase):
+    def test_diff(self):
+        esko_table = {"PMS 100": lab(50.0), "PMS 200": lab(60.0), "PMS 300": lab(70.0)}
+        gold = {
+            "PMS 100": ColorDefinition(name="PMS 100", coating="U", **lab(50.001)),
+            "PMS 200": ColorDefinition(name="PMS 200", coating="U", **lab(55.0)),
+            "PMS 999": ColorDefinition(name="PMS 999", coating="U", **lab(10.0)),
+        }
+        to_create, to_update, stale = diff_colorbook(esko_table, gold)
+        self.assertEqual(to_create, ["PMS 300"])
+        # PMS 100 is within the rounding tolerance.
+        self.assertEqual([d.name for d in to_update], ["PMS 200"])
+        self.assertEqual(to_update[0].lab_l, 60.0)
+        self.assertEqual([d.name for d in stale], ["PMS 999"])
+
+    def test_colors_without_spectral_data_are_not_stale(self):
+        gold = {
+            "PMS 100": ColorDefinition(name="PMS 100", coating="U", **lab(50.0)),
+            "PMS 999": ColorDefinition(name="PMS 999", coating="U", **lab(10.0)),
+        }
+        # PMS 100 is still in the .res index, but has no spectral entry.
+        to_create, to_update, stale = diff_colorbook({}, gold, ["PMS 100"])
+        self.assertEqual((to_create, to_update), ([], []))
+        self.assertEqual([d.name for d in stale], ["PMS 999"])
+
+
+class ColorBookSyncTest(TestCase):
+    def run_sync(self, esko_table, names):
+        cbook = mock.Mock(**{"get_color_name_list.return_value": names})
+        with (
+            mock.patch.object(colorbook_sync, "EskoColorBook", return_value=cbook),
+            mock.patch.object(colorbook_sync, "colorbook_lab_table", return_value=esko_table),
+            mock.patch.object(ColorBookSync, "_stamps", return_value=[]),
+            mock.patch.object(ColorBookSync, "_hashes", return_value=[]),
+        ):
+            return ColorBookSync("FSB_Pantone_Uncoated", "U", force=True).run()
+
+    def test_nothing_deleted_when_no_spectral_data_is_read(self):
+        ColorDefinition.objects.create(name="PMS 100", coating="U", **lab(50.0))
+        result = self.run_sync({}, [])
+        self.assertTrue(result["empty"])
+        self.assertEqual(result["deleted"], [])
+        self.assertTrue(ColorDefinition.objects.filter(name="PMS 100").exists())
+
+        result = self.run_sync({"PMS 200": lab(60.0)}, ["PMS 200"])
+        self.assertEqual((result["created"], result["deleted"]), (["PMS 200"], ["PMS 100"]))
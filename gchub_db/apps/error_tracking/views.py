@@ -5,12 +5,27 @@ from datetime import date
 from django.forms import ModelForm
 from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils import timezone
 
 from gchub_db.apps.error_tracking.models import Error
 from gchub_db.apps.joblog import app_defs as joblog_defs
 from gchub_db.apps.joblog.models import JobLog
 from gchub_db.apps.workflow.models import Item
 from gchub_db.includes.gold_json import JSMessage
+from gchub_db.includes.kpi import (
+    cached_for_year,
+    grouped_counts,
+    invalidate_year,
+    percent_without_errors,
+    year_bounds,
+)
+
+# Per-workflow buckets for the error and file out counts.
+WORKFLOW_BUCKETS = {
+    "fsb": {"job__workflow__name": "Foodservice"},
+    "bev": {"job__workflow__name": "Beverage"},
+    "con": {"job__workflow__name": "Container"},
+}
 
 
 class ErrorForm(ModelForm):
@@ -25,42 +40,48 @@ def error_tracking_home(request, year=False):
         today = date.today()
         year = today.year
 
-    # Get the most recent errors to display up front.
-    error_list = Error.objects.filter(reported_date__year=year).order_by("-id")
-
-    # Get all the errors for this year so we can do some stats.
-    yearly_errors = Error.objects.filter(reported_date__year=year)
-    errors_reported = yearly_errors.count()
-
-    # Count errors per workflow.
-    fsb_errors_reported = yearly_errors.filter(job__workflow__name="Foodservice").count()
-    bev_errors_reported = yearly_errors.filter(job__workflow__name="Beverage").count()
-    con_errors_reported = yearly_errors.filter(job__workflow__name="Container").count()
-
-    # Get total number of file outs so we can check the percentage of error.
-    file_outs = JobLog.objects.filter(type=joblog_defs.JOBLOG_TYPE_ITEM_FILED_OUT, event_time__year=year)
-
-    num_file_outs = file_outs.count()
-    fsb_file_outs = file_outs.filter(job__workflow__name="Foodservice").count()
-    bev_file_outs = file_outs.filter(job__workflow__name="Beverage").count()
-    con_file_outs = file_outs.filter(job__workflow__name="Container").count()
+    start, end = year_bounds(year)
 
-    if errors_reported and num_file_outs:
-        error_percentage = 100 - (float(errors_reported) / num_file_outs) * 100
-    else:
-        error_percentage = 100
-    if fsb_errors_reported and fsb_file_outs:
-        fsb_error_percentage = 100 - (float(fsb_errors_reported) / fsb_file_outs) * 100
-    else:
-        fsb_error_percentage = 100
-    if bev_errors_reported and bev_file_outs:
-        bev_error_percentage = 100 - (float(bev_errors_reported) / bev_file_outs) * 100
-    else:
-        bev_error_percentage = 100
-    if con_errors_reported and con_file_outs:
-        con_error_percentage = 100 - (float(con_errors_reported) / con_file_outs) * 100
-    else:
-        con_error_percentage = 100
+    # Get the most recent errors to display up front.
+    error_list = (
+        Error.objects.filter(reported_date__gte=start, reported_date__lt=end)
+        .select_related("job__workflow", "item", "reported_by")
+        .order_by("-id")
+    )
+
+    # Errors reported and file outs per workflow, one query each. Closed
+    # years are cached permanently since their numbers can't change.
+    def _yearly_stats():
+        errors = grouped_counts(
+            Error.objects.filter(reported_date__gte=start, reported_date__lt=end),
+            WORKFLOW_BUCKETS,
+        )
+        file_outs = grouped_counts(
+            JobLog.objects.filter(
+                type=joblog_defs.JOBLOG_TYPE_ITEM_FILED_OUT,
+                event_time__gte=start,
+                event_time__lt=end,
+            ),
+            WORKFLOW_BUCKETS,
+        )
+        return errors, file_outs
+
+    errors, file_outs = cached_for_year("error_tracking_home", year, _yearly_stats)
+
+    errors_reported = errors["total"]
+    fsb_errors_reported = errors["fsb"]
+    bev_errors_reported = errors["bev"]
+    con_errors_reported = errors["con"]
+
+    num_file_outs = file_outs["total"]
+    fsb_file_outs = file_outs["fsb"]
+    bev_file_outs = file_outs["bev"]
+    con_file_outs = file_outs["con"]
+
+    error_percentage = percent_without_errors(errors_reported, num_file_outs)
+    fsb_error_percentage = percent_without_errors(fsb_errors_reported, fsb_file_outs)
+    bev_error_percentage = percent_without_errors(bev_errors_reported, bev_file_outs)
+    con_error_percentage = percent_without_errors(con_errors_reported, con_file_outs)
 
     # array of years used to display yearly reports
     start_year = 2008
@@ -101,7 +122,8 @@ def error_tracking_add(request, item_id):
     if request.POST:
         form = ErrorForm(request.POST)
         if form.is_valid():
-            form.save()
+            error = form.save()
+            invalidate_year("error_tracking_home", timezone.localtime(error.reported_date).year)
             return error_tracking_home(request)
         else:
             for error in form.errors:
@@ -127,5 +149,6 @@ def error_tracking_delete(request, error_id):
     """Delete the given error report."""
     error = Error.objects.get(id=error_id)
     error.delete()
+    invalidate_year("error_tracking_home", timezone.localtime(error.reported_date).year)
 
     return error_tracking_home(request)
@@ -0,0 +1,136 @@
+"""
+The FedEx label print queue, for bin/process_fedex_label_queue.py.
+
+Shipments without a date_label_printed are claimed a batch at a time with
+SELECT ... FOR UPDATE SKIP LOCKED, so two spoolers running at once never
+print the same label. Each batch's labels, with the extra copies for
+international shipments, are written to the printer in a single write,
+and the whole batch is marked printed with one UPDATE before its rows are
+unlocked.
+
+If the batch write fails, each shipment in it is written on its own, up
+to LABEL_RETRIES times. The ones that still fail are left unprinted for
+the next run, and are in the spooler's failed list. A batch write that
+fails part way through may already have printed some of its labels, and
+those will be printed again.
+"""
+
+import binascii
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from gchub_db.apps.fedexsys.models import LABEL_PRINTER, Shipment
+
+# Shipments claimed and printed per write.
+LABEL_BATCH_SIZE = getattr(settings, "FEDEX_LABEL_BATCH_SIZE", 25)
+# Attempts at printing a shipment on its own once its batch has failed.
+LABEL_RETRIES = 3
+# Seconds between those attempts.
+LABEL_RETRY_DELAY = 2
+
+
+class LabelSpooler(object):
+    """Prints the queued FedEx labels."""
+
+    def __init__(self, device=LABEL_PRINTER, batch_size=LABEL_BATCH_SIZE, retries=LABEL_RETRIES, retry_delay=LABEL_RETRY_DELAY):
+        self.device = device
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.failed = []
+        self.labels = 0
+        self.bytes_written = 0
+
+    def _write(self, data):
+        """Writes data to the printer in one go."""
+        with open(self.device, "ab") as printer:
+            printer.write(data)
+        self.bytes_written += len(data)
+
+    def _claim(self):
+        """
+        Locks and returns the next batch of unprinted shipments, skipping any
+        another spooler has claimed. Must be called in a transaction.
+        """
+        shipments = (
+            Shipment.objects.select_for_update(skip_locked=True)
+            .filter(date_label_printed=None)
+            .exclude(id__in=self.failed)
+            .order_by("id")
+        )
+        return list(shipments.prefetch_related("address")[: self.batch_size])
+
+    def _labels(self, shipments):
+        """
+        Decodes the shipments' labels. Returns a list of (shipment, label data
+        with all its copies); shipments whose labels can't be prepared are
+        added to failed.
+        """
+        labels = []
+        for shipment in shipments:
+            try:
+                label = binascii.a2b_base64(shipment.label_data) * shipment.label_copies()
+            except (binascii.Error, TypeError, AttributeError) as error:
+                # No label data, or no address to tell how many copies.
+                print("! Could not prepare the label for shipment %d: %s" % (shipment.id, error))
+                self.failed.append(shipment.id)
+                continue
+            labels.append((shipment, label))
+        return labels
+
+    def _retry(self, shipment, data):
+        """Prints one shipment's labels on their own. Returns True if they got out."""
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._write(data)
+                return True
+            except OSError as error:
+                print("! Attempt %d at printing shipment %d failed: %s" % (attempt, shipment.id, error))
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay)
+        self.failed.append(shipment.id)
+        return False
+
+    def _print_batch(self):
+        """Claims and prints one batch. Returns the number of shipments claimed."""
+        with transaction.atomic():
+            shipments = self._claim()
+            labels = self._labels(shipments)
+            printed = []
+            if labels:
+                try:
+                    self._write(b"".join(data for shipment, data in labels))
+                    printed = labels
+                except OSError as error:
+                    print("! Batch write failed, printing one at a time: %s" % error)
+                    printed = [(shipment, data) for shipment, data in labels if self._retry(shipment, data)]
+            Shipment.objects.filter(id__in=[shipment.id for shipment, data in printed]).update(date_label_printed=timezone.now())
+            self.labels += sum(shipment.label_copies() for shipment, data in printed)
+            return len(shipments)
+
+    def run(self):
+        """
+        Prints labels until the queue is empty. Returns the number of
+        shipments printed; the ids of those that couldn't be are in failed.
+        """
+        start = time.time()
+        claimed = 0
+        while True:
+            batch = self._print_batch()
+            if not batch:
+                break
+            claimed += batch
+
+        printed = claimed - len(self.failed)
+        elapsed = time.time() - start
+        if printed:
+            print(
+                "%d shipments, %d labels, %d bytes printed in %.1f seconds, %.1f labels/sec."
+                % (printed, self.labels, self.bytes_written, elapsed, self.labels / elapsed if elapsed else 0)
+            )
+        if self.failed:
+            print("%d shipments could not be printed." % len(self.failed))
+        return printed
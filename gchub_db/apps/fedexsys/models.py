@@ -32,6 +32,11 @@ from gchub_db.apps.fedexsys.defines import (
 
 from .config_factory import create_fedex_config
 
+# Device node (or any file or pipe) the labels are written to.
+LABEL_PRINTER = getattr(settings, "FEDEX_LABEL_PRINTER", "/dev/usb/lp0")
+# International labels get two extra copies.
+INTERNATIONAL_LABEL_COPIES = 3
+
 
 class Shipment(models.Model):
     """
@@ -89,11 +94,17 @@ class Shipment(models.Model):
         """Returns True if this shipment is an international shipment."""
         return countries.full_to_abbrev(self.address.country) != "US"
 
-    def print_label(self, debug=False):
+    def label_copies(self):
+        """Returns the number of copies of the label to print."""
+        if self.is_international():
+            return INTERNATIONAL_LABEL_COPIES
+        return 1
+
+    def print_label(self, debug=False, device=LABEL_PRINTER):
         """
         Grabs the textual representation of the label from the XML response,
         converts it to base64, and pipes it directly into the label printer
-        via a device node in /dev/
+        via a device node in /dev/ (or whatever device is given).
         """
         if debug:
             print(("Label output type: " + settings.FEDEX_LABEL_IMG_TYPE))
@@ -103,7 +114,7 @@ class Shipment(models.Model):
 
         # Pipe the binary directly to the label printer. Works under Linux
         # without requiring PySerial.
-        label_file = open("/dev/usb/lp0", "wb+")
+        label_file = open(device, "wb+")
         label_file.write(label_binary)
         label_file.close()
 
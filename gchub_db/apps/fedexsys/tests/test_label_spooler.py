@@ -0,0 +1,105 @@
+"""
+Tests for the FedEx label print spooler.
+"""
+
+import binascii
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from gchub_db.apps.address.models import Contact
+from gchub_db.apps.fedexsys.label_spooler import LabelSpooler
+from gchub_db.apps.fedexsys.models import Shipment
+
+
+class LabelSpoolerTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.device = os.path.join(self.temp_dir, "lp0")
+        self.shipments = []
+        for num, country in enumerate(("US", "CA", "US", "US")):
+            contact = Contact.objects.create(
+                first_name="Pat",
+                last_name="Doe %d" % num,
+                company="Acme",
+                address1="1 Main St",
+                city="Clemson",
+                zip_code="29631",
+                country=country,
+                phone="555-1234",
+            )
+            self.shipments.append(
+                Shipment.objects.create(
+                    address_content_type=ContentType.objects.get_for_model(Contact),
+                    address_id=contact.id,
+                    label_data=binascii.b2a_base64(b"<label %d>" % num).decode(),
+                )
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def printed(self):
+        with open(self.device, "rb") as printer:
+            return printer.read()
+
+    def unprinted(self):
+        return list(Shipment.objects.filter(date_label_printed=None).order_by("id").values_list("id", flat=True))
+
+    def test_one_write_per_batch(self):
+        spooler = LabelSpooler(device=self.device, batch_size=3)
+        with mock.patch.object(spooler, "_write", wraps=spooler._write) as write:
+            self.assertEqual(spooler.run(), 4)
+        self.assertEqual(write.call_count, 2)
+        # The international label is printed three times.
+        self.assertEqual(self.printed(), b"<label 0>" + b"<label 1>" * 3 + b"<label 2><label 3>")
+        self.assertEqual(spooler.labels, 6)
+        self.assertEqual(self.unprinted(), [])
+        self.assertEqual(LabelSpooler(device=self.device).run(), 0)
+
+    def test_batch_queries_are_constant(self):
+        def batch_queries(batch_size):
+            Shipment.objects.update(date_label_printed=None)
+            with CaptureQueriesContext(connection) as queries:
+                LabelSpooler(device=self.device, batch_size=batch_size)._print_batch()
+            return len(queries)
+
+        self.assertEqual(batch_queries(1), batch_queries(4))
+
+    def test_failed_batch_is_retried_per_shipment(self):
+        spooler = LabelSpooler(device=self.device, batch_size=4, retries=2, retry_delay=0)
+        real_write = spooler._write
+
+        def write(data):
+            # The batch write and both attempts at the second shipment fail.
+            if b"<label 1>" in data:
+                raise OSError("printer offline")
+            real_write(data)
+
+        with mock.patch.object(spooler, "_write", side_effect=write) as mocked:
+            self.assertEqual(spooler.run(), 3)
+        self.assertEqual(mocked.call_count, 6)
+        self.assertEqual(spooler.failed, [self.shipments[1].id])
+        self.assertEqual(self.unprinted(), [self.shipments[1].id])
+        self.assertEqual(self.printed(), b"<label 0><label 2><label 3>")
+
+    def test_bad_label_does_not_stop_the_queue(self):
+        Shipment.objects.filter(id=self.shipments[0].id).update(label_data=None)
+        spooler = LabelSpooler(device=self.device)
+        self.assertEqual(spooler.run(), 3)
+        self.assertEqual(spooler.failed, [self.shipments[0].id])
+        self.assertEqual(self.unprinted(), [self.shipments[0].id])
+
+    def test_pipe_device(self):
+        read_fd, write_fd = os.pipe()
+        spooler = LabelSpooler(device="/dev/fd/%d" % write_fd)
+        self.assertEqual(spooler.run(), 4)
+        os.close(write_fd)
+        with os.fdopen(read_fd, "rb") as pipe:
+            self.assertEqual(pipe.read(), b"<label 0>" + b"<label 1>" * 3 + b"<label 2><label 3>")
@@ -3,7 +3,9 @@ Manager Tool Functions. These are functions that need to be accessed outside of
 maager tools. We split them out to minimize circular dependencies.
 """
 
-from gchub_db.apps.timesheet.models import TimeSheet
+from django.db.models import Sum
+
+from gchub_db.apps.timesheet.models import TimeSheetDay
 from gchub_db.apps.workflow.app_defs import COMPLEXITY_OPTIONS
 from gchub_db.apps.workflow.models import Item, JobComplexity
 
@@ -53,13 +55,7 @@ def get_job_average_hours(supplied_category, supplied_type, supplied_artist=Fals
                     job_list.append(job_complexity.job)
 
         # Calculate average total time from time sheets.
-        total_hours = 0
-
-        # Iterate through jobs and count the hours.
-        for job in job_list:
-            timesheets = TimeSheet.objects.filter(job=job)
-            for sheet in timesheets:
-                total_hours += sheet.hours
+        total_hours = TimeSheetDay.objects.filter(job__in=job_list).aggregate(total=Sum("hours"))["total"] or 0
 
         # Calculate the average time.
         if len(job_list) > 0:
@@ -112,18 +108,8 @@ def get_item_average_hours(supplied_category, supplied_type, supplied_artist=Fal
                     job_list.append(job_complexity.job)
 
         # Calculate average total time from time sheets.
-        total_hours = 0
-        total_items = 0
-
-        # Iterate through jobs and count the hours and items.
-        for job in job_list:
-            # Count the items
-            items = Item.objects.filter(job=job)
-            total_items += items.count()
-            # Count the hours
-            timesheets = TimeSheet.objects.filter(job=job)
-            for sheet in timesheets:
-                total_hours += sheet.hours
+        total_hours = TimeSheetDay.objects.filter(job__in=job_list).aggregate(total=Sum("hours"))["total"] or 0
+        total_items = Item.objects.filter(job__in=job_list).count()
 
         # Calculate the average time.
         if total_items > 0:
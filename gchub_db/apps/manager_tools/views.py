@@ -32,7 +32,7 @@ from gchub_db.apps.manager_tools.manager_tool_funcs import (
     get_job_average_hours,
 )
 from gchub_db.apps.qc.models import QCCategory, QCResponseDoc, QCWhoops
-from gchub_db.apps.timesheet.models import TimeSheet, TimeSheetCategory
+from gchub_db.apps.timesheet.models import TimeSheetCategory, TimeSheetDay
 from gchub_db.apps.workflow.app_defs import (
     COMPLEXITY_CATEGORIES,
     JOB_TYPES,
@@ -93,18 +93,14 @@ def hoursbyplant(request):
             year = int(year)
             plant = form.cleaned_data.get("plant", None)
 
-            # Gather the data.
-            timesheets = TimeSheet.objects.filter(date__month=month, date__year=year)
-            hours = 0
-
-            # Exclude the timesheets not associated with the selected plant.
-            for sheet in timesheets:
-                try:
-                    items = Item.objects.filter(job=sheet.job, printlocation__plant__name=plant)
-                except Exception:
-                    items = None
-                if items:
-                    hours += sheet.hours
+            # Hours on jobs with an item printed at the selected plant.
+            plant_jobs = Item.objects.filter(printlocation__plant__name=plant).values("job")
+            hours = (
+                TimeSheetDay.objects.filter(date__month=month, date__year=year, job__in=plant_jobs).aggregate(total=Sum("hours"))[
+                    "total"
+                ]
+                or 0
+            )
 
             welcome_message = None
 
@@ -1858,6 +1854,15 @@ def timesheets_by_date_span(start_date, end_date):
     # Currently available time sheet activities.
     categories = TimeSheetCategory.objects.all().order_by("order")
 
+    # Everyone's hours in each category over the span, in one query.
+    span_hours = (
+        TimeSheetDay.objects.filter(date__gte=start_date, date__lte=end_date)
+        .order_by()
+        .values_list("artist", "category")
+        .annotate(total=Sum("hours"))
+    )
+    hours_by_user_category = dict(((artist_id, category_id), total) for artist_id, category_id, total in span_hours)
+
     # Create a dictionary of categories to track total hours in each.
     total_hours_by_category = {}
     for cat in categories:
@@ -1883,12 +1888,7 @@ def timesheets_by_date_span(start_date, end_date):
         cat_hours.append(("Name", str(user.first_name + " " + user.last_name), user.id))
         # Go through all the timesheet categories and total this user's hours in each.
         for category in categories:
-            hours_total = 0
-            # Gather all the timesheet entries for the user in this category.
-            entries = TimeSheet.objects.filter(artist=user, date__gte=start_date, date__lte=end_date, category=category)
-            # Total up the hours.
-            for entry in entries:
-                hours_total += entry.hours
+            hours_total = hours_by_user_category.get((user.id, category.id), 0)
             # Add this category and the total hours to the list.
             cat_hours.append((str(category.name), hours_total))
             # Also increase this caterory's total in the total_hours_by_category dict.
@@ -1934,26 +1934,21 @@ def timesheets_billable_hours(month, year):
     # Master list for tracking the employee billable hours.
     billable_hours_data = []
 
+    # Everyone's total and billable (on a job) hours for the month.
+    month_hours = (
+        TimeSheetDay.objects.filter(date__month=month, date__year=year)
+        .exclude(category__name__in=excluded_activities)
+        .order_by()
+        .values_list("artist")
+        .annotate(total=Sum("hours"), billable=Sum("hours", filter=Q(job__isnull=False)))
+    )
+    hours_by_user = dict((artist_id, (total, billable)) for artist_id, total, billable in month_hours)
+
     # Gather data for each employee and append it to the list.
     for user in clemson_employee_list:
-        # Used to track all the users hours.
-        total_hours = 0
-        # Used to track the users billable hours.
-        billable_hours = 0
-
-        # Gather all the timesheet entries for the user during the month.
-        entries = TimeSheet.objects.filter(artist=user, date__month=month, date__year=year).exclude(
-            category__name__in=excluded_activities
-        )
-
-        # Total up all the hours.
-        for entry in entries:
-            total_hours += entry.hours
-
-        # Total up the billable hours
-        billable_entries = entries.filter(job__isnull=False)
-        for entry in billable_entries:
-            billable_hours += entry.hours
+        # The user's hours, and the billable ones among them.
+        total_hours, billable_hours = hours_by_user.get(user.id, (0, 0))
+        billable_hours = billable_hours or 0
 
         # Now add the user's hour totals to the master list.
         if total_hours > 0:
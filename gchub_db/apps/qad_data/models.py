@@ -5,6 +5,11 @@ from django.db import models
 # from gchub_db.apps.workflow.models.general import ItemCatalog
 
 
+# The "New Print Group" entry, for art requests on a print group QAD doesn't
+# have yet. Offered ahead of the others on the art request form.
+NEW_PRINTGROUP_ID = 4363
+
+
 class QAD_PrintGroups(models.Model):
     """List of PrintGroup names from QAD."""
 
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from gchub_db.apps.queues.models import ColorKeyQueue, TiffToPDF
+from gchub_db.apps.queues.models import ColorKeyQueue, OutboundEmail, TiffToPDF
+from gchub_db.apps.queues.outbox import outbox_backlog
 
 
 class ColorKeyQueueAdmin(admin.ModelAdmin):
@@ -27,3 +28,32 @@ class TiffToPDFAdmin(admin.ModelAdmin):
 
 
 admin.site.register(TiffToPDF, TiffToPDFAdmin)
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "subject",
+        "date_queued",
+        "next_attempt",
+        "date_sent",
+        "number_of_attempts",
+    )
+    list_display_links = ("id", "subject")
+    list_filter = ("date_sent",)
+    search_fields = ("subject", "last_error")
+    readonly_fields = ("dedup_key", "date_queued", "date_sent", "last_error")
+
+    def changelist_view(self, request, extra_context=None):
+        """Shows the outbox backlog in the page title."""
+        backlog = outbox_backlog()
+        extra_context = extra_context or {}
+        extra_context["title"] = "Email outbox: %d waiting (%d retrying), %d failed" % (
+            backlog["waiting"],
+            backlog["retrying"],
+            backlog["failed"],
+        )
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("queues", "0004_alter_colorkeyqueue_id_alter_tifftopdf_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundEmail",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("subject", models.TextField()),
+                ("body", models.TextField(blank=True)),
+                ("content_subtype", models.CharField(default="plain", max_length=20)),
+                ("from_email", models.CharField(max_length=255)),
+                ("to", models.JSONField(default=list)),
+                ("cc", models.JSONField(blank=True, default=list)),
+                ("bcc", models.JSONField(blank=True, default=list)),
+                ("reply_to", models.JSONField(blank=True, default=list)),
+                ("headers", models.JSONField(blank=True, default=dict)),
+                ("alternatives", models.JSONField(blank=True, default=list)),
+                ("attachments", models.JSONField(blank=True, default=list)),
+                ("dedup_key", models.CharField(db_index=True, max_length=40)),
+                ("date_queued", models.DateTimeField(auto_now_add=True, verbose_name="Date Queued")),
+                ("next_attempt", models.DateTimeField(default=django.utils.timezone.now, verbose_name="Next Attempt")),
+                ("date_sent", models.DateTimeField(blank=True, null=True, verbose_name="Date Sent")),
+                ("number_of_attempts", models.IntegerField(default=0, verbose_name="Attempts")),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "ordering": ["-date_queued"],
+                "indexes": [models.Index(fields=["date_sent", "next_attempt"], name="queues_outb_date_se_65b261_idx")],
+            },
+        ),
+    ]
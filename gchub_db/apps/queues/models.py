@@ -4,6 +4,9 @@ background. These models are those that don't fit cleanly under their own apps.
 For example, there is no Hughes Uploading app, and there is not enough
 functionality needed to necessitate such an app.
 
+OutboundEmail is the email outbox. Messages are queued by
+gchub_db.apps.queues.outbox and sent in batches by bin/send_queued_email.py.
+
 As of 2015 the tiff2pdf workflow is handled in Automation Engine. The TiffToPDF
 queue is no longer in use but for now we're leaving it just in case we need the
 info for something.
@@ -62,3 +65,40 @@ class TiffToPDF(models.Model):
         """Marks the queue entry as processed and makes the tiffs."""
         self.mark_as_processed()
         self.item.do_tiff_to_pdf()
+
+
+class OutboundEmail(models.Model):
+    """
+    A rendered email waiting in the outbox. Queued with
+    outbox.enqueue_email() and sent by outbox.OutboxSender.
+    """
+
+    subject = models.TextField()
+    body = models.TextField(blank=True)
+    content_subtype = models.CharField(max_length=20, default="plain")
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    # [content, mimetype] pairs.
+    alternatives = models.JSONField(default=list, blank=True)
+    # [filename, base64 content, mimetype] triples.
+    attachments = models.JSONField(default=list, blank=True)
+    # Identical messages queued while one is still waiting (or was sent
+    # recently) share a dedup_key and are dropped.
+    dedup_key = models.CharField(max_length=40, db_index=True)
+    date_queued = models.DateTimeField("Date Queued", auto_now_add=True)
+    # When the message may next be picked up by a sender.
+    next_attempt = models.DateTimeField("Next Attempt", default=timezone.now)
+    date_sent = models.DateTimeField("Date Sent", blank=True, null=True)
+    number_of_attempts = models.IntegerField("Attempts", default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-date_queued"]
+        indexes = [models.Index(fields=["date_sent", "next_attempt"])]
+
+    def __str__(self):
+        return self.subject
@@ -0,0 +1,221 @@
+"""
+Email outbox.
+
+Request handlers and scripts queue messages with enqueue_email() (or
+general_funcs.send_info_mail(), which goes through here) instead of talking
+to the mail relay themselves. OutboxSender, run by bin/send_queued_email.py,
+sends them in batches over one reused SMTP connection. Sending is rate
+limited, and failures are retried with an exponential backoff.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED plus a lease on next_attempt,
+so two senders never pick up the same message, and messages claimed by a
+sender that died are picked up again once the lease runs out.
+"""
+
+import base64
+import hashlib
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from gchub_db.apps.queues.models import OutboundEmail
+
+# Messages claimed per batch.
+OUTBOX_BATCH_SIZE = getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 50)
+# Most messages sent per second (0 for no limit).
+OUTBOX_RATE_LIMIT = getattr(settings, "EMAIL_OUTBOX_RATE_LIMIT", 10)
+# Attempts before a message is given up on.
+OUTBOX_MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 8)
+# Seconds before the first retry. Doubles with each attempt.
+OUTBOX_RETRY_DELAY = getattr(settings, "EMAIL_OUTBOX_RETRY_DELAY", 60)
+# Identical messages queued within this many seconds of each other are dropped.
+OUTBOX_DEDUP_SECONDS = getattr(settings, "EMAIL_OUTBOX_DEDUP_SECONDS", 3600)
+# Seconds a claimed batch is reserved for its sender.
+OUTBOX_LEASE_SECONDS = 300
+
+
+def dedup_key(message):
+    """Returns a key identifying a message by its sender, recipients and content."""
+    digest = hashlib.sha1()
+    for part in (
+        message.from_email,
+        ",".join(sorted(message.recipients())),
+        message.subject,
+        message.body,
+    ):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    for content, mimetype in getattr(message, "alternatives", []):
+        digest.update(str(content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _encode_attachment(attachment):
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return [filename, base64.b64encode(content).decode("ascii"), mimetype]
+
+
+def enqueue_email(message, key=None):
+    """
+    Queues a Django EmailMessage (or EmailMultiAlternatives) for sending.
+    Returns the new OutboundEmail, or None if an identical message is
+    already waiting or was sent in the last OUTBOX_DEDUP_SECONDS.
+
+    Attachments given as MIMEBase objects aren't supported; attach them as
+    (filename, content, mimetype) instead.
+    """
+    key = key or dedup_key(message)
+    recent = timezone.now() - timedelta(seconds=OUTBOX_DEDUP_SECONDS)
+    duplicate = OutboundEmail.objects.filter(dedup_key=key).filter(
+        Q(date_sent__isnull=True, number_of_attempts__lt=OUTBOX_MAX_ATTEMPTS) | Q(date_sent__gte=recent)
+    )
+    if duplicate.exists():
+        return None
+    return OutboundEmail.objects.create(
+        subject=message.subject,
+        body=message.body,
+        content_subtype=message.content_subtype,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        alternatives=[list(alternative) for alternative in getattr(message, "alternatives", [])],
+        attachments=[_encode_attachment(attachment) for attachment in message.attachments],
+        dedup_key=key,
+    )
+
+
+def to_message(outbound, connection=None):
+    """Rebuilds the Django email message for a queued OutboundEmail."""
+    message = EmailMultiAlternatives(
+        outbound.subject,
+        outbound.body,
+        outbound.from_email,
+        outbound.to,
+        bcc=outbound.bcc,
+        connection=connection,
+        headers=outbound.headers,
+        cc=outbound.cc,
+        reply_to=outbound.reply_to,
+        alternatives=[tuple(alternative) for alternative in outbound.alternatives],
+    )
+    message.content_subtype = outbound.content_subtype
+    for filename, content, mimetype in outbound.attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+def outbox_backlog():
+    """Returns counts of waiting, retrying and failed messages."""
+    unsent = OutboundEmail.objects.filter(date_sent__isnull=True)
+    waiting = unsent.filter(number_of_attempts__lt=OUTBOX_MAX_ATTEMPTS)
+    return {
+        "waiting": waiting.count(),
+        "retrying": waiting.filter(number_of_attempts__gt=0).count(),
+        "failed": unsent.filter(number_of_attempts__gte=OUTBOX_MAX_ATTEMPTS).count(),
+    }
+
+
+class OutboxSender:
+    """Claims queued messages and sends them over one SMTP connection."""
+
+    def __init__(self, batch_size=OUTBOX_BATCH_SIZE, rate_limit=OUTBOX_RATE_LIMIT, connection=None):
+        self.batch_size = batch_size
+        self.rate_limit = rate_limit
+        self.connection = connection or get_connection(fail_silently=False)
+        self._last_send = 0.0
+
+    def claim(self):
+        """
+        Claims the next batch of due messages by pushing their next_attempt
+        out by the lease time. Rows locked by another sender are skipped.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                OutboundEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    date_sent__isnull=True,
+                    number_of_attempts__lt=OUTBOX_MAX_ATTEMPTS,
+                    next_attempt__lte=now,
+                )
+                .order_by("next_attempt", "id")[: self.batch_size]
+            )
+            OutboundEmail.objects.filter(id__in=[message.id for message in messages]).update(
+                next_attempt=now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+            )
+        return messages
+
+    def _throttle(self):
+        if self.rate_limit:
+            wait = self._last_send + 1.0 / self.rate_limit - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        self._last_send = time.monotonic()
+
+    def _send(self, outbound):
+        """Sends one message, reconnecting once if the relay dropped us."""
+        message = to_message(outbound, connection=self.connection)
+        self._throttle()
+        try:
+            self.connection.send_messages([message])
+        except smtplib.SMTPServerDisconnected:
+            self.connection.close()
+            self.connection.open()
+            self.connection.send_messages([message])
+
+    def send_batch(self, messages):
+        """Sends a claimed batch. Returns (sent, failed) counts."""
+        sent_ids = []
+        failed = []
+        for outbound in messages:
+            try:
+                self._send(outbound)
+                sent_ids.append(outbound.id)
+            except Exception as ex:
+                outbound.number_of_attempts += 1
+                delay = OUTBOX_RETRY_DELAY * 2 ** (outbound.number_of_attempts - 1)
+                outbound.next_attempt = timezone.now() + timedelta(seconds=delay)
+                outbound.last_error = "%s: %s" % (ex.__class__.__name__, ex)
+                failed.append(outbound)
+
+        if sent_ids:
+            OutboundEmail.objects.filter(id__in=sent_ids).update(date_sent=timezone.now(), last_error="")
+        if failed:
+            OutboundEmail.objects.bulk_update(failed, ["number_of_attempts", "next_attempt", "last_error"])
+        return len(sent_ids), len(failed)
+
+    def drain(self, forever=False, poll_interval=10, verbose=True):
+        """
+        Sends due messages until there are none left. With forever set, keeps
+        polling every poll_interval seconds instead of returning. Returns a
+        dict of sent/failed counts.
+        """
+        stats = {"sent": 0, "failed": 0}
+        self.connection.open()
+        try:
+            while True:
+                messages = self.claim()
+                if not messages:
+                    if not forever:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                sent, failed = self.send_batch(messages)
+                stats["sent"] += sent
+                stats["failed"] += failed
+                if verbose:
+                    print("Sent %d messages, %d failed." % (sent, failed))
+        finally:
+            self.connection.close()
+        return stats
@@ -0,0 +1,62 @@
+import smtplib
+
+from django.core import mail
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.test import TestCase, override_settings
+
+from gchub_db.apps.queues import outbox
+from gchub_db.apps.queues.models import OutboundEmail
+
+
+class FailingConnection:
+    """Stands in for an SMTP connection whose relay refuses everything."""
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise smtplib.SMTPException("Relay unavailable")
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class OutboxTest(TestCase):
+    def make_message(self, subject="Proof ready"):
+        msg = EmailMultiAlternatives(subject, "<b>Body</b>", "gold@example.com", ["csr@example.com"])
+        msg.content_subtype = "html"
+        msg.attach("event.ics", "BEGIN:VCALENDAR", "text/calendar")
+        return msg
+
+    def test_enqueue_and_send(self):
+        self.assertIsNotNone(outbox.enqueue_email(self.make_message()))
+        self.assertIsNotNone(outbox.enqueue_email(self.make_message("Another")))
+        self.assertEqual(len(mail.outbox), 0)
+
+        sender = outbox.OutboxSender(rate_limit=0, connection=get_connection())
+        self.assertEqual(sender.drain(verbose=False), {"sent": 2, "failed": 0})
+        self.assertEqual(len(mail.outbox), 2)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.content_subtype, "html")
+        self.assertEqual(sent.attachments[0][0], "event.ics")
+        self.assertEqual(outbox.outbox_backlog()["waiting"], 0)
+
+    def test_duplicates_are_dropped(self):
+        self.assertIsNotNone(outbox.enqueue_email(self.make_message()))
+        self.assertIsNone(outbox.enqueue_email(self.make_message()))
+        outbox.OutboxSender(rate_limit=0, connection=get_connection()).drain(verbose=False)
+        # Recently sent, so still a duplicate.
+        self.assertIsNone(outbox.enqueue_email(self.make_message()))
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_failures_are_retried_later(self):
+        outbox.enqueue_email(EmailMessage("Hi", "Body", "gold@example.com", ["csr@example.com"]))
+        stats = outbox.OutboxSender(rate_limit=0, connection=FailingConnection()).drain(verbose=False)
+        self.assertEqual(stats, {"sent": 0, "failed": 1})
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.number_of_attempts, 1)
+        self.assertIn("Relay unavailable", queued.last_error)
+        # Backed off, so not due again yet.
+        self.assertEqual(outbox.OutboxSender(rate_limit=0, connection=get_connection()).claim(), [])
+        self.assertEqual(outbox.outbox_backlog(), {"waiting": 1, "retrying": 1, "failed": 0})
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_timesheet_days(apps, schema_editor):
+    """Sums up the existing time sheet entries."""
+    TimeSheet = apps.get_model("timesheet", "TimeSheet")
+    TimeSheetDay = apps.get_model("timesheet", "TimeSheetDay")
+    totals = (
+        TimeSheet.objects.order_by().values_list("artist", "job", "category", "date").annotate(total=Sum("hours"), count=Count("id"))
+    )
+    TimeSheetDay.objects.bulk_create(
+        (
+            TimeSheetDay(artist_id=artist_id, job_id=job_id, category_id=category_id, date=date, hours=total, entries=count)
+            for artist_id, job_id, category_id, date, total, count in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("timesheet", "0002_alter_timesheet_id_alter_timesheetcategory_id"),
+        ("workflow", "0011_auto_20190625_1125"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimeSheetDay",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField()),
+                ("hours", models.FloatField(default=0)),
+                ("entries", models.IntegerField(default=0)),
+                (
+                    "artist",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="timesheet.timesheetcategory"),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to="workflow.job"),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["artist", "date"], name="timesheet_t_artist__c9a688_idx"),
+                    models.Index(fields=["date"], name="timesheet_t_date_68b8b1_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("artist", "job", "category", "date"), name="unique_timesheet_day", nulls_distinct=False
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_timesheet_days, migrations.RunPython.noop),
+    ]
@@ -6,7 +6,8 @@ Module gchub_db\apps\timesheet\\models.py
 from __future__ import unicode_literals
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Sum, signals
 
 
 class TimeSheetCategory(models.Model):
@@ -39,3 +40,83 @@ class TimeSheet(models.Model):
 
     def __unicode__(self):
         return self.__str__()
+
+
+class TimeSheetDay(models.Model):
+    """
+    The hours an artist logged against a job (or no job) in a category on a
+    given day: the TimeSheet entries summed up, kept current by the TimeSheet
+    signals below. Reports read these instead of adding up entries, so a
+    long date range costs one grouped query.
+
+    Entries changed with QuerySet.update() or bulk_create() skip the signals;
+    call refresh_timesheet_days() for the days they touched. There is one row
+    per artist, job, category and day, entries without a job included.
+    """
+
+    artist = models.ForeignKey(User, on_delete=models.CASCADE)
+    job = models.ForeignKey("workflow.Job", blank=True, null=True, on_delete=models.CASCADE)
+    category = models.ForeignKey(TimeSheetCategory, on_delete=models.CASCADE)
+    date = models.DateField()
+    hours = models.FloatField(default=0)
+    entries = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["artist", "date"]),
+            models.Index(fields=["date"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["artist", "job", "category", "date"], nulls_distinct=False, name="unique_timesheet_day"),
+        ]
+
+    def __str__(self):
+        return str("%s - %s - %s" % (self.artist, self.category, self.date))
+
+
+def refresh_timesheet_days(artist_id, date):
+    """
+    Re-sums an artist's TimeSheet entries for one day into TimeSheetDay.
+    Refreshes for the same artist wait on a lock of the artist's row, so
+    each one sums the entries as the one before it left them.
+    """
+    totals = (
+        TimeSheet.objects.filter(artist_id=artist_id, date=date)
+        .order_by()
+        .values_list("job", "category")
+        .annotate(total=Sum("hours"), count=Count("id"))
+    )
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(id=artist_id).values_list("id"))
+        TimeSheetDay.objects.filter(artist_id=artist_id, date=date).delete()
+        TimeSheetDay.objects.bulk_create(
+            [
+                TimeSheetDay(artist_id=artist_id, job_id=job_id, category_id=category_id, date=date, hours=total, entries=count)
+                for job_id, category_id, total, count in totals
+            ]
+        )
+
+
+def timesheet_pre_save(sender, instance, *args, **kwargs):
+    """Remember the day an edited entry was on, in case it moves."""
+    instance._previous_day = None
+    if instance.id:
+        instance._previous_day = TimeSheet.objects.filter(id=instance.id).values_list("artist_id", "date").first()
+
+
+def timesheet_post_save(sender, instance, *args, **kwargs):
+    """Update the TimeSheetDay totals of the entry's day (and its old one)."""
+    refresh_timesheet_days(instance.artist_id, instance.date)
+    previous_day = getattr(instance, "_previous_day", None)
+    if previous_day and previous_day != (instance.artist_id, instance.date):
+        refresh_timesheet_days(*previous_day)
+
+
+def timesheet_post_delete(sender, instance, *args, **kwargs):
+    """Take a deleted entry out of its day's TimeSheetDay totals."""
+    refresh_timesheet_days(instance.artist_id, instance.date)
+
+
+signals.pre_save.connect(timesheet_pre_save, sender=TimeSheet)
+signals.post_save.connect(timesheet_post_save, sender=TimeSheet)
+signals.post_delete.connect(timesheet_post_delete, sender=TimeSheet)
@@ -0,0 +1,98 @@
+"""
+Tests for the daily timesheet rollup and the views and reports reading it.
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from gchub_db.apps.manager_tools.views import timesheets_billable_hours, timesheets_by_date_span
+from gchub_db.apps.timesheet import views
+from gchub_db.apps.timesheet.models import TimeSheet, TimeSheetCategory, TimeSheetDay
+from gchub_db.apps.workflow.models import Job, Site
+
+
+class TimeSheetDayTest(TestCase):
+    def setUp(self):
+        self.artist = User.objects.create_user(username="artist", first_name="Art", last_name="Ist")
+        self.design = TimeSheetCategory.objects.create(name="Design", order=1)
+        self.lunch = TimeSheetCategory.objects.create(name="Lunch", order=2)
+        site = Site.objects.create(name="Carton", domain="carton.example.com")
+        self.job = Job.objects.create(name="Sheet Job", workflow=site, status="Active", due_date=date.today())
+        self.day = date(2026, 3, 2)
+
+    def entry(self, hours, day=None, job=None, category=None):
+        return TimeSheet.objects.create(
+            artist=self.artist, job=job, category=category or self.design, date=day or self.day, hours=hours
+        )
+
+    def totals(self):
+        rows = TimeSheetDay.objects.values_list("date", "job_id", "category__name", "hours", "entries")
+        return sorted(rows, key=lambda row: (row[0], row[1] or 0))
+
+    def test_kept_current_by_saves_and_deletes(self):
+        first = self.entry(2.5, job=self.job)
+        self.entry(1.25, job=self.job)
+        self.entry(0.5)
+        self.assertEqual(self.totals(), [(self.day, None, "Design", 0.5, 1), (self.day, self.job.id, "Design", 3.75, 2)])
+
+        # Moving an entry to another day updates both days.
+        first.date = self.day + timedelta(days=1)
+        first.save()
+        self.assertEqual(
+            self.totals(),
+            [
+                (self.day, None, "Design", 0.5, 1),
+                (self.day, self.job.id, "Design", 1.25, 1),
+                (self.day + timedelta(days=1), self.job.id, "Design", 2.5, 1),
+            ],
+        )
+
+        first.delete()
+        self.assertEqual(self.totals(), [(self.day, None, "Design", 0.5, 1), (self.day, self.job.id, "Design", 1.25, 1)])
+
+    def test_reports(self):
+        self.entry(6, job=self.job)
+        self.entry(2)
+        self.entry(1, category=self.lunch)
+        self.entry(3, day=date(2026, 4, 1), job=self.job)
+
+        self.assertEqual(timesheets_billable_hours(3, 2026), [])
+        self.artist.user_permissions.add(Permission.objects.get(codename="clemson_employee"))
+        self.assertEqual(timesheets_billable_hours(3, 2026), [["Art Ist", 6, 8, 75.0]])
+        self.assertEqual(
+            timesheets_by_date_span(date(2026, 3, 1), date(2026, 3, 31)),
+            [
+                [("Name", "Art Ist", self.artist.id), ("Design", 8), ("Lunch", 1), ("Total", 8)],
+                [("Name", "Total", None), ("Design", 8), ("Lunch", 1)],
+            ],
+        )
+
+    def timesheet_queries(self, queries):
+        return len([query for query in queries if "timesheet_" in query["sql"]])
+
+    @override_settings(ROOT_URLCONF="gchub_db.urls")
+    def test_home_takes_the_same_queries_for_any_range(self):
+        for days_back in range(0, 90, 3):
+            self.entry(1, day=self.day - timedelta(days=days_back), job=self.job)
+
+        def fetch(end_date):
+            request = RequestFactory().post(
+                "/timesheet/", {"start_date": self.day.strftime("%m/%d/%Y"), "end_date": end_date.strftime("%m/%d/%Y")}
+            )
+            request.user = self.artist
+            return views.home(request, user_id=self.artist.id)
+
+        with CaptureQueriesContext(connection) as week_queries:
+            response = fetch(self.day - timedelta(days=6))
+        self.assertContains(response, "Total: 1.00", count=3)
+        with CaptureQueriesContext(connection) as quarter_queries:
+            response = fetch(self.day - timedelta(days=89))
+        self.assertContains(response, "Total: 1.00", count=30)
+        self.assertContains(response, "Total: 0.00", count=60)
+        # The base template's own queries aside.
+        self.assertEqual(self.timesheet_queries(quarter_queries), self.timesheet_queries(week_queries))
+        self.assertEqual(self.timesheet_queries(week_queries), 2)
@@ -11,12 +11,13 @@ from datetime import timedelta
 from django import forms
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import Permission, User
+from django.db.models import Count, Q, Sum
 from django.forms import ChoiceField, DateField, IntegerField, ModelForm
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
 
-from gchub_db.apps.timesheet.models import TimeSheet
+from gchub_db.apps.timesheet.models import TimeSheet, TimeSheetDay
 from gchub_db.apps.workflow.models import Job
 from gchub_db.includes import general_funcs
 from gchub_db.middleware import threadlocals
@@ -179,28 +180,31 @@ def home(request, user_id=None):
             time_diff = start_date - end_date + timedelta(days=1)
             days_back_target = time_diff.days
 
-    # Master list. Each entry will be the data for a given date.
-    timesheets_by_date = []
+    # The user's entries for the whole range in one query, with the item
+    # counts shown next to the jobs, grouped by date.
+    entries = (
+        TimeSheet.objects.filter(artist=user, date__gte=end_date, date__lte=start_date)
+        .select_related("job", "category")
+        .annotate(items_in_job=Count("job__item", filter=Q(job__item__is_deleted=False)))
+        .order_by("id")
+    )
+    entries_by_date = {}
+    for entry in entries:
+        entries_by_date.setdefault(entry.date, []).append(entry)
+    # Daily totals come from the rollup.
+    totals_by_date = dict(
+        TimeSheetDay.objects.filter(artist=user, date__gte=end_date, date__lte=start_date)
+        .order_by()
+        .values_list("date")
+        .annotate(total=Sum("hours"))
+    )
 
-    # Iterate back through our days and gather the date, timesheet entries, and
-    # total hours for each.
+    # Master list. Each entry will be the data for a given date, in this
+    # order: date, timesheet entries, total hours.
+    timesheets_by_date = []
     for days_back in range(0, days_back_target):
-        # Make a list of todays data.
-        # We'll append in this order: date, timesheet_queryset, total hours.
-        todays_data = []
-        # Get and append today's date.
         todays_date = start_date - timedelta(days=days_back)
-        todays_data.append(todays_date)
-        # Get the user's timesheets for this date.
-        timesheets = TimeSheet.objects.filter(artist=user, date=todays_date).order_by("id")
-        todays_data.append(timesheets)
-        # Total up the hours
-        total = 0
-        for entry in timesheets:
-            total += entry.hours
-        todays_data.append(total)
-        # Add todays data to the master list.
-        timesheets_by_date.append(todays_data)
+        timesheets_by_date.append([todays_date, entries_by_date.get(todays_date, []), totals_by_date.get(todays_date, 0)])
 
     # Pass today and yesterday's dates so they can be flagged in the template.
     today_check = general_funcs._utcnow_naive().date()
@@ -0,0 +1,279 @@
+"""
+Archiving of jobs that have gone quiet, for bin/archive_stale_active_jobs.py,
+and locking of archived job folders, for bin/lock_archived_jobs.py.
+
+A job is stale when its latest JobLog entry is older than
+ARCHIVAL_CUTOFF_DATE days, or COMPLETE_CUTOFF_DATE days for a completed
+job. The candidates are found with one grouped query rather than a JobLog
+query per unarchived job, and then archived a batch at a time:
+
+1. The job's junction point in Active and its Carton DeleteOnOutput
+   folders are removed, by a pool of ARCHIVE_WORKERS threads.
+2. The pool creates each job's junction point in Archive and locks its
+   folder.
+3. archive_disc is set on the jobs that were linked, with one UPDATE.
+
+The UPDATE skips Job.save() and its signals. For a job with log entries
+those only regenerate the keywords, recalculate real_due_date from
+due_date and, on Beverage jobs, copy olmsted_po_number into po_number, so
+a job archived here keeps those as they were last saved, where saving it
+would have brought them up to date.
+
+A job that couldn't be linked keeps an empty archive_disc, so the next run
+picks it up again.
+
+The threads only talk to the file system and the FS server. Everything
+they need from the database is loaded before they start.
+
+Progress is saved to ARCHIVE_STATE_FILE after each step. The state's
+pending jobs have had step 1 done but not steps 2 and 3: the current batch
+and the jobs that couldn't be linked. With resume, these are finished
+before going on to the jobs after the last one the interrupted run got
+through.
+
+FolderLocker is the lock pass of bin/lock_archived_jobs.py. It chmods
+archived job folders directly, LOCK_WORKERS jobs at a time, so it has to
+run on master. Each job's result is kept in a JobFolderLock, and only jobs
+that have never been locked, failed, or were last checked more than
+LOCK_RECHECK_DAYS ago are locked again. The results are saved a batch at a
+time, so an interrupted pass loses at most one batch.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from gchub_db.apps.workflow.models import Item, Job
+from gchub_db.apps.workflow.models.general import JobFolderLock
+from gchub_db.includes import fs_api
+
+# Jobs with no activity for more than this number of days will be archived.
+ARCHIVAL_CUTOFF_DATE = 180
+# Jobs with no activity that are complete for more than this number
+# of days will be archived.
+COMPLETE_CUTOFF_DATE = 120
+# Threads doing folder operations. The FS server and the file share are the
+# bottleneck, so keep this small.
+ARCHIVE_WORKERS = getattr(settings, "ARCHIVE_WORKERS", 4)
+# Jobs archived per UPDATE and per checkpoint.
+ARCHIVE_BATCH_SIZE = 100
+ARCHIVE_STATE_FILE = getattr(settings, "ARCHIVE_STATE_FILE", os.path.join(os.path.dirname(__file__), "archive_stale_jobs.json"))
+# Jobs whose folders are locked at once by the lock pass. Each one is a
+# directory walk, mostly waiting on the file share.
+LOCK_WORKERS = getattr(settings, "LOCK_WORKERS", 16)
+# Days before a locked job folder is checked again, in case someone has
+# changed permissions by hand.
+LOCK_RECHECK_DAYS = getattr(settings, "LOCK_RECHECK_DAYS", 90)
+
+
+def stale_job_ids(job_ids=None):
+    """
+    Ids of the unarchived jobs that are due to be archived, in order. Jobs
+    with no log entries at all are left alone. job_ids limits the jobs
+    considered.
+    """
+    now = timezone.now()
+    archival_cutoff_date = now - timedelta(days=ARCHIVAL_CUTOFF_DATE)
+    complete_cutoff_date = now - timedelta(days=COMPLETE_CUTOFF_DATE)
+    jobs = Job.objects.filter(archive_disc="")
+    if job_ids is not None:
+        jobs = jobs.filter(id__in=job_ids)
+    jobs = jobs.annotate(last_event=Max("job_set__event_time")).filter(
+        Q(last_event__lt=archival_cutoff_date) | Q(last_event__lt=complete_cutoff_date, status="Complete")
+    )
+    return list(jobs.order_by("id").values_list("id", flat=True))
+
+
+class StaleJobArchiver(object):
+    """
+    Archives stale jobs. With dry_run, only lists the jobs that would be
+    archived.
+    """
+
+    def __init__(self, workers=ARCHIVE_WORKERS, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False, state_file=ARCHIVE_STATE_FILE):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.state_file = state_file
+        self.failed = []
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as state:
+                return json.load(state)
+        except (OSError, ValueError):
+            return {"last_id": 0, "pending": []}
+
+    def _save_state(self, last_id, pending):
+        temp_file = self.state_file + ".tmp"
+        with open(temp_file, "w") as state:
+            json.dump({"last_id": last_id, "pending": pending}, state)
+        os.replace(temp_file, self.state_file)
+
+    def _jobs(self, job_ids):
+        return list(Job.objects.filter(id__in=job_ids).select_related("workflow").order_by("id"))
+
+    def _remove_links(self, job, item_nums):
+        """Removes the job's Active junction point and Carton item subfolders. Returns False on failure."""
+        try:
+            job.delete_folder_symlink()
+        except fs_api.NoResultsFound:
+            pass
+        except Exception as error:
+            print("! Could not remove the junction point for %s: %s" % (job.id, error))
+            return False
+        try:
+            for num_in_job in item_nums:
+                fs_api.delete_item_deleteonoutput_folder(job.id, num_in_job)
+        except Exception:
+            pass
+        return True
+
+    def _link_archived(self, job):
+        """Creates the job's Archive junction point and locks its folder. Returns False on failure."""
+        job.archive_disc = "1"
+        try:
+            job.create_folder_symlink(force_archive=True)
+            job.lock_folder(retries=fs_api.FS_SERVER_RETRIES)
+        except Exception as error:
+            print("! Could not link or lock %s: %s" % (job.id, error))
+            self.failed.append(job.id)
+            job.archive_disc = ""
+            return False
+        return True
+
+    def _archive(self, jobs, pool):
+        """
+        Steps 2 and 3: links the jobs in Archive and marks the ones that made
+        it archived. Returns the ids of the jobs that couldn't be linked.
+        """
+        linked = list(pool.map(self._link_archived, jobs))
+        Job.objects.filter(id__in=[job.id for job, ok in zip(jobs, linked) if ok], archive_disc="").update(archive_disc="1")
+        return [job.id for job, ok in zip(jobs, linked) if not ok]
+
+    def run(self, job_ids=None, resume=False):
+        """
+        Archives the stale jobs (among job_ids, if given). Returns the number
+        of jobs archived (or that would be, on a dry run).
+        """
+        start = time.time()
+        state = self._load_state() if resume else {"last_id": 0, "pending": []}
+        candidates = [job_id for job_id in stale_job_ids(job_ids) if job_id > state["last_id"]]
+        print("%d jobs to archive." % len(candidates))
+        archived = 0
+        # Jobs removed from Active that couldn't be linked in Archive.
+        unlinked = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if state["pending"] and not self.dry_run:
+                print("Finishing %d jobs from the interrupted run." % len(state["pending"]))
+                unlinked = self._archive(self._jobs(state["pending"]), pool)
+                archived += len(state["pending"]) - len(unlinked)
+                self._save_state(state["last_id"], unlinked)
+
+            for position in range(0, len(candidates), self.batch_size):
+                jobs = self._jobs(candidates[position : position + self.batch_size])
+                last_id = candidates[min(position + self.batch_size, len(candidates)) - 1]
+                if self.dry_run:
+                    for job in jobs:
+                        print("Would archive", job)
+                    archived += len(jobs)
+                    continue
+
+                carton_items = {}
+                carton_jobs = [job.id for job in jobs if job.workflow.name == "Carton"]
+                for job_id, num_in_job in Item.objects.filter(job__in=carton_jobs).values_list("job_id", "num_in_job"):
+                    carton_items.setdefault(job_id, []).append(num_in_job)
+                removed = pool.map(lambda job: self._remove_links(job, carton_items.get(job.id, ())), jobs)
+                ready = []
+                for job, ok in zip(jobs, removed):
+                    if ok:
+                        ready.append(job)
+                    else:
+                        self.failed.append(job.id)
+
+                self._save_state(last_id, unlinked + [job.id for job in ready])
+                batch_unlinked = self._archive(ready, pool)
+                unlinked += batch_unlinked
+                self._save_state(last_id, unlinked)
+                archived += len(ready) - len(batch_unlinked)
+                elapsed = time.time() - start
+                print("%d jobs archived, %.1f jobs/sec." % (archived, archived / elapsed if elapsed else 0))
+
+        elapsed = time.time() - start
+        verb = "would be archived" if self.dry_run else "archived"
+        print("%d jobs %s in %.1f seconds (%.1f jobs/sec)." % (archived, verb, elapsed, archived / elapsed if elapsed else 0))
+        if self.failed:
+            print("Failed: %s" % ", ".join(str(job_id) for job_id in self.failed))
+        return archived
+
+
+def jobs_to_lock(recheck_days=LOCK_RECHECK_DAYS):
+    """
+    Ids of the archived jobs whose folders need locking, newest first: those
+    never locked, those that failed and those last checked more than
+    recheck_days ago.
+    """
+    checked_since = timezone.now() - timedelta(days=recheck_days)
+    jobs = Job.objects.exclude(archive_disc="").filter(
+        Q(folder_lock__isnull=True) | Q(folder_lock__locked=False) | Q(folder_lock__date_checked__lt=checked_since)
+    )
+    return list(jobs.order_by("-id").values_list("id", flat=True))
+
+
+class FolderLocker(object):
+    """Locks archived job folders, recording each job's JobFolderLock."""
+
+    def __init__(self, workers=LOCK_WORKERS, batch_size=ARCHIVE_BATCH_SIZE, recheck_days=LOCK_RECHECK_DAYS):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.recheck_days = recheck_days
+        self.failed = []
+
+    def _lock(self, job_id):
+        """Locks one job's folder. Returns its (unsaved) JobFolderLock."""
+        try:
+            changed = fs_api.direct_lock_job_folder(job_id)
+        except OSError as error:
+            return JobFolderLock(job_id=job_id, locked=False, date_checked=timezone.now(), last_error=str(error))
+        return JobFolderLock(job_id=job_id, locked=True, date_checked=timezone.now(), entries_changed=changed)
+
+    def run(self, job_ids=None):
+        """
+        Locks the folders of the given jobs, or of jobs_to_lock(). Returns the
+        number locked; the ids of the jobs that couldn't be are in failed.
+        """
+        start = time.time()
+        if job_ids is None:
+            job_ids = jobs_to_lock(self.recheck_days)
+        print("%d job folders to lock." % len(job_ids))
+        locked = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for position in range(0, len(job_ids), self.batch_size):
+                results = list(pool.map(self._lock, job_ids[position : position + self.batch_size]))
+                JobFolderLock.objects.bulk_create(
+                    results,
+                    update_conflicts=True,
+                    unique_fields=["job"],
+                    update_fields=["locked", "date_checked", "entries_changed", "last_error"],
+                )
+                for result in results:
+                    if result.locked:
+                        locked += 1
+                    else:
+                        print("! Could not lock %s: %s" % (result.job_id, result.last_error))
+                        self.failed.append(result.job_id)
+                elapsed = time.time() - start
+                done = position + len(results)
+                print("%d/%d job folders, %.1f jobs/sec." % (done, len(job_ids), done / elapsed if elapsed else 0))
+
+        elapsed = time.time() - start
+        print("%d job folders locked, %d failed, in %.1f seconds." % (locked, len(self.failed), elapsed))
+        return locked
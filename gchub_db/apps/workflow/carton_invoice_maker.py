@@ -3,16 +3,16 @@ import os
 from datetime import date
 
 from django.conf import settings
+from django.db.models import Prefetch
 from reportlab.graphics import renderPDF
-from reportlab.graphics.shapes import Drawing, Group
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Paragraph
-from svglib.svglib import svg2rlg
 
 from gchub_db.apps.workflow.models import Charge, Item, Job
+from gchub_db.includes.reportlib.util import svg_drawing
 
 # Variables.
 LINE_SPACING = 0.2
@@ -31,9 +31,15 @@ def generate_carton_invoice(save_destination, job_id, item_list):
     The item list contains database IDs for each item like this:
     ['26099621', '26099622', '26099623']
     """
-    # Gather the listed items in the job.
-    items = Item.objects.filter(id__in=item_list)
+    # Gather the listed items in the job, and all their charges in one go.
+    items = Item.objects.filter(id__in=item_list).prefetch_related(
+        Prefetch(
+            "charge_set",
+            queryset=Charge.objects.select_related("description__category").order_by("creation_date"),
+        )
+    )
     job = Job.objects.get(id=job_id)
+    style = getSampleStyleSheet()["BodyText"]
 
     # Setup the document.
     c = canvas.Canvas(save_destination, pagesize=letter)
@@ -52,7 +58,7 @@ def generate_carton_invoice(save_destination, job_id, item_list):
         y_cursor = 6.750  # Starting point for all line items to be written. Higher is up.
         c.setFont("Helvetica", 12)
 
-        charges = Charge.objects.filter(item=item).order_by("creation_date")
+        charges = item.charge_set.all()
         total = 0
 
         # Draw the charges. We'll track how much space we're using up.
@@ -65,8 +71,6 @@ def generate_carton_invoice(save_destination, job_id, item_list):
                 # Move the cursor down.
                 y_cursor -= LINE_SPACING
                 # Make a paragraph for the comment so we can wrap long text.
-                styleSheet = getSampleStyleSheet()
-                style = styleSheet["BodyText"]
                 p = Paragraph("- " + charge.comments, style)
                 INDNT_COLUMN_TWO_X = COLUMN_TWO_X + 0.25
                 # Available width.
@@ -179,11 +183,7 @@ def draw_header(c):
     """Draws everything above the job number and name."""
     # Draw GPI log top left
     file_path = os.path.join(settings.MEDIA_ROOT, "img/GPI_Black_logo.svg")
-    graphic = svg2rlg(file_path)
-    d = Drawing()
-    graphic_group = Group(graphic)
-    d.add(graphic_group)
-    renderPDF.draw(d, c, 0.5 * inch, 10 * inch)
+    renderPDF.draw(svg_drawing(file_path), c, 0.5 * inch, 10 * inch)
 
     # GCHub address to right
     c.setFont("Helvetica-Bold", 14)
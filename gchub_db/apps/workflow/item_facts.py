@@ -0,0 +1,292 @@
+"""
+Analytics snapshot of items for the trend and billing reports in bin/.
+
+The reports used to loop over years, months, artists and plants running a
+count() or Sum() per spreadsheet cell against the live database. Instead, a
+nightly job (bin/refresh_item_facts.py) extracts one denormalized row per
+item - its job, workflow, plant, people, milestone dates and charge totals -
+into a compressed NumPy .npz file, and the reports group and total that in
+memory with ItemFacts.
+
+Refreshes are incremental: only items touched since the previous snapshot
+(the item or its job edited, a milestone logged, a charge added or invoiced)
+are extracted again and merged in, and deleted items are dropped. Deleted
+charges aren't detected, so a full rebuild should be run now and then.
+"""
+
+import datetime
+import os
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from gchub_db.apps.joblog.app_defs import (
+    JOBLOG_TYPE_ITEM_APPROVED,
+    JOBLOG_TYPE_ITEM_FILED_OUT,
+    JOBLOG_TYPE_ITEM_PROOFED_OUT,
+)
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.workflow.models import Charge, Item
+
+ITEM_FACTS_SNAPSHOT = getattr(settings, "ITEM_FACTS_SNAPSHOT", os.path.join(os.path.dirname(__file__), "item_facts.npz"))
+
+# Rows fetched from the database at a time while extracting.
+EXTRACT_CHUNK_SIZE = 5000
+
+# Column name -> numpy dtype. Missing dates are NaT, missing strings are "".
+COLUMNS = (
+    ("item_id", "i8"),
+    ("job_id", "i8"),
+    ("workflow", "U"),
+    ("item_created", "M8[D]"),
+    ("job_created", "M8[D]"),
+    ("job_due", "M8[D]"),
+    ("job_status", "U"),
+    ("prepress_supplier", "U"),
+    ("plant", "U"),
+    ("artist", "U"),
+    ("salesperson", "U"),
+    ("item_type", "U"),
+    ("quality", "U"),
+    ("overdue_exempt", "?"),
+    ("first_proof", "M8[D]"),
+    ("approved", "M8[D]"),
+    ("filed_out", "M8[D]"),
+    ("charges", "f8"),
+    ("billed_charges", "f8"),
+)
+
+# Snapshot column -> Item.objects.values() lookup, for the plain columns.
+VALUE_LOOKUPS = {
+    "item_id": "id",
+    "job_id": "job_id",
+    "workflow": "job__workflow__name",
+    "item_created": "creation_date",
+    "job_created": "job__creation_date",
+    "job_due": "job__due_date",
+    "job_status": "job__status",
+    "prepress_supplier": "job__prepress_supplier",
+    "plant": "printlocation__plant__name",
+    "artist": "job__artist__username",
+    "salesperson": "job__salesperson__username",
+    "item_type": "size__item_type",
+    "quality": "quality",
+    "overdue_exempt": "overdue_exempt",
+}
+
+MILESTONE_TYPES = (JOBLOG_TYPE_ITEM_PROOFED_OUT, JOBLOG_TYPE_ITEM_APPROVED, JOBLOG_TYPE_ITEM_FILED_OUT)
+
+
+def _milestone(log_type, order_by):
+    """Subquery for the first or last event_time of a log type on each item."""
+    logs = JobLog.objects.filter(item=OuterRef("pk"), type=log_type).order_by(order_by)
+    return Subquery(logs.values("event_time")[:1])
+
+
+def _charge_total(**filters):
+    charges = Charge.objects.filter(item=OuterRef("pk"), **filters).values("item").annotate(total=Sum("amount"))
+    return Subquery(charges.values("total"), output_field=FloatField())
+
+
+def _day(value):
+    """Reduces a date or aware datetime to a local date (None stays None)."""
+    if value is None or not hasattr(value, "hour"):
+        return value
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def extract_item_facts(queryset):
+    """
+    Returns {column: array} with one row per item in queryset. Milestones
+    match Item.first_proof_date(), approval_date() and final_file_date().
+    """
+    rows = queryset.annotate(
+        fact_first_proof=_milestone(JOBLOG_TYPE_ITEM_PROOFED_OUT, "event_time"),
+        fact_approved=_milestone(JOBLOG_TYPE_ITEM_APPROVED, "-event_time"),
+        fact_filed_out=_milestone(JOBLOG_TYPE_ITEM_FILED_OUT, "-event_time"),
+        fact_charges=_charge_total(),
+        fact_billed_charges=_charge_total(invoice_date__isnull=False),
+    ).values(*VALUE_LOOKUPS.values(), "fact_first_proof", "fact_approved", "fact_filed_out", "fact_charges", "fact_billed_charges")
+
+    lookups = dict(VALUE_LOOKUPS)
+    for name in ("first_proof", "approved", "filed_out", "charges", "billed_charges"):
+        lookups[name] = "fact_" + name
+    values = {name: [] for name, dtype in COLUMNS}
+    for row in rows.order_by("id").iterator(chunk_size=EXTRACT_CHUNK_SIZE):
+        for name, dtype in COLUMNS:
+            value = row[lookups[name]]
+            if dtype == "U":
+                value = value or ""
+            elif dtype == "f8":
+                value = value or 0.0
+            elif dtype == "M8[D]":
+                value = _day(value)
+            values[name].append(value)
+    return {name: np.array(values[name], dtype=dtype) for name, dtype in COLUMNS}
+
+
+def changed_items(since):
+    """Items whose snapshot row may be out of date after since."""
+    logged = JobLog.objects.filter(event_time__gte=since, type__in=MILESTONE_TYPES).values("item_id")
+    charged = Charge.objects.filter(Q(creation_date__gte=since) | Q(invoice_date__gte=_day(since))).values("item_id")
+    return Item.objects.filter(Q(last_modified__gte=since) | Q(job__last_modified__gte=since) | Q(id__in=logged) | Q(id__in=charged))
+
+
+def _as_key(values):
+    """Turns a numpy group key into plain Python values."""
+    return tuple(value.item() if hasattr(value, "item") else value for value in values)
+
+
+class ItemFacts(object):
+    """
+    An in-memory item fact table: a dict of equal length column arrays with
+    filtering and grouped counts/sums. Filtering returns a new ItemFacts, so
+    calls can be chained:
+
+        facts = ItemFacts.load().where(workflow="Foodservice").exclude(job_status="Cancelled")
+        facts.count_by(facts.years("item_created"), "plant")
+        => {(2023, "Kenton"): 812, (2023, "Visalia"): 640, ...}
+    """
+
+    def __init__(self, columns, refreshed=None):
+        self.columns = columns
+        self.refreshed = refreshed
+
+    @classmethod
+    def load(cls, path=None):
+        """Reads a snapshot written by save(). Raises OSError if there is none."""
+        with np.load(path or ITEM_FACTS_SNAPSHOT) as data:
+            columns = {name: data[name] for name, dtype in COLUMNS}
+            refreshed = datetime.datetime.fromtimestamp(float(data["refreshed"]), tz=datetime.timezone.utc)
+        return cls(columns, refreshed)
+
+    def save(self, path=None):
+        """Writes the snapshot, replacing the old file only once complete."""
+        path = path or ITEM_FACTS_SNAPSHOT
+        temp_path = path + ".tmp.npz"
+        np.savez_compressed(temp_path, refreshed=np.float64(self.refreshed.timestamp()), **self.columns)
+        os.replace(temp_path, path)
+
+    def __len__(self):
+        return len(self.columns["item_id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def subset(self, mask):
+        return ItemFacts({name: column[mask] for name, column in self.columns.items()}, self.refreshed)
+
+    def _matches(self, mask, equals):
+        matches = np.ones(len(self), dtype=bool) if mask is None else np.array(mask, dtype=bool)
+        for name, value in equals.items():
+            if isinstance(value, (list, tuple, set)):
+                matches &= np.isin(self.columns[name], list(value))
+            else:
+                matches &= self.columns[name] == value
+        return matches
+
+    def where(self, mask=None, **equals):
+        """
+        Rows matching a boolean mask and/or column=value conditions (a list
+        or tuple value matches any of its members).
+        """
+        return self.subset(self._matches(mask, equals))
+
+    def exclude(self, mask=None, **equals):
+        """The opposite of where()."""
+        return self.subset(~self._matches(mask, equals))
+
+    def years(self, column):
+        """Year of each date in column, -1 where it is missing."""
+        dates = self.columns[column]
+        return np.where(np.isnat(dates), -1, dates.astype("M8[Y]").astype("i8") + 1970)
+
+    def months(self, column):
+        """Month (1-12) of each date in column, -1 where it is missing."""
+        dates = self.columns[column]
+        return np.where(np.isnat(dates), -1, dates.astype("M8[M]").astype("i8") % 12 + 1)
+
+    def has(self, column):
+        """Mask of rows where a date column is filled in."""
+        return ~np.isnat(self.columns[column])
+
+    def _group(self, keys):
+        arrays = [self.columns[key] if isinstance(key, str) else np.asarray(key) for key in keys]
+        codes = np.zeros(len(self), dtype=np.int64)
+        uniques = []
+        for array in arrays:
+            values, inverse = np.unique(array, return_inverse=True)
+            uniques.append(values)
+            codes = codes * len(values) + inverse.reshape(-1)
+        groups, group_index = np.unique(codes, return_inverse=True)
+        # Decode each group's combined code back into its key values.
+        labels = []
+        for code in groups:
+            parts = []
+            for values in reversed(uniques):
+                code, position = divmod(int(code), len(values))
+                parts.append(values[position])
+            labels.append(_as_key(reversed(parts)))
+        return labels, group_index.reshape(-1)
+
+    def _by(self, keys, totals):
+        if len(keys) == 1:
+            return {label[0]: total for label, total in totals.items()}
+        return totals
+
+    def count_by(self, *keys):
+        """
+        Number of rows per group. Keys are column names or arrays; with one
+        key the result is keyed by value, otherwise by tuples of values.
+        """
+        if not len(self):
+            return {}
+        labels, group_index = self._group(keys)
+        counts = np.bincount(group_index, minlength=len(labels))
+        return self._by(keys, {label: int(count) for label, count in zip(labels, counts)})
+
+    def sum_by(self, column, *keys):
+        """Total of a numeric column per group, keyed as in count_by()."""
+        if not len(self):
+            return {}
+        labels, group_index = self._group(keys)
+        sums = np.bincount(group_index, weights=self.columns[column], minlength=len(labels))
+        return self._by(keys, {label: float(total) for label, total in zip(labels, sums)})
+
+    def first_per_job(self):
+        """One row per job, for job level figures like lead times."""
+        job_ids, first_rows = np.unique(self.columns["job_id"], return_index=True)
+        return self.subset(np.sort(first_rows))
+
+
+def refresh_item_facts(path=None, full=False):
+    """
+    Brings the snapshot up to date and saves it. Returns (facts, number of
+    item rows extracted). A full extract is done when asked for or when
+    there is no previous snapshot.
+    """
+    started = timezone.now()
+    previous = None
+    if not full:
+        try:
+            previous = ItemFacts.load(path)
+        except (OSError, KeyError, ValueError):
+            previous = None
+
+    if previous is None:
+        fresh = extract_item_facts(Item.objects.all())
+        facts = ItemFacts(fresh, started)
+    else:
+        fresh = extract_item_facts(changed_items(previous.refreshed))
+        live_ids = np.fromiter(Item.objects.values_list("id", flat=True).iterator(), dtype=np.int64)
+        old_ids = previous["item_id"]
+        keep = np.isin(old_ids, live_ids) & ~np.isin(old_ids, fresh["item_id"])
+        columns = {name: np.concatenate([previous[name][keep], fresh[name]]) for name, dtype in COLUMNS}
+        order = np.argsort(columns["item_id"], kind="stable")
+        facts = ItemFacts({name: column[order] for name, column in columns.items()}, started)
+    facts.save(path)
+    return facts, len(fresh["item_id"])
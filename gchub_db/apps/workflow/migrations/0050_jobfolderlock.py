@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("workflow", "0049_plantbevcontroller_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobFolderLock",
+            fields=[
+                (
+                    "job",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="folder_lock",
+                        serialize=False,
+                        to="workflow.job",
+                    ),
+                ),
+                ("locked", models.BooleanField(default=False)),
+                ("date_checked", models.DateTimeField(verbose_name="Date Checked")),
+                ("entries_changed", models.IntegerField(default=0, verbose_name="Entries Changed")),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["locked", "date_checked"], name="workflow_jo_locked_c6db53_idx")],
+            },
+        ),
+    ]
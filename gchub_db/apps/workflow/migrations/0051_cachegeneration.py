@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("workflow", "0050_jobfolderlock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheGeneration",
+            fields=[
+                ("name", models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ("generation", models.CharField(max_length=32)),
+            ],
+        ),
+    ]
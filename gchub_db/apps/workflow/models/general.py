@@ -739,196 +739,16 @@ class ChargeType(models.Model):
     def actual_charge(self, num_colors=1, quality="B", rush_days="", item=None):
         """
         Return the actual charge amount, based on number of colors,
-        quality and rush days.
+        quality and rush days. The pricing rules are in workflow.pricing.
         """
-        amount = self.base_amount
+        from gchub_db.apps.workflow.pricing import charge_amount, charge_rate, item_facts, needs_item
 
-        # "coating" inks don't count towards "Prepress Production" charges on carton items.
-        if self.type == "Prepress Production" and self.workflow.name == "Carton":
-            if item:
-                num_colors = item.get_num_colors_carton()
-
-        # Adjust amount for quality.
-        if self.adjust_for_quality:
-            if quality == "A":
-                # No change
-                pass
-            elif quality == "B":
-                amount = amount * 0.67
-            elif quality == "C":
-                amount = amount * 0.33
-
-        # Adjust for number of colors/inks in item.
-        if self.adjust_for_colors:
-            amount = amount * num_colors
-
-        # Add extra amount if needed.
-        if self.extra_amount:
-            amount = amount + self.extra_amount
-
-        # Due to math error long ago, this needs to be done here, since it
-        # can't really be fit to a formula. Grrr.
-        if self.type == "New_w_Digtial_Art":
-            if num_colors == 1:
-                amount = 218
-            if num_colors == 2:
-                amount = 303
-            if num_colors == 3:
-                amount = 374
-            if num_colors == 4:
-                amount = 459
-
-        if self.type == "Create_From_Drawing":
-            if num_colors == 1:
-                amount = 279
-            if num_colors == 2:
-                amount = 391
-            if num_colors == 3:
-                amount = 502
-            if num_colors == 4:
-                amount = 615
-
-        # Add in rush charges last.
-        # High Multiplier.
-        if self.rush_type == "FSBMULTH":
-            if rush_days == 0:
-                amount = amount * 2
-            if rush_days == 1:
-                amount = amount * 1.75
-            if rush_days == 2:
-                amount = amount * 1.6
-            if rush_days == 3:
-                amount = amount * 1.5
-            if rush_days == 4:
-                amount = amount * 1.4
-            if rush_days == 5:
-                amount = amount * 1.3
-            if rush_days == 6:
-                amount = amount * 1.2
-            if rush_days == 7:
-                amount = amount * 1.1
-
-        # Low multiplier.
-        if self.rush_type == "FSBMULTL":
-            if rush_days == 0:
-                amount = amount * 1.5
-            if rush_days == 1:
-                amount = amount * 1.25
-
-        # This is for calculating the price of Beverage plates
-        # for a particular item. Needs item to determin size, num_up,
-        # and qty of plates being ordered (default = 1)
-        if self.type == "Plates":
-            # Remove any extra bits like, Fitment or Foil
-            simple_size = item.size.size.split(" - ")[0]
-
-            ECO_PAKS = ("4oz", "6oz", "8oz", "10oz", "12oz")
-
-            # Carton pricing.
-            if simple_size == "Half Gallon":
-                amount = 172.14
-            if simple_size == "Quart":
-                amount = 122.72
-            if simple_size == "Pint":
-                amount = 71.72
-            if simple_size == "Half Pint":
-                if item.num_up == 4:
-                    amount = 139.08
-                else:
-                    amount = 51.53
-            if simple_size.replace(" ", "") in ECO_PAKS:
-                if item.num_up == 4:
-                    amount = 97.75
-                else:
-                    amount = 48.88
-            if simple_size == "2 Liter":
-                amount = 181.83
-            if simple_size == "1 Liter":
-                amount = 129.29
-            if simple_size == "500 mL":
-                amount = 90.62
-            if simple_size in ("250 mL", "250mL", "200 mL"):
-                if item.num_up == 4:
-                    amount = 139.08
-                else:
-                    amount = 51.53
-            if simple_size == "Third Quart":
-                amount = 51.53
-
-            # Sidepanel pricing.
-            if simple_size == "Sidepanel":
-                # Sidepanels - get that last element of the split for the size.
-                panel_size = item.size.size.split(" - ")[-1]
-                if panel_size == "Pint":
-                    amount = 16.96
-                if panel_size == "Half Pint":
-                    amount = 16.96
-                if panel_size == "Quart":
-                    amount = 24.87
-                if panel_size == "Half Gallon":
-                    amount = 28.26
-                if panel_size.replace(" ", "") in ECO_PAKS:
-                    amount = 16.96
-
-                # They always make 2, so double the price.
-                # Also, tell me these things earlier, damnit.
-                amount = amount * 2
-
-            # Raleigh BHS work has separate pricing.
-            if item.job.temp_printlocation.plant.name == "Raleigh" and item.job.temp_printlocation.press.name == "BHS":
-                if simple_size == "Half Gallon":
-                    amount = 254.33
-                if simple_size == "Quart":
-                    amount = 197.82
-                if simple_size == "Pint":
-                    amount = 197.82
-                if simple_size == "Half Pint":
-                    amount = 197.82
-
-            # Now multiply by the number of plates (num_plates of each
-            # itemcolor object)
-            # Amounts listed above are PER PLATE.
-            num_plates = 0
-            for color in item.itemcolor_set.all():
-                num_plates += color.num_plates
-            amount = amount * num_plates
-            # END PLATE CHARGE CALCULATION
-
-        # Film pricing is calculated differently from plates.
-        elif self.type == "Films":
-            # Remove any extra bits like, Fitment or Foil
-            simple_size = item.size.size.split(" - ")[0]
-
-            MECO_PAKS = ("4oz", "6oz", "8oz", "10oz")
-
-            # Carton pricing.
-            if simple_size == "Half Gallon":
-                amount = 33.53
-            if simple_size == "Quart":
-                amount = 26.26
-            if simple_size == "Pint":
-                amount = 26.26
-            if simple_size == "2 Liter":
-                amount = 33.53
-            if simple_size == "Third Quart":
-                amount = 26.26
-            if simple_size == "Half Pint":
-                if item.num_up == 4:
-                    amount = 26.26
-            if simple_size.replace(" ", "") in MECO_PAKS:
-                if item.num_up == 4:
-                    amount = 21.12
-
-            # Now multiply by the number of plates (num_plates of each
-            # itemcolor object)
-            # Amounts listed above are PER PLATE.
-            num_plates = 0
-            for color in item.itemcolor_set.all():
-                num_plates += color.num_plates
-            amount = amount * num_plates
-            # END FILM CHARGE CALCULATION
-
-        return amount
+        rate = charge_rate(self)
+        facts = None
+        # Beverage plates and films and carton prepress need the item's colors and size.
+        if item is not None and needs_item(rate):
+            facts = item_facts([item])[item.id]
+        return charge_amount(rate, num_colors, quality, rush_days, facts)
 
 
 class Charge(models.Model):
@@ -1382,8 +1202,11 @@ class ItemColor(models.Model):
         else:
             return None
 
-    def calculate_plate_code(self):
-        """Calculate and populate plate_code for FSB ItemColor objects."""
+    def calculate_plate_code(self, save=True):
+        """
+        Calculate and populate plate_code for FSB ItemColor objects. Pass
+        save=False when the caller saves the ItemColor itself.
+        """
         if self.item.job.workflow.name == "Foodservice":
             if self.item.fsb_nine_digit:
                 plate_code = self.item.fsb_nine_digit
@@ -1410,7 +1233,8 @@ class ItemColor(models.Model):
                 seq_code = "X"
             plate_code += " 1%s" % seq_code
             self.plate_code = plate_code
-            self.save()
+            if save:
+                self.save()
             return plate_code
 
 
@@ -1683,6 +1507,48 @@ class Revision(models.Model):
         return str(self.item) + " - " + str(self.creation_date.date())
 
 
+class JobFolderLock(models.Model):
+    """
+    The result of the last time bin/lock_archived_jobs.py locked an archived
+    job's folder. Jobs without one, or whose last attempt failed or was
+    LOCK_RECHECK_DAYS ago, are locked again on the next pass.
+    """
+
+    job = models.OneToOneField("Job", on_delete=models.CASCADE, primary_key=True, related_name="folder_lock")
+    locked = models.BooleanField(default=False)
+    date_checked = models.DateTimeField("Date Checked")
+    # Files and folders whose mode had to be changed.
+    entries_changed = models.IntegerField("Entries Changed", default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        app_label = "workflow"
+        indexes = [models.Index(fields=["locked", "date_checked"])]
+
+    def __str__(self):
+        return "%s - %s" % (self.job_id, "locked" if self.locked else "failed")
+
+
+class CacheGeneration(models.Model):
+    """
+    The current generation of a model's rows, which changes whenever one of
+    them does. The option lists (includes/choice_lists.py) and other
+    per-process caches built from the model compare it with the generation
+    they were built from. It's kept here, not in the cache, so that every
+    process sees the others' changes.
+    """
+
+    # The model's label, like "qad_data.qad_printgroups".
+    name = models.CharField(max_length=100, primary_key=True)
+    generation = models.CharField(max_length=32)
+
+    class Meta:
+        app_label = "workflow"
+
+    def __str__(self):
+        return "%s - %s" % (self.name, self.generation)
+
+
 def revision_post_save(sender, instance, created, *args, **kwargs):
     """Things to do after a Revision object is saved."""
     # Save job to trigger keyword generation.
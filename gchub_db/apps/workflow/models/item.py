@@ -42,6 +42,7 @@ from gchub_db.apps.joblog.app_defs import (
 from gchub_db.apps.joblog.models import JobLog
 from gchub_db.apps.qad_data import qad
 from gchub_db.apps.queues.models import ColorKeyQueue
+from gchub_db.apps.queues.outbox import enqueue_email
 from gchub_db.apps.workflow import fsb_template_maker, workflow_funcs
 from gchub_db.apps.workflow.app_defs import (
     COMPLEXITY_OPTIONS,
@@ -827,12 +828,32 @@ class Item(models.Model):
         This is mostly useful for displaying the due date of the revision in
         the item timeline summary.
         """
+        if hasattr(self, "_current_revision"):
+            # Filled in by prefetch_current_revisions().
+            return self._current_revision
         try:
             cur_rev = Revision.objects.filter(item=self.id, complete_date__isnull=True).latest()
             return cur_rev
         except Exception:
             return None
 
+    @staticmethod
+    def prefetch_current_revisions(items):
+        """
+        Looks up current_revision() for a whole list of items in one query,
+        for templates that call it several times for every item in a job.
+        Returns the items as a list.
+        """
+        items = list(items)
+        latest = {}
+        revisions = Revision.objects.filter(item__in=[item.id for item in items], complete_date__isnull=True)
+        # Ascending, so the newest revision for each item is kept.
+        for revision in revisions.order_by("creation_date"):
+            latest[revision.item_id] = revision
+        for item in items:
+            item._current_revision = latest.get(item.id)
+        return items
+
     def approval_date(self):
         """
         Returns date of last final file out job log entry for item.
@@ -1669,11 +1690,7 @@ class Item(models.Model):
             "TIFFList": {"Status": "Unavailable"},
         }
 
-        head, mid, tail = self.path_to_file.partition("/Final_Files")
-        path_to_file = "file://" + settings.FS_SERVER_HOST + "/JobStorage/" + str(self.job.id) + mid + tail
-
-        file_set = []
-        file_set.append(path_to_file)
+        file_set = [self.jdf_jobstorage_url()]
 
         # Create ItemJDF object with input file list.
         sr_jdf = ItemJDF(self, {"SourceFileList": file_set}, extra_vars=extra_vars)
@@ -2456,13 +2473,18 @@ class Item(models.Model):
         jmf = JMFSubmitQueueEntry(reverse("jdf-gen-item", args=[self.job.id, self.num_in_job, genxml_func]))
         jmf.execute()
 
+    def jdf_jobstorage_url(self):
+        """
+        URL of the item's one-up file for Automation Engine. We generate the
+        path to the file via JobStorage as item.path_to_file can be incorrect
+        when jobs get archived.
+        """
+        head, mid, tail = self.path_to_file.partition("/Final_Files")
+        return "file://" + settings.FS_SERVER_HOST + "/JobStorage/" + str(self.job.id) + mid + tail
+
     def genxml_jdf_fsb_colorkeys(self):
         """Create JDF instruction to Rip Tiffs using self.jdf_fsb_colorkeys()"""
-        # We generate the path to the file via JobStorage as item.path_to_file
-        # can be incorrect when jobs get archived
-        head, mid, tail = self.path_to_file.partition("/Final_Files")
-        path_to_file = "file://" + settings.FS_SERVER_HOST + "/JobStorage/" + str(self.job.id) + mid + tail
-        proof_jdf = ItemJDF(self, {"SourceFileList": [path_to_file]})
+        proof_jdf = ItemJDF(self, {"SourceFileList": [self.jdf_jobstorage_url()]})
         # Calculate the Backstage ticket name.
         #        rip_ticket = (
         #            "/fripfile_s.file_sModel1.grx/%s" % self.jdf_fsb_colorkeys()
@@ -2470,13 +2492,7 @@ class Item(models.Model):
         rip_ticket = "/swft/%s" % self.jdf_fsb_colorkeys()
 
         # Rip the one-up source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RIP1up",
-            node_id="n0001",
-            task_id="TaskParamLink",
-            ticket_name=rip_ticket,
-            task_output_id="TIFFList",
-        )
+        proof_jdf.add_task("rip_1up", rip_ticket)
         return proof_jdf
 
     def fsb_colorkeys_queue(self):
@@ -2516,14 +2532,8 @@ class Item(models.Model):
         # Automation Engine ticket name.
         rip_ticket = "/swft/BeverageTemplateWorkflow"
 
-        # Rip the one-up source PDF
-        die_jdf.add_task_node(
-            descriptive_name="RGB PDF",
-            node_id="n0001",
-            task_id="PDFLink",
-            ticket_name=rip_ticket,
-            task_output_id="PDFFileList",
-        )
+        # Make the RGB PDF from the template
+        die_jdf.add_task("rgb_pdf", rip_ticket)
 
         return die_jdf
 
@@ -2545,30 +2555,11 @@ class Item(models.Model):
         # print "TICKET", rip_ticket
 
         # Rip the one-up source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RIP1up",
-            node_id="n0001",
-            task_id="TaskParamLink",
-            ticket_name=rip_ticket,
-            task_output_id="TIFFList",
-            smartmark_set="!QuickApproval-Master",
-        )
+        proof_jdf.add_task("rip_1up", rip_ticket, smartmark_set="!QuickApproval-Master")
         # Create a RGB PDF from the source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RGB PDF",
-            node_id="n0002",
-            task_id="PDFLink",
-            ticket_name="/batchbrix.pdfout/AutosavePDF",
-            task_output_id="PDFFileList",
-        )
+        proof_jdf.add_task("rgb_pdf", "/batchbrix.pdfout/AutosavePDF")
         # Create a RGB JPG for renders from the source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RGB PDF",
-            node_id="n0003",
-            task_id="JPGLink",
-            ticket_name="/LINKEDGETASK/FSB_JPG for Rendering",
-            task_output_id="JPGFileList",
-        )
+        proof_jdf.add_task("rgb_jpg", "/LINKEDGETASK/FSB_JPG for Rendering")
         return proof_jdf
 
     def genxml_jdf_flexproof_fsb_proof(self):
@@ -2588,13 +2579,7 @@ class Item(models.Model):
         # rip_ticket = "/fripfile_s.file_sModel1.grx/Manual"
 
         # Rip the one-up source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RIP1up",
-            node_id="n0001",
-            task_id="TaskParamLink",
-            ticket_name=rip_ticket,
-            task_output_id="TIFFList",
-        )
+        proof_jdf.add_task("rip_1up", rip_ticket)
 
         return proof_jdf
 
@@ -2604,11 +2589,7 @@ class Item(models.Model):
         A) Rip Tiffs using self.jdf_fsb_flexproof()
         NOTE: A proof will be printed out unless the Manual rip_ticket is used.
         """
-        # We generate the path to the file via JobStorage as item.path_to_file
-        # can be incorrect when jobs get archived
-        head, mid, tail = self.path_to_file.partition("/Final_Files")
-        path_to_file = "file://" + settings.FS_SERVER_HOST + "/JobStorage/" + str(self.job.id) + mid + tail
-        proof_jdf = ItemJDF(self, {"SourceFileList": [path_to_file]})
+        proof_jdf = ItemJDF(self, {"SourceFileList": [self.jdf_jobstorage_url()]})
         # Calculate the Backstage ticket name.
         # If we switch to workflows, replace forktask with 'swft'
 
@@ -2620,13 +2601,7 @@ class Item(models.Model):
         # rip_ticket = "/fripfile_s.file_sModel1.grx/Manual"
 
         # Rip the one-up source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RIP1up",
-            node_id="n0001",
-            task_id="TaskParamLink",
-            ticket_name=rip_ticket,
-            task_output_id="TIFFList",
-        )
+        proof_jdf.add_task("rip_1up", rip_ticket)
 
         return proof_jdf
 
@@ -2635,21 +2610,11 @@ class Item(models.Model):
         Create JDF instruction to run the 1up through the Carton Smart Proofing
         workflow in Automation Engine.
         """
-        # We generate the path to the file via JobStorage as item.path_to_file
-        # can be incorrect when jobs get archived
-        head, mid, tail = self.path_to_file.partition("/Final_Files")
-        path_to_file = "file://" + settings.FS_SERVER_HOST + "/JobStorage/" + str(self.job.id) + mid + tail
-        proof_jdf = ItemJDF(self, {"SourceFileList": [path_to_file]})
+        proof_jdf = ItemJDF(self, {"SourceFileList": [self.jdf_jobstorage_url()]})
         # AutoEng ticket name.
         rip_ticket = "/swft/%s" % "Carton Smart Proofing"
         # Rip the one-up source PDF
-        proof_jdf.add_task_node(
-            descriptive_name="RIP1up",
-            node_id="n0001",
-            task_id="TaskParamLink",
-            ticket_name=rip_ticket,
-            task_output_id="TIFFList",
-        )
+        proof_jdf.add_task("rip_1up", rip_ticket)
 
         return proof_jdf
 
@@ -2677,13 +2642,7 @@ class Item(models.Model):
         rip_ticket = "/swft/BeverageTiffToPDF"
 
         # Run the AE ticket
-        tiff_jdf.add_task_node(
-            descriptive_name="RGB PDF",
-            node_id="n0001",
-            task_id="TIFFLink",
-            ticket_name=rip_ticket,
-            task_output_id="PDFFileList",
-        )
+        tiff_jdf.add_task("tiff_to_pdf", rip_ticket)
 
         return tiff_jdf
 
@@ -3024,7 +2983,7 @@ class Item(models.Model):
                             mail_send_to,
                         )
                         msg.content_subtype = "html"
-                        msg.send()
+                        enqueue_email(msg)
                 else:
                     print("Can't generate plant review because one already exists or there's no print location.")
 
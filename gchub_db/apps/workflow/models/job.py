@@ -44,6 +44,7 @@ from gchub_db.apps.workflow.models.general import (
     ItemTracker,
     JobAddress,
     JobComplexity,
+    JobFolderLock,
     PlatePackage,
     PrintLocation,
     Revision,
@@ -240,13 +241,23 @@ class Job(models.Model):
         else:
             pass
 
-    def lock_folder(self):
-        """Locks the job's folder from modification."""
-        fs_api.lock_job_folder(self.id)
+    def lock_folder(self, retries=0):
+        """
+        Locks the job's folder from modification. Returns False if the FS
+        server never acknowledged the request. The request is sent once
+        unless retries is given, as bin scripts do.
+        """
+        return fs_api.lock_job_folder(self.id, retries=retries)
 
-    def unlock_folder(self):
-        """Unlocks the job's folder."""
-        fs_api.unlock_job_folder(self.id)
+    def unlock_folder(self, retries=0):
+        """
+        Unlocks the job's folder. Returns False if the FS server never
+        acknowledged the request. The request is sent once unless retries
+        is given, as bin scripts do.
+        """
+        # The next lock pass has to lock it again.
+        JobFolderLock.objects.filter(job=self).delete()
+        return fs_api.unlock_job_folder(self.id, retries=retries)
 
     def reset_folder(self):
         """
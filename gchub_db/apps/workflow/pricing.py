@@ -0,0 +1,232 @@
+"""
+Charge pricing.
+
+The rules that turn a ChargeType into an amount for an item - quality
+factors, per-color pricing, the flat prices of the digital art charges, the
+Foodservice rush multipliers and the per-plate prices of Beverage plates and
+films - are kept in the tables below rather than in code, and applied by
+charge_amount() to plain values, so they can be run in bulk.
+
+ChargeType.actual_charge() prices one charge. price_many() prices every
+combination of a batch of items and charge types with one query for the
+items' colors, sizes and print locations. Both price from the ChargeType
+instances they are given, so there is no copy of the charge types to go
+stale.
+"""
+
+from collections import namedtuple
+
+from django.db.models import Count, Q, Sum
+
+from gchub_db.apps.workflow.models import Item
+
+# Item quality -> multiplier, for charge types that adjust for quality.
+QUALITY_FACTORS = {"A": 1, "B": 0.67, "C": 0.33}
+
+# Charge types with a set price per number of colors (from a math error
+# long ago that can't be fit to a formula). Other color counts are priced
+# normally.
+FLAT_PRICES_BY_COLORS = {
+    "New_w_Digtial_Art": {1: 218, 2: 303, 3: 374, 4: 459},
+    "Create_From_Drawing": {1: 279, 2: 391, 3: 502, 4: 615},
+}
+
+# Rush type -> {rush days: multiplier}. Longer rushes aren't marked up.
+RUSH_MULTIPLIERS = {
+    "FSBMULTH": {0: 2, 1: 1.75, 2: 1.6, 3: 1.5, 4: 1.4, 5: 1.3, 6: 1.2, 7: 1.1},
+    "FSBMULTL": {0: 1.5, 1: 1.25},
+}
+
+# Beverage sizes are matched on the part before " - " (so without Fitment,
+# Foil and the like), and eco paks with the spaces taken out.
+ECO_PAKS = ("4oz", "6oz", "8oz", "10oz", "12oz")
+MECO_PAKS = ("4oz", "6oz", "8oz", "10oz")
+
+# Per plate prices: size -> (4-up price, price otherwise).
+PLATE_PRICES = {
+    "Half Gallon": (172.14, 172.14),
+    "Quart": (122.72, 122.72),
+    "Pint": (71.72, 71.72),
+    "Half Pint": (139.08, 51.53),
+    "2 Liter": (181.83, 181.83),
+    "1 Liter": (129.29, 129.29),
+    "500 mL": (90.62, 90.62),
+    "250 mL": (139.08, 51.53),
+    "250mL": (139.08, 51.53),
+    "200 mL": (139.08, 51.53),
+    "Third Quart": (51.53, 51.53),
+}
+ECO_PAK_PLATE_PRICES = (97.75, 48.88)
+# Sidepanel plates are priced by the panel's size (the part after the last
+# " - "), and always come in pairs.
+SIDEPANEL_PLATE_PRICES = {"Pint": 16.96, "Half Pint": 16.96, "Quart": 24.87, "Half Gallon": 28.26}
+ECO_PAK_SIDEPANEL_PLATE_PRICE = 16.96
+SIDEPANEL_PLATES_MADE = 2
+# Raleigh BHS work has separate plate pricing.
+RALEIGH_BHS_PLATE_PRICES = {"Half Gallon": 254.33, "Quart": 197.82, "Pint": 197.82, "Half Pint": 197.82}
+
+# Per film prices: size -> (4-up price, price otherwise). None keeps the
+# charge type's amount.
+FILM_PRICES = {
+    "Half Gallon": (33.53, 33.53),
+    "Quart": (26.26, 26.26),
+    "Pint": (26.26, 26.26),
+    "2 Liter": (33.53, 33.53),
+    "Third Quart": (26.26, 26.26),
+    "Half Pint": (26.26, None),
+}
+MECO_PAK_FILM_PRICES = (21.12, None)
+
+# The pricing fields of a ChargeType.
+ChargeRate = namedtuple(
+    "ChargeRate",
+    "id type workflow_name base_amount rush_type adjust_for_colors adjust_for_quality extra_amount",
+)
+
+# What pricing needs to know about an item. carton_colors leaves out
+# "coating" inks, which aren't billed on Carton items.
+ItemFacts = namedtuple("ItemFacts", "id quality num_colors carton_colors num_plates size num_up plant press")
+
+
+def _by_num_up(prices, num_up):
+    return prices[0] if num_up == 4 else prices[1]
+
+
+def _plate_amount(amount, item):
+    """Plate charges are a per plate price for the item's size."""
+    simple_size = item.size.split(" - ")[0]
+    if simple_size in PLATE_PRICES:
+        amount = _by_num_up(PLATE_PRICES[simple_size], item.num_up)
+    elif simple_size.replace(" ", "") in ECO_PAKS:
+        amount = _by_num_up(ECO_PAK_PLATE_PRICES, item.num_up)
+    elif simple_size == "Sidepanel":
+        panel_size = item.size.split(" - ")[-1]
+        if panel_size in SIDEPANEL_PLATE_PRICES:
+            amount = SIDEPANEL_PLATE_PRICES[panel_size]
+        elif panel_size.replace(" ", "") in ECO_PAKS:
+            amount = ECO_PAK_SIDEPANEL_PLATE_PRICE
+        amount = amount * SIDEPANEL_PLATES_MADE
+
+    if item.plant == "Raleigh" and item.press == "BHS" and simple_size in RALEIGH_BHS_PLATE_PRICES:
+        amount = RALEIGH_BHS_PLATE_PRICES[simple_size]
+    return amount * item.num_plates
+
+
+def _film_amount(amount, item):
+    """Film charges are a per film price for the item's size."""
+    simple_size = item.size.split(" - ")[0]
+    price = None
+    if simple_size in FILM_PRICES:
+        price = _by_num_up(FILM_PRICES[simple_size], item.num_up)
+    elif simple_size.replace(" ", "") in MECO_PAKS:
+        price = _by_num_up(MECO_PAK_FILM_PRICES, item.num_up)
+    if price is not None:
+        amount = price
+    return amount * item.num_plates
+
+
+def charge_amount(rate, num_colors=1, quality="B", rush_days="", item=None):
+    """
+    The amount for a charge of the given ChargeRate. item is the ItemFacts of
+    the item being charged, which Carton prepress and Beverage plate and film
+    charges need.
+    """
+    amount = rate.base_amount
+
+    # "coating" inks don't count towards "Prepress Production" charges on carton items.
+    if rate.type == "Prepress Production" and item and rate.workflow_name == "Carton":
+        num_colors = item.carton_colors
+
+    if rate.adjust_for_quality:
+        amount = amount * QUALITY_FACTORS.get(quality, 1)
+    if rate.adjust_for_colors:
+        amount = amount * num_colors
+    if rate.extra_amount:
+        amount = amount + rate.extra_amount
+
+    flat_prices = FLAT_PRICES_BY_COLORS.get(rate.type)
+    if flat_prices and num_colors in flat_prices:
+        amount = flat_prices[num_colors]
+
+    # Add in rush charges last.
+    multipliers = RUSH_MULTIPLIERS.get(rate.rush_type, {})
+    if rush_days in multipliers:
+        amount = amount * multipliers[rush_days]
+
+    # Beverage plates and films are priced per plate, by the item's size.
+    if rate.type == "Plates":
+        amount = _plate_amount(amount, item)
+    elif rate.type == "Films":
+        amount = _film_amount(amount, item)
+    return amount
+
+
+def needs_item(rate):
+    """Whether charges of the ChargeRate depend on the item charged."""
+    return rate.type in ("Plates", "Films") or (rate.type == "Prepress Production" and rate.workflow_name == "Carton")
+
+
+def charge_rate(charge_type):
+    """The ChargeRate of a ChargeType instance."""
+    # The workflow is only needed for Carton prepress, so don't look it up otherwise.
+    workflow_name = charge_type.workflow.name if charge_type.type == "Prepress Production" else None
+    return ChargeRate(
+        charge_type.id,
+        charge_type.type,
+        workflow_name,
+        charge_type.base_amount,
+        charge_type.rush_type,
+        charge_type.adjust_for_colors,
+        charge_type.adjust_for_quality,
+        charge_type.extra_amount,
+    )
+
+
+def item_facts(items):
+    """
+    {item id: ItemFacts} for the given items (Item instances or ids), in one
+    query.
+    """
+    item_ids = [getattr(item, "id", item) for item in items]
+    rows = (
+        Item.objects.filter(id__in=item_ids)
+        .annotate(
+            color_count=Count("itemcolor"),
+            coating_count=Count("itemcolor", filter=Q(itemcolor__definition__name__icontains="coating")),
+            plate_count=Sum("itemcolor__num_plates"),
+        )
+        .values_list(
+            "id",
+            "quality",
+            "color_count",
+            "coating_count",
+            "plate_count",
+            "size__size",
+            "num_up",
+            "job__temp_printlocation__plant__name",
+            "job__temp_printlocation__press__name",
+        )
+    )
+    facts = {}
+    for item_id, quality, colors, coatings, plates, size, num_up, plant, press in rows:
+        facts[item_id] = ItemFacts(item_id, quality, colors, colors - coatings, plates or 0, size, num_up, plant, press)
+    return facts
+
+
+def price_many(items, charge_types, rush_days=""):
+    """
+    Prices each charge type for each item, as a charge added to the item
+    from the job's billing page would be: for the item's number of colors
+    and quality. Returns {(item id, charge type id): amount}.
+
+    items are Item instances or ids, and charge_types ChargeType instances,
+    as the caller loaded them. Takes one query for the items (and one for
+    the workflow of a Prepress Production charge type, unless it was
+    loaded with select_related()).
+    """
+    rates = [charge_rate(charge_type) for charge_type in charge_types]
+    prices = {}
+    for item_id, item in item_facts(items).items():
+        for rate in rates:
+            prices[(item_id, rate.id)] = charge_amount(rate, item.num_colors, item.quality, rush_days, item)
+    return prices
@@ -0,0 +1,141 @@
+"""
+Tracking of proofs printed by AE/FlexRIP.
+
+The RIP writes a JOB_*.xml file into PRINTED_PROOFS_DIR for each print.
+record_printed_proof() reads one and creates a ProofTracker for the item
+named in it, unless the print was cancelled or is already recorded.
+"""
+
+import os
+from datetime import datetime, timedelta
+from xml.dom import minidom
+
+from django.conf import settings
+from django.utils import timezone
+
+from gchub_db.apps.workflow.models import Item, ProofTracker
+
+# Path to the hot folder.
+PRINTED_PROOFS_DIR = settings.PRINTED_PROOFS_DIR
+# XML files older than this are ignored.
+MAX_AGE = timedelta(31)
+
+
+class ItemNotFound(Exception):
+    """The item a print record is for isn't in GOLD (or isn't yet)."""
+
+
+def is_proof_xml(file_name):
+    """True for the RIP's print records, as opposed to anything else in the folder."""
+    return file_name.startswith("JOB_") and file_name.endswith(".xml")
+
+
+def _job_item_num(xml):
+    """The job and item numbers, from the string type Title tag (the file name)."""
+    jobnum = num_in_job = None
+    for title in xml.getElementsByTagName("Title"):
+        if title.getAttribute("type") == "string":
+            jobitemnum = title.firstChild.data.split()[0]
+            # Separate the item number from the job number.
+            jobnum = jobitemnum.split("-")[0]
+            num_in_job = jobitemnum.split("-")[1]
+    return jobnum, num_in_job
+
+
+def _proofer(xml):
+    """The description of the last workflow (proofer) used, if any."""
+    proofer = None
+    for workflow in xml.getElementsByTagName("Workflow"):
+        try:
+            proofer = workflow.getElementsByTagName("Description")[0].firstChild.data
+        except Exception:
+            pass
+    return proofer
+
+
+def record_printed_proof(path, show_your_work=False):
+    """
+    Reads one print record and creates a ProofTracker for it. Returns the
+    new tracker, or None if the file was skipped. Raises ItemNotFound if
+    the item isn't in GOLD, so the file can be tried again later.
+    """
+    file_name = os.path.basename(path)
+    if show_your_work:
+        print("Working on %s..." % file_name)
+
+    # Check the files modification date. The dates stored within the XML
+    # are too inconsistent.
+    try:
+        print_date = timezone.make_aware(datetime.fromtimestamp(os.path.getmtime(path)))
+    except Exception:
+        if show_your_work:
+            print("   Print date not found. Skipping.")
+        return None
+    # Skip XML older than a month.
+    if timezone.now() - MAX_AGE > print_date:
+        return None
+
+    # Now read the XML.
+    try:
+        xml = minidom.parse(path)
+    except Exception:
+        if show_your_work:
+            print("   XML read failed. Skipping.")
+        return None
+
+    # Check if the print job was cancelled and bail out if it was.
+    if xml.getElementsByTagName("Cancelled"):
+        if show_your_work:
+            print("   Cancelled. Skipping.")
+        return None
+
+    # Get the copy count.
+    try:
+        copycount = xml.getElementsByTagName("CopyCount")[0].firstChild.data
+    except Exception:
+        if show_your_work:
+            print("   Copy count not found. Skipping.")
+        return None
+
+    # Get the job and item numbers. They're in one of the Title tags.
+    try:
+        jobnum, num_in_job = _job_item_num(xml)
+    except Exception:
+        jobnum = None
+    if jobnum is None:
+        if show_your_work:
+            print("   Job number not found. Skipping.")
+        return None
+
+    proofer = _proofer(xml)
+    # Print all the data we've gathered.
+    if show_your_work:
+        print("   %s-%s = %s copie(s) (%s) %s" % (jobnum, num_in_job, copycount, print_date, proofer))
+
+    # Look up the item in GOLD.
+    try:
+        item = Item.objects.get(job__id=jobnum, num_in_job=num_in_job)
+    except Item.DoesNotExist:
+        if show_your_work:
+            print("   Item not found in GOLD. Skipping.")
+        raise ItemNotFound("%s-%s" % (jobnum, num_in_job))
+    except Exception:
+        if show_your_work:
+            print("   Item lookup failed. Skipping.")
+        return None
+
+    # See if there's already a record for this proof. xml_filenames do get
+    # re-used, but the chances of a name getting re-used and then applied to
+    # the same item at a later date are very low.
+    if ProofTracker.objects.filter(item=item, xml_filename=file_name).exists():
+        return None
+    tracker = ProofTracker.objects.create(
+        item=item,
+        creation_date=print_date,
+        copies=copycount,
+        xml_filename=file_name,
+        proofer=proofer or "",
+    )
+    if show_your_work:
+        print("   ...tracker created.")
+    return tracker
@@ -0,0 +1,131 @@
+"""
+Finds Foodservice proofs that have been waiting on a response too long, for
+the reminder emails sent by bin/email_proof_reminders.py and the stale
+proofs page.
+
+The whole selection is one query. Each item is annotated with its latest
+proof-out date and whether it has been approved, filed out or deleted, or
+has a revision pending, using subqueries instead of a query per proof.
+"""
+
+from datetime import date, timedelta
+
+from django.db.models import Exists, OuterRef, Subquery
+from django.template import loader
+from django.utils import timezone
+
+from gchub_db.apps.joblog.app_defs import (
+    JOBLOG_TYPE_ITEM_APPROVED,
+    JOBLOG_TYPE_ITEM_FILED_OUT,
+    JOBLOG_TYPE_ITEM_PROOFED_OUT,
+    JOBLOG_TYPE_JOBLOG_DELETED,
+)
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.workflow.models import Item, Revision
+from gchub_db.includes.general_funcs import send_info_mail
+
+# Proofs become stale this many days after going out.
+STALE_AFTER_DAYS = 15
+# Proofs older than this many more days are left alone. We don't want an
+# email going out for a job that's been idle for 2 years, for example.
+STALE_WINDOW_DAYS = 15
+
+
+def stale_proof_items(today=None, include_reminded=False):
+    """
+    Returns the Foodservice items on active jobs whose latest proof went out
+    between STALE_AFTER_DAYS and STALE_AFTER_DAYS + STALE_WINDOW_DAYS days
+    ago, and that haven't been approved, filed out, deleted or sent back for
+    revision since. Items that already had a reminder are left out unless
+    include_reminded is set.
+
+    Each item carries a latest_proof_date annotation. Ordered by
+    salesperson, then job, then item.
+    """
+    today = today or date.today()
+    newest = today - timedelta(days=STALE_AFTER_DAYS)
+    oldest = newest - timedelta(days=STALE_WINDOW_DAYS)
+
+    item_logs = JobLog.objects.filter(item=OuterRef("pk"))
+    latest_proof = item_logs.filter(type=JOBLOG_TYPE_ITEM_PROOFED_OUT).order_by("-event_time").values("event_time")[:1]
+    items = (
+        Item.objects.filter(job__workflow__name="Foodservice", job__status="Active")
+        .annotate(
+            latest_proof_date=Subquery(latest_proof),
+            is_resolved=Exists(
+                item_logs.filter(
+                    type__in=(
+                        JOBLOG_TYPE_ITEM_APPROVED,
+                        JOBLOG_TYPE_ITEM_FILED_OUT,
+                        JOBLOG_TYPE_JOBLOG_DELETED,
+                    )
+                )
+            ),
+            has_pending_revision=Exists(Revision.objects.filter(item=OuterRef("pk"), complete_date__isnull=True)),
+        )
+        .filter(
+            latest_proof_date__date__gt=oldest,
+            latest_proof_date__date__lt=newest,
+            is_resolved=False,
+            has_pending_revision=False,
+        )
+        .select_related("job", "job__salesperson", "job__artist", "size")
+        .order_by("job__salesperson__last_name", "job__salesperson__first_name", "job_id", "num_in_job")
+    )
+    if not include_reminded:
+        items = items.filter(proof_reminder_email_sent__isnull=True)
+    return items
+
+
+def group_by_salesperson(items):
+    """
+    Groups items (ordered as stale_proof_items() returns them) in one pass:
+    [{"salesperson": user, "jobs": [{"job": job, "items": [item, ...]}]}].
+    """
+    groups = []
+    for item in items:
+        salesperson = item.job.salesperson
+        if not groups or groups[-1]["salesperson"] != salesperson:
+            groups.append({"salesperson": salesperson, "jobs": []})
+        jobs = groups[-1]["jobs"]
+        if not jobs or jobs[-1]["job"].id != item.job_id:
+            jobs.append({"job": item.job, "items": []})
+        jobs[-1]["items"].append(item)
+    return groups
+
+
+def send_proof_reminders(today=None, dry_run=False):
+    """
+    Emails each salesperson one reminder per job with stale proofs, then
+    marks the items so they aren't reminded again. Jobs without a
+    salesperson are skipped. With dry_run set, nothing is sent or marked.
+
+    Returns the salesperson groups (see group_by_salesperson()).
+    """
+    groups = group_by_salesperson(stale_proof_items(today=today))
+    if dry_run:
+        return groups
+
+    mail_body = loader.get_template("emails/idle_proof_reminder.txt")
+    reminded_ids = []
+    for group in groups:
+        salesperson = group["salesperson"]
+        if salesperson is None or not salesperson.email:
+            continue
+        for job_group in group["jobs"]:
+            job = job_group["job"]
+            items = job_group["items"]
+            mail_subject = "GOLD Proof Reminder: %d %s" % (job.id, job.name)
+            econtext = {
+                "items": items,
+                "job": job,
+                "salesperson": salesperson,
+                "item_count": len(items),
+            }
+            send_info_mail(mail_subject, mail_body.render(econtext), [salesperson.email], fail_silently=True)
+            reminded_ids.extend(item.id for item in items)
+
+    # Set the proof_reminder_email_sent field on the items to prevent
+    # future repeats of the email.
+    Item.objects.filter(id__in=reminded_ids).update(proof_reminder_email_sent=timezone.now())
+    return groups
@@ -1,4 +1,9 @@
-"""Links to item tasks with sanity checks included."""
+"""
+Links to item tasks with sanity checks included.
+
+The file checks are answered by the job's fs_api.JobFileManifest, so a page
+showing links for every item in a job lists each job folder once.
+"""
 
 from django import template
 from django.conf import settings
@@ -20,6 +25,11 @@ def _safe_link(html_template, *args):
     return mark_safe(html_template % args)
 
 
+def _job_files(item):
+    """Returns the file manifest for the item's job."""
+    return fs_api.get_job_file_manifest(item.job_id)
+
+
 @register.filter
 def item_stepped_proof_link(item, link_text="Stepped Proof"):
     """Render a stepped proof link or an informative fallback."""
@@ -35,8 +45,8 @@ def item_stepped_proof_link(item, link_text="Stepped Proof"):
         )
 
     try:
-        if item.job.workflow.name == "Beverage":
-            fs_api.get_item_proof(item.job.id, item.num_in_job, "h")
+        if item.job.workflow.name == "Beverage" and not _job_files(item).has_proof(item.num_in_job, "h"):
+            raise fs_api.NoResultsFound()
 
         return _safe_link(
             """
@@ -74,10 +84,9 @@ def item_proof_link(item, link_text="Proof"):
         )
 
     try:
-        if item.job.workflow.name == "Beverage":
-            fs_api.get_item_proof(item.job.id, item.num_in_job, "l")
-        else:
-            fs_api.get_item_proof(item.job.id, item.num_in_job)
+        quality = "l" if item.job.workflow.name == "Beverage" else None
+        if not _job_files(item).has_proof(item.num_in_job, quality):
+            raise fs_api.NoResultsFound()
 
         return _safe_link(
             """
@@ -104,7 +113,8 @@ def item_proof_link(item, link_text="Proof"):
 @register.filter
 def item_finalfile_link(item, link_text="Production File"):
     try:
-        fs_api.get_item_finalfile(item.job.id, item.num_in_job)
+        if not _job_files(item).has_finalfile(item.num_in_job):
+            raise fs_api.NoResultsFound()
         return _safe_link(
             """
           <a href='%s'>
@@ -130,7 +140,8 @@ def item_finalfile_link(item, link_text="Production File"):
 @register.filter
 def item_approval_link(item, link_text="Approval"):
     try:
-        fs_api.get_item_approval_pdf(item.job.id, item.num_in_job)
+        if not _job_files(item).has_approval_pdf(item.num_in_job):
+            raise fs_api.NoResultsFound()
         return _safe_link(
             """
           <a href='%s'>
@@ -156,7 +167,8 @@ def item_approval_link(item, link_text="Approval"):
 @register.filter
 def item_preview_art_link(item, link_text="Preview Art"):
     try:
-        fs_api.get_item_preview_art(item.job.id, item.num_in_job)
+        if not _job_files(item).has_preview_art(item.num_in_job):
+            raise fs_api.NoResultsFound()
         return _safe_link(
             """
           <a href='%s'>
@@ -199,7 +211,8 @@ def item_preview_art_link(item, link_text="Preview Art"):
 @register.filter
 def item_print_seps_link(item, link_text="Printable Separations"):
     try:
-        fs_api.get_item_print_seps(item.job.id, item.num_in_job)
+        if not _job_files(item).has_print_seps(item.num_in_job):
+            raise fs_api.NoResultsFound()
         return _safe_link(
             """
           <a href='%s'>
@@ -242,7 +255,7 @@ def item_print_seps_link(item, link_text="Printable Separations"):
 @register.filter
 def item_download_zip_tiffs_link(item, link_text="Download all tiffs in ZIP format"):
     try:
-        if fs_api.list_item_tiffs(item.job.id, item.num_in_job):
+        if _job_files(item).has_tiffs(item.num_in_job):
             return _safe_link(
                 """
               <a href='%s'>
@@ -20,24 +20,18 @@ def job_thumbnail(job, width=155):
     # print "WIDTH", width
     try:
         # Fine the item that was most recently thumbnailed and use that.
-        thumbnailed_item = job.item_set.filter(time_last_thumbnailed__isnull=False).order_by("-time_last_thumbnailed")[0]
+        thumbnailed = job.item_set.filter(time_last_thumbnailed__isnull=False).only("id", "num_in_job")
+        thumbnailed_item = thumbnailed.order_by("-time_last_thumbnailed")[0]
         # print "ITEM", thumbnailed_item
     except IndexError:
         # Fail silently if none have been thumbnailed.
         # return "NO THUMBS"
         return ""
 
-    try:
-        thumbnail_file = fs_api.get_thumbnail_item_finalfile(job.id, thumbnailed_item.num_in_job, width=int(width))
-        # print "THUMB", thumbnail_file
-    except fs_api.NoResultsFound:
-        # This should generally not happen, as the DB says that the thumbnail
-        # was generated correctly, but the file would have been deleted or
-        # never created.
-        thumbnail_file = False
-    except fs_api.InvalidPath:
-        # This usually means the drives aren't mounted.
-        thumbnail_file = False
+    # The job's file manifest is shared with the item links on the same page.
+    # It comes back empty if the drives aren't mounted, and the file may be
+    # missing even though the DB says the thumbnail was generated correctly.
+    thumbnail_file = fs_api.get_job_file_manifest(job.id).get_thumbnail(thumbnailed_item.num_in_job, width=int(width))
 
     if thumbnail_file:
         # Return the image tag with an appropriate link.
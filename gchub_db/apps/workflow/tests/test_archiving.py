@@ -0,0 +1,163 @@
+"""
+Tests for the stale job archiver.
+"""
+
+import json
+import os
+import shutil
+import stat
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.workflow.archiving import FolderLocker, StaleJobArchiver, jobs_to_lock, stale_job_ids
+from gchub_db.apps.workflow.models import Job, Site
+from gchub_db.apps.workflow.models.general import JobFolderLock
+from gchub_db.includes import fs_api
+
+
+class StaleJobArchiverTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.temp_dir, "archive.json")
+        site = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        self.jobs = {}
+        for name, status, days_quiet in (
+            ("old", "Active", 200),
+            ("complete", "Complete", 150),
+            ("recent_complete", "Complete", 30),
+            ("recent", "Active", 150),
+        ):
+            job = Job.objects.create(name=name, workflow=site, status=status, due_date=date.today())
+            JobLog.objects.create(job=job, type=1, log_text="Older entry.")
+            newest = JobLog.objects.create(job=job, type=1, log_text="Newest entry.")
+            JobLog.objects.filter(job=job).exclude(id=newest.id).update(event_time=timezone.now() - timedelta(days=400))
+            JobLog.objects.filter(id=newest.id).update(event_time=timezone.now() - timedelta(days=days_quiet))
+            self.jobs[name] = job
+        # Without log entries a job is never archived.
+        self.jobs["no_logs"] = Job.objects.create(name="no_logs", workflow=site, status="Complete", due_date=date.today())
+        JobLog.objects.filter(job=self.jobs["no_logs"]).delete()
+
+        patches = (
+            mock.patch.object(Job, "delete_folder_symlink"),
+            mock.patch.object(Job, "create_folder_symlink"),
+            mock.patch.object(Job, "lock_folder"),
+        )
+        self.delete_link, self.create_link, self.lock = [patch.start() for patch in patches]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def archived(self):
+        return set(Job.objects.exclude(archive_disc="").values_list("name", flat=True))
+
+    def test_candidates(self):
+        expected = [self.jobs["old"].id, self.jobs["complete"].id]
+        self.assertEqual(stale_job_ids(), expected)
+        self.assertEqual(stale_job_ids([self.jobs["complete"].id, self.jobs["recent"].id]), [self.jobs["complete"].id])
+
+    def test_dry_run_changes_nothing(self):
+        self.assertEqual(StaleJobArchiver(dry_run=True, state_file=self.state_file).run(), 2)
+        self.assertEqual(self.archived(), set())
+        self.assertFalse(self.delete_link.called)
+
+    def test_archives_in_batches(self):
+        self.assertEqual(StaleJobArchiver(batch_size=1, state_file=self.state_file).run(), 2)
+        self.assertEqual(self.archived(), {"old", "complete"})
+        self.assertEqual(self.delete_link.call_count, 2)
+        self.create_link.assert_called_with(force_archive=True)
+        self.assertEqual(self.lock.call_count, 2)
+        with open(self.state_file) as state:
+            self.assertEqual(json.load(state), {"last_id": self.jobs["complete"].id, "pending": []})
+
+    def test_failed_removal_is_not_archived(self):
+        self.delete_link.side_effect = [OSError("share offline"), None]
+        archiver = StaleJobArchiver(workers=1, state_file=self.state_file)
+        self.assertEqual(archiver.run(), 1)
+        self.assertEqual(self.archived(), {"complete"})
+        self.assertEqual(archiver.failed, [self.jobs["old"].id])
+
+    def test_failed_link_is_not_archived(self):
+        self.create_link.side_effect = [OSError("FS server offline"), None]
+        archiver = StaleJobArchiver(workers=1, state_file=self.state_file)
+        self.assertEqual(archiver.run(), 1)
+        self.assertEqual(self.archived(), {"complete"})
+        self.assertEqual(archiver.failed, [self.jobs["old"].id])
+        self.assertEqual(stale_job_ids(), [self.jobs["old"].id])
+        with open(self.state_file) as state:
+            self.assertEqual(json.load(state), {"last_id": self.jobs["complete"].id, "pending": [self.jobs["old"].id]})
+
+        # A resumed run links it without removing its links again.
+        self.create_link.side_effect = None
+        self.assertEqual(StaleJobArchiver(state_file=self.state_file).run(resume=True), 1)
+        self.assertEqual(self.archived(), {"old", "complete"})
+        self.assertEqual(self.delete_link.call_count, 2)
+
+    def test_resume_finishes_pending_jobs(self):
+        # Interrupted after removing the old job's links, before archiving it.
+        with open(self.state_file, "w") as state:
+            json.dump({"last_id": self.jobs["old"].id, "pending": [self.jobs["old"].id]}, state)
+        self.assertEqual(StaleJobArchiver(state_file=self.state_file).run(resume=True), 2)
+        self.assertEqual(self.archived(), {"old", "complete"})
+        # The old job's links were already removed.
+        self.assertEqual(self.delete_link.call_count, 1)
+        self.assertEqual(self.create_link.call_count, 2)
+
+
+class FolderLockerTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(JOBSTORAGE_DIR=self.temp_dir)
+        self.settings_override.enable()
+        site = Site.objects.create(name="Carton", domain="carton.example.com")
+        self.jobs = [
+            Job.objects.create(name="Job %d" % num, workflow=site, status="Complete", archive_disc="1", due_date=date.today())
+            for num in range(3)
+        ]
+        Job.objects.create(name="Active", workflow=site, status="Active", due_date=date.today())
+        # The last archived job has no folder.
+        for job in self.jobs[:2]:
+            os.makedirs(os.path.join(fs_api.get_job_folder(job.id), "Proofs", "%d-1 SMR-16" % job.id))
+            open(os.path.join(fs_api.get_job_folder(job.id), "Proofs", "%d-1 SMR-16" % job.id, "proof.pdf"), "wb").close()
+
+    def tearDown(self):
+        for job in self.jobs:
+            if os.path.exists(fs_api.get_job_folder(job.id)):
+                fs_api.direct_unlock_job_folder(job.id)
+        self.settings_override.disable()
+        shutil.rmtree(self.temp_dir)
+
+    def modes(self, job):
+        modes = set()
+        for path, dirs, files in os.walk(fs_api.get_job_folder(job.id)):
+            for name in [path] + [os.path.join(path, name) for name in files]:
+                modes.add(stat.S_IMODE(os.stat(name).st_mode))
+        return modes
+
+    def test_locks_and_records_each_job(self):
+        locker = FolderLocker(workers=2, batch_size=2)
+        self.assertEqual(locker.run(), 2)
+        self.assertEqual(locker.failed, [self.jobs[2].id])
+        for job in self.jobs[:2]:
+            self.assertEqual(self.modes(job), {fs_api.LOCKED_MODE})
+            self.assertTrue(JobFolderLock.objects.get(job=job).locked)
+        self.assertFalse(JobFolderLock.objects.get(job=self.jobs[2]).locked)
+
+    def test_only_unknown_failed_and_stale_jobs_are_relocked(self):
+        FolderLocker().run()
+        # Only the failed job is left.
+        self.assertEqual(jobs_to_lock(), [self.jobs[2].id])
+        JobFolderLock.objects.filter(job=self.jobs[0]).update(date_checked=timezone.now() - timedelta(days=365))
+        with mock.patch.object(fs_api, "unlock_job_folder"):
+            self.jobs[1].unlock_folder()
+        self.assertEqual(jobs_to_lock(), [job.id for job in reversed(self.jobs)])
+
+        os.makedirs(fs_api.get_job_folder(self.jobs[2].id))
+        self.assertEqual(FolderLocker().run(), 3)
+        self.assertEqual(jobs_to_lock(), [])
@@ -0,0 +1,94 @@
+"""
+Tests for cached choice lists, the autocomplete select widget and the
+autocomplete endpoints behind it.
+"""
+
+from django import forms
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from gchub_db.apps.qad_data.models import NEW_PRINTGROUP_ID, QAD_PrintGroups
+from gchub_db.apps.workflow.models.general import CacheGeneration
+from gchub_db.includes import choice_lists
+from gchub_db.includes.choice_lists import CachedModelChoiceField
+from gchub_db.includes.widgets import AutocompleteSelect
+
+
+class PrintGroupForm(forms.Form):
+    cached = CachedModelChoiceField(queryset=QAD_PrintGroups.objects.order_by("name"), cache_name="test_printgroups", required=False)
+    lazy = forms.ModelChoiceField(
+        queryset=QAD_PrintGroups.objects.order_by("name"),
+        required=False,
+        widget=AutocompleteSelect("printgroup_autocomplete"),
+    )
+
+
+@override_settings(ROOT_URLCONF="gchub_db.apps.workflow.urls")
+class ChoiceListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alpha = QAD_PrintGroups.objects.create(name="ALPHA", description="Alpha Cups")
+        self.beta = QAD_PrintGroups.objects.create(name="BETA", description="Beta Lids")
+
+    def test_options_come_from_cache(self):
+        str(PrintGroupForm()["cached"])
+        with self.assertNumQueries(0):
+            html = str(PrintGroupForm()["cached"])
+        self.assertIn("ALPHA-Alpha Cups", html)
+        self.assertIn("BETA-Beta Lids", html)
+
+    def test_model_change_rebuilds_list(self):
+        str(PrintGroupForm()["cached"])
+        QAD_PrintGroups.objects.create(name="GAMMA", description="Gamma Bowls")
+        self.assertIn("GAMMA-Gamma Bowls", str(PrintGroupForm()["cached"]))
+        self.beta.delete()
+        self.assertNotIn("BETA-Beta Lids", str(PrintGroupForm()["cached"]))
+
+    def test_change_from_another_process_rebuilds_list(self):
+        str(PrintGroupForm()["cached"])
+        # Another process renames a print group, so only the database has the new generation.
+        QAD_PrintGroups.objects.filter(id=self.alpha.id).update(name="ALEPH")
+        CacheGeneration.objects.update_or_create(name="qad_data.qad_printgroups", defaults={"generation": "elsewhere"})
+        self.assertIn("ALPHA-Alpha Cups", str(PrintGroupForm()["cached"]))
+        # This process's copy of the generation expires after GENERATION_TIMEOUT.
+        cache.delete(choice_lists._generation_key(QAD_PrintGroups))
+        self.assertIn("ALEPH-Alpha Cups", str(PrintGroupForm()["cached"]))
+
+    def test_cached_field_still_validates(self):
+        form = PrintGroupForm({"cached": self.alpha.id})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["cached"], self.alpha)
+        self.assertFalse(PrintGroupForm({"cached": 999999}).is_valid())
+
+    def test_autocomplete_select_renders_only_selection(self):
+        html = str(PrintGroupForm(initial={"lazy": self.beta.id})["lazy"])
+        self.assertIn('data-autocomplete-url="%s"' % reverse("printgroup_autocomplete"), html)
+        self.assertIn("BETA-Beta Lids", html)
+        self.assertNotIn("ALPHA-Alpha Cups", html)
+
+
+@override_settings(ROOT_URLCONF="gchub_db.apps.workflow.urls")
+class AutocompleteEndpointTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="searcher", password="testpass123")
+        self.client.login(username="searcher", password="testpass123")
+
+    def test_printgroup_autocomplete(self):
+        printgroup = QAD_PrintGroups.objects.create(name="ALPHA", description="Alpha Cups")
+        QAD_PrintGroups.objects.create(name="BETA", description="Beta Lids")
+        response = self.client.get(reverse("printgroup_autocomplete"), {"term": "cups"})
+        self.assertEqual(response.json(), [{"id": printgroup.id, "label": "ALPHA-Alpha Cups", "value": "ALPHA-Alpha Cups"}])
+
+    def test_printgroup_autocomplete_offers_new_print_group_first(self):
+        QAD_PrintGroups.objects.create(id=NEW_PRINTGROUP_ID, name="NEW", description="New Print Group")
+        QAD_PrintGroups.objects.create(name="ALPHA", description="Alpha Print")
+        response = self.client.get(reverse("printgroup_autocomplete"), {"term": "print", "include_new": 1})
+        self.assertEqual([row["label"] for row in response.json()], ["NEW-New Print Group", "ALPHA-Alpha Print"])
+        response = self.client.get(reverse("printgroup_autocomplete"), {"term": "", "include_new": 1})
+        self.assertEqual([row["id"] for row in response.json()], [NEW_PRINTGROUP_ID])
+
+    def test_user_autocomplete_requires_known_role(self):
+        response = self.client.get(reverse("user_autocomplete"), {"term": "sea", "role": "nobody"})
+        self.assertEqual(response.json(), [])
@@ -0,0 +1,81 @@
+"""
+Tests for the shared workflow file response helper.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from gchub_db.includes import file_response
+
+
+class TestServeFile(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "51234-1.pdf")
+        with open(self.path, "wb") as f:
+            f.write(b"0123456789" * 10)
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_full_file_is_streamed(self):
+        response = file_response.serve_file(self.factory.get("/"), self.path, filename="proof.pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789" * 10)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="proof.pdf"')
+
+    def test_range_request(self):
+        request = self.factory.get("/", HTTP_RANGE="bytes=10-19")
+        response = file_response.serve_file(request, self.path)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+    def test_suffix_range_request(self):
+        request = self.factory.get("/", HTTP_RANGE="bytes=-5")
+        response = file_response.serve_file(request, self.path)
+        self.assertEqual(response["Content-Range"], "bytes 95-99/100")
+
+    def test_unsatisfiable_range(self):
+        request = self.factory.get("/", HTTP_RANGE="bytes=500-")
+        response = file_response.serve_file(request, self.path)
+        self.assertEqual(response.status_code, 416)
+
+    def test_etag_not_modified(self):
+        etag = file_response.serve_file(self.factory.get("/"), self.path)["ETag"]
+        response = file_response.serve_file(self.factory.get("/", HTTP_IF_NONE_MATCH=etag), self.path)
+        self.assertEqual(response.status_code, 304)
+
+    def test_x_accel_redirect(self):
+        with override_settings(
+            FILE_SERVE_BACKEND="x-accel",
+            FILE_SERVE_ACCEL_LOCATIONS={self.tmpdir: "/protected-workflow/"},
+        ):
+            response = file_response.serve_file(self.factory.get("/"), self.path)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-workflow/51234-1.pdf")
+        self.assertEqual(response.content, b"")
+
+
+class TestNewestFileSearch(SimpleTestCase):
+    def test_picks_most_recently_modified(self):
+        import re
+
+        from gchub_db.includes import fs_api
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for offset, name in enumerate(["51234-1.pdf", "51234-1 v3.pdf", "51234-1 v2.pdf"]):
+                path = os.path.join(tmpdir, name)
+                open(path, "wb").close()
+                os.utime(path, (1000 + offset * 100, 1000 + offset * 100))
+            pattern = re.compile(r"(.*)-(1)( .*\.pdf$|\.pdf$)")
+            newest = fs_api._newest_item_file_search(tmpdir, pattern)
+            self.assertEqual(os.path.basename(newest), "51234-1 v2.pdf")
+        finally:
+            shutil.rmtree(tmpdir)
@@ -0,0 +1,124 @@
+"""
+Tests for the GOLD FS daemon's work queue and the job folder chmod pass.
+"""
+
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from gchub_db.daemons.gold_fs.work_queue import WorkQueue
+from gchub_db.includes import fs_api
+
+
+def wait_until_idle(work_queue, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = work_queue.stats()
+        if not stats["queued"] and not stats["running"]:
+            return
+        time.sleep(0.01)
+    raise AssertionError("Work queue did not drain.")
+
+
+class TestWorkQueue(SimpleTestCase):
+    def test_waiting_work_is_replaced(self):
+        work_queue = WorkQueue(workers=1)
+        release = threading.Event()
+        ran = []
+        work_queue.submit("blocker", "block", release.wait)
+        while not work_queue.stats()["running"]:
+            time.sleep(0.01)
+        self.assertTrue(work_queue.submit(51234, "lock_job_folder", lambda: ran.append("lock")))
+        self.assertFalse(work_queue.submit(51234, "unlock_job_folder", lambda: ran.append("unlock")))
+        self.assertEqual(work_queue.stats()["queued"], 1)
+        release.set()
+        wait_until_idle(work_queue)
+        work_queue.shutdown()
+        # Only the latest request for the job ran.
+        self.assertEqual(ran, ["unlock"])
+        self.assertEqual(work_queue.stats()["latency"]["unlock_job_folder"]["count"], 1)
+
+    def test_key_never_runs_twice_at_once(self):
+        work_queue = WorkQueue(workers=4)
+        active = []
+        overlaps = []
+
+        def work():
+            active.append(1)
+            if len(active) > 1:
+                overlaps.append(1)
+            time.sleep(0.02)
+            active.pop()
+
+        for _num in range(10):
+            work_queue.submit(51234, "lock_job_folder", work)
+            time.sleep(0.005)
+        wait_until_idle(work_queue)
+        work_queue.shutdown()
+        self.assertEqual(overlaps, [])
+
+    def test_shutdown_waits_for_running_work(self):
+        work_queue = WorkQueue(workers=2)
+        done = []
+        for num in range(3):
+            work_queue.submit(num, "slow", lambda num=num: (time.sleep(0.05), done.append(num)))
+        work_queue.shutdown(wait=True)
+        self.assertEqual(sorted(done), [0, 1, 2])
+
+
+class TestRecursiveChmod(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        for folder in ("Proofs/51234-1", "Final_Files/51234-1", "Final_Files/51234-2"):
+            os.makedirs(os.path.join(self.tmpdir, folder))
+            open(os.path.join(self.tmpdir, folder, "51234-1.pdf"), "wb").close()
+
+    def tearDown(self):
+        fs_api._recursive_chmod(self.tmpdir, fs_api.UNLOCKED_MODE)
+        shutil.rmtree(self.tmpdir)
+
+    def test_lock_then_relock(self):
+        changed = fs_api._recursive_chmod(self.tmpdir, fs_api.LOCKED_MODE, workers=2)
+        # The root, 2 top-level folders, 3 item folders and 3 files.
+        self.assertEqual(changed, 9)
+        pdf = os.path.join(self.tmpdir, "Final_Files/51234-2/51234-1.pdf")
+        self.assertEqual(stat.S_IMODE(os.stat(pdf).st_mode), fs_api.LOCKED_MODE)
+        # Already locked, nothing left to change.
+        self.assertEqual(fs_api._recursive_chmod(self.tmpdir, fs_api.LOCKED_MODE), 0)
+
+
+class TestFSServerRequest(SimpleTestCase):
+    def setUp(self):
+        # A server that never answers.
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(("127.0.0.1", 0))
+        self.server.settimeout(0)
+        self.settings_override = override_settings(FS_SERVER_HOST="127.0.0.1", FS_SERVER_PORT=self.server.getsockname()[1])
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.server.close()
+
+    def received(self):
+        count = 0
+        while True:
+            try:
+                self.server.recv(65535)
+            except BlockingIOError:
+                return count
+            count += 1
+
+    def test_sent_once_by_default(self):
+        self.assertFalse(fs_api.lock_job_folder(51234))
+        self.assertEqual(self.received(), 1)
+
+    def test_retries(self):
+        self.assertIsNone(fs_api._send_fs_server_request("stats", retries=2, timeout=0.01))
+        self.assertEqual(self.received(), 3)
@@ -0,0 +1,82 @@
+"""
+Tests for the item fact snapshot behind the trend and billing reports.
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from django.test import TestCase
+from django.utils import timezone
+
+from gchub_db.apps.joblog.app_defs import JOBLOG_TYPE_ITEM_FILED_OUT
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.workflow.item_facts import ItemFacts, refresh_item_facts
+from gchub_db.apps.workflow.models import Charge, ChargeType, Item, ItemCatalog, Job, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory
+
+
+class ItemFactsTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "item_facts.npz")
+        self.site = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        self.size = ItemCatalog.objects.create(size="SMR-16", workflow=self.site)
+        category = ChargeCategory.objects.create(name="Proof")
+        self.charge_type = ChargeType.objects.create(
+            type="Proof", category=category, base_amount=50, rush_type="Proof", workflow=self.site
+        )
+        # Saving a Foodservice item looks this up.
+        ChargeType.objects.create(type="Art Request", category=category, base_amount=0, workflow=self.site)
+        self.job = Job.objects.create(name="Facts Job", workflow=self.site, status="Active", due_date=date.today())
+        self.items = [
+            Item.objects.create(workflow=self.site, job=self.job, size=self.size, num_in_job=num, quality=quality)
+            for num, quality in ((1, "A"), (2, "A"), (3, "B"))
+        ]
+        self.charge(self.items[0], 100.0, invoiced=True)
+        self.charge(self.items[0], 25.0)
+        self.charge(self.items[2], 40.0)
+        JobLog.objects.create(job=self.job, item=self.items[0], type=JOBLOG_TYPE_ITEM_FILED_OUT, log_text="")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def charge(self, item, amount, invoiced=False):
+        return Charge.objects.create(
+            item=item,
+            description=self.charge_type,
+            amount=amount,
+            invoice_date=date.today() if invoiced else None,
+        )
+
+    def test_full_refresh_groups_and_totals(self):
+        facts, extracted = refresh_item_facts(self.path)
+        self.assertEqual(extracted, 3)
+        facts = ItemFacts.load(self.path)
+        self.assertEqual(facts.count_by("quality"), {"A": 2, "B": 1})
+        self.assertEqual(facts.sum_by("charges", "quality"), {"A": 125.0, "B": 40.0})
+        self.assertEqual(facts.sum_by("billed_charges", "quality"), {"A": 100.0, "B": 0.0})
+        self.assertEqual(facts.count_by("quality", facts.has("filed_out")), {("A", False): 1, ("A", True): 1, ("B", False): 1})
+        self.assertEqual(len(facts.where(workflow="Foodservice").first_per_job()), 1)
+
+    def test_incremental_refresh_only_extracts_changes(self):
+        refresh_item_facts(self.path)
+        # Move the snapshot time past the setup data, so only the changes below are newer.
+        facts = ItemFacts.load(self.path)
+        facts.refreshed = timezone.now()
+        facts.save(self.path)
+        self.charge(self.items[1], 10.0)
+        self.items[2].delete()
+
+        facts, extracted = refresh_item_facts(self.path)
+        # Deleting an item renumbers (saves) the others in its job.
+        self.assertEqual(extracted, 2)
+        self.assertEqual(list(facts["item_id"]), [self.items[0].id, self.items[1].id])
+        self.assertEqual(facts.sum_by("charges", "quality"), {"A": 135.0})
+
+    def test_missing_snapshot_does_full_extract(self):
+        facts, extracted = refresh_item_facts(os.path.join(self.temp_dir, "missing.npz"))
+        self.assertEqual(extracted, len(facts))
+        self.assertEqual(facts.exclude(quality="A").count_by("quality"), {"B": 1})
+        self.assertEqual(facts.where(quality="C").count_by("quality"), {})
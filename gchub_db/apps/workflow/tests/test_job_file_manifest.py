@@ -0,0 +1,69 @@
+"""
+Tests for the per-job file manifest used by the item link filters.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from gchub_db.includes import fs_api
+
+
+class TestJobFileManifest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        job_folder = os.path.join(self.tmpdir, "51234")
+        self.proof_folder = os.path.join(job_folder, "Proofs", "51234-1 SMR-16")
+        final_folder = os.path.join(job_folder, "Final_Files", "51234-2 DMR-12")
+        os.makedirs(self.proof_folder)
+        os.makedirs(os.path.join(final_folder, ".thumbnails"))
+        os.makedirs(os.path.join(job_folder, "Database_Documents", "Preview_Art"))
+        for path in (
+            os.path.join(self.proof_folder, "51234-1 SMR-16.pdf"),
+            os.path.join(final_folder, "51234-2.pdf"),
+            os.path.join(final_folder, ".thumbnails", "thumb_155.png"),
+            os.path.join(job_folder, "Database_Documents", "Preview_Art", "ap_51234_2.pdf"),
+        ):
+            open(path, "wb").close()
+        self.settings_override = override_settings(JOBSTORAGE_DIR=self.tmpdir, FS_ACCESS_ENABLED=True)
+        self.settings_override.enable()
+        fs_api.forget_job_file_manifest(51234)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        fs_api.forget_job_file_manifest(51234)
+        shutil.rmtree(self.tmpdir)
+
+    def test_matches_item_files(self):
+        manifest = fs_api.get_job_file_manifest(51234)
+        self.assertTrue(manifest.has_proof(1))
+        self.assertFalse(manifest.has_proof(1, "l"))
+        self.assertFalse(manifest.has_proof(2))
+        self.assertTrue(manifest.has_finalfile(2))
+        self.assertFalse(manifest.has_finalfile(1))
+        self.assertTrue(manifest.has_preview_art(2))
+        self.assertFalse(manifest.has_print_seps(2))
+        self.assertFalse(manifest.has_tiffs(1))
+        self.assertTrue(manifest.get_thumbnail(2, 155).endswith("thumb_155.png"))
+        self.assertIsNone(manifest.get_thumbnail(2, 300))
+
+    def test_missing_job_folder(self):
+        manifest = fs_api.get_job_file_manifest(99999)
+        self.assertFalse(manifest.has_proof(1))
+        fs_api.forget_job_file_manifest(99999)
+
+    def test_reused_until_folder_changes(self):
+        manifest = fs_api.get_job_file_manifest(51234)
+        self.assertIs(fs_api.get_job_file_manifest(51234), manifest)
+
+        open(os.path.join(self.proof_folder, "51234-1 SMR-16 l.pdf"), "wb").close()
+        # Push the folder's mtime forward in case the clock is coarse.
+        stamp = os.stat(self.proof_folder).st_mtime + 10
+        os.utime(self.proof_folder, (stamp, stamp))
+        with mock.patch.object(fs_api, "JOB_MANIFEST_REVALIDATE_SECONDS", 0):
+            rebuilt = fs_api.get_job_file_manifest(51234)
+        self.assertIsNot(rebuilt, manifest)
+        self.assertTrue(rebuilt.has_proof(1, "l"))
@@ -0,0 +1,79 @@
+"""
+Tests for keyset pagination of the search result lists.
+"""
+
+from datetime import date
+from unittest import mock
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from gchub_db.apps.workflow.models import Item, ItemCatalog, Job, Site
+from gchub_db.includes import pagination
+from gchub_db.includes.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTest(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="Carton", domain="carton.example.com")
+        size = ItemCatalog.objects.create(size="SMR-16", workflow=site)
+        for num in range(6):
+            job = Job.objects.create(name="Job %d" % num, workflow=site, status="Active", due_date=date.today())
+            # Several items per job, so the job number alone doesn't order them.
+            for item_num in range(1, num % 3 + 3):
+                Item.objects.create(workflow=site, job=job, size=size, num_in_job=item_num)
+
+    def assertPagesMatch(self, queryset, reference, per_page=4):
+        """Pages fetched by cursor, forwards and back, are the same as by OFFSET."""
+        paginator = KeysetPaginator(queryset, per_page)
+        expected = Paginator(reference, per_page)
+        page = paginator.page(1)
+        for number in range(2, expected.num_pages + 1):
+            with CaptureQueriesContext(connection) as queries:
+                page = paginator.page(number, after=page.next_cursor)
+            self.assertNotIn("OFFSET", queries[-1]["sql"].upper())
+            self.assertEqual([obj.id for obj in page], [obj.id for obj in expected.page(number)])
+        self.assertEqual(page.next_cursor, "")
+        for number in range(expected.num_pages - 1, 0, -1):
+            page = paginator.page(number, before=page.previous_cursor)
+            self.assertEqual([obj.id for obj in page], [obj.id for obj in expected.page(number)])
+
+    def test_single_key(self):
+        self.assertPagesMatch(Job.objects.order_by("-id"), Job.objects.order_by("-id"), per_page=4)
+        self.assertPagesMatch(Job.objects.order_by("id"), Job.objects.order_by("id"), per_page=4)
+
+    def test_tie_broken_by_id(self):
+        self.assertPagesMatch(Item.objects.order_by("-job__id"), Item.objects.order_by("-job__id", "-id"))
+        self.assertPagesMatch(Item.objects.order_by("job__id"), Item.objects.order_by("job__id", "id"))
+
+    def test_bad_cursor_falls_back_to_page_number(self):
+        paginator = KeysetPaginator(Item.objects.order_by("-job__id"), 4)
+        expected = [item.id for item in Paginator(Item.objects.order_by("-job__id", "-id"), 4).page(3)]
+        for cursor in ("junk,1", "12"):
+            self.assertEqual([item.id for item in paginator.page(3, after=cursor)], expected)
+
+    def estimate(self, queryset, row):
+        """The paginator's count on PostgreSQL, with the statistics query answering row."""
+        database = mock.MagicMock(vendor="postgresql")
+        cursor = database.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = row
+        with mock.patch.object(pagination, "connections", {"default": database}):
+            paginator = KeysetPaginator(queryset, 25, estimate_count=True)
+            count = paginator.count
+        return count, paginator.count_is_estimate, cursor.execute.call_args[0][0]
+
+    def test_filtered_list_is_estimated_from_its_plan(self):
+        count, estimated, sql = self.estimate(Job.objects.exclude(id=99999), ([{"Plan": {"Plan Rows": 250000}}],))
+        self.assertEqual((count, estimated), (250000, True))
+        self.assertTrue(sql.startswith("EXPLAIN"))
+
+        # Job.objects leaves out deleted jobs, so only the base manager is unfiltered.
+        count, estimated, sql = self.estimate(Job._base_manager.all(), (300000.0,))
+        self.assertEqual((count, estimated), (300000, True))
+        self.assertIn("reltuples", sql)
+
+    def test_small_estimate_is_counted(self):
+        count, estimated, sql = self.estimate(Job.objects.filter(name="Job 1"), ('[{"Plan": {"Plan Rows": 3}}]',))
+        self.assertEqual((count, estimated), (1, False))
@@ -0,0 +1,63 @@
+"""
+Tests for the stale proof reminder engine.
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from gchub_db.apps.joblog.app_defs import JOBLOG_TYPE_ITEM_APPROVED, JOBLOG_TYPE_ITEM_PROOFED_OUT
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.queues.models import OutboundEmail
+from gchub_db.apps.workflow import proof_reminders
+from gchub_db.apps.workflow.models import ChargeType, Item, ItemCatalog, Job, Revision, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory
+
+
+class ProofReminderTest(TestCase):
+    def setUp(self):
+        self.salesperson = User.objects.create_user(username="sales", email="sales@example.com", first_name="Sal")
+        site = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        size = ItemCatalog.objects.create(size="SMR-16", workflow=site)
+        # Saving a Foodservice item looks this up.
+        ChargeType.objects.create(type="Art Request", category=ChargeCategory.objects.create(name="Art"), base_amount=0, workflow=site)
+        self.job = Job.objects.create(
+            name="Stale Job",
+            workflow=site,
+            status="Active",
+            salesperson=self.salesperson,
+            due_date=date.today(),
+        )
+        self.items = [Item.objects.create(workflow=site, job=self.job, size=size, num_in_job=num) for num in (1, 2, 3, 4)]
+        proofed = timezone.now() - timedelta(days=20)
+        for item in self.items:
+            self.log(item, JOBLOG_TYPE_ITEM_PROOFED_OUT, proofed)
+        # Item 2 was approved, item 3 has a revision pending.
+        self.log(self.items[1], JOBLOG_TYPE_ITEM_APPROVED, proofed + timedelta(days=1))
+        Revision.objects.create(item=self.items[2], due_date=date.today(), comments="Fix it")
+        # Item 4 was proofed again recently, so it isn't stale yet.
+        self.log(self.items[3], JOBLOG_TYPE_ITEM_PROOFED_OUT, timezone.now() - timedelta(days=2))
+
+    def log(self, item, log_type, event_time):
+        entry = JobLog.objects.create(job=item.job, item=item, type=log_type, log_text="")
+        JobLog.objects.filter(id=entry.id).update(event_time=event_time)
+
+    def test_selection_is_one_query(self):
+        with self.assertNumQueries(1):
+            groups = proof_reminders.group_by_salesperson(proof_reminders.stale_proof_items())
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]["salesperson"], self.salesperson)
+        self.assertEqual([item.num_in_job for item in groups[0]["jobs"][0]["items"]], [1])
+
+    def test_dry_run_sends_nothing(self):
+        proof_reminders.send_proof_reminders(dry_run=True)
+        self.assertFalse(OutboundEmail.objects.exists())
+        self.assertIsNone(Item.objects.get(id=self.items[0].id).proof_reminder_email_sent)
+
+    def test_reminders_are_sent_once(self):
+        proof_reminders.send_proof_reminders()
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertIsNotNone(Item.objects.get(id=self.items[0].id).proof_reminder_email_sent)
+        self.assertEqual(proof_reminders.send_proof_reminders(), [])
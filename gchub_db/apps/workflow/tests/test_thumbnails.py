@@ -0,0 +1,62 @@
+"""
+Tests for the final file thumbnail cache in fs_api.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from gchub_db.includes import fs_api
+
+
+def fake_render(pdf_path, thumbnail_folder, widths):
+    for width in widths:
+        with open(os.path.join(thumbnail_folder, "thumb_%d.png" % width), "wb") as f:
+            f.write(b"png")
+
+
+class TestThumbnailCache(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.ff_file = os.path.join(self.tmpdir, "51234-1.pdf")
+        with open(self.ff_file, "wb") as f:
+            f.write(b"%PDF-1.4 original")
+        patcher = mock.patch.object(fs_api, "get_item_finalfile", return_value=self.ff_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        render_patcher = mock.patch.object(fs_api, "render_pdf_thumbnails", side_effect=fake_render)
+        self.render = render_patcher.start()
+        self.addCleanup(render_patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_renders_all_widths_in_one_call(self):
+        self.assertTrue(fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155, 600)))
+        self.assertEqual(self.render.call_count, 1)
+        manifest = fs_api.read_thumbnail_manifest(os.path.join(self.tmpdir, fs_api.THUMBNAIL_FOLDER_NAME))
+        self.assertEqual(manifest["widths"], [155, 600])
+
+    def test_unchanged_final_file_is_skipped(self):
+        fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155,))
+        self.assertFalse(fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155,)))
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_touched_final_file_is_skipped_by_hash(self):
+        fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155,))
+        stat = os.stat(self.ff_file)
+        os.utime(self.ff_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertFalse(fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155,)))
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_changed_final_file_is_rerendered_with_new_etag(self):
+        fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155,))
+        thumb = os.path.join(self.tmpdir, fs_api.THUMBNAIL_FOLDER_NAME, "thumb_155.png")
+        old_etag = fs_api.get_thumbnail_etag(thumb)
+        with open(self.ff_file, "wb") as f:
+            f.write(b"%PDF-1.4 revised artwork")
+        self.assertTrue(fs_api.make_thumbnails_item_finalfile(51234, 1, widths=(155,)))
+        self.assertNotEqual(fs_api.get_thumbnail_etag(thumb), old_etag)
@@ -0,0 +1,117 @@
+"""
+Item thumbnail queue.
+
+Items flagged with is_queued_for_thumbnailing are claimed in batches and
+rendered by a pool of worker processes. Each item's final file is decoded
+once for all of the configured widths, and unchanged final files are skipped
+by fs_api's content-hash manifest, so re-queued items are cheap.
+
+Claiming uses SELECT ... FOR UPDATE SKIP LOCKED, so several queue runners
+can drain the queue at the same time without rendering an item twice.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from gchub_db.apps.workflow.models import Item
+from gchub_db.includes import fs_api
+
+# Widths rendered for every queued item. 155 is the job detail thumbnail.
+THUMBNAIL_WIDTHS = getattr(settings, "THUMBNAIL_WIDTHS", (155,))
+THUMBNAIL_WORKERS = getattr(settings, "THUMBNAIL_WORKERS", 4)
+THUMBNAIL_BATCH_SIZE = getattr(settings, "THUMBNAIL_BATCH_SIZE", 20)
+
+
+def render_item_thumbnails(jobnum, itemnum, widths=THUMBNAIL_WIDTHS):
+    """
+    Renders the thumbnails for one item. Runs in a worker process, so it only
+    touches the filesystem and reports back (success, message).
+    """
+    try:
+        rendered = fs_api.make_thumbnails_item_finalfile(jobnum, itemnum, widths=widths)
+        return True, "rendered" if rendered else "unchanged"
+    except fs_api.NoResultsFound:
+        return False, "Failed to find final file"
+    except fs_api.InvalidPath:
+        return False, "Invalid path"
+    except OSError as ex:
+        return False, "OSError caught: %s" % ex
+    except Exception as ex:
+        return False, "Some other error occurred: %s" % ex
+
+
+class ThumbnailQueue:
+    """Claims queued items and renders their thumbnails in a process pool."""
+
+    def __init__(self, workers=THUMBNAIL_WORKERS, batch_size=THUMBNAIL_BATCH_SIZE, widths=THUMBNAIL_WIDTHS):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.widths = tuple(widths)
+
+    def claim(self):
+        """
+        Claims the next batch of queued items, clearing their queue flags in
+        the same transaction. Rows locked by another runner are skipped.
+        """
+        with transaction.atomic():
+            items = list(
+                Item.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(is_queued_for_thumbnailing=True, job__archive_disc="")
+                .only("id", "job_id", "num_in_job", "is_queued_for_thumbnailing")
+                .order_by("id")[: self.batch_size]
+            )
+            for item in items:
+                item.is_queued_for_thumbnailing = False
+            Item.objects.bulk_update(items, ["is_queued_for_thumbnailing"])
+        return items
+
+    def drain(self, forever=False, poll_interval=5, verbose=True):
+        """
+        Renders queued thumbnails until the queue is empty. With forever set,
+        keeps polling the queue every poll_interval seconds instead of
+        returning. Returns a dict of rendered/unchanged/failed counts.
+        """
+        stats = {"rendered": 0, "unchanged": 0, "failed": 0}
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                items = self.claim()
+                if not items:
+                    if not forever:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                futures = [(item, pool.submit(render_item_thumbnails, item.job_id, item.num_in_job, self.widths)) for item in items]
+                thumbnailed_ids = []
+                for item, future in futures:
+                    success, message = future.result()
+                    if verbose:
+                        print("Thumbnailing %d-%d: %s" % (item.job_id, item.num_in_job, message))
+                    if success:
+                        thumbnailed_ids.append(item.id)
+                        stats[message] += 1
+                    else:
+                        stats["failed"] += 1
+
+                # Only timestamp items that actually have a thumbnail.
+                if thumbnailed_ids:
+                    Item.objects.filter(id__in=thumbnailed_ids).update(time_last_thumbnailed=timezone.now())
+
+        if verbose:
+            elapsed = max(time.monotonic() - started, 0.001)
+            total = sum(stats.values())
+            print(
+                "%d items (%d rendered, %d unchanged, %d failed) in %.1fs, %.1f items/sec"
+                % (total, stats["rendered"], stats["unchanged"], stats["failed"], elapsed, total / elapsed)
+            )
+        return stats
+
+
+def queue_item_thumbnail(item_id):
+    """Flags an item for the thumbnail queue without loading or saving it."""
+    Item.objects.filter(id=item_id).update(is_queued_for_thumbnailing=True)
@@ -524,6 +524,9 @@ from gchub_db.apps.workflow.views.search_views import (
 from gchub_db.apps.workflow.views.autocomplete_views import (
     job_autocomplete,
     item_autocomplete,
+    itemcatalog_autocomplete,
+    printgroup_autocomplete,
+    user_autocomplete,
 )
 
 urlpatterns += [
@@ -560,6 +563,9 @@ urlpatterns += [
     # Autocomplete endpoints for enhanced search UI
     url(r"^api/job_autocomplete/$", job_autocomplete, name="job_autocomplete"),
     url(r"^api/item_autocomplete/$", item_autocomplete, name="item_autocomplete"),
+    url(r"^api/printgroup_autocomplete/$", printgroup_autocomplete, name="printgroup_autocomplete"),
+    url(r"^api/user_autocomplete/$", user_autocomplete, name="user_autocomplete"),
+    url(r"^api/itemcatalog_autocomplete/$", itemcatalog_autocomplete, name="itemcatalog_autocomplete"),
     url(r"^todo_list/$", job_todo_list, name="todo_list"),
     url(
         r"^todo_list/manager_tools/$",
@@ -746,6 +752,7 @@ from gchub_db.apps.workflow.views.misc_views import (
     data_trends_quality,
     data_trends_volume,
     gen_doc_upload,
+    stale_proofs,
 )
 
 urlpatterns += [
@@ -777,6 +784,7 @@ urlpatterns += [
     url(r"^trends/cuptype/$", data_trends_cuptype, name="data_trends_cuptype"),
     url(r"^trends/quality/$", data_trends_quality, name="data_trends_quality"),
     url(r"^file/gen_doc_upload/$", gen_doc_upload, name="misc_gen_doc_upload"),
+    url(r"^stale_proofs/$", stale_proofs, name="stale_proofs"),
     url(
         r"^gen_doc_upload_complete/$",
         TemplateView.as_view(template_name="workflow/misc/popups/gen_doc_upload_complete.html"),
@@ -1,10 +1,24 @@
 """Autocomplete views for workflow search functionality."""
 
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from django.http import JsonResponse
 from django.db.models import Q
 
-from gchub_db.apps.workflow.models import Job, Item
+from gchub_db.apps.qad_data.models import NEW_PRINTGROUP_ID, QAD_PrintGroups
+from gchub_db.apps.workflow.models import Job, Item, ItemCatalog
+from gchub_db.includes import general_funcs
+
+# Users offered by user_autocomplete for each "role" GET parameter. These match
+# the artist/salesperson/CSR querysets on the job and item search forms.
+USER_ROLES = {
+    "artist": lambda: User.objects.filter(groups__name="ClemsonPersonnel"),
+    "salesperson": lambda: User.objects.filter(groups__permissions__codename="salesperson"),
+    "csr": lambda: User.objects.filter(is_active=True, groups__permissions__codename="is_fsb_csr"),
+}
+
+# Roles limited to users sharing a workflow with the requesting user.
+SAME_PERMS_ROLES = ("artist", "salesperson")
 
 
 @login_required
@@ -89,3 +103,65 @@ def item_autocomplete(request):
         suggestions.append({"id": item.id, "label": label, "value": value})
 
     return JsonResponse(suggestions, safe=False)
+
+
+@login_required
+def printgroup_autocomplete(request):
+    """
+    Autocomplete API for QAD print group pulldowns. With include_new, the
+    "New Print Group" entry comes first, whatever the term.
+    """
+    term = request.GET.get("term", "").strip()
+    printgroups = []
+    if request.GET.get("include_new"):
+        printgroups += QAD_PrintGroups.objects.filter(id=NEW_PRINTGROUP_ID)
+    if len(term) >= 2:
+        matches = QAD_PrintGroups.objects.filter(Q(name__icontains=term) | Q(description__icontains=term))
+        printgroups += matches.exclude(id=NEW_PRINTGROUP_ID).order_by("name")[:10]
+    suggestions = [{"id": printgroup.id, "label": str(printgroup), "value": str(printgroup)} for printgroup in printgroups]
+    return JsonResponse(suggestions, safe=False)
+
+
+@login_required
+def user_autocomplete(request):
+    """
+    Autocomplete API for user pulldowns. The "role" GET parameter picks the
+    list (see USER_ROLES).
+    """
+    term = request.GET.get("term", "").strip()
+    role = request.GET.get("role", "")
+    if len(term) < 2 or role not in USER_ROLES:
+        return JsonResponse([], safe=False)
+
+    users = USER_ROLES[role]()
+    if role in SAME_PERMS_ROLES:
+        users = general_funcs.filter_query_same_perms(request, users)
+    users = (
+        users.filter(Q(username__icontains=term) | Q(first_name__icontains=term) | Q(last_name__icontains=term))
+        .distinct()
+        .order_by("username")[:10]
+    )
+    suggestions = []
+    for user in users:
+        full_name = user.get_full_name()
+        label = "%s (%s)" % (user.username, full_name) if full_name else user.username
+        suggestions.append({"id": user.id, "label": label, "value": user.username})
+    return JsonResponse(suggestions, safe=False)
+
+
+@login_required
+def itemcatalog_autocomplete(request):
+    """
+    Autocomplete API for item catalog (size) pulldowns. Only active sizes are
+    offered, optionally limited to one workflow by name.
+    """
+    term = request.GET.get("term", "").strip()
+    if len(term) < 2:
+        return JsonResponse([], safe=False)
+
+    sizes = ItemCatalog.objects.filter(size__icontains=term, active=True)
+    workflow = request.GET.get("workflow")
+    if workflow:
+        sizes = sizes.filter(workflow__name=workflow)
+    suggestions = [{"id": size.id, "label": size.size, "value": size.size} for size in sizes.order_by("size")[:10]]
+    return JsonResponse(suggestions, safe=False)
@@ -17,6 +17,7 @@ from django.forms import ModelForm
 from django.http import HttpResponse, HttpResponseNotFound
 from django.shortcuts import get_object_or_404, render
 from django.template import loader
+from django.utils.cache import get_conditional_response
 from django.views.decorators.csrf import csrf_exempt
 from gchub_db.apps.color_mgt.models import ColorDefinition
 from gchub_db.apps.joblog.app_defs import (
@@ -47,7 +48,9 @@ from gchub_db.apps.workflow.models import (
     Revision,
     SpecialMfgConfiguration,
 )
+from gchub_db.apps.workflow.thumbnails import queue_item_thumbnail
 from gchub_db.includes import fs_api, general_funcs
+from gchub_db.includes.file_response import serve_file
 from gchub_db.includes.form_utils import JSONErrorForm
 from gchub_db.includes.gold_json import JSMessage
 from gchub_db.includes.widgets import GCH_SelectDateWidget
@@ -1316,44 +1319,24 @@ def do_item_tiff_to_pdf(request, job_num, item_num):
 
 def get_item_proof(request, job_num, item_num, quality="l", log_id=None):
     """Return a given item's proof pdf."""
-    job = Job.objects.get(id=job_num)
-    workflow = job.workflow.name
+    workflow = Job.objects.filter(id=job_num).values_list("workflow__name", flat=True).get()
 
     if workflow == "Beverage":
         # Beverage links low res proofs.
         filepath = fs_api.get_item_proof(job_num, item_num, quality, proof_log_id=log_id)
     else:
-        filepaths_array = fs_api.get_item_proof(job_num, item_num, quality=None, proof_log_id=log_id, return_first=False)
+        # Other workflows can have several proofs in the folder, send the one
+        # that was most recently modified.
+        filepath = fs_api.get_newest_item_proof(job_num, item_num, proof_log_id=log_id)
 
-        """
-            This blurb will go get all of the filepaths in the proofs folder for an item of a job.
-            Sort them from oldest to newest, and return the file that was most recently modified.
-            All of this is currently sorted off of the last modified time stamp.
-        """
-        # make an object to store the times and filepaths
-        pathObj = {}
-        for path in filepaths_array:
-            # create a time - path relationship per entry
-            pathObj[os.path.getmtime(path)] = path
-        # sort the keys (times) of pathObj and get the last (newest) one
-        most_recent_time = sorted(pathObj)[-1]
-        # use that newest time to lookup the path to get the file from
-        filepath = pathObj[most_recent_time]
-    # return that newest file to the client
-    with open(filepath, "rb") as f:
-        data = f.read()
-
-    response = HttpResponse(data, content_type="application/pdf")
     if log_id:
         # If this is a past proof, take the log ID and use it to append the
         # date to the back of the PDF name.
         log = JobLog.objects.get(id=log_id)
-        response["Content-Disposition"] = (
-            "attachment; filename=" + job_num + "-" + item_num + "_proof_" + str(log.event_time.date()) + ".pdf"
-        )
+        filename = job_num + "-" + item_num + "_proof_" + str(log.event_time.date()) + ".pdf"
     else:
-        response["Content-Disposition"] = "attachment; filename=" + job_num + "-" + item_num + "_proof.pdf"
-    return response
+        filename = job_num + "-" + item_num + "_proof.pdf"
+    return serve_file(request, filepath, content_type="application/pdf", filename=filename)
 
 
 def get_stepped_item_proof(request, job_num, item_num, quality="h", log_id=None):
@@ -1373,28 +1356,24 @@ def get_item_finalfile(request, job_num, item_num):
     extra = str(item.bev_nomenclature())
 
     filepath = fs_api.get_item_finalfile(job_num, item_num)
-    with open(filepath, "rb") as f:
-        data = f.read()
-
-    response = HttpResponse(data, content_type="application/pdf")
-    response["Content-Disposition"] = "attachment; filename=%s-%s_%s.pdf" % (
+    filename = "%s-%s_%s.pdf" % (
         job_num,
         item_num,
         extra,
     )
-    return response
+    return serve_file(request, filepath, content_type="application/pdf", filename=filename)
 
 
 def get_item_preview_art(request, job_num, item_num):
     """Return a given item's proof pdf."""
     try:
         filepath = fs_api.get_item_preview_art(job_num, item_num)
-        with open(filepath, "rb") as f:
-            data = f.read()
-
-        response = HttpResponse(data, content_type="application/pdf")
-        response["Content-Disposition"] = "attachment; filename=" + job_num + "-" + item_num + "_preview.pdf"
-        return response
+        return serve_file(
+            request,
+            filepath,
+            content_type="application/pdf",
+            filename=job_num + "-" + item_num + "_preview.pdf",
+        )
     except Exception:
         return HttpResponse("No preview artwork available.")
 
@@ -1453,14 +1432,9 @@ def item_tiff_download_list(request, item_id):
 
 def get_single_tiff(request, item_id, filename):
     """Download the selected TIFF."""
-    item = Item.objects.get(id=item_id)
-    filepath = fs_api.get_item_tiff_path(item.job.id, item.num_in_job, filename)
-    with open(filepath, "rb") as f:
-        data = f.read()
-
-    response = HttpResponse(data, content_type="image/tiff")
-    response["Content-Disposition"] = 'attachment; filename="' + str(filename) + '"'
-    return response
+    item = Item.objects.only("id", "job_id", "num_in_job").get(id=item_id)
+    filepath = fs_api.get_item_tiff_path(item.job_id, item.num_in_job, filename)
+    return serve_file(request, filepath, content_type="image/tiff", filename=str(filename))
 
 
 def get_zipfile_tiff(request, item_id):
@@ -2218,23 +2192,38 @@ def bev_nomenclature_lookup(
 
 
 def item_thumbnail(request, item_id, width=155, generate_thumb=False):
-    """Returns the binary data for the item's thumbnail."""
-    item = get_object_or_404(Item, id=item_id)
-    job_num = item.job.id
+    """
+    Returns the binary data for the item's thumbnail. Thumbnails are never
+    rendered inside the request; a missing one is queued for the thumbnail
+    worker when generate_thumb is set.
+    """
+    item = get_object_or_404(Item.objects.only("id", "job_id", "num_in_job"), id=item_id)
+    job_num = item.job_id
     item_num = item.num_in_job
-    if generate_thumb:
-        fs_api.make_thumbnail_item_finalfile(job_num, item_num, width=int(width))
-    thumb_path = fs_api.get_thumbnail_item_finalfile(job_num, item_num, width=int(width))
+    try:
+        thumb_path = fs_api.get_thumbnail_item_finalfile(job_num, item_num, width=int(width))
+    except (fs_api.NoResultsFound, fs_api.InvalidPath):
+        thumb_path = None
     if thumb_path:
-        with open(thumb_path, "rb") as f:
-            data = f.read()
-        response = HttpResponse(data, content_type="image/png")
-        response["Content-Disposition"] = "filename=%d-%d_thumb.png" % (
-            job_num,
-            item_num,
+        etag = fs_api.get_thumbnail_etag(thumb_path)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = serve_file(
+            request,
+            thumb_path,
+            content_type="image/png",
+            filename="%d-%d_thumb.png" % (job_num, item_num),
+            as_attachment=False,
         )
+        # Keyed by the final file's content rather than the PNG's mtime.
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=0, must-revalidate"
         return response
     else:
+        if generate_thumb:
+            queue_item_thumbnail(item.id)
+            return HttpResponseNotFound("No thumbnail of this size found. It has been queued for generation.")
         return HttpResponseNotFound("No thumbnail of this size found.")
 
 
@@ -10,6 +10,7 @@ from django.shortcuts import render
 from django.template import loader
 from django.views.generic.list import ListView
 
+from gchub_db.apps.queues.outbox import enqueue_email
 from gchub_db.apps.workflow import app_defs
 from gchub_db.apps.workflow.models import (
     ItemCatalog,
@@ -199,7 +200,7 @@ def sendAddEditProductEmail(type, user, id):
     # send the email
     msg = EmailMultiAlternatives(mail_subject, mail_body.render(mail_context), mail_from, mail_send_to)
     msg.content_subtype = "html"
-    msg.send()
+    enqueue_email(msg)
 
 
 def new_itemcatalog(request):
@@ -24,6 +24,7 @@ from django.urls import reverse
 from django.views.generic.list import ListView
 from django.views.decorators.cache import cache_page
 from gchub_db.apps.art_req.models import AdditionalInfo, ArtReq
+from gchub_db.apps.color_mgt.color_index import color_index
 from gchub_db.apps.color_mgt.models import ColorDefinition
 from gchub_db.apps.joblog.app_defs import (
     JOBLOG_TYPE_CRITICAL,
@@ -60,7 +61,10 @@ from gchub_db.apps.workflow.models import (
     Substrate,
     Trap,
 )
+from gchub_db.apps.workflow.pricing import price_many
 from gchub_db.includes import fs_api
+from gchub_db.includes.choice_lists import CachedModelChoiceField
+from gchub_db.includes.file_response import serve_file
 from gchub_db.includes.form_utils import JSONErrorForm
 from gchub_db.includes.gold_json import JSMessage
 from gchub_db.includes.widgets import GCH_SelectDateWidget
@@ -208,7 +212,9 @@ class ItemFormFSB(ItemForm):
     """This form is used for entering new FSB items."""
 
     workflow = _safe_get_site("Foodservice")
-    size = forms.ModelChoiceField(queryset=ItemCatalog.objects.filter(workflow=workflow, active=True).order_by("size"))
+    size = CachedModelChoiceField(
+        queryset=ItemCatalog.objects.filter(workflow=workflow, active=True).order_by("size"), cache_name="fsb_item_sizes"
+    )
 
 
 class ItemFormBEV(ItemForm):
@@ -234,8 +240,9 @@ class ItemFormBEV(ItemForm):
 
     workflow = _safe_get_site("Beverage")
 
-    size = forms.ModelChoiceField(
+    size = CachedModelChoiceField(
         queryset=ItemCatalog.objects.filter(workflow=workflow, active=True).order_by("size"),
+        cache_name="bev_item_sizes",
         required=True,
     )
 
@@ -266,13 +273,14 @@ class ItemFormBEV(ItemForm):
     seq5 = forms.ChoiceField(choices=SEQ_CHOICES, initial=5)
     seq6 = forms.ChoiceField(choices=SEQ_CHOICES, initial=6)
 
+    # All six pulldowns share one cached list of coated colors.
     COLORDEF_QUERYSET = ColorDefinition.objects.filter(coating="C").order_by("name")
-    color1 = forms.ModelChoiceField(queryset=COLORDEF_QUERYSET)
-    color2 = forms.ModelChoiceField(queryset=COLORDEF_QUERYSET, required=False)
-    color3 = forms.ModelChoiceField(queryset=COLORDEF_QUERYSET, required=False)
-    color4 = forms.ModelChoiceField(queryset=COLORDEF_QUERYSET, required=False)
-    color5 = forms.ModelChoiceField(queryset=COLORDEF_QUERYSET, required=False)
-    color6 = forms.ModelChoiceField(queryset=COLORDEF_QUERYSET, required=False)
+    color1 = CachedModelChoiceField(queryset=COLORDEF_QUERYSET, cache_name="coated_colordefs")
+    color2 = CachedModelChoiceField(queryset=COLORDEF_QUERYSET, cache_name="coated_colordefs", required=False)
+    color3 = CachedModelChoiceField(queryset=COLORDEF_QUERYSET, cache_name="coated_colordefs", required=False)
+    color4 = CachedModelChoiceField(queryset=COLORDEF_QUERYSET, cache_name="coated_colordefs", required=False)
+    color5 = CachedModelChoiceField(queryset=COLORDEF_QUERYSET, cache_name="coated_colordefs", required=False)
+    color6 = CachedModelChoiceField(queryset=COLORDEF_QUERYSET, cache_name="coated_colordefs", required=False)
 
     PLATECODE_WIDGET = forms.TextInput(attrs={"size": "20"})
     plate1 = forms.CharField(widget=PLATECODE_WIDGET, required=False)
@@ -368,14 +376,11 @@ class ItemFormBEV(ItemForm):
                     # Populate the color pulldown with all available colors.
                     self.fields[colorfield_str].initial = color.definition.id
                 else:
-                    try:
-                        # Try to find the Color Def. of the prev. color in the
-                        # color library. If found, set as initial value.
-                        col_def = ColorDefinition.objects.get(name=color.color)
+                    # Try to find the Color Def. of the prev. color in the
+                    # color library. If found, set as initial value.
+                    col_def = color_index().exact(color.color, "C")
+                    if col_def:
                         self.fields[colorfield_str].initial = col_def.id
-                    except ColorDefinition.DoesNotExist:
-                        # No default selection. Discard.
-                        pass
 
                 # Set the screened boolean based on the color's name.
                 if color.color.endswith(" Screened"):
@@ -447,7 +452,9 @@ def job_detail(request, job_id):
         jobcomplexform = JobComplexityForm(instance=jobcomplex)
     except Exception:
         jobcomplexform = JobComplexityForm()
-    itemsinjob = job.item_set.order_by("num_in_job")
+    # The timeline's item links check revisions for every item, so look them
+    # all up at once.
+    itemsinjob = Item.prefetch_current_revisions(job.item_set.order_by("num_in_job"))
     ship_to_count = job.jobaddress_set.count()
     database_docs = fs_api.list_job_database_docs(job_id)
 
@@ -473,14 +480,9 @@ def job_detail(request, job_id):
 
 def get_database_document(request, job_num, filepath):
     """Retrieve single file."""
-    job = Job.objects.get(id=job_num)
+    job = Job.objects.only("id").get(id=job_num)
     file = fs_api.get_job_database_doc(job.id, filepath)
-    with open(file, "rb") as f:
-        data = f.read()
-
-    response = HttpResponse(data, content_type=fs_api.get_mimetype(filepath))
-    response["Content-Disposition"] = 'attachment; filename="' + str(filepath) + '"'
-    return response
+    return serve_file(request, file, content_type=fs_api.get_mimetype(filepath), filename=str(filepath))
 
 
 def job_detail_main(request, job_id):
@@ -1043,7 +1045,7 @@ def new_beverage_item(request, job_id, type, item_id=0):
 class ItemFormCart(ItemForm):
     """This form is used for entering new carton items."""
 
-    size = forms.ModelChoiceField(queryset=ItemCatalog.objects.filter(workflow__name="Carton"))
+    size = CachedModelChoiceField(queryset=ItemCatalog.objects.filter(workflow__name="Carton"), cache_name="carton_item_sizes")
     one_up_die = forms.CharField(widget=forms.TextInput(attrs={"size": "30", "maxsize": "255"}), required=True)
     step_die = forms.CharField(widget=forms.TextInput(attrs={"size": "30", "maxsize": "255"}), required=False)
     grn = forms.CharField(widget=forms.TextInput(attrs={"size": "30", "maxsize": "255"}), required=False)
@@ -1588,6 +1590,8 @@ def edit_all_billing(request, job_id):
             # Iterate over each item in the job, creating a new charge for each.
             # for item in items:
             # Only goes through items that have been checked...
+            # Price them all at once, for each item's colors and quality.
+            prices = price_many(check_list_ids, [charge_type], rush_days)
             for item_id in check_list_ids:
                 # Added this line to grab the Items that have been checked from the template page
                 item = Item.objects.get(id=item_id)
@@ -1597,12 +1601,7 @@ def edit_all_billing(request, job_id):
                 c.item = item
                 c.description = charge_type
                 c.rush_days = rush_days
-                c.amount = charge_type.actual_charge(
-                    num_colors=item.itemcolor_set.count(),
-                    quality=item.quality,
-                    rush_days=rush_days,
-                    item=item,
-                )
+                c.amount = prices[(item.id, charge_type.id)]
                 c.save()
             return HttpResponse(JSMessage("Saved."))
         else:
@@ -2661,7 +2660,9 @@ def db_doc_upload(request, job_id):
 def item_summary(request, job_id, view):
     """Display all items associated with a job in given view."""
     job = Job.objects.get(id=job_id)
-    itemsinjob = Item.objects.filter(job=job_id).order_by("num_in_job")
+    # As on the job detail page, look up every item's revision at once. The
+    # item links check item.job.workflow, so that comes with the items.
+    itemsinjob = Item.prefetch_current_revisions(job.item_set.select_related("job__workflow").order_by("num_in_job"))
     overdue = job.overdue()
 
     pagevars = {
@@ -24,6 +24,7 @@ from gchub_db.apps.workflow.models import (
     ItemColor,
     Job,
 )
+from gchub_db.apps.workflow.proof_reminders import group_by_salesperson, stale_proof_items
 from gchub_db.includes import fs_api, general_funcs
 from gchub_db.includes.gold_json import JSMessage
 
@@ -390,3 +391,16 @@ def data_trends_quality(request):
     }
 
     return render(request, "workflow/misc/trends/data_trends_quality.html", context=pagevars)
+
+
+def stale_proofs(request):
+    """
+    Lists Foodservice proofs that have been waiting on a response long
+    enough for a reminder, grouped by salesperson and job. Includes items
+    that have already been reminded.
+    """
+    pagevars = {
+        "page_title": "Stale Proofs",
+        "groups": group_by_salesperson(stale_proof_items(include_reminded=True)),
+    }
+    return render(request, "workflow/misc/stale_proofs.html", context=pagevars)
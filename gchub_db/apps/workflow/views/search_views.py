@@ -13,8 +13,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import Permission, User, Group
 from django.contrib.sites.models import Site
 from django.db import models
-from django.db.models import Q
-from django.http import HttpResponse, HttpResponseRedirect
+from django.db.models import Count, Q
+from django.http import HttpResponse
 from django.shortcuts import render
 from django.urls import reverse
 from django.utils import timezone
@@ -49,7 +49,10 @@ from gchub_db.apps.workflow.models import (
     SpecialMfgConfiguration,
 )
 from gchub_db.includes import general_funcs
+from gchub_db.includes.choice_lists import CachedModelChoiceField
 from gchub_db.includes.gold_json import JSMessage
+from gchub_db.includes.pagination import ResultListMixin
+from gchub_db.includes.widgets import AutocompleteSelect
 
 
 def _groups_for_permission(codename):
@@ -294,7 +297,7 @@ def review(request, category):
         return render(request, "workflow/plant_review/review.html", context=pagevars)
 
 
-class ReviewSearchResults(ListView):
+class ReviewSearchResults(ResultListMixin, ListView):
     """Displays plant review search results."""
 
     # Set up ListView stuff.
@@ -643,17 +646,27 @@ class JobSearchForm(forms.Form):
     # This permission must be assigned via the Group.
     # This is a list of people past and present who have worked at clemson at some point
     # This is mainly used for job and item searching.
+    # These lists are long, so only the selected user is rendered and the rest
+    # are looked up with user_autocomplete.
     grouped_artist_users = group_members = User.objects.filter(groups__name="ClemsonPersonnel").order_by("username")
-    artist = forms.ModelChoiceField(queryset=None, required=False)
+    artist = forms.ModelChoiceField(queryset=None, required=False, widget=AutocompleteSelect("user_autocomplete", {"role": "artist"}))
 
     grouped_sales_users = User.objects.filter(groups__in=_groups_for_permission("salesperson")).order_by("username")
-    salesperson = forms.ModelChoiceField(queryset=None, required=False)
+    salesperson = forms.ModelChoiceField(
+        queryset=None, required=False, widget=AutocompleteSelect("user_autocomplete", {"role": "salesperson"})
+    )
 
     grouped_csr_users = User.objects.filter(is_active=True, groups__in=_groups_for_permission("is_fsb_csr")).order_by("username")
 
-    csr = forms.ModelChoiceField(queryset=grouped_csr_users, required=False)
+    csr = forms.ModelChoiceField(
+        queryset=grouped_csr_users, required=False, widget=AutocompleteSelect("user_autocomplete", {"role": "csr"})
+    )
 
-    printgroup = forms.ModelChoiceField(queryset=QAD_PrintGroups.objects.all().order_by("name"), required=False)
+    printgroup = forms.ModelChoiceField(
+        queryset=QAD_PrintGroups.objects.all().order_by("name"),
+        required=False,
+        widget=AutocompleteSelect("printgroup_autocomplete"),
+    )
     # Build list of prepress suppliers, an option search field.
     prepress_choices = []
     prepress_choices.append(("", "---------"))
@@ -680,7 +693,7 @@ class JobSearchForm(forms.Form):
         self.fields["salesperson"].queryset = sales_qset
 
 
-class JobSearchResultsView(ListView):
+class JobSearchResultsView(ResultListMixin, ListView):
     paginate_by = 25
     template_name = "workflow/search/search_results.html"
     form = None
@@ -875,14 +888,19 @@ class JobSearchResultsView(ListView):
 
         return context
 
+    def single_result_url(self, job):
+        return reverse("job_detail", args=[job.id])
+
+    def count_is_estimable(self):
+        # Browsing without a search lists nearly the whole jobs table. The
+        # estimate is the planner's for the query, so it allows for the
+        # workflow access filter.
+        return self.form is None
+
     # Require the user to be logged in to GOLD to view.
     @method_decorator(login_required)
     def dispatch(self, *args, **kwargs):
-        if self.get_queryset().count() == 1:
-            job_detail_url = reverse("job_detail", args=[self.get_queryset()[0].id])
-            return HttpResponseRedirect(job_detail_url)
-        else:
-            return super(JobSearchResultsView, self).dispatch(*args, **kwargs)
+        return super(JobSearchResultsView, self).dispatch(*args, **kwargs)
 
 
 # @login_required  # Temporarily disabled for testing
@@ -921,7 +939,7 @@ def job_search(request):
 # this is some shim sham to make the label for ItemTrackerType "Nutrition Facts" return as
 # "New Nutrition Facts" rather than modify the current 114 objects this is attached to.
 # Eventually we wont need the New so we can just delete this.
-class TrackerModelChoiceField(forms.ModelChoiceField):
+class TrackerModelChoiceField(CachedModelChoiceField):
     def label_from_instance(self, obj):
         return "New " + obj.name
 
@@ -960,9 +978,15 @@ class ItemSearchForm(forms.Form):
     plant_comments = forms.CharField(required=False, help_text="Search in plant comments")
     mkt_review_comments = forms.CharField(required=False, help_text="Search in marketing review comments")
 
-    plant = forms.ModelChoiceField(queryset=Plant.objects.none(), required=False)
-    press = forms.ModelChoiceField(queryset=Press.objects.none(), required=False)
-    platemaker = forms.ModelChoiceField(queryset=Platemaker.objects.none(), required=False)
+    # Filtered per user in __init__, the lists are cached per set of workflows.
+    plant = CachedModelChoiceField(queryset=Plant.objects.none(), cache_name="search_plants", required=False)
+    press = CachedModelChoiceField(queryset=Press.objects.none(), cache_name="search_presses", required=False)
+    platemaker = CachedModelChoiceField(
+        queryset=Platemaker.objects.none(),
+        cache_name="search_platemakers",
+        cache_models=(Platemaker, Platemaker.workflow.through),
+        required=False,
+    )
 
     # New code --- Search for number of colors in job
     color_num_low = forms.IntegerField(min_value=0, max_value=9, required=False)
@@ -976,7 +1000,9 @@ class ItemSearchForm(forms.Form):
         platetype_choices.append(type)
     platetype = forms.ChoiceField(choices=platetype_choices, required=False)
 
-    specialmfg = forms.ModelChoiceField(queryset=SpecialMfgConfiguration.objects.none(), required=False)
+    specialmfg = CachedModelChoiceField(
+        queryset=SpecialMfgConfiguration.objects.none(), cache_name="search_specialmfg", required=False
+    )
 
     # Build list of prepress suppliers, an option search field.
     prepress_choices = []
@@ -1012,17 +1038,21 @@ class ItemSearchForm(forms.Form):
     # This is a list of people past and present who have worked at clemson at some point
     # This is mainly used for job and item searching.
     grouped_artist_users = group_members = User.objects.filter(groups__name="ClemsonPersonnel").order_by("username")
-    artist = forms.ModelChoiceField(queryset=grouped_artist_users, required=False)
+    artist = forms.ModelChoiceField(
+        queryset=grouped_artist_users, required=False, widget=AutocompleteSelect("user_autocomplete", {"role": "artist"})
+    )
 
     grouped_sales_users = User.objects.filter(groups__in=_groups_for_permission("salesperson")).order_by("username")
-    salesperson = forms.ModelChoiceField(queryset=grouped_sales_users, required=False)
+    salesperson = forms.ModelChoiceField(
+        queryset=grouped_sales_users, required=False, widget=AutocompleteSelect("user_autocomplete", {"role": "salesperson"})
+    )
 
     nut_trackers = ItemTrackerType.objects.filter(category__name="Beverage Nutrition")
-    nutrition = TrackerModelChoiceField(queryset=nut_trackers, required=False)
+    nutrition = TrackerModelChoiceField(queryset=nut_trackers, cache_name="search_nutrition_trackers", required=False)
     mkt_trackers = ItemTrackerType.objects.filter(category__name="Marketing")
-    marketing = forms.ModelChoiceField(queryset=mkt_trackers, required=False)
+    marketing = CachedModelChoiceField(queryset=mkt_trackers, cache_name="search_marketing_trackers", required=False)
     promo_trackers = ItemTrackerType.objects.filter(category__name="Promotional")
-    promo = forms.ModelChoiceField(queryset=promo_trackers, required=False)
+    promo = CachedModelChoiceField(queryset=promo_trackers, cache_name="search_promo_trackers", required=False)
     workflow = WorkflowModelChoiceField(queryset=Site.objects.all().exclude(name="Container"), required=False)
     sort_by = forms.ChoiceField(choices=[("id", "Job #")], required=False)
     sort_order = forms.ChoiceField(choices=[("desc", "Descending"), ("asc", "Ascending")], required=False)
@@ -1046,6 +1076,8 @@ class ItemSearchForm(forms.Form):
 
         # Get the workflows that this user has access to.
         user_workflows = general_funcs.get_user_workflow_access(request)
+        for field_name in ("plant", "press", "platemaker", "specialmfg"):
+            self.fields[field_name].cache_variant = user_workflows
         # Only display plants linked to workflows the user has access to.
         self.fields["plant"].queryset = Plant.objects.filter(workflow__name__in=user_workflows).order_by("name")
         # Only display presses linked to workflows the user has access to.
@@ -1058,7 +1090,7 @@ class ItemSearchForm(forms.Form):
         )
 
 
-class ItemSearchResultsView(ListView):
+class ItemSearchResultsView(ResultListMixin, ListView):
     paginate_by = 25
     template_name = "workflow/search/search_results.html"
     form = None
@@ -1341,25 +1373,12 @@ class ItemSearchResultsView(ListView):
             s_max_colors = self.form.cleaned_data.get("color_num_high", None)
 
             if s_min_colors or s_max_colors:
-                result_list = []
-
-                if s_min_colors and s_max_colors:
-                    for item in qset:
-                        num_colors = ItemColor.objects.filter(item=item).count()
-                        if num_colors >= s_min_colors and num_colors <= s_max_colors:
-                            result_list.append(item.id)
-                elif s_min_colors:
-                    for item in qset:
-                        num_colors = ItemColor.objects.filter(item=item).count()
-                        if num_colors >= s_min_colors:
-                            result_list.append(item.id)
-                elif s_max_colors:
-                    for item in qset:
-                        num_colors = ItemColor.objects.filter(item=item).count()
-                        if num_colors <= s_max_colors:
-                            result_list.append(item.id)
-
-                qset = qset.filter(id__in=result_list)
+                # Count each item's colors in the query, rather than one query per item.
+                qset = qset.annotate(num_colors=Count("itemcolor"))
+                if s_min_colors:
+                    qset = qset.filter(num_colors__gte=s_min_colors)
+                if s_max_colors:
+                    qset = qset.filter(num_colors__lte=s_max_colors)
 
             # Sort records.
             sort = self.form.cleaned_data.get("sort_order", "desc")
@@ -1382,14 +1401,13 @@ class ItemSearchResultsView(ListView):
 
         return context
 
+    def single_result_url(self, item):
+        return reverse("job_detail", args=[item.job_id])
+
     # Require the user to be logged in to GOLD to view.
     @method_decorator(login_required)
     def dispatch(self, *args, **kwargs):
-        if self.get_queryset().count() == 1:
-            job_detail_url = reverse("job_detail", args=[self.get_queryset()[0].job.id])
-            return HttpResponseRedirect(job_detail_url)
-        else:
-            return super(ItemSearchResultsView, self).dispatch(*args, **kwargs)
+        return super(ItemSearchResultsView, self).dispatch(*args, **kwargs)
 
 
 @login_required
@@ -1420,7 +1438,7 @@ def item_search(request):
         return render(request, template_name, context=pagevars)
 
 
-class ItemFindSame(ListView):
+class ItemFindSame(ResultListMixin, ListView):
     """Do a quick search for all items of the same name."""
 
     paginate_by = 25
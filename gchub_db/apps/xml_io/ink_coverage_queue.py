@@ -0,0 +1,291 @@
+"""
+Ink coverage import queue.
+
+Backstage drops ink coverage XML files into INK_COVERAGE_DIR. A file is
+claimed by renaming it into the processing directory; the rename is atomic,
+so several queue runners can share the folder without importing a file
+twice. Claimed files are parsed by a pool of worker processes and imported
+here, one transaction per file.
+
+Claimed files are stamped with the time they were claimed. Files still in
+the processing directory long after that belong to a runner that died part
+way through, and requeue_abandoned() puts them back when a runner starts.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from gchub_db.apps.joblog import app_defs as joblog_defs
+from gchub_db.apps.workflow.models import Job
+from gchub_db.apps.xml_io.ink_coverage_reader import (
+    InkCoverageDocument,
+    InkCoverageException,
+    parse_ink_coverage,
+)
+
+# Sub-folders of INK_COVERAGE_DIR, created as needed.
+PROCESSING_FOLDER = "processing"
+PROCESSED_FOLDER = "processed"
+INVALID_FOLDER = "invalid"
+INK_COVERAGE_WORKERS = getattr(settings, "INK_COVERAGE_WORKERS", 4)
+INK_COVERAGE_BATCH_SIZE = getattr(settings, "INK_COVERAGE_BATCH_SIZE", 20)
+# When True, send JobLog and Growl notifications about errors.
+SEND_ERROR_NOTIFICATIONS = True
+# When True, successfully processed files are deleted and not retained.
+DELETE_PROCESSED_FILES = True
+# Coverages for the same item are imported at least this many seconds apart,
+# so the JDF files they trigger don't overwrite each other.
+SAME_ITEM_INTERVAL = 1.0
+# Claimed files left in the processing directory this many seconds are taken
+# to have been abandoned by a runner that died, and are queued again.
+ABANDONED_CLAIM_SECONDS = 10 * 60
+IGNORED_FILES = (".DS_Store",)
+UNEXPECTED_ERROR = "An unexpected error has occured during ink coverage processing. Please contact support."
+
+
+def queue_dir(folder):
+    """The path of one of the queue's sub-folders."""
+    return os.path.join(settings.INK_COVERAGE_DIR, folder)
+
+
+def parse_coverage_file(path):
+    """
+    Parses one claimed coverage file. Runs in a worker process, so it only
+    reads the file and reports back (parsed dict, error message).
+    """
+    try:
+        return parse_ink_coverage(path), None
+    except InkCoverageException as ex:
+        return None, ex.message
+    except Exception as ex:
+        print("Unexpected error parsing %s: %s" % (path, ex))
+        return None, UNEXPECTED_ERROR
+
+
+class InkCoverageQueue:
+    """Claims ink coverage files, parses them in a process pool and imports them."""
+
+    def __init__(self, workers=INK_COVERAGE_WORKERS, batch_size=INK_COVERAGE_BATCH_SIZE, debug=False):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.debug = debug
+        # (job id, item number) -> when its last coverage was imported.
+        self.last_imported = {}
+
+    def make_dirs(self):
+        """Creates the processing, processed and invalid directories if missing."""
+        for folder in (PROCESSING_FOLDER, PROCESSED_FOLDER, INVALID_FOLDER):
+            os.makedirs(queue_dir(folder), exist_ok=True)
+
+    def requeue_abandoned(self, max_age=ABANDONED_CLAIM_SECONDS):
+        """
+        Moves files claimed more than max_age seconds ago back into the queue.
+        Files claimed more recently may still be in another runner's hands
+        and are left alone. Returns the names of the files requeued.
+        """
+        self.make_dirs()
+        cutoff = time.time() - max_age
+        requeued = []
+        with os.scandir(queue_dir(PROCESSING_FOLDER)) as entries:
+            for entry in entries:
+                waiting_path = os.path.join(settings.INK_COVERAGE_DIR, entry.name)
+                try:
+                    if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                        continue
+                    if os.path.lexists(waiting_path):
+                        # A newer copy is waiting; leave this one for review.
+                        print("! Not requeueing %s, another copy is waiting." % entry.name)
+                        continue
+                    os.rename(entry.path, waiting_path)
+                except FileNotFoundError:
+                    # Another runner requeued it first.
+                    continue
+                requeued.append(entry.name)
+        return requeued
+
+    def claim(self):
+        """
+        Claims up to batch_size waiting files, oldest first, by moving them
+        into the processing directory. Files another runner got to first are
+        skipped. Returns the claimed paths.
+        """
+        waiting = []
+        with os.scandir(settings.INK_COVERAGE_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name not in IGNORED_FILES:
+                    try:
+                        waiting.append((entry.stat().st_mtime, entry.name))
+                    except FileNotFoundError:
+                        continue
+
+        claimed = []
+        for mtime, name in sorted(waiting):
+            dest_path = self.claim_file(name)
+            if dest_path is None:
+                continue
+            claimed.append(dest_path)
+            if len(claimed) >= self.batch_size:
+                break
+        return claimed
+
+    def claim_file(self, name):
+        """
+        Claims one waiting file. Returns its path in the processing directory,
+        or None if another runner claimed it first.
+        """
+        self.make_dirs()
+        waiting_path = os.path.join(settings.INK_COVERAGE_DIR, name)
+        dest_path = os.path.join(queue_dir(PROCESSING_FOLDER), name)
+        try:
+            os.rename(waiting_path, dest_path)
+        except FileNotFoundError:
+            if os.path.lexists(waiting_path):
+                # The file is still there, so the processing directory isn't.
+                raise
+            return None
+        # Record when it was claimed, for requeue_abandoned().
+        os.utime(dest_path)
+        return dest_path
+
+    def move_to_invalid(self, path, error_msg, job=None):
+        """
+        Moves a claimed file to the invalid directory and routes the error
+        message to the joblog and Growl.
+        """
+        if SEND_ERROR_NOTIFICATIONS and error_msg and job:
+            # Note the error in the joblog for the item's job.
+            job.do_create_joblog_entry(joblog_defs.JOBLOG_TYPE_ERROR, error_msg)
+
+            # Strip all HTML tags out for Growl.
+            growl_error_msg = "".join(BeautifulSoup(error_msg, "lxml").findAll(text=True))
+            # Notify the artist via Growl pop-up.
+            job.growl_at_artist(
+                "Ink Coverage Error: %s %s" % (job.id, job.name),
+                growl_error_msg,
+                pref_field="growl_hear_jdf_processes",
+            )
+        # Print it out to the console.
+        print("ERROR:", error_msg)
+        # Move to the invalid directory for later review.
+        os.replace(path, os.path.join(queue_dir(INVALID_FOLDER), os.path.basename(path)))
+
+    def _space_out_item(self, job_id, item_num):
+        key = (job_id, str(item_num))
+        last = self.last_imported.get(key)
+        if last is not None:
+            wait = SAME_ITEM_INTERVAL - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+        self.last_imported[key] = time.monotonic()
+
+    def import_file(self, path, parsed, error_msg=None):
+        """
+        Imports one parsed coverage file and disposes of it. Returns True if
+        it was imported, False if it was moved to the invalid directory.
+        """
+        doc = InkCoverageDocument(path, debug=self.debug, parsed=parsed or {})
+        job = None
+        try:
+            job = Job.objects.select_related("workflow").get(id=doc.get_job_number())
+            if error_msg:
+                self.move_to_invalid(path, error_msg, job)
+                return False
+            item_num = doc.get_item_number()
+            try:
+                item = job.get_item_num(item_num)
+            except IndexError:
+                error_msg = "An ink coverage was sent for %s-%s, but no such item exists in GOLD." % (job.id, item_num)
+                self.move_to_invalid(path, error_msg, job)
+                return False
+
+            # Store the path to the PDF file on the Item.
+            item.path_to_file = doc.get_pdf_path()
+            print("@> Path to file:", item.path_to_file)
+            if self.debug:
+                print("@> Job #:", job.id)
+                print("@> Item #:", item_num)
+                print("@> Inks:", doc.get_ink_str_list())
+
+            if not item.printlocation:
+                item.save()
+                error_msg = (
+                    "An ink coverage was sent for %s-%s, but lacks a print location. "
+                    "Please set one and re-send the ink coverage." % (job.id, item_num)
+                )
+                self.move_to_invalid(path, error_msg, job)
+                return False
+
+            self._space_out_item(job.id, item_num)
+            doc.import_coverage(job, item)
+        except InkCoverageException as instance:
+            self.move_to_invalid(path, instance.message, job)
+            return False
+        except Exception:
+            print("Unexpected error:", sys.exc_info())
+            self.move_to_invalid(path, error_msg or UNEXPECTED_ERROR, job)
+            return False
+
+        # Everything was fine, get rid of the old ink coverage.
+        if DELETE_PROCESSED_FILES:
+            os.remove(path)
+        else:
+            # We're not deleting files, send them to the processed directory.
+            os.replace(path, os.path.join(queue_dir(PROCESSED_FOLDER), os.path.basename(path)))
+        return True
+
+    def import_waiting_file(self, name):
+        """
+        Claims, parses and imports one waiting file in this process, for the
+        hot folder watcher. Returns None if the file was already claimed.
+        """
+        path = self.claim_file(name)
+        if path is None:
+            return None
+        parsed, error_msg = parse_coverage_file(path)
+        return self.import_file(path, parsed, error_msg)
+
+    def drain(self, forever=False, poll_interval=5, verbose=True):
+        """
+        Imports waiting coverage files until the folder is empty. With forever
+        set, keeps polling the folder every poll_interval seconds instead of
+        returning. Returns a dict of imported/invalid counts.
+        """
+        stats = {"imported": 0, "invalid": 0}
+        started = time.monotonic()
+        requeued = self.requeue_abandoned()
+        if requeued and verbose:
+            print("%d abandoned files requeued." % len(requeued))
+        # Workers need Django set up to unpickle parse_coverage_file under spawn.
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup) as pool:
+            while True:
+                paths = self.claim()
+                if not paths:
+                    if not forever:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                futures = [(path, pool.submit(parse_coverage_file, path)) for path in paths]
+                for path, future in futures:
+                    if verbose:
+                        print("-> Reading:", path)
+                    parsed, error_msg = future.result()
+                    if self.import_file(path, parsed, error_msg):
+                        stats["imported"] += 1
+                    else:
+                        stats["invalid"] += 1
+
+        if verbose:
+            elapsed = max(time.monotonic() - started, 0.001)
+            total = sum(stats.values())
+            print(
+                "%d files (%d imported, %d invalid) in %.1fs, %.1f files/sec"
+                % (total, stats["imported"], stats["invalid"], elapsed, total / elapsed)
+            )
+        return stats
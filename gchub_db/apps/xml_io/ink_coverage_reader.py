@@ -1,14 +1,52 @@
-"""Reads in ink coverage XMLs from backstage."""
+"""
+Reads in ink coverage XMLs from backstage.
 
-import urllib
-from xml.dom import minidom
+parse_ink_coverage() reads a coverage file in one streaming pass into plain
+values, so it can run in a worker process (see ink_coverage_queue).
+InkCoverageDocument imports the result: the item's ItemColors, the color
+definitions and the color warnings are each fetched once per file, matched
+in memory, and written back in bulk in one transaction.
+"""
+
+import os
+import urllib.parse
+from xml.etree import ElementTree
 
 from colormath.color_objects import sRGBColor
+from django.db import transaction
+from django.db.models.functions import Lower
 
+from gchub_db.apps.catscanner.item_colors import invalidate_job_colors
 from gchub_db.apps.color_mgt.models import ColorDefinition
 from gchub_db.apps.joblog import app_defs as joblog_defs
 from gchub_db.apps.workflow.models import ColorWarning, ItemColor
 
+# Sections of the coverage file that are read. Like getElementsByTagName()[0],
+# only the first of each is used.
+INKS_TAG = "egGr:inks"
+COVERAGES_TAG = "egInkCovL:coverage"
+DESCRIPTION_TAG = "dc:description"
+DERIVED_FROM_TAG = "egPrF:DerivedFrom"
+SECTION_TAGS = (INKS_TAG, COVERAGES_TAG, DESCRIPTION_TAG, DERIVED_FROM_TAG)
+
+# Values kept for each rdf:li in the ink and coverage lists.
+INK_FIELDS = ("egInk:name", "egInk:book", "egInk:type", "egInk:angle", "egInk:r", "egInk:g", "egInk:b", "egInk:frequency")
+COVERAGE_FIELDS = ("egInkCov:pct", "egInkCov:mm2")
+
+# Carton process inks are matched by the material number in ItemColor.color.
+CARTON_PROCESS_COLORS = {
+    "Process Black": "90985234",
+    "Process Cyan": "90985253",
+    "Process Magenta": "90984629",
+    "Process Yellow": "90985250",
+}
+
+# Certain plastic sizes should not get color warnings.
+COLOR_WARNING_EXCLUDED_SIZES = ("pmrp", "pmrk", "ptrpc", "ptrpt", "ptrpw")
+
+# ItemColor fields filled in from the coverage file.
+ITEMCOLOR_FIELDS = ("definition", "hexvalue", "coverage_perc", "coverage_sqin", "lpi", "angle")
+
 
 class InkCoverageException(Exception):
     """Generic un-recoverable ink coverage problem."""
@@ -20,17 +58,102 @@ class InkCoverageException(Exception):
         return self.message
 
 
+def _qualified_tag(tag, prefixes):
+    """Turns an ElementTree {uri}local tag back into the file's prefix:local."""
+    if tag[0] != "{":
+        return tag
+    uri, local = tag[1:].split("}", 1)
+    return "%s:%s" % (prefixes.get(uri, uri), local)
+
+
+def parse_ink_coverage(xml_file_path):
+    """
+    Reads an ink coverage XML file with iterparse, clearing each element once
+    it has been read. Returns a dict of plain values:
+
+        {"pdf_path": ..., "disclaimer": ..., "vsize": ..., "hsize": ...,
+         "inks": [{"name": ..., "book": ..., "angle": ..., "pct": ..., ...}]}
+
+    Each ink carries the egInk: values from its rdf:li in the ink list and
+    the egInkCov: values from the rdf:li at the same position in the
+    coverage list. Values are the raw strings from the file.
+    """
+    prefixes = {}
+    depth = 0
+    section = section_depth = None
+    finished_sections = set()
+    record = record_depth = None
+    inks = []
+    coverages = []
+    parsed = {"pdf_path": None, "disclaimer": None, "vsize": None, "hsize": None}
+
+    for event, value in ElementTree.iterparse(xml_file_path, events=("start-ns", "start", "end")):
+        if event == "start-ns":
+            prefix, uri = value
+            prefixes.setdefault(uri, prefix)
+            continue
+        tag = _qualified_tag(value.tag, prefixes)
+        if event == "start":
+            depth += 1
+            if section is None and tag in SECTION_TAGS and tag not in finished_sections:
+                section, section_depth = tag, depth
+            elif section in (INKS_TAG, COVERAGES_TAG) and tag == "rdf:li" and record is None:
+                record, record_depth = {}, depth
+            continue
+
+        text = value.text or ""
+        if record is not None and tag in (INK_FIELDS if section == INKS_TAG else COVERAGE_FIELDS):
+            record.setdefault(tag.split(":", 1)[1], text)
+        elif section == DESCRIPTION_TAG and tag == "rdf:li" and "disclaimer" not in finished_sections:
+            parsed["disclaimer"] = value.text
+            finished_sections.add("disclaimer")
+        elif section == DERIVED_FROM_TAG and tag == "stRef:instanceID" and parsed["pdf_path"] is None:
+            parsed["pdf_path"] = text
+        elif tag in ("egGr:vsize", "egGr:hsize") and parsed[tag[5:]] is None:
+            parsed[tag[5:]] = text
+
+        if depth == record_depth:
+            (inks if section == INKS_TAG else coverages).append(record)
+            record = record_depth = None
+        if depth == section_depth:
+            finished_sections.add(section)
+            section = section_depth = None
+        depth -= 1
+        # Everything needed from the element has been read.
+        value.clear()
+
+    for ink, coverage in zip(inks, coverages):
+        for name, text in coverage.items():
+            ink.setdefault(name, text)
+    parsed["inks"] = inks
+    return parsed
+
+
+def _get_one(itemcolors, matches):
+    """Like ItemColor.objects.get(), over an already fetched list of ItemColors."""
+    found = [ic for ic in itemcolors if matches(ic)]
+    if not found:
+        raise ItemColor.DoesNotExist("ItemColor matching query does not exist.")
+    if len(found) > 1:
+        raise ItemColor.MultipleObjectsReturned("get() returned more than one ItemColor -- it returned %d!" % len(found))
+    return found[0]
+
+
+def _definition_name(ic):
+    return ic.definition.name if ic.definition else None
+
+
 class InkNode(object):
-    """Abstraction for INK nodes in the XML document."""
+    """Abstraction for an ink parsed out of the XML document."""
 
-    def __init__(self, ink_node):
-        self.ink_node = ink_node
+    def __init__(self, ink):
+        self.ink = ink
         self.ink_name = self.determine_ink_db_name()
-        self.ink_angle = float(self.ink_node.getElementsByTagName("egInk:angle")[0].firstChild.nodeValue)
-        self.rgb_r = float(self.ink_node.getElementsByTagName("egInk:r")[0].firstChild.nodeValue)
-        self.rgb_g = float(self.ink_node.getElementsByTagName("egInk:g")[0].firstChild.nodeValue)
-        self.rgb_b = float(self.ink_node.getElementsByTagName("egInk:b")[0].firstChild.nodeValue)
-        self.ink_lpi = float(self.ink_node.getElementsByTagName("egInk:frequency")[0].firstChild.nodeValue)
+        self.ink_angle = float(self.ink["angle"])
+        self.rgb_r = float(self.ink["r"])
+        self.rgb_g = float(self.ink["g"])
+        self.rgb_b = float(self.ink["b"])
+        self.ink_lpi = float(self.ink["frequency"])
 
     def __str__(self):
         return self.ink_name
@@ -40,15 +163,19 @@ class InkNode(object):
         Abstract this here, since it sometimes throws an IndexError if the
         node is without coverage data.
         """
-        return float(self.ink_node.getElementsByTagName("egInkCov:pct")[0].firstChild.nodeValue)
+        if "pct" not in self.ink:
+            raise IndexError("No coverage percentage for %s" % self.ink_name)
+        return float(self.ink["pct"])
 
     def get_coverage_sq_inch(self):
         """
         Abstract this here, since it sometimes throws an IndexError if the
         node is without coverage data.
         """
+        if "mm2" not in self.ink:
+            raise IndexError("No coverage area for %s" % self.ink_name)
         # .00155 Converts from inches to mm
-        return float(self.ink_node.getElementsByTagName("egInkCov:mm2")[0].firstChild.nodeValue) * 0.00155
+        return float(self.ink["mm2"]) * 0.00155
 
     def get_color_hex_value(self):
         """Get the RGB values and spit out some hex."""
@@ -73,8 +200,8 @@ class InkNode(object):
         Given an ink_node, determine the ink's name as per the database. For
         example, GCH 123 or Warm Red.
         """
-        ink_book = self.ink_node.getElementsByTagName("egInk:book")[0].firstChild.nodeValue
-        ink_name = self.ink_node.getElementsByTagName("egInk:name")[0].firstChild.nodeValue
+        ink_book = self.ink["book"]
+        ink_name = self.ink["name"]
 
         if "ppasc" in ink_book:
             temp_ink_name = ink_name.split(" ")
@@ -88,15 +215,11 @@ class InkNode(object):
                     "Proper ink name could not be determined for %s in the inkbook: %s. Ink coverage failed." % (ink_name, ink_book)
                 )
 
-        try:
-            # Sometimes ink that aren't in the ink book won't have a TYPE
-            # attribute.
-            ink_type = self.ink_node.getElementsByTagName("egInk:type")[0].firstChild.nodeValue
-        except KeyError:
-            # In these cases, it's unknown whether we're dealing with a
-            # process color. 99% of the times, this will not be a process
-            # color. Give the ink type a value accordingly.
-            ink_type = "UNK"
+        # Sometimes ink that aren't in the ink book won't have a TYPE
+        # attribute. In these cases, it's unknown whether we're dealing with a
+        # process color. 99% of the times, this will not be a process
+        # color. Give the ink type a value accordingly.
+        ink_type = self.ink.get("type", "UNK")
 
         if "process" in ink_type:
             # This is a process color.
@@ -107,60 +230,58 @@ class InkNode(object):
 
         return "%s%s" % (name_prefix, ink_name)
 
-    def lookup_itemcolor(self, item):
+    def lookup_itemcolor(self, item, itemcolors):
         """
         Searches for an itemcolor by name. If it doesn't exist return None.
 
         item: (Item) The item that's being manipulated.
+        itemcolors: (list) The item's ItemColors, already fetched.
         """
         workflow_name = item.job.workflow.name
+        ink_name = self.ink_name.lower()
 
         try:
             """
             Beverage and carton items work the same here, error if the itemcolor is not already in GOLD
             """
             if workflow_name == "Foodservice":
-                return ItemColor.objects.get(item=item, color__iexact=self.ink_name, angle=str(self.ink_angle))
+                angle = str(self.ink_angle)
+                return _get_one(itemcolors, lambda ic: ic.color.lower() == ink_name and str(ic.angle) == angle)
             elif workflow_name == "Beverage":
-                return ItemColor.objects.get(item=item, color__iexact=self.ink_name)
+                return _get_one(itemcolors, lambda ic: ic.color.lower() == ink_name)
             else:
                 # This should be just carton items at this point.
-                ink_type = self.ink_node.getElementsByTagName("egInk:type")[0].firstChild.nodeValue
+                ink_type = self.ink.get("type", "")
                 # Need to capitalize the first color here to match how colors are in our system
-                ink_name = self.ink_node.getElementsByTagName("egInk:name")[0].firstChild.nodeValue.capitalize()
+                raw_name = self.ink["name"].capitalize()
                 # Sometimes process black is used as a place-holder for low carbon black.
-                if ink_type == "process" and ink_name == "Black":
+                if ink_type == "process" and raw_name == "Black":
                     try:  # Return the low carbon item color, if there is one.
-                        return ItemColor.objects.get(item=item, definition__name="Low-Carbon Black")
+                        return _get_one(itemcolors, lambda ic: _definition_name(ic) == "Low-Carbon Black")
                     except Exception:  # No low carbon ink item color? Carry on.
                         pass
                 # Process color logic
-                if ink_type == "process" and ink_name in [
+                if ink_type == "process" and raw_name in [
                     "Black",
                     "Cyan",
                     "Magenta",
                     "Yellow",
                 ]:
-                    colorDict = {
-                        "Process Black": "90985234",
-                        "Process Cyan": "90985253",
-                        "Process Magenta": "90984629",
-                        "Process Yellow": "90985250",
-                    }
-                    return ItemColor.objects.get(
-                        item=item,
-                        color__iexact=colorDict["Process %s" % (ink_name)],
-                        definition__name="Process %s" % (ink_name),
+                    process_name = "Process %s" % raw_name
+                    material = CARTON_PROCESS_COLORS[process_name].lower()
+                    return _get_one(
+                        itemcolors,
+                        lambda ic: ic.color.lower() == material and _definition_name(ic) == process_name,
                     )
                 # Spot color logic
                 else:
                     # Search by color first.
                     try:
-                        return ItemColor.objects.get(item=item, color__iexact=self.ink_name)
+                        return _get_one(itemcolors, lambda ic: ic.color.lower() == ink_name)
                     except Exception:
                         pass
                     # Search by defintion if nothing was found by color.
-                    return ItemColor.objects.get(item=item, definition__name=self.ink_name)
+                    return _get_one(itemcolors, lambda ic: _definition_name(ic) == self.ink_name)
 
         except ItemColor.DoesNotExist:
             """
@@ -189,46 +310,39 @@ class InkNode(object):
 
 
 class InkCoverageDocument(object):
-    """Class for parsing and importing ink coverage XML documents."""
+    """Class for importing a parsed ink coverage XML document."""
 
-    # Head of the XML structure
-    jdoc = None
-    # Shortcut reference to the document's first child
-    doc_root = None
     # When false, print some debugging stuff
     debug = False
     # Full path to the XML file
     xml_file = None
 
-    def __init__(self, xml_file_path, debug=False):
+    def __init__(self, xml_file_path, debug=False, parsed=None):
         """
         Arguments:
-        * xml_file_path (String): Full path to the XML file to parse
+        * xml_file_path (String): Full path to the XML file
         * debug (bool): When true, print debugging info
+        * parsed (dict): The file as returned by parse_ink_coverage(), if it
+          has already been parsed (in a worker process, say)
 
         """
-        # Parse the XML file path string and return the XML node structure.
-        self.jdoc = minidom.parse(xml_file_path)
         self.xml_file = xml_file_path
-        print(self.xml_file)
-        # Shortcut reference to the document's first child, where things
-        # start getting interesting (bypassing the paf:INFO node).
-        self.doc_root = self.jdoc.firstChild
         self.debug = debug
+        self.parsed = parsed if parsed is not None else parse_ink_coverage(xml_file_path)
+
+    def _file_name(self):
+        return os.path.basename(self.xml_file)
 
     def get_job_number(self):
         """Returns the job number based on the XML file's file name."""
-        # Grab the file name out of the full path by taking everything after
-        # the last forward slash.
-        file_name = self.xml_file.split("/")[-1:]
         # Anything before the dash should be a job number.
-        return file_name[0].split("-")[0]
+        return self._file_name().split("-")[0]
 
     def get_item_number(self):
         """Returns the item number."""
         # Get everything after the dash, then split by the period character
         # and get the first thing in that list (the item's number)
-        remove_space = self.xml_file.split(" ")[0]
+        remove_space = self._file_name().split(" ")[0]
         second_half = remove_space.split("-")[1]
         minus_extension = second_half.split(".")[0]
         minus_nojdf = minus_extension.split("_")[0]
@@ -241,8 +355,9 @@ class InkCoverageDocument(object):
         If windows_format is True, make the slashes forward slashes and
         pre-pend file://. If False, return the raw path (more UNIX-style).
         """
-        jobRef = self.jdoc.getElementsByTagName("egPrF:DerivedFrom")[0]
-        raw_path = jobRef.getElementsByTagName("stRef:instanceID")[0].firstChild.nodeValue
+        raw_path = self.parsed["pdf_path"]
+        if raw_path is None:
+            raise InkCoverageException("The ink coverage does not reference a PDF file. Ink coverage failed.")
         less_raw_path = str(urllib.parse.unquote(urllib.parse.unquote(str(raw_path))))
         if windows_format:
             new_path = less_raw_path.replace("\\", "/")
@@ -251,16 +366,9 @@ class InkCoverageDocument(object):
         else:
             return raw_path
 
-    def _get_ink_nodes(self):
-        """Returns a NodeList of ink nodes."""
-        return self.jdoc.getElementsByTagName("egGr:inks")[0].getElementsByTagName("rdf:li")
-
     def get_ink_str_list(self):
         """Returns a list of the PDF's ink names in string format."""
-        inks = []
-        for node in self._get_ink_nodes():
-            inks.append(node.getElementsByTagName("egInk:name")[0].firstChild.nodeValue)
-        return inks
+        return [ink.get("name") for ink in self.parsed["inks"]]
 
     def _round_dimension(self, dim_float):
         """
@@ -281,11 +389,9 @@ class InkCoverageDocument(object):
 
         Returns True when dimensions match, False otherwise.
         """
-        vsize = (
-            float(self.doc_rootjdoc.getElementsByTagName("egGr:vsize")[0].firstChild.nodeValue) * 0.0393701
-        )  # Convert from mm to inch
+        vsize = float(self.parsed["vsize"]) * 0.0393701  # Convert from mm to inch
         vsize = self._round_dimension(vsize)
-        hsize = float(self.doc_root.getElementsByTagName("egGr:hsize")[0].firstChild.nodeValue) * 0.0393701  # Convert from mm to inch
+        hsize = float(self.parsed["hsize"]) * 0.0393701  # Convert from mm to inch
         hsize = self._round_dimension(hsize)
 
         try:
@@ -329,164 +435,179 @@ class InkCoverageDocument(object):
 
         item: (Item) The workflow Item object to import to.
         """
-        jinfo_node = self.jdoc.getElementsByTagName("dc:description")
-        if jinfo_node:
-            jinfo_nodes = jinfo_node[0].getElementsByTagName("rdf:li")
-            # If the tag can't be found, fail silently.
-            if jinfo_nodes:
-                jnode = jinfo_nodes[0]
-                dtext = jnode.firstChild.nodeValue
-                item.disclaimer_text = dtext
-                print("@> Importing Disclaimer:", dtext)
-            else:
-                # This allows artists to delete disclaimers if they had previously
-                # entered one they no longer want.
-                item.disclaimer_text = None
+        dtext = self.parsed["disclaimer"]
+        if dtext:
+            item.disclaimer_text = dtext
+            print("@> Importing Disclaimer:", dtext)
         else:
             # This allows artists to delete disclaimers if they had previously
             # entered one they no longer want.
             item.disclaimer_text = None
         item.save()
 
-    def import_itemcolors(self, job, item):
-        """Imports all of the ink data into ItemColor objects."""
-        workflow_name = job.workflow.name
+    def import_coverage(self, job, item):
+        """
+        Imports the disclaimer and all of the ink data for the item, with every
+        write in one transaction. Color warnings fail the coverage once the
+        colors are saved; otherwise the item is logged and sent on to proofing.
+        """
+        with transaction.atomic():
+            self.import_disclaimer(item)
+            warning_message = self.import_itemcolors(job, item)
+        if warning_message:
+            raise InkCoverageException(warning_message)
 
-        if workflow_name == "Foodservice":
-            # Foodservice wipes all item colors clean and re-populates them.
-            print("$> Foodservice job found, wiping existing ItemColors.")
-            item.itemcolor_set.all().delete()
+        item.do_create_joblog_entry(
+            joblog_defs.JOBLOG_TYPE_JDF,
+            "Ink coverage for item %d completed." % (item.num_in_job),
+        )
 
-        allCovers = self.jdoc.getElementsByTagName("egInkCovL:coverage")[0]
-        covers = allCovers.getElementsByTagName("rdf:li")
+        if job.workflow.name == "Foodservice" and "nojdf" not in self.xml_file:
+            # Fire off a JDF to print the proof.
+            print("-J> Triggering Foodservice JDF proofing.")
+            item.do_jdf_fsb_proof()
 
-        # Filter out technical inks
-        inkNodes = self._get_ink_nodes()
-        for x in range(len(inkNodes)):
-            newElement = self.jdoc.createElement("egInkCov:pct")
-            newElementText = self.jdoc.createTextNode(covers[x].getElementsByTagName("egInkCov:pct")[0].firstChild.nodeValue)
-            newElement.appendChild(newElementText)
-            inkNodes[x].appendChild(newElement)
+        if job.workflow.name == "Beverage" and "nojdf" not in self.xml_file:
+            # Fire off a JDF to print the proof.
+            print("-J> Triggering Beverage workflow.")
+            item.do_jdf_bev_workflow()
 
-            newElement = self.jdoc.createElement("egInkCov:mm2")
-            newElementText = self.jdoc.createTextNode(covers[x].getElementsByTagName("egInkCov:mm2")[0].firstChild.nodeValue)
-            newElement.appendChild(newElementText)
-            inkNodes[x].appendChild(newElement)
+    def _fetch_definitions(self, names, coating):
+        """Returns {lowercased name: ColorDefinition} for the given names and coating."""
+        definitions = {}
+        queryset = ColorDefinition.objects.annotate(name_lower=Lower("name")).filter(
+            coating=coating, name_lower__in={name.lower() for name in names}
+        )
+        for definition in queryset:
+            if definition.name_lower in definitions:
+                raise ColorDefinition.MultipleObjectsReturned("More than one %s %s color definition." % (definition.name, coating))
+            definitions[definition.name_lower] = definition
+        return definitions
 
-        ink_nodes = [InkNode(node) for node in inkNodes]
+    def _fetch_color_warnings(self, job, item, definition_ids):
+        """
+        Returns {definition id: ColorWarning} for the colors we cannot hit,
+        or nothing if the item shouldn't get color warnings.
+        """
+        # Press change jobs should not be caught by Color Warning
+        if job.duplicated_from:
+            return {}
+        # Check this item against the excluded sizes.
+        size_name = str(item.size.size).lower()
+        if any(excluded_size in size_name for excluded_size in COLOR_WARNING_EXCLUDED_SIZES):
+            return {}
+        warnings = {}
+        for warning in ColorWarning.objects.filter(definition_id__in=definition_ids):
+            warnings.setdefault(warning.definition_id, warning)
+        return warnings
+
+    def import_itemcolors(self, job, item):
+        """
+        Imports all of the ink data into ItemColor objects. Returns the
+        warning message for inks that fail the coverage, if there are any.
+        """
+        workflow_name = job.workflow.name
+
+        ink_nodes = [InkNode(ink) for ink in self.parsed["inks"]]
         ink_nodes = [node for node in ink_nodes if node.is_importable_ink()]
 
-        # Count the number of ink nodes in the coverage and ItemColor DB objects
-        ink_node_count = len(ink_nodes)
-        itemcolor_count = item.itemcolor_set.all().count()
+        if workflow_name == "Foodservice":
+            # Foodservice wipes all item colors clean and re-populates them.
+            print("$> Foodservice job found, wiping existing ItemColors.")
+            itemcolors = []
+        else:
+            itemcolors = list(item.itemcolor_set.select_related("definition"))
 
         # If the ink coverage node count for Beverage doesn't match the DB, fail.
-        if (workflow_name == "Beverage" or workflow_name == "Carton") and ink_node_count != itemcolor_count:
+        if (workflow_name == "Beverage" or workflow_name == "Carton") and len(ink_nodes) != len(itemcolors):
             # This gets JobLogged, the ink coverage is aborted.
             raise InkCoverageException(
                 "Mis-match in ink count between the ink coverage (%d) and the item in the database (%d). Ink coverage failed."
-                % (ink_node_count, itemcolor_count)
+                % (len(ink_nodes), len(itemcolors))
             )
 
+        coating = item.size.get_coating_type(return_abbrev=True)
+        definitions = self._fetch_definitions(
+            [node.ink_name for node in ink_nodes] + [ic.color for ic in itemcolors],
+            coating,
+        )
+
         # Go through each of the inks listed in the ink coverage document and
-        # import an ItemColor object associated to the job/item for each.
-        total_error_message = ""
-        exception = False
-        count = 0
+        # populate an ItemColor object associated to the job/item for each.
+        populated = []
         for node in ink_nodes:
-            # This creates an ItemColor object with the correct values filled.
-            ic = self.populate_itemcolor(node, job, item)
-            if ic:
-                # ItemColor was populated in some manner, save it.
-                ic.save()
-
-                # Check for colors we cannot hit
-                warnings = ColorWarning.objects.filter(definition=ic.definition)
-                if warnings and workflow_name == "Foodservice":
-                    warning = warnings[0]
-                    # Press change jobs should not be caught by Color Warning
-                    if not job.duplicated_from and warning.active:
-                        # Certain plastic sizes should not get color warnings
-                        excluded_sizes = ["pmrp", "pmrk", "ptrpc", "ptrpt", "ptrpw"]
-                        exclude_flag = False
-                        # Check this item against the excluded sizes.
-                        for excluded_size in excluded_sizes:
-                            if excluded_size in str(item.size.size).lower():
-                                exclude_flag = True
-                        # Go ahead if this isn't an excluded size.
-                        if not exclude_flag:
-                            count = count + 1
-                            total_error_message += "%d) Color warning: cannot hit %s. Replace with %s. \n " % (
-                                count,
-                                ic.color,
-                                warning.qpo_number,
-                            )
-                            exception = True
-
-                if workflow_name == "Beverage" and ic.lpi > 85:
-                    # Ink coverage fails if any inks are greater than 65 lpi.
-                    print("-!> LPI greater than 65, failing.")
-                    count = count + 1
-                    total_error_message += "%d) LPI on the ink named %s on item %d is greater than 65. Ink coverage failed. \n" % (
-                        count,
-                        ic.color,
-                        item.num_in_job,
-                    )
-                    exception = True
-
-                if workflow_name == "Foodservice":
-                    # Set a sequence number for Foodservice item colors based on
-                    # the total number of colors for the item.
-                    ic.sequence = item.itemcolor_set.all().count()
-                    ic.save()
-                    # This method will take into account sequence and FSB Nine Digit
-                    # if it exists to generate the full plate code.
-                    ic.calculate_plate_code()
+            ic = node.lookup_itemcolor(item, itemcolors)
+            self.populate_itemcolor(node, ic, item, coating, definitions)
+            if not any(ic is other for other in itemcolors):
+                itemcolors.append(ic)
+            if workflow_name == "Foodservice":
+                # Set a sequence number for Foodservice item colors based on
+                # the total number of colors for the item.
+                ic.sequence = len(itemcolors)
+            populated.append(ic)
 
-        if exception:
-            raise InkCoverageException(total_error_message)
+        warnings = {}
+        if workflow_name == "Foodservice":
+            warnings = self._fetch_color_warnings(job, item, {ic.definition_id for ic in populated if ic.definition_id})
 
-        item.do_create_joblog_entry(
-            joblog_defs.JOBLOG_TYPE_JDF,
-            "Ink coverage for item %d completed." % (item.num_in_job),
-        )
+        warning_message = ""
+        count = 0
+        for ic in populated:
+            # Check for colors we cannot hit
+            warning = warnings.get(ic.definition_id)
+            if warning and warning.active:
+                count = count + 1
+                warning_message += "%d) Color warning: cannot hit %s. Replace with %s. \n " % (
+                    count,
+                    ic.color,
+                    warning.qpo_number,
+                )
 
-        if workflow_name == "Foodservice" and "nojdf" not in self.xml_file:
-            # Fire off a JDF to print the proof.
-            print("-J> Triggering Foodservice JDF proofing.")
-            item.do_jdf_fsb_proof()
+            if workflow_name == "Beverage" and ic.lpi > 85:
+                # Ink coverage fails if any inks are greater than 65 lpi.
+                print("-!> LPI greater than 65, failing.")
+                count = count + 1
+                warning_message += "%d) LPI on the ink named %s on item %d is greater than 65. Ink coverage failed. \n" % (
+                    count,
+                    ic.color,
+                    item.num_in_job,
+                )
 
-        if workflow_name == "Beverage" and "nojdf" not in self.xml_file:
-            # Fire off a JDF to print the proof.
-            print("-J> Triggering Beverage workflow.")
-            item.do_jdf_bev_workflow()
+        if workflow_name == "Foodservice":
+            for ic in itemcolors:
+                # This will take into account sequence and FSB Nine Digit
+                # if it exists to generate the full plate code.
+                ic.calculate_plate_code(save=False)
+            item.itemcolor_set.all().delete()
 
-    def populate_itemcolor(self, ink_node, job, item):
+        ItemColor.objects.bulk_create([ic for ic in itemcolors if ic.pk is None])
+        changed = {ic.pk: ic for ic in populated if ic.pk is not None}
+        ItemColor.objects.bulk_update(list(changed.values()), ITEMCOLOR_FIELDS)
+        # Bulk writes skip itemcolor_post_save, which saves the job to
+        # regenerate its keywords, so do that once here.
+        job.save()
+        # They also skip the signals that refresh catscanner's color lists.
+        invalidate_job_colors(job.id)
+        return warning_message
+
+    def populate_itemcolor(self, ink_node, ic, item, coating, definitions):
         """
-        Populates and returns an ItemColor object that is ready to be saved.
-        Returns an ItemColor object to be saved by import_itemcolors().
+        Re-populates an ItemColor matched by InkNode.lookup_itemcolor() from
+        the ink. definitions are the color definitions for the item's coating
+        by lowercased name. The ItemColor is saved by import_itemcolors().
         """
-        # Returns a 'C' or 'U' for coated/uncoated.
-        coating = item.size.get_coating_type(return_abbrev=True)
-
         # Print a summary of everything found so far.
         print("#> %s %s (%s)" % (ink_node.ink_name, coating, item.size.product_substrate))
 
-        # This must be found now to check against other colors.
-        color_angle = ink_node.ink_angle
-
-        # This will either return an existing ItemColor to repopulate, or
-        # create a new one if none can be found (depending on the workflow).
-        ic = ink_node.lookup_itemcolor(item)
-
         """
         Start populating/re-populating the ItemColor.
         """
         # Try to look up a color definition based on name. On failure,
-        # set the definition to None.
-        try:
-            ic.definition = ColorDefinition.objects.get(name__iexact=ic.color, coating=coating)
-        except ColorDefinition.DoesNotExist:
+        # leave the definition as it is.
+        definition = definitions.get(ic.color.lower())
+        if definition:
+            ic.definition = definition
+        else:
             # Foodservice colors don't need to match against library.
             print("-!> No matching color definition for: %s" % ic.color)
 
@@ -505,9 +626,6 @@ class InkCoverageDocument(object):
             pass
         ic.lpi = ink_node.ink_lpi
         print("--> LPI:", ic.lpi)
-        ic.angle = color_angle
+        ic.angle = ink_node.ink_angle
         print("--> Angle:", ic.angle)
-
-        # This is returned instead of saved here directly so that import_itemcolors()
-        # can decide what to do in the case of oddities.
         return ic
@@ -1,7 +1,27 @@
-"""JDF readers."""
+"""
+JDF readers.
+
+Backstage writes its JDFs back namespaced (the CIP4 JDF schemas, plus the
+Esko eg: namespace), so elements and attributes are matched on their local
+names with local_name().
+"""
 
 import os
-from xml.dom import minidom
+from xml.etree import ElementTree as ET
+
+ESKO_NAMESPACE = "http://www.esko-graphics.com/EGschema1_0"
+
+
+def local_name(tag):
+    """Strips the {namespace} off an ElementTree tag or attribute name."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_local(element, name):
+    """Iterates over element and its descendants with the given local name."""
+    for child in element.iter():
+        if local_name(child.tag) == name:
+            yield child
 
 
 class JDFAuditPool(object):
@@ -19,18 +39,20 @@ class JDFAuditPool(object):
         # 'Completed' or 'Aborted'
         self.end_status = None
 
-        for child in audit_pool_node.childNodes:
+        for child in audit_pool_node:
             # Notification Comments are stored in the comments attribute on the
             # AuditPool object, and the overall end result is grabbed from
             # the ProcessRun element.
-            if child.tagName == "Notification":
+            tag = local_name(child.tag)
+            if tag == "Notification":
                 # Cosmetic more than anything. Don't line break on first comment.
                 if self.comments != "":
                     self.comments += "\n\r"
-                self.comments += child.getElementsByTagName("Comment")[0].childNodes[0].data
-            elif child.tagName == "ProcessRun":
+                comment = next(iter_local(child, "Comment"))
+                self.comments += comment.text or ""
+            elif tag == "ProcessRun":
                 # This is the overall end result of this process.
-                self.end_status = child.getAttribute("EndStatus")
+                self.end_status = child.get("EndStatus", "")
 
 
 class JDFTask(object):
@@ -44,10 +66,10 @@ class JDFTask(object):
         # Reference to the JDF task node.
         self.root_node = jdf_task_node
         # Common attribute values.
-        self.descriptive_name = jdf_task_node.getAttribute("DescriptiveName")
-        self.id = jdf_task_node.getAttribute("ID")
-        self.status = jdf_task_node.getAttribute("Status")
-        self.type = jdf_task_node.getAttribute("Type")
+        self.descriptive_name = jdf_task_node.get("DescriptiveName", "")
+        self.id = jdf_task_node.get("ID", "")
+        self.status = jdf_task_node.get("Status", "")
+        self.type = jdf_task_node.get("Type", "")
         # Storage for AuditPool objects
         self.audit_pools = []
         # Populate the AuditPool list.
@@ -58,8 +80,7 @@ class JDFTask(object):
         Store the AuditPool tags into JDFAuditPool objects and stuff them in
         the audit_pools list on this JDFTask object for easy retrieval.
         """
-        audit_pools = self.root_node.getElementsByTagName("AuditPool")
-        for pool in audit_pools:
+        for pool in iter_local(self.root_node, "AuditPool"):
             self.audit_pools.append(JDFAuditPool(pool))
 
     def return_comments(self):
@@ -74,8 +95,6 @@ class JDFReader(object):
     for the presence of errors and other important things.
     """
 
-    # This is set to True when the reader detects an aborted task.
-
     def __init__(self, jdf_file_path):
         """Initialize the JDFReader object and store some commonly needed values."""
         # If this is True, one of the JDFTask objects returned as Aborted
@@ -85,15 +104,17 @@ class JDFReader(object):
         # JDF node that encapsulates all of the sub-tasks. It is best to think
         # of it as the summary.
         self.jdf_tasks = []
+        # The eg:TicketName of the first Backstage task, if there is one.
+        self.ticket_name = None
 
         # Store the JDF's file name for later usage.
         self.filename = jdf_file_path
-        # Parse the XML doc, return the minidom document we need.
-        self.doc = minidom.parse(jdf_file_path)
+        # Parse the XML doc, return the root JDF element.
+        self.doc = ET.parse(jdf_file_path).getroot()
         # Calculate the job and item numbers based on the JDF's file name.
         self._calc_job_and_item_nums()
-        # See if there were any Aborted processes.
-        self._detect_aborted_processes()
+        # See if there were any Aborted processes, and find the ticket name.
+        self._scan_document()
 
         # This is really only necessary if we have aborted tasks. We're not
         # really interested in diagnostic information otherwise.
@@ -118,18 +139,20 @@ class JDFReader(object):
         Stores all of the JDF nodes in JDFTask objects and stuffs them in the
         self.jdf_tasks lists for easy later retrieval.
         """
-        jdf_tasks = self.doc.getElementsByTagName("JDF")
-        for jtask in jdf_tasks:
+        for jtask in iter_local(self.doc, "JDF"):
             self.jdf_tasks.append(JDFTask(jtask))
 
-    def _detect_aborted_processes(self):
+    def _scan_document(self):
         """
         Look for ProcessRun tags with an EndStatus attribute containing
         'Aborted'. This lets us know something went wrong and further
-        investigation is needed.
+        investigation is needed. Done in the same pass as finding the ticket.
         """
-        processes = self.doc.getElementsByTagName("ProcessRun")
-        for process in processes:
-            if process.getAttribute("EndStatus") == "Aborted":
-                # Backstage was unable to finish the job for some reason.
-                self.has_aborted_tasks = True
+        for element in self.doc.iter():
+            tag = local_name(element.tag)
+            if tag == "ProcessRun":
+                if element.get("EndStatus") == "Aborted":
+                    # Backstage was unable to finish the job for some reason.
+                    self.has_aborted_tasks = True
+            elif tag == "BackStageTaskParams" and self.ticket_name is None:
+                self.ticket_name = element.get("{%s}TicketName" % ESKO_NAMESPACE, element.get("eg:TicketName"))
@@ -1,17 +1,109 @@
-"""Generic JDF writer"""
+"""
+Generic JDF writer
 
-import glob
+Tickets are built with ElementTree rather than minidom. The task nodes for
+each kind of Automation Engine task are built once and cached (see
+TASK_TEMPLATES and ItemJDF.add_task()), so sending the same kind of ticket
+again only builds the item specific file list.
+"""
+
+import functools
 import os
 from xml.dom import minidom
+from xml.etree import ElementTree as ET
 
 from django.conf import settings
 from django.utils import timezone
 
+# Matches what minidom's toxml() wrote, which Automation Engine is used to.
+XML_DECLARATION = '<?xml version="1.0" ?>'
+
+# Task node settings for the kinds of Automation Engine tasks GOLD sends.
+# Pass one of these names to ItemJDF.add_task() along with the ticket name.
+TASK_TEMPLATES = {
+    # RIP the one-up source PDF into TIFFs.
+    "rip_1up": {"descriptive_name": "RIP1up", "task_id": "TaskParamLink", "task_output_id": "TIFFList"},
+    # Create a RGB PDF from the source file.
+    "rgb_pdf": {"descriptive_name": "RGB PDF", "task_id": "PDFLink", "task_output_id": "PDFFileList"},
+    # Create a RGB JPG for renders from the source PDF.
+    "rgb_jpg": {"descriptive_name": "RGB PDF", "task_id": "JPGLink", "task_output_id": "JPGFileList"},
+    # Create a PDF proof from an item's tiffs.
+    "tiff_to_pdf": {"descriptive_name": "RGB PDF", "task_id": "TIFFLink", "task_output_id": "PDFFileList"},
+}
+
+
+def _element(tag, attributes):
+    """Creates an element, keeping attributes in the order given."""
+    element = ET.Element(tag)
+    for key, value in attributes:
+        element.set(key, value)
+    return element
+
+
+@functools.lru_cache(maxsize=256)
+def task_node(
+    descriptive_name,
+    node_id,
+    task_id,
+    ticket_name,
+    task_output_id,
+    priority=50,
+    task_input_id="SourceFileList",
+    task_status="Available",
+    task_hold="false",
+    smartmark_set=None,
+):
+    """
+    Returns the JDF task node for a task, building it the first time those
+    settings are asked for. The node may end up in many documents, so it
+    must not be modified.
+    """
+    # Begin containing JDF tag
+    new_node = _element(
+        "JDF",
+        (
+            ("DescriptiveName", descriptive_name),
+            ("ID", node_id),
+            ("Status", "Waiting"),
+            ("Type", "eg:BackStageTask"),
+            ("Version", "1.2"),
+            ("xmlns", "http://www.CIP4.org/JDFSchema_1_1"),
+            ("xmlns:eg", "http://www.esko-graphics.com/EGschema1_0"),
+        ),
+    )
+
+    # NodeInfo is by itself within JDF
+    new_node.append(_element("NodeInfo", (("JobPriority", str(priority)),)))
+
+    # ResourcePool contains BackStageTaskParams
+    resource_pool = ET.SubElement(new_node, "ResourcePool")
+    task_params = _element(
+        "eg:BackStageTaskParams",
+        (
+            ("Class", "Parameter"),
+            ("ID", task_id),
+            ("Status", task_status),
+            ("eg:TicketName", ticket_name),
+            ("eg:Hold", task_hold),
+        ),
+    )
+    # If a smartmark set is specified, include it in the backstage params.
+    if smartmark_set:
+        task_params.append(_element("eg:FlexRipParam", (("eg:MarkSet", smartmark_set),)))
+    resource_pool.append(task_params)
+
+    # ResourceLinkPool contains the task params link and the input and output links.
+    resource_link_pool = ET.SubElement(new_node, "ResourceLinkPool")
+    resource_link_pool.append(_element("eg:BackStageTaskParamsLink", (("Usage", "Input"), ("rRef", task_id))))
+    resource_link_pool.append(_element("RunListLink", (("Usage", "Input"), ("rRef", task_input_id))))
+    resource_link_pool.append(_element("RunListLink", (("Usage", "Output"), ("rRef", task_output_id))))
+    return new_node
+
 
 class ItemJDF(object):
     """JDF operations on workflow Items."""
 
-    # Holds the minidom Document
+    # Holds the ElementTree document
     doc = None
     # Reference to the root containing JDF node
     doc_root = None
@@ -20,60 +112,45 @@ class ItemJDF(object):
 
     def __init__(self, item, file_list, extra_vars=[]):
         """Document initialization."""
-        self.doc = minidom.Document()
         self.item = item
-
-        self.doc_root = self.doc.createElement("JDF")
-        self.doc_root.setAttribute("DescriptiveName", "GOLD JDF Task")
-        self.doc_root.setAttribute("ID", "n0001")
-        self.doc_root.setAttribute("Status", "Waiting")
-        self.doc_root.setAttribute("Type", "ProcessGroup")
-        self.doc_root.setAttribute("Version", "1.2")
-        self.doc_root.setAttribute("xmlns", "http://www.CIP4.org/JDFSchema_1_2")
-        self.doc_root.setAttribute("xmlns:eg", "http://www.esko-graphics.com/EGschema1_0")
-        self.doc.appendChild(self.doc_root)
-
-        for key in file_list.keys():
-            resource_pool = self.doc.createElement("ResourcePool")
-            runlist_param = self.doc.createElement("RunList")
-            runlist_param.setAttribute("Class", "Parameter")
-            runlist_param.setAttribute("ID", key)
-            runlist_param.setAttribute("PartIDKeys", "Run")
-            runlist_param.setAttribute("Status", "Available")
-            # runlist_param.setAttribute('DescriptiveName', '1-up')
-
-            run_counter = 1
-            for sfile in file_list[key]:
-                runlist_run = self.doc.createElement("RunList")
-                runlist_run.setAttribute("Run", "Run%04d" % run_counter)
-                run_counter += 1
-
-                layout_element = self.doc.createElement("LayoutElement")
-                filespec = self.doc.createElement("FileSpec")
-                filespec.setAttribute("URL", sfile)
-                layout_element.appendChild(filespec)
-                runlist_run.appendChild(layout_element)
-
-                # Tabbing this line over 1/2011... was not in for loop before.
-                runlist_param.appendChild(runlist_run)
-        resource_pool.appendChild(runlist_param)
+        self.task_count = 0
+
+        self.doc_root = _element(
+            "JDF",
+            (
+                ("DescriptiveName", "GOLD JDF Task"),
+                ("ID", "n0001"),
+                ("Status", "Waiting"),
+                ("Type", "ProcessGroup"),
+                ("Version", "1.2"),
+                ("xmlns", "http://www.CIP4.org/JDFSchema_1_2"),
+                ("xmlns:eg", "http://www.esko-graphics.com/EGschema1_0"),
+            ),
+        )
+        self.doc = ET.ElementTree(self.doc_root)
+
+        resource_pool = ET.SubElement(self.doc_root, "ResourcePool")
+        for key, files in file_list.items():
+            runlist_param = _element(
+                "RunList",
+                (("Class", "Parameter"), ("ID", key), ("PartIDKeys", "Run"), ("Status", "Available")),
+            )
+            for run_counter, sfile in enumerate(files, 1):
+                runlist_run = _element("RunList", (("Run", "Run%04d" % run_counter),))
+                layout_element = ET.SubElement(runlist_run, "LayoutElement")
+                layout_element.append(_element("FileSpec", (("URL", sfile),)))
+                runlist_param.append(runlist_run)
+            resource_pool.append(runlist_param)
 
         if extra_vars:
             # Extra vars are additional ResourcePool parameters that serve
             # much like defining variables or allocating space for them ahead
             # of time.
-            for var in extra_vars.keys():
-                new_var = self.doc.createElement("RunList")
-                new_var.setAttribute("Class", "Parameter")
-                new_var.setAttribute("ID", var)
-
-                sub_vars = extra_vars[var]
-                if sub_vars:
-                    for sub_var in sub_vars:
-                        new_var.setAttribute(sub_var, sub_vars[sub_var])
-                resource_pool.appendChild(new_var)
-
-        self.doc_root.appendChild(resource_pool)
+            for var, sub_vars in extra_vars.items():
+                new_var = _element("RunList", (("Class", "Parameter"), ("ID", var)))
+                for sub_var, value in (sub_vars or {}).items():
+                    new_var.set(sub_var, value)
+                resource_pool.append(new_var)
 
     def add_task_node(
         self,
@@ -97,115 +174,50 @@ class ItemJDF(object):
         ticket_name: (str) Backstage ticket to use.
         task_output_id: (str) The ID of output resource pool (if any).
         """
-        # Begin containing JDF tag
-        new_node = self.doc.createElement("JDF")
-        new_node.setAttribute("DescriptiveName", descriptive_name)
-        new_node.setAttribute("ID", node_id)
-        new_node.setAttribute("Status", "Waiting")
-        new_node.setAttribute("Type", "eg:BackStageTask")
-        new_node.setAttribute("Version", "1.2")
-        new_node.setAttribute("xmlns", "http://www.CIP4.org/JDFSchema_1_1")
-        new_node.setAttribute("xmlns:eg", "http://www.esko-graphics.com/EGschema1_0")
-
-        # NodeInfo is by itself within JDF
-        node_info = self.doc.createElement("NodeInfo")
-        node_info.setAttribute("JobPriority", str(priority))
-        new_node.appendChild(node_info)
-        # End NodeInfo
-
-        # ResourcePool contains BackStageTaskParams
-        resource_pool = self.doc.createElement("ResourcePool")
-        # Begin task params
-        task_params = self.doc.createElement("eg:BackStageTaskParams")
-        task_params.setAttribute("Class", "Parameter")
-        task_params.setAttribute("ID", task_id)
-        task_params.setAttribute("Status", task_status)
-        task_params.setAttribute("eg:TicketName", ticket_name)
-        task_params.setAttribute("eg:Hold", task_hold)
-
-        # If a smartmark set is specified, include it in the backstage params.
-        if smartmark_set:
-            flex_params = self.doc.createElement("eg:FlexRipParam")
-            flex_params.setAttribute("eg:MarkSet", smartmark_set)
-            task_params.appendChild(flex_params)
-
-        resource_pool.appendChild(task_params)
-        # End task params
-        new_node.appendChild(resource_pool)
-        # End ResourcePool
-
-        # ResourceLinkPool contains a few link related elements
-        resource_link_pool = self.doc.createElement("ResourceLinkPool")
-
-        # Begin Task Params Link
-        task_params_link = self.doc.createElement("eg:BackStageTaskParamsLink")
-        task_params_link.setAttribute("Usage", "Input")
-        task_params_link.setAttribute("rRef", task_id)
-        resource_link_pool.appendChild(task_params_link)
-        # End Task Params Link
-
-        # Input and output links
-        input_link = self.doc.createElement("RunListLink")
-        input_link.setAttribute("Usage", "Input")
-        input_link.setAttribute("rRef", task_input_id)
-        resource_link_pool.appendChild(input_link)
-
-        output_link = self.doc.createElement("RunListLink")
-        output_link.setAttribute("Usage", "Output")
-        output_link.setAttribute("rRef", task_output_id)
-        resource_link_pool.appendChild(output_link)
-        # End input and output links
-
-        new_node.appendChild(resource_link_pool)
-        # End ResourceLinkPool
-
-        self.doc_root.appendChild(new_node)
+        self.task_count += 1
+        self.doc_root.append(
+            task_node(
+                descriptive_name,
+                node_id,
+                task_id,
+                ticket_name,
+                task_output_id,
+                priority,
+                task_input_id,
+                task_status,
+                task_hold,
+                smartmark_set,
+            )
+        )
+
+    def add_task(self, task_type, ticket_name, **kwargs):
+        """
+        Adds a task node using one of the TASK_TEMPLATES. Node IDs are
+        numbered n0001, n0002... in the order tasks are added unless given.
+        Any other add_task_node() argument may be passed to override the
+        template.
+        """
+        task_settings = dict(TASK_TEMPLATES[task_type], **kwargs)
+        task_settings.setdefault("node_id", "n%04d" % (self.task_count + 1))
+        self.add_task_node(ticket_name=ticket_name, **task_settings)
 
     def get_xml_doc_string(self, pretty=False):
-        """Returns a string representation of the document via prettyprint."""
+        """Returns a string representation of the document."""
+        xml = XML_DECLARATION + ET.tostring(self.doc_root, encoding="unicode")
         if pretty:
-            return self.doc.toprettyxml()
-        else:
-            return self.doc.toxml()
+            # Re-parsed rather than indented in place, as the task nodes are shared.
+            return minidom.parseString(xml).toprettyxml()
+        return xml
 
     def check_jdf_exists(self, file_name, jdf_queue_path):
         """
         Checks to see if a jdf file exists for that job already and throws a growl error
         so that two jobs dont get processed by automation engine at the same time.
-        """
-        try:
-            fileNameArr = file_name.split("-")
-            checkFileName = fileNameArr[0] + "-" + fileNameArr[1] + "*"
-        except Exception:
-            checkFileName = file_name
 
+        Different versions of the same item are still allowed, so only a file
+        of the exact same name counts.
         """
-        glob checks filenames and allows for wildcard searches (returning an array of matches)
-        so that we can see if any jobs exist for an item/job.
-
-        The filenames are checked when there are duplicated to make sure that different versions of the
-        same item are still allowed
-        """
-        folderFilesToCheck = glob.glob(os.path.join(jdf_queue_path, checkFileName))
-        if folderFilesToCheck:
-            # function flag
-            duplicateExists = False
-            # for each file in the jdf automation engine folder
-            for checkFile in folderFilesToCheck:
-                # get the filename out of the absolute paths returned from glob
-                pathsArr = checkFile.split("/")
-                # the filename in the folder we are currently checking is the last spot in the path
-                checkFileTemp = pathsArr[-1]
-                # compare the filename to the file we want to write and see if it is the same name or not
-                if file_name == checkFileTemp:
-                    duplicateExists = True
-            # if duplicates then return true and error else return false
-            if duplicateExists:
-                return True
-            else:
-                return False
-        else:
-            return False
+        return os.path.exists(os.path.join(jdf_queue_path, file_name))
 
     def send_jdf(self, file_name_override=None, jdf_path_override=None):
         """Creates the JDF file and drops it in the hotfolder."""
@@ -223,7 +235,11 @@ class ItemJDF(object):
                 timezone.now().strftime("%d_%m-%H_%M_%S"),
             )
 
-        if self.check_jdf_exists(file_name, jdf_queue_path):
+        try:
+            # Exclusive create, so two back-to-back sends can't both write the file.
+            with open(os.path.join(jdf_queue_path, file_name), "x") as f:
+                f.write(self.get_xml_doc_string())
+        except FileExistsError:
             error_msg = (
                 "Too many JDF tasks launched back-to-back on this item. "
                 "Only the first task will run. You can launch another JDF task in 1 minute."
@@ -233,7 +249,3 @@ class ItemJDF(object):
                 error_msg,
                 pref_field="growl_hear_jdf_processes",
             )
-        else:
-            f = open(os.path.join(jdf_queue_path, file_name), "w")
-            f.write(self.get_xml_doc_string())
-            f.close()
@@ -1,10 +1,19 @@
 #!/usr/bin/python
-"""JMF Gateway module"""
+"""
+JMF Gateway module
+
+Messages are built with ElementTree and POSTed to the Automation Engine JMF
+gateway over keep-alive connections from a small shared pool, rather than a
+new HTTP connection per message.
+"""
 
 import http.client
 import os
+import queue
 import sys
+import threading
 from xml.dom import minidom
+from xml.etree import ElementTree as ET
 
 # Setup the Django environment
 sys.path.append("../../../")
@@ -14,63 +23,140 @@ from django.conf import settings
 # Back to the ordinary imports
 from django.urls import reverse
 
+from gchub_db.apps.xml_io.jdf_writer import XML_DECLARATION
+
+# Most idle connections kept open to the gateway.
+JMF_GATEWAY_CONNECTIONS = getattr(settings, "JMF_GATEWAY_CONNECTIONS", 4)
+# Seconds to wait on the gateway before giving up on a message.
+JMF_GATEWAY_TIMEOUT = getattr(settings, "JMF_GATEWAY_TIMEOUT", 30)
+JMF_CONTENT_TYPE = "application/vnd.cip4-jmf+xml"
+
+
+class GatewayConnectionPool(object):
+    """
+    Keep-alive HTTP connections to one host, shared between threads. Each
+    request borrows an idle connection (or opens one) and returns it after
+    reading the response, unless the server asked to close it.
+    """
+
+    def __init__(self, host, size=JMF_GATEWAY_CONNECTIONS, timeout=JMF_GATEWAY_TIMEOUT):
+        self.host = host
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connection(self):
+        """Returns (connection, whether it was reused)."""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, timeout=self.timeout), False
+
+    def _release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def post(self, path, body, content_type=JMF_CONTENT_TYPE):
+        """
+        POSTs body to path and returns (status, response body). A reused
+        connection the server has since dropped is retried on another one.
+        """
+        while True:
+            connection, reused = self._connection()
+            try:
+                connection.request("POST", path, body=body, headers={"Content-Type": content_type})
+                response = connection.getresponse()
+                data = response.read()
+            except ConnectionError:
+                # Includes RemoteDisconnected, from an idle connection timing out.
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return response.status, data
+
+    def close(self):
+        """Closes the idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_gateway_pool = None
+_gateway_pool_lock = threading.Lock()
+
+
+def gateway_pool():
+    """The shared connection pool for settings.JMF_GATEWAY."""
+    global _gateway_pool
+    with _gateway_pool_lock:
+        if _gateway_pool is None:
+            _gateway_pool = GatewayConnectionPool(settings.JMF_GATEWAY)
+        return _gateway_pool
+
 
 class JMFMessage(object):
     """Standard JMF class with common stuff on it."""
 
-    # Holds the minidom Document
+    # Holds the ElementTree document
     doc = None
-    # Reference to the root containing JDF node
+    # Reference to the root containing JMF node
     doc_root = None
     debug = False
     message_name = "JMFMessage"
 
     def get_xml_doc_string(self):
-        """Returns a string representation of the document via prettyprint."""
-        return self.doc.toxml()
+        """Returns a string representation of the document."""
+        return XML_DECLARATION + ET.tostring(self.doc_root, encoding="unicode")
 
     def __init__(self, debug=False):
         """Document initialization."""
         self.debug = debug
-        self.doc = minidom.Document()
-
-        self.doc_root = self.doc.createElement("JMF")
-        self.doc_root.setAttribute("SenderID", "QMon")
-        self.doc_root.setAttribute("Version", "1.2")
-        self.doc_root.setAttribute("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
+        self.doc_root = ET.Element("JMF")
+        self.doc_root.set("SenderID", "QMon")
+        self.doc_root.set("Version", "1.2")
+        self.doc_root.set("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
+        self.doc = ET.ElementTree(self.doc_root)
+
+    def add_element(self, parent, tag, **attributes):
+        """Appends a child element to parent, with attributes in the order given."""
+        element = ET.SubElement(parent, tag)
+        for key, value in attributes.items():
+            element.set(key, value)
+        return element
 
     def execute(self):
         """
-        Processes the request by sending it to the FedEx server. Stores
-        a minidom.Document object containing the result of the query in
-        the object's responsexml property.
+        Processes the request by sending it to the JMF gateway. Stores the
+        root Element of the response in the object's responsexml property.
         """
-        req_xml = "%s" % self.doc.toxml()
+        req_xml = self.get_xml_doc_string()
 
         print("EXECUTING")
-
-        hcon = http.client.HTTPConnection(settings.JMF_GATEWAY)
-        hcon.putrequest("POST", settings.JMF_GATEWAY_PATH)
-        hcon.putheader("Content-Length", len(req_xml))
-        hcon.putheader("Content-Type", "application/vnd.cip4-jmf+xml")
-        hcon.endheaders()
-        hcon.send(req_xml)
-        hres = hcon.getresponse()
-
+        status, self.response = gateway_pool().post(settings.JMF_GATEWAY_PATH, req_xml.encode("utf-8"))
         print("GOT RESPONSE")
 
-        self.response = hres.read()
-        self.responsexml = minidom.parseString(self.response)
+        self.responsexml = ET.fromstring(self.response)
 
         if self.debug:
             print("-" * 80)
             print("Message: %s" % self.__class__.__name__)
             print("-" * 80)
-            print(self.doc.toprettyxml())
+            print(minidom.parseString(req_xml).toprettyxml())
             print("-" * 80)
-            print("Backstage Response")
+            print("Backstage Response (%s)" % status)
             print("-" * 80)
-            print(self.responsexml.documentElement.toprettyxml())
+            print(minidom.parseString(self.response).toprettyxml())
             print("-" * 80)
 
 
@@ -80,13 +166,7 @@ class JMFKnownMessages(JMFMessage):
     def __init__(self):
         """Document initialization."""
         super(JMFKnownMessages, self).__init__()
-
-        query = self.doc.createElement("Query")
-        query.setAttribute("ID", "Link1290_5")
-        query.setAttribute("Type", "KnownMessages")
-
-        self.doc_root.appendChild(query)  # type: ignore
-        self.doc.appendChild(self.doc_root)
+        self.add_element(self.doc_root, "Query", ID="Link1290_5", Type="KnownMessages")
 
 
 class JMFKnownDevices(JMFMessage):
@@ -95,13 +175,7 @@ class JMFKnownDevices(JMFMessage):
     def __init__(self):
         """Document initialization."""
         super(JMFKnownDevices, self).__init__()
-
-        query = self.doc.createElement("Query")
-        query.setAttribute("ID", "Link1290_5")
-        query.setAttribute("Type", "KnownDevices")
-
-        self.doc_root.appendChild(query)  # type: ignore
-        self.doc.appendChild(self.doc_root)
+        self.add_element(self.doc_root, "Query", ID="Link1290_5", Type="KnownDevices")
 
 
 class JMFSubscription(JMFMessage):
@@ -111,17 +185,9 @@ class JMFSubscription(JMFMessage):
         """Document initialization."""
         super(JMFSubscription, self).__init__(debug=debug)
 
-        query = self.doc.createElement("Query")
-        query.setAttribute("ID", "Subscribe")
-        query.setAttribute("Type", event_type)
+        query = self.add_element(self.doc_root, "Query", ID="Subscribe", Type=event_type)
         # query.setAttribute('xsi:type', xsi_type)
-
-        subscription = self.doc.createElement("Subscription")
-        subscription.setAttribute("URL", url)
-        query.appendChild(subscription)
-
-        self.doc_root.appendChild(query)  # type: ignore
-        self.doc.appendChild(self.doc_root)
+        self.add_element(query, "Subscription", URL=url)
 
 
 class JMFUnsubscribe(JMFMessage):
@@ -131,19 +197,13 @@ class JMFUnsubscribe(JMFMessage):
         """Document initialization."""
         super(JMFUnsubscribe, self).__init__(debug=debug)
 
-        query = self.doc.createElement("Command")
-        query.setAttribute("ID", "Unsubscribe")
+        query = self.add_element(self.doc_root, "Command", ID="Unsubscribe")
         # query.setAttribute('Type', 'Events')
         # query.setAttribute('xsi:type', 'QueryEvents')
-        query.setAttribute("Type", "StopPersistentChannel")
-        query.setAttribute("xsi:type", "CommandStopPersistentChannel")
+        query.set("Type", "StopPersistentChannel")
+        query.set("xsi:type", "CommandStopPersistentChannel")
 
-        subscription = self.doc.createElement("StopPersChParams")
-        subscription.setAttribute("URL", url)
-        query.appendChild(subscription)
-
-        self.doc_root.appendChild(query)  # type: ignore
-        self.doc.appendChild(self.doc_root)
+        self.add_element(query, "StopPersChParams", URL=url)
 
 
 class JMFSubmitQueueEntry(JMFMessage):
@@ -156,19 +216,15 @@ class JMFSubmitQueueEntry(JMFMessage):
         """Document initialization."""
         super(JMFSubmitQueueEntry, self).__init__(debug=debug)
 
-        command = self.doc.createElement("Command")
-        command.setAttribute("ID", "Job9043")
-        command.setAttribute("Type", "SubmitQueueEntry")
-
-        submission_params = self.doc.createElement("QueueSubmissionParams")
-        submission_params.setAttribute("Hold", "false")
-        submission_params.setAttribute("Priority", "50")
-        submission_params.setAttribute("URL", settings.WEBSERVER_HOST + url)
-        submission_params.setAttribute("ReturnJMF", "http://172.23.8.96:8001/xml/echo")
-        command.appendChild(submission_params)
-
-        self.doc_root.appendChild(command)  # type: ignore
-        self.doc.appendChild(self.doc_root)
+        command = self.add_element(self.doc_root, "Command", ID="Job9043", Type="SubmitQueueEntry")
+        self.add_element(
+            command,
+            "QueueSubmissionParams",
+            Hold="false",
+            Priority="50",
+            URL=settings.WEBSERVER_HOST + url,
+            ReturnJMF="http://172.23.8.96:8001/xml/echo",
+        )
 
 
 """
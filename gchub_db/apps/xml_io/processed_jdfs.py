@@ -0,0 +1,167 @@
+"""
+Review of the JDFs Backstage has finished with.
+
+Backstage tosses JDFs into its processed directory once it has run them,
+with AuditPool tags added to the tasks. process_processed_jdf() reads one,
+notes any aborted task in the item's joblog (and moves the JDF aside for
+later review), and kicks off Tiff_to_PDF proofs for Beverage RIP tickets.
+"""
+
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.template import loader
+from django.utils import timezone
+
+from gchub_db.apps.joblog import app_defs as joblog_defs
+from gchub_db.apps.joblog.models import JobLog
+from gchub_db.apps.workflow.models import Job
+from gchub_db.apps.xml_io.jdf_reader import JDFReader
+from gchub_db.includes import general_funcs
+
+# While True, move files to processed and error when appropriate.
+MOVE_FILES = True
+# If this is True, send errors to the artist and make joblog entries when bad stuff happens.
+SEND_ERROR_NOTIFICATIONS = True
+# This is Backstage's processed directory where it tosses JDFs once it's done
+# parsing them and adding the AuditPool tags to the tasks for us to read.
+PROCESSED_DIR = os.path.join(settings.JDF_ROOT, "processed")
+# We'll move any of the processed JDFs that have errors in them to this
+# directory for later review.
+ERROR_DIR = os.path.join(settings.JDF_ROOT, "errors")
+IGNORED_FILES = (".DS_Store",)
+
+
+class TaskAborted(Exception):
+    """This is thrown when a Backstage error is encountered."""
+
+    pass
+
+
+def ColorKeyErrorMonitor(item):
+    """Notify on recent Color Key related errors for the provided item."""
+    an_hour_ago = timezone.now() - timedelta(hours=1)
+    recent_errors = JobLog.objects.filter(job=item.job_id, log_text__icontains="Keys", event_time__gte=an_hour_ago)
+    if recent_errors:
+        mail_subject = "Shelbyville Color Keys Failure: %s" % item.job
+        mail_send_to = []
+        group_members = User.objects.filter(groups__name="EmailGCHubColorManagement", is_active=True)
+        for user in group_members:
+            mail_send_to.append(user.email)
+        mail_body = loader.get_template("emails/ckfail.txt")
+        mail_context = {"item": item}
+        general_funcs.send_info_mail(mail_subject, mail_body.render(mail_context), mail_send_to)
+
+
+def move_to_error_folder(filepath, error_msg, item=None):
+    """Move an XML file to the error directory and route the error message to joblog and Growl."""
+    if SEND_ERROR_NOTIFICATIONS and error_msg and item:
+        # Note the error in the joblog for the item's job.
+        item.job.do_create_joblog_entry(joblog_defs.JOBLOG_TYPE_JDF_ERROR, error_msg)
+
+        # Notify the artist via Growl pop-up.
+        item.job.growl_at_artist(
+            "JDF Error: JDF error on %s-%s %s" % (item.job.id, item.num_in_job, item.job.name),
+            error_msg,
+            pref_field="growl_hear_jdf_processes",
+        )
+    # Print it out to the console.
+    print("ERROR:", error_msg)
+
+    if MOVE_FILES:
+        filename = os.path.basename(filepath)
+        dest_path = os.path.join(ERROR_DIR, filename)
+        shutil.move(filepath, dest_path)
+
+
+def _report_aborted_tasks(jdf, filepath, item):
+    """Logs the aborted JDF's tasks and moves it to the error directory."""
+    print("!> ABORTED TASK DETECTED")
+    is_first_node = True
+    for task in jdf.jdf_tasks:
+        if is_first_node:
+            task_debug_output = task.return_comments()
+            print("@ JDF FILE DESCRIPTION:", task.descriptive_name)
+            print("@ END STATUS:", task.status)
+            print("@ COMMENTS:", task_debug_output)
+            # Create a JobLog entry to let the user know something bad happened.
+            log_text = "JDF task resulted in an error:<br />%s" % (task_debug_output)
+            move_to_error_folder(filepath, log_text, item)
+            # Send email if related to Color Keys
+            ColorKeyErrorMonitor(item)
+        else:
+            print("\n\r   TASK:", task.descriptive_name)
+            print("   Status:", task.status)
+            print("   Comments:", task.return_comments())
+        is_first_node = False
+    print("!> END RESULT: TASK FAILED")
+
+
+def _start_tiff_to_pdf(jdf, filepath, item):
+    """
+    Triggers Tiff_to_PDF proof generation for Beverage RIP tickets. Returns
+    False if the proof couldn't be started and the JDF was moved aside.
+    """
+    print("--> Beverage job found, triggering Tiff_to_PDF proof generation.")
+    # Check ticket name. Certain tickets shouldn't trigger tiff2pdf.
+    ticket_name = jdf.ticket_name or "Unknown"
+    # If the ticket isn't a "Workflow" task type attempt tiff to pdf.
+    if not ticket_name.startswith("/swft/Beverage Smart Step and RIP"):
+        print("--> Tiff_to_PDF proof generation skipped due to ticket name.")
+        return True
+    print("--> Tiff_to_PDF generation started.")
+    try:
+        item.do_tiff_to_pdf()
+    except IOError:
+        # Usually means it can't find the die tiff.
+        log_text = "Die tiff missing for %s-%s" % (item.job.id, item.num_in_job)
+        move_to_error_folder(filepath, log_text, item)
+        return False
+    return True
+
+
+def process_processed_jdf(filepath):
+    """
+    Checks one processed JDF for success or failure. Returns True if it ran
+    cleanly, False if it was moved to the error directory.
+
+    Any exception is dealt with here, so that one bad file doesn't stop the
+    rest of the folder from being processed.
+    """
+    item = None
+    try:
+        # Parse the file.
+        jdf = JDFReader(filepath)
+
+        job_num = jdf.job_num
+        item_in_job = jdf.item_num_in_job
+        print("--> Job %s item %s" % (job_num, item_in_job))
+
+        job = Job.objects.get(id=job_num)
+        item = job.get_item_num(item_in_job)
+
+        if jdf.has_aborted_tasks:
+            # One or more sub-task in the JDF has been aborted.
+            _report_aborted_tasks(jdf, filepath, item)
+            raise TaskAborted()
+    except TaskAborted:
+        # Already noted and moved to the error directory.
+        return False
+    except Exception as inst:
+        # Something really bad happened, move the JDF to the error
+        # directory for later review.
+        print("Unexpected JDF read error for %s: %s" % (os.path.basename(filepath), inst))
+        move_to_error_folder(filepath, "Unexpected JDF read error: %s" % inst, item)
+        return False
+
+    print("--> JDF was processed successfully.")
+    if job.workflow.name == "Beverage" and not _start_tiff_to_pdf(jdf, filepath, item):
+        return False
+
+    # All's well, get rid of the file.
+    if MOVE_FILES:
+        os.remove(filepath)
+    return True
@@ -0,0 +1,107 @@
+"""
+Tests for the hot folder watcher that feeds files to the XML importers.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from gchub_db.apps.workflow.printed_proofs import ItemNotFound
+from gchub_db.apps.xml_io.ink_coverage_queue import InkCoverageQueue
+from gchub_db.daemons.hot_folders import handlers
+from gchub_db.includes.hot_folder import HotFolder, HotFolderWatcher, SeenLedger, wait_for
+
+
+class HotFolderTest(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.folder_path = os.path.join(self.temp_dir, "incoming")
+        os.mkdir(self.folder_path)
+        self.ledger = SeenLedger(os.path.join(self.temp_dir, "ledger"))
+        self.handled = []
+
+    def tearDown(self):
+        self.ledger.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, text):
+        with open(os.path.join(self.folder_path, name), "w") as f:
+            f.write(text)
+
+    def watcher(self):
+        folder = HotFolder("incoming", self.folder_path, self.handled.append, settle=0, poll=True)
+        return HotFolderWatcher([folder], ledger=self.ledger)
+
+    def run_pass(self, watcher):
+        """A scan, then a check to see the file's stamp and one to hand it over."""
+        watcher.scan(watcher.folders[0])
+        watcher.check_pending()
+        watcher.check_pending()
+
+    def test_file_is_handled_once_across_restarts(self):
+        self.write("100-1.xml", "<x/>")
+        self.write(".DS_Store", "")
+        watcher = self.watcher()
+        self.run_pass(watcher)
+        self.run_pass(watcher)
+        self.assertEqual(self.handled, [os.path.join(self.folder_path, "100-1.xml")])
+        self.assertEqual(watcher.stats["handled"], 1)
+
+        # A restarted watcher remembers it through the ledger.
+        self.run_pass(self.watcher())
+        self.assertEqual(len(self.handled), 1)
+
+    def test_changed_file_is_handled_again(self):
+        self.write("100-1.xml", "<x/>")
+        self.run_pass(self.watcher())
+        self.write("100-1.xml", "<x>new contents</x>")
+        self.run_pass(self.watcher())
+        self.assertEqual(len(self.handled), 2)
+
+    def test_failed_handler_is_not_recorded(self):
+        def handler(path):
+            raise ValueError("bad file")
+
+        self.write("100-1.xml", "<x/>")
+        watcher = HotFolderWatcher([HotFolder("incoming", self.folder_path, handler, settle=0, poll=True)], ledger=self.ledger)
+        self.run_pass(watcher)
+        self.assertEqual(watcher.stats["failed"], 1)
+        self.assertFalse(self.ledger.seen("incoming", "100-1.xml", watcher._failed[("incoming", "100-1.xml")]))
+
+    def test_proof_for_unknown_item_is_retried(self):
+        self.write("JOB_1.xml", "<x/>")
+        folder = HotFolder("printed_proof", self.folder_path, handlers.handle_printed_proof, settle=0, poll=True)
+        watcher = HotFolderWatcher([folder], ledger=self.ledger)
+        with (
+            mock.patch.object(handlers, "close_old_connections"),
+            mock.patch.object(handlers, "record_printed_proof", side_effect=[ItemNotFound("100-1"), None]) as record,
+        ):
+            self.run_pass(watcher)
+            self.assertEqual((watcher.stats["handled"], watcher.stats["failed"]), (0, 0))
+            stamp = watcher._failed[("printed_proof", "JOB_1.xml")]
+            self.assertFalse(self.ledger.seen("printed_proof", "JOB_1.xml", stamp))
+            # The next full scan tries it again.
+            watcher._failed.clear()
+            self.run_pass(watcher)
+        self.assertEqual(record.call_count, 2)
+        self.assertTrue(self.ledger.seen("printed_proof", "JOB_1.xml", stamp))
+
+    def test_ink_coverage_handler_creates_the_processing_folder(self):
+        self.write("100-1.xml", "<x/>")
+        folder = HotFolder("ink_coverage", self.folder_path, handlers.handle_ink_coverage, settle=0, poll=True)
+        with (
+            override_settings(INK_COVERAGE_DIR=self.folder_path),
+            mock.patch.object(handlers, "close_old_connections"),
+            mock.patch.object(InkCoverageQueue, "import_file", return_value=True) as import_file,
+        ):
+            self.run_pass(HotFolderWatcher([folder], ledger=self.ledger))
+        claimed = os.path.join(self.folder_path, "processing", "100-1.xml")
+        self.assertEqual(import_file.call_args[0][0], claimed)
+        self.assertTrue(os.path.exists(claimed))
+
+    def test_wait_for(self):
+        self.assertTrue(wait_for(lambda: True, self.folder_path, timeout=1))
+        self.assertFalse(wait_for(lambda: False, self.folder_path, timeout=0.2, poll_interval=0.05))
@@ -0,0 +1,150 @@
+"""
+Tests for streaming ink coverage parsing, the bulk ItemColor import and the
+claim step of the ink coverage queue.
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from gchub_db.apps.color_mgt.models import ColorDefinition
+from gchub_db.apps.workflow.models import ChargeType, ColorWarning, Item, ItemCatalog, ItemColor, Job, Site
+from gchub_db.apps.workflow.models.general import ChargeCategory
+from gchub_db.apps.xml_io import ink_coverage_queue
+from gchub_db.apps.xml_io.ink_coverage_reader import InkCoverageDocument, parse_ink_coverage
+
+INK = """<rdf:li rdf:parseType="Resource"><egInk:name>%s</egInk:name><egInk:book>%s</egInk:book>
+<egInk:type>%s</egInk:type><egInk:angle>%s</egInk:angle><egInk:r>1</egInk:r><egInk:g>0</egInk:g><egInk:b>0</egInk:b>
+<egInk:frequency>120</egInk:frequency></rdf:li>"""
+
+COVERAGE = """<rdf:li rdf:parseType="Resource"><egInkCov:pct>%s</egInkCov:pct><egInkCov:mm2>1000</egInkCov:mm2></rdf:li>"""
+
+DOCUMENT = """<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:egGr="http://ns.esko-graphics.com/grinfo/1.0/"
+ xmlns:egInk="http://ns.esko-graphics.com/inkinfo/1.0/" xmlns:egInkCovL="http://ns.esko-graphics.com/inkcovlist/1.0/"
+ xmlns:egInkCov="http://ns.esko-graphics.com/inkcov/1.0/" xmlns:egPrF="http://ns.esko-graphics.com/prfile/1.0/"
+ xmlns:stRef="http://ns.adobe.com/xap/1.0/sType/ResourceRef#">
+<dc:description><rdf:Alt><rdf:li xml:lang="x-default">Not for resale</rdf:li></rdf:Alt></dc:description>
+<egPrF:DerivedFrom rdf:parseType="Resource"><stRef:instanceID>server%%5Cjobs%%5Cart%%2012.pdf</stRef:instanceID></egPrF:DerivedFrom>
+<egGr:inks><rdf:Seq>%s</rdf:Seq></egGr:inks>
+<egInkCovL:coverage><rdf:Seq>%s</rdf:Seq></egInkCovL:coverage>
+</rdf:Description></rdf:RDF></x:xmpmeta>
+<?xpacket end="w"?>"""
+
+
+def coverage_xml(inks, coverages):
+    return DOCUMENT % ("".join(INK % ink for ink in inks), "".join(COVERAGE % pct for pct in coverages))
+
+
+class InkCoverageTest(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        site = Site.objects.create(name="Foodservice", domain="fsb.example.com")
+        size = ItemCatalog.objects.create(size="SMR-16", workflow=site)
+        # Saving a Foodservice item looks this up.
+        ChargeType.objects.create(type="Art Request", category=ChargeCategory.objects.create(name="Art"), base_amount=0, workflow=site)
+        self.job = Job.objects.create(name="Coverage Job", workflow=site, status="Active", due_date=date.today())
+        self.item = Item.objects.create(workflow=site, job=self.job, size=size, num_in_job=1)
+        self.red = ColorDefinition.objects.create(name="185", coating="C")
+        ColorWarning.objects.create(definition=self.red, qpo_number="QPO-1")
+        ItemColor.objects.create(item=self.item, color="Old Color")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, xml):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, "w") as f:
+            f.write(xml)
+        return path
+
+    def test_parse_pairs_inks_with_coverage(self):
+        path = self.write(
+            "%d-1.xml" % self.job.id,
+            coverage_xml(
+                [("Pantone 185 C", "pantone+ ppasc", "pms", "45"), ("Black", "process", "process", "15")],
+                ["12.5", "3"],
+            ),
+        )
+        parsed = parse_ink_coverage(path)
+        self.assertEqual(parsed["disclaimer"], "Not for resale")
+        self.assertEqual(
+            [(ink["name"], ink["angle"], ink["pct"]) for ink in parsed["inks"]],
+            [
+                ("Pantone 185 C", "45", "12.5"),
+                ("Black", "15", "3"),
+            ],
+        )
+        doc = InkCoverageDocument(path, parsed=parsed)
+        self.assertEqual(doc.get_job_number(), str(self.job.id))
+        self.assertEqual(doc.get_item_number(), "1")
+        self.assertEqual(doc.get_pdf_path(), "server/jobs/art 12.pdf")
+
+    def test_foodservice_import_replaces_itemcolors_in_bulk(self):
+        path = self.write(
+            "%d-1_nojdf.xml" % self.job.id,
+            coverage_xml(
+                [
+                    ("Pantone 185 C", "pantone+ ppasc", "pms", "45"),
+                    ("Black", "process", "process", "15"),
+                    ("Die", "technical", "technical", "0"),
+                ],
+                ["12.5", "3", "1"],
+            ),
+        )
+        warning_message = InkCoverageDocument(path).import_itemcolors(self.job, self.item)
+        self.assertIn("cannot hit 185. Replace with QPO-1", warning_message)
+
+        colors = list(self.item.itemcolor_set.order_by("sequence"))
+        self.assertEqual([(ic.color, ic.sequence, ic.angle) for ic in colors], [("185", 1, "45.0"), ("Process Black", 2, "15.0")])
+        self.assertEqual(colors[0].definition, self.red)
+        self.assertEqual(colors[0].plate_code, " 1A")
+        self.assertEqual(float(colors[0].coverage_perc), 12.5)
+
+    def incoming(self, *names):
+        incoming = os.path.join(self.temp_dir, "incoming")
+        os.makedirs(incoming)
+        for name in names:
+            self.write(os.path.join("incoming", name), "<x/>")
+        return incoming
+
+    def test_claim_moves_each_file_once(self):
+        # The processing directory doesn't exist until the first claim.
+        incoming = self.incoming("100-1.xml", "100-2.xml", ".DS_Store")
+        processing = os.path.join(incoming, "processing")
+
+        with override_settings(INK_COVERAGE_DIR=incoming):
+            first = ink_coverage_queue.InkCoverageQueue(batch_size=1)
+            second = ink_coverage_queue.InkCoverageQueue()
+            claimed = first.claim() + second.claim()
+            self.assertEqual(second.claim(), [])
+
+        self.assertEqual(sorted(os.path.basename(path) for path in claimed), ["100-1.xml", "100-2.xml"])
+        self.assertEqual(sorted(os.listdir(processing)), ["100-1.xml", "100-2.xml"])
+        self.assertEqual(sorted(os.listdir(incoming)), [".DS_Store", "invalid", "processed", "processing"])
+
+    def test_missing_processing_directory_is_an_error(self):
+        incoming = self.incoming("100-1.xml")
+        queue = ink_coverage_queue.InkCoverageQueue()
+        with override_settings(INK_COVERAGE_DIR=incoming), mock.patch.object(queue, "make_dirs"):
+            with self.assertRaises(FileNotFoundError):
+                queue.claim_file("100-1.xml")
+            # Only a file that has gone is skipped.
+            self.assertIsNone(queue.claim_file("100-2.xml"))
+
+    def test_abandoned_claims_are_requeued(self):
+        incoming = self.incoming("100-1.xml", "100-2.xml")
+        queue = ink_coverage_queue.InkCoverageQueue()
+        with override_settings(INK_COVERAGE_DIR=incoming):
+            old, recent = queue.claim_file("100-1.xml"), queue.claim_file("100-2.xml")
+            claimed = os.stat(old).st_mtime - ink_coverage_queue.ABANDONED_CLAIM_SECONDS - 1
+            os.utime(old, (claimed, claimed))
+            self.assertEqual(queue.requeue_abandoned(), ["100-1.xml"])
+            # Claimed again by the next pass, the recent claim is left alone.
+            self.assertEqual(queue.claim(), [old])
+        self.assertTrue(os.path.exists(recent))
@@ -0,0 +1,78 @@
+"""
+Tests for JDF ticket generation and reading the JDFs Backstage sends back.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+from xml.etree import ElementTree as ET
+
+from django.test import SimpleTestCase
+
+from gchub_db.apps.xml_io.jdf_reader import JDFReader
+from gchub_db.apps.xml_io.jdf_writer import ItemJDF
+
+PROCESSED_JDF = """<?xml version="1.0"?>
+<JDF xmlns="http://www.CIP4.org/JDFSchema_1_2" xmlns:eg="http://www.esko-graphics.com/EGschema1_0"
+ DescriptiveName="GOLD JDF Task" ID="n0001" Status="Aborted" Type="ProcessGroup" Version="1.2">
+<JDF xmlns="http://www.CIP4.org/JDFSchema_1_1" DescriptiveName="RIP1up" ID="n0002" Status="Aborted" Type="eg:BackStageTask">
+<ResourcePool><eg:BackStageTaskParams Class="Parameter" ID="TaskParamLink" eg:TicketName="/swft/FSB Smart Contract Proofing"/></ResourcePool>
+<AuditPool><Notification Class="Event"><Comment>Missing font</Comment></Notification>
+<Notification Class="Event"><Comment>Missing die</Comment></Notification><ProcessRun EndStatus="Aborted"/></AuditPool>
+</JDF></JDF>"""
+
+
+class JDFTest(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.item = mock.Mock(num_in_job=2)
+        self.item.job.id = 60001
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_ticket_tasks_from_templates(self):
+        jdf = ItemJDF(
+            self.item,
+            {"SourceFileList": ["file://fs/a.pdf", "file://fs/b & c.pdf"]},
+            extra_vars={"TIFFList": {"Status": "Unavailable"}},
+        )
+        jdf.add_task("rip_1up", "/swft/FSB Smart Contract Proofing", smartmark_set="!QuickApproval-Master")
+        jdf.add_task("rgb_pdf", "/batchbrix.pdfout/AutosavePDF")
+
+        xml = jdf.get_xml_doc_string()
+        self.assertTrue(xml.startswith('<?xml version="1.0" ?><JDF DescriptiveName="GOLD JDF Task"'))
+        root = ET.fromstring(xml)
+        files = [spec.get("URL") for spec in root.iter("{http://www.CIP4.org/JDFSchema_1_2}FileSpec")]
+        self.assertEqual(files, ["file://fs/a.pdf", "file://fs/b & c.pdf"])
+        tasks = root.findall("{http://www.CIP4.org/JDFSchema_1_1}JDF")
+        self.assertEqual(
+            [(task.get("ID"), task.get("DescriptiveName")) for task in tasks], [("n0001", "RIP1up"), ("n0002", "RGB PDF")]
+        )
+        self.assertIn('eg:TicketName="/batchbrix.pdfout/AutosavePDF"', xml)
+        self.assertIn('eg:MarkSet="!QuickApproval-Master"', xml)
+
+    def test_send_refuses_duplicate_file_name(self):
+        jdf = ItemJDF(self.item, {"SourceFileList": ["file://fs/a.pdf"]})
+        jdf.add_task("rip_1up", "/swft/Carton Smart Proofing")
+        jdf.send_jdf(file_name_override="60001-2-test.jdf", jdf_path_override=self.temp_dir)
+        self.assertTrue(jdf.check_jdf_exists("60001-2-test.jdf", self.temp_dir))
+        self.item.job.growl_at_artist.assert_not_called()
+
+        jdf.send_jdf(file_name_override="60001-2-test.jdf", jdf_path_override=self.temp_dir)
+        self.item.job.growl_at_artist.assert_called_once()
+        self.assertEqual(os.listdir(self.temp_dir), ["60001-2-test.jdf"])
+
+    def test_reader_finds_aborted_tasks(self):
+        path = os.path.join(self.temp_dir, "60001-2-19_10-10_00_00.jdf")
+        with open(path, "w") as f:
+            f.write(PROCESSED_JDF)
+
+        jdf = JDFReader(path)
+        self.assertEqual((jdf.job_num, jdf.item_num_in_job), ("60001", "2"))
+        self.assertTrue(jdf.has_aborted_tasks)
+        self.assertEqual(jdf.ticket_name, "/swft/FSB Smart Contract Proofing")
+        self.assertEqual([task.descriptive_name for task in jdf.jdf_tasks], ["GOLD JDF Task", "RIP1up"])
+        self.assertEqual(jdf.jdf_tasks[1].return_comments(), "Missing font\n\rMissing die")
+        self.assertEqual(jdf.jdf_tasks[1].audit_pools[0].end_status, "Aborted")
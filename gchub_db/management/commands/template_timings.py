@@ -0,0 +1,51 @@
+"""
+Management command that reports how long each template takes to render
+for the given pages, to find the slowest includes and inclusion tags.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from gchub_db.includes.template_tools import TemplateTimer, warm_templates
+
+
+class Command(BaseCommand):
+    help = "Report per-template render times for the given URLs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="Paths to fetch, e.g. /workflow/job/12345/")
+        parser.add_argument("--user", help="Username to fetch the pages as")
+        parser.add_argument("--repeat", type=int, default=1, help="Times to fetch each page")
+        parser.add_argument("--limit", type=int, default=30, help="Number of templates to list")
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Don't compile the templates first, so parsing is included in the times",
+        )
+
+    def handle(self, *args, **options):
+        hosts = [host for host in settings.ALLOWED_HOSTS if "*" not in host]
+        client = Client(HTTP_HOST=hosts[0] if hosts else "testserver")
+        if options["user"]:
+            try:
+                client.force_login(User.objects.get(username=options["user"]))
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']}")
+        if not options["cold"]:
+            warm_templates()
+
+        with TemplateTimer() as timer:
+            for url in options["urls"]:
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    response = client.get(url, secure=True)
+                    self.stdout.write(f"{url}: {response.status_code} in {time.perf_counter() - start:.3f}s")
+
+        self.stdout.write("")
+        self.stdout.write(f"{'Template':<60} {'Renders':>8} {'Total (s)':>10} {'Own (s)':>10}")
+        for name, renders, seconds, own in timer.report()[: options["limit"]]:
+            self.stdout.write(f"{name:<60} {renders:>8} {seconds:>10.3f} {own:>10.3f}")
@@ -0,0 +1,22 @@
+"""
+Management command that compiles every template before the workers start.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gchub_db.includes.template_tools import warm_templates
+
+
+class Command(BaseCommand):
+    help = "Compile every template, failing on any with syntax errors"
+
+    def handle(self, *args, **options):
+        start = time.time()
+        compiled, errors = warm_templates()
+        for name, error in sorted(errors.items()):
+            self.stderr.write(f"{name}: {error}")
+        if errors:
+            raise CommandError(f"{len(errors)} of {compiled + len(errors)} templates failed to compile")
+        self.stdout.write(self.style.SUCCESS(f"{compiled} templates compiled in {time.time() - start:.1f}s"))
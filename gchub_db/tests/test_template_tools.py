@@ -0,0 +1,118 @@
+"""
+Tests for template warm-up and render timing.
+"""
+
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.shortcuts import render
+from django.template import engines
+from django.template.loaders.filesystem import Loader
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+
+from gchub_db.includes.template_tools import TemplateTimer, template_names, warm_templates
+from gchub_db.management.commands import template_timings
+from gchub_db.management.commands import warm_templates as warm_templates_command
+
+TEMPLATES = {
+    "page.html": "{% extends 'base.html' %}{% block body %}{% for n in numbers %}{% include 'row.html' %}{% endfor %}{% endblock %}",
+    "base.html": "<body>{% block body %}{% endblock %}</body>",
+    "row.html": "<p>{{ n }}</p>",
+    "emails/notice.txt": "Hello {{ name }}",
+    "notes.bak": "{% broken",
+    "scripts/widget.js": "{% broken",
+}
+
+
+def page(request):
+    return render(request, "page.html", {"numbers": range(3)})
+
+
+urlpatterns = [path("page/", page)]
+
+
+class TemplateToolsTest(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        for name, source in TEMPLATES.items():
+            os.makedirs(os.path.dirname(os.path.join(self.temp_dir, name)), exist_ok=True)
+            with open(os.path.join(self.temp_dir, name), "w") as template:
+                template.write(source)
+        self.settings_override = override_settings(
+            ROOT_URLCONF=__name__,
+            TEMPLATES=[
+                {
+                    "BACKEND": "django.template.backends.django.DjangoTemplates",
+                    "DIRS": [self.temp_dir],
+                    "OPTIONS": {"loaders": [("django.template.loaders.cached.Loader", ["django.template.loaders.filesystem.Loader"])]},
+                }
+            ],
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.temp_dir)
+
+    def add_template(self, name, source):
+        with open(os.path.join(self.temp_dir, name), "w") as template:
+            template.write(source)
+
+    def test_warm_up_fills_the_cache(self):
+        engine = engines["django"].engine
+        self.assertEqual(template_names(engine), ["base.html", "emails/notice.txt", "page.html", "row.html"])
+        self.assertEqual(warm_templates(), (4, {}))
+        with mock.patch.object(Loader, "get_contents") as get_contents:
+            engine.get_template("page.html")
+        self.assertFalse(get_contents.called)
+
+    def test_command_fails_on_syntax_errors(self):
+        stdout = StringIO()
+        call_command(warm_templates_command.Command(), stdout=stdout)
+        self.assertIn("4 templates compiled", stdout.getvalue())
+
+        self.add_template("broken.html", "{% if %}")
+        stderr = StringIO()
+        with self.assertRaisesMessage(CommandError, "1 of 5 templates failed to compile"):
+            call_command(warm_templates_command.Command(), stdout=StringIO(), stderr=stderr)
+        self.assertIn("broken.html", stderr.getvalue())
+
+    def test_worker_warm_up_logs_any_error(self):
+        get_template = engines["django"].engine.get_template
+
+        def broken_tag(name):
+            if name == "row.html":
+                raise ValueError("bad tag argument")
+            return get_template(name)
+
+        with mock.patch.object(engines["django"].engine, "get_template", side_effect=broken_tag):
+            with self.assertRaisesMessage(ValueError, "bad tag argument"):
+                warm_templates()
+            with self.assertLogs("gchub_db.includes.template_tools", "WARNING") as logs:
+                compiled, errors = warm_templates(strict=False)
+        self.assertEqual((compiled, list(errors)), (3, ["row.html"]))
+        self.assertIn("row.html", logs.output[0])
+
+    def test_timer_counts_included_templates(self):
+        with TemplateTimer() as timer:
+            engines["django"].get_template("page.html").render({"numbers": range(3)})
+        report = {name: (renders, seconds, own) for name, renders, seconds, own in timer.report()}
+        self.assertEqual({name: row[0] for name, row in report.items()}, {"page.html": 1, "base.html": 1, "row.html": 3})
+        # base.html is rendered by page.html, and the rows by base.html's block.
+        self.assertGreaterEqual(report["page.html"][1], report["base.html"][1])
+        self.assertGreaterEqual(report["base.html"][1], report["row.html"][1])
+        self.assertAlmostEqual(sum(row[2] for row in report.values()), report["page.html"][1])
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def test_timings_command(self):
+        stdout = StringIO()
+        call_command(template_timings.Command(), "/page/", "--repeat=2", stdout=stdout)
+        output = stdout.getvalue()
+        self.assertEqual(output.count("/page/: 200"), 2)
+        self.assertRegex(output, r"row\.html\s+6\s")
@@ -0,0 +1,183 @@
+"""
+Cached option lists for the <select> boxes on search and entry forms.
+
+A ModelChoiceField runs its queryset and builds a model instance per option
+every time its form is rendered, which adds up on forms with several long
+pulldowns (or a formset of them). CachedModelChoiceField renders its options
+from a list of (value, label) pairs kept in the cache instead. Each list
+remembers the "generation" of the models it was built from; saving or
+deleting one of those models starts a new generation, so the next render
+rebuilds the list. Generations are kept in the database (CacheGeneration),
+and each process re-reads them once its copy is GENERATION_TIMEOUT seconds
+old, so a change made by another process shows within that long.
+Submitted values are still validated against the field's queryset, so a
+stale list can never let an invalid choice through.
+
+Lists that are too long to be usable as a pulldown at all (users, print
+groups, the item catalog) should use widgets.AutocompleteSelect instead.
+"""
+
+import hashlib
+import uuid
+
+from django import forms
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.choices import BaseChoiceIterator
+
+# Seconds an option list is kept, as a backstop to signal invalidation.
+CHOICE_LIST_TIMEOUT = getattr(settings, "CHOICE_LIST_TIMEOUT", 60 * 60)
+# Seconds a process trusts the generations it last read from the database.
+GENERATION_TIMEOUT = getattr(settings, "CHOICE_LIST_GENERATION_TIMEOUT", 10)
+
+# Changes to any of these affect who appears in a permission-based user list.
+USER_LIST_MODELS = (User, User.groups.through, Group.permissions.through)
+
+_watched_models = set()
+
+
+def _generation_key(model):
+    return "choice_list_gen_%s" % model._meta.label_lower
+
+
+def _new_generation(sender, **kwargs):
+    # m2m_changed is sent before and after each change; once is enough.
+    if kwargs.get("action", "").startswith("pre_"):
+        return
+    from gchub_db.apps.workflow.models.general import CacheGeneration
+
+    generation = uuid.uuid4().hex
+    CacheGeneration.objects.update_or_create(name=sender._meta.label_lower, defaults={"generation": generation})
+    cache.set(_generation_key(sender), generation, GENERATION_TIMEOUT)
+
+
+def _generations(models):
+    """
+    The current generation of each of models, from this process's cache if
+    it was read recently enough, otherwise from the database. A model that
+    has never changed is at generation "".
+    """
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    missing = {model._meta.label_lower: key for model, key in zip(models, keys) if key not in found}
+    if missing:
+        from gchub_db.apps.workflow.models.general import CacheGeneration
+
+        stored = dict(CacheGeneration.objects.filter(name__in=missing).values_list("name", "generation"))
+        read = {key: stored.get(name, "") for name, key in missing.items()}
+        cache.set_many(read, GENERATION_TIMEOUT)
+        found.update(read)
+    return [found[key] for key in keys]
+
+
+def watch_model(model):
+    """Invalidates the option lists built from model whenever it changes."""
+    if model in _watched_models:
+        return
+    _watched_models.add(model)
+    dispatch_uid = "choice_lists_%s" % model._meta.label_lower
+    for signal in (post_save, post_delete, m2m_changed):
+        signal.connect(_new_generation, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+
+def model_generation(model):
+    """
+    The current generation of model, which changes whenever it does (once
+    watched). Lets other in-process caches built from model notice changes,
+    those made by other processes up to GENERATION_TIMEOUT seconds late.
+    """
+    watch_model(model)
+    return _generations([model])[0]
+
+
+def invalidate_choice_lists(model):
+    """
+    Invalidates the option lists built from model. Only needed after writes
+    that don't send signals, like bulk_create(), bulk_update() and update().
+    """
+    _new_generation(model)
+
+
+def cached_choices(name, queryset, choice=None, models=None, variant=""):
+    """
+    Returns a list of (value, label) pairs for queryset, cached under name.
+
+    choice turns an instance into its pair and defaults to (pk, str(obj)).
+    models are the models whose changes invalidate the list, defaulting to the
+    queryset's model. variant tells apart versions of the same list that are
+    filtered differently, for example by the workflows a user can see.
+    """
+    models = models or (queryset.model,)
+    for model in models:
+        watch_model(model)
+    choice = choice or (lambda obj: (obj.pk, str(obj)))
+
+    key = "choice_list_%s_%s" % (name, hashlib.md5(repr(variant).encode()).hexdigest())
+    generations = _generations(models)
+    entry = cache.get(key)
+    if entry is not None and entry["generations"] == generations:
+        return entry["choices"]
+
+    choices = [choice(obj) for obj in queryset]
+    cache.set(key, {"generations": generations, "choices": choices}, CHOICE_LIST_TIMEOUT)
+    return choices
+
+
+class CachedChoiceIterator(BaseChoiceIterator):
+    """
+    Used in place of ModelChoiceIterator, reading the options from the cache.
+    As a BaseChoiceIterator it is left alone, not listed, when the field is
+    set up.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.queryset = field.queryset
+
+    def choice(self, obj):
+        return (self.field.prepare_value(obj), self.field.label_from_instance(obj))
+
+    def _choices(self):
+        return cached_choices(
+            self.field.cache_name,
+            self.queryset,
+            choice=self.choice,
+            models=self.field.cache_models,
+            variant=self.field.cache_variant,
+        )
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self._choices()
+
+    def __len__(self):
+        return len(self._choices()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self._choices())
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField whose options are rendered from cached_choices().
+
+    cache_name must be unique to the queryset; if the queryset is narrowed
+    per user after the form is created, set cache_variant to something that
+    identifies the filtering (the queryset itself is only run on a miss).
+    """
+
+    def __init__(self, queryset, cache_name, cache_models=None, cache_variant="", **kwargs):
+        self.cache_name = cache_name
+        self.cache_models = cache_models
+        self.cache_variant = cache_variant
+        super(CachedModelChoiceField, self).__init__(queryset, **kwargs)
+
+    def _get_choices(self):
+        if hasattr(self, "_choices"):
+            return self._choices
+        return CachedChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField.choices.fset)
@@ -5,7 +5,32 @@ colors within Kalleidescope color books.
 
 from configparser import RawConfigParser
 
-from colormath.color_objects import SpectralColor
+from colormath.color_conversions import convert_color
+from colormath.color_objects import LabColor, SpectralColor
+
+# Wavelengths (nm) of the 36 reflectance values stored for each color.
+WAVELENGTHS = tuple(range(380, 740, 10))
+# Each color's spectral data is split over these four keys.
+SPECTRAL_KEYS = ("v0", "v1", "v2", "v3")
+
+
+def parse_spectral_values(fobj):
+    """
+    Parses a whole colorbook spectral .res file in one pass. Returns a dict
+    of section (color header) name to a tuple of 36 floats. Sections that
+    don't carry a full set of spectral values are skipped.
+    """
+    config_parser = RawConfigParser()
+    config_parser.read_file(fobj)
+    table = {}
+    for section in config_parser.sections():
+        try:
+            values = tuple(float(num) for key in SPECTRAL_KEYS for num in config_parser.get(section, key).split())
+        except Exception:
+            continue
+        if len(values) == len(WAVELENGTHS):
+            table[section] = values
+    return table
 
 
 class InvalidColor(Exception):
@@ -24,106 +49,51 @@ class EskoColor(object):
     share. From here, you can get color values and perform some calculations.
     """
 
-    def __init__(self, color_name, color_spec_res_path):
+    def __init__(self, color_name, color_spec_res_path, spectral_values=None):
         """
         color_name: (str) Raw, user-provided color name that was queried for.
         color_spec_res_path: (str) Path to the color's *_ras_spec.res file.
+        spectral_values: (tuple) The color's 36 reflectance values, if already
+                         parsed by the colorbook. The .res file is only read
+                         when these aren't given.
         """
         self.name = color_name
         self.color_spec_res_path = color_spec_res_path
-
-        try:
-            self.fobj = open(self.color_spec_res_path, "r")
-        except IOError:
-            raise InvalidColor(self.color_spec_res_path) from None
-
-        self.config_parser = RawConfigParser()
-        self.config_parser.read_file(self.fobj)
+        self.spectral_values = spectral_values
+        self.config_parser = None
+
+        if spectral_values is None:
+            self.config_parser = RawConfigParser()
+            try:
+                with open(self.color_spec_res_path, "r") as fobj:
+                    self.config_parser.read_file(fobj)
+            except IOError:
+                raise InvalidColor(self.color_spec_res_path) from None
+
+    @staticmethod
+    def header_name(color_name):
+        """Returns the spectral file section name for a color at 100% on white."""
+        return color_name.replace(" ", "_") + "_100_w"
 
     def __str__(self):
         return "EskoColor: %s" % self.name
 
     def get_spectral_color_obj(self):
         """Returns a python-colormath SpectralColor object for this color."""
-        # These variables need to be pre-instantiated for the tuple splitting
-        # to work further down.
-        # v0 Options
-        w380 = w390 = w400 = w410 = w420 = w430 = w440 = w450 = w460 = w470 = None
-        # v1 Options
-        w480 = w490 = w500 = w510 = w520 = w530 = w540 = w550 = w560 = w570 = None
-        # v2 Options
-        w580 = w590 = w600 = w610 = w620 = w630 = w640 = w650 = w660 = w670 = None
-        # v3 Options
-        w680 = w690 = w700 = w710 = w720 = w730 = None
-
-        # Get each line of spectral float numbers and stuff them into variables
-        # according to their [guessed] wavelength. Notice that the 'cow01000'
+        # Values are ordered by wavelength. Notice that the 'cow01000'
         # property is what we assume to be 'Color On White', as in the
         # substrate's white value.
-
-        # Specify the name of the header that the color information will be found.
-        color_header_name = self.name.replace(" ", "_") + "_100_w"
-
-        # First line
-        v0_values = self.config_parser.get(color_header_name, "v0").split()
-        v0_float_list = [float(num) for num in v0_values]
-        w380, w390, w400, w410, w420, w430, w440, w450, w460, w470 = tuple(v0_float_list)
-        # Second line
-        v1_values = self.config_parser.get(color_header_name, "v1").split()
-        v1_float_list = [float(num) for num in v1_values]
-        w480, w490, w500, w510, w520, w530, w540, w550, w560, w570 = tuple(v1_float_list)
-        # Third line
-        v2_values = self.config_parser.get(color_header_name, "v2").split()
-        v2_float_list = [float(num) for num in v2_values]
-        w580, w590, w600, w610, w620, w630, w640, w650, w660, w670 = tuple(v2_float_list)
-        # Fourth line
-        v3_values = self.config_parser.get(color_header_name, "v3").split()
-        v3_float_list = [float(num) for num in v3_values]
-        w680, w690, w700, w710, w720, w730 = tuple(v3_float_list)
-
-        spc = SpectralColor(
-            observer=2,
-            illuminant="d50",
-            spec_380nm=w380,
-            spec_390nm=w390,
-            spec_400nm=w400,
-            spec_410nm=w410,
-            spec_420nm=w420,
-            spec_430nm=w430,
-            spec_440nm=w440,
-            spec_450nm=w450,
-            spec_460nm=w460,
-            spec_470nm=w470,
-            spec_480nm=w480,
-            spec_490nm=w490,
-            spec_500nm=w500,
-            spec_510nm=w510,
-            spec_520nm=w520,
-            spec_530nm=w530,
-            spec_540nm=w540,
-            spec_550nm=w550,
-            spec_560nm=w560,
-            spec_570nm=w570,
-            spec_580nm=w580,
-            spec_590nm=w590,
-            spec_600nm=w600,
-            spec_610nm=w610,
-            spec_620nm=w620,
-            spec_630nm=w630,
-            spec_640nm=w640,
-            spec_650nm=w650,
-            spec_660nm=w660,
-            spec_670nm=w670,
-            spec_680nm=w680,
-            spec_690nm=w690,
-            spec_700nm=w700,
-            spec_710nm=w710,
-            spec_720nm=w720,
-            spec_730nm=w730,
-        )
+        values = self.spectral_values
+        if values is None:
+            # Specify the name of the header that the color information will be found.
+            color_header_name = self.header_name(self.name)
+            values = tuple(float(num) for key in SPECTRAL_KEYS for num in self.config_parser.get(color_header_name, key).split())
+
+        spectral_kwargs = {"spec_%dnm" % wavelength: value for wavelength, value in zip(WAVELENGTHS, values)}
+        spc = SpectralColor(observer=2, illuminant="d50", **spectral_kwargs)
         return spc
 
     def get_lab_color_obj(self):
         """Returns a python-colormath LabColor object."""
         spec = self.get_spectral_color_obj()
-        return spec.convert_to("lab")
+        return convert_color(spec, LabColor)
@@ -8,7 +8,11 @@ from configparser import RawConfigParser
 
 from django.conf import settings
 
-from .color_reader import EskoColor
+from .color_reader import EskoColor, InvalidColor, parse_spectral_values
+
+# Parsed spectral files, keyed by path and validated by mtime/size, so every
+# EskoColorBook (and every color looked up in it) shares one parse.
+_SPECTRAL_TABLES = {}
 
 
 class InvalidColorBook(Exception):
@@ -40,14 +44,13 @@ class EskoColorBook(object):
         self.cdb_path = None
 
         self._calc_path_from_colorbook_name(colorbook_name)
+        self.config_parser = RawConfigParser()
         try:
-            self.fobj = open(self.resfile_path, "r")
+            with open(self.resfile_path, "r") as fobj:
+                self.config_parser.read_file(fobj)
         except IOError:
             raise InvalidColorBook(self.resfile_path) from None
 
-        self.config_parser = RawConfigParser()
-        self.config_parser.readfp(self.fobj)
-
     def __str__(self):
         return "EskoColorBook: %s" % self.name
 
@@ -93,4 +96,26 @@ class EskoColorBook(object):
         """
         # color_filename = 'cdb_%s_ras_spec.res' % parsed_name
         # color_spec_res_path = os.path.join(self.cdb_path, color_filename)
-        return EskoColor(color_name, self.spec_file_path)
+        return EskoColor(
+            color_name,
+            self.spec_file_path,
+            spectral_values=self.get_spectral_table().get(EskoColor.header_name(color_name)),
+        )
+
+    def get_spectral_table(self):
+        """
+        Returns the colorbook's spectral data as a dict of color header name to
+        a tuple of 36 reflectance values (380nm-730nm). The spectral file is
+        parsed once and re-used until it changes on disk.
+        """
+        try:
+            spec_stat = os.stat(self.spec_file_path)
+        except OSError:
+            raise InvalidColor(self.spec_file_path) from None
+        stamp = (spec_stat.st_mtime_ns, spec_stat.st_size)
+        cached = _SPECTRAL_TABLES.get(self.spec_file_path)
+        if cached is None or cached[0] != stamp:
+            with open(self.spec_file_path, "r") as fobj:
+                cached = (stamp, parse_spectral_values(fobj))
+            _SPECTRAL_TABLES[self.spec_file_path] = cached
+        return cached[1]
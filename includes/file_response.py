@@ -0,0 +1,160 @@
+"""
+Sends workflow files (proofs, final files, TIFFs, database documents) to the
+browser without reading them into memory.
+
+With FILE_SERVE_BACKEND set to "x-accel" the response only carries an
+X-Accel-Redirect header and nginx streams the file itself, so no gunicorn
+thread is held for the length of the download. "x-sendfile" does the same for
+Apache/lighttpd. Otherwise the file is streamed by Django in chunks. In every
+case ETag/Last-Modified conditional requests are answered with a 304, and the
+Django fallback honours single HTTP Range requests.
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Size of each chunk read when Django streams the file itself.
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(file_stat):
+    """Returns a quoted ETag built from a file's size and modification time."""
+    return '"%x-%x"' % (file_stat.st_size, file_stat.st_mtime_ns)
+
+
+class RangeNotSatisfiable(Exception):
+    """Thrown when a Range header asks for bytes past the end of the file."""
+
+    def __str__(self):
+        return "The requested range is not satisfiable."
+
+
+def parse_range(range_header, size):
+    """
+    Parses a single-range Range header into an inclusive (start, end) pair.
+    Returns None if there is no usable range, in which case the whole file is
+    sent; multi-range and malformed requests are treated the same way.
+    Raises RangeNotSatisfiable if the range lies entirely past the end.
+    """
+    if not range_header:
+        return None
+    match = RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last N bytes.
+        length = int(end)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def _iter_file_range(path, start, length):
+    """Yields length bytes of a file starting at start, in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _accel_redirect_uri(path):
+    """
+    Maps a filesystem path onto one of the nginx internal locations listed in
+    FILE_SERVE_ACCEL_LOCATIONS. Returns None if the path is outside all of them.
+    """
+    real_path = os.path.realpath(path)
+    locations = getattr(settings, "FILE_SERVE_ACCEL_LOCATIONS", {})
+    # Longest prefix first so nested shares map to their own location.
+    for root in sorted(locations, key=len, reverse=True):
+        real_root = os.path.realpath(root).rstrip(os.sep) + os.sep
+        if real_path.startswith(real_root):
+            relative = real_path[len(real_root) :].replace(os.sep, "/")
+            return locations[root].rstrip("/") + "/" + quote(relative)
+    return None
+
+
+def serve_file(request, path, content_type=None, filename=None, as_attachment=True):
+    """
+    Returns a response that sends the file at path.
+
+    content_type defaults to a guess from the file name. filename is what the
+    browser is told to save the file as, defaulting to the file's own name.
+    Raises OSError if the file can't be read.
+    """
+    file_stat = os.stat(path)
+    etag = file_etag(file_stat)
+    last_modified = int(file_stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    content_type = content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    filename = filename or os.path.basename(path)
+    backend = getattr(settings, "FILE_SERVE_BACKEND", None)
+
+    response = None
+    if backend == "x-accel":
+        redirect_uri = _accel_redirect_uri(path)
+        if redirect_uri:
+            # nginx handles Range and the body itself.
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = redirect_uri
+    elif backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+
+    if response is None:
+        try:
+            byte_range = parse_range(request.META.get("HTTP_RANGE"), file_stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = "bytes */%d" % file_stat.st_size
+            return response
+        # Only honour Range if If-Range (when sent) still matches this file.
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if byte_range and if_range and if_range not in (etag, http_date(last_modified)):
+            byte_range = None
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_iter_file_range(path, start, length), status=206, content_type=content_type)
+            response["Content-Range"] = "bytes %d-%d/%d" % (start, end, file_stat.st_size)
+            response["Content-Length"] = str(length)
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+            response["Content-Length"] = str(file_stat.st_size)
+        response["Accept-Ranges"] = "bytes"
+
+    response["Content-Disposition"] = '%s; filename="%s"' % (
+        "attachment" if as_attachment else "inline",
+        filename.replace('"', ""),
+    )
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -12,16 +12,21 @@ Rendering System.
 
 import datetime
 import glob
+import hashlib
+import json
 import mimetypes
 import os  # Operating System level things (files, dirs, etc)
 import os.path
 import re  # Regular Expressions
 import shutil  # Shared utilities (recursive deletion)
 import stat
+import threading
+import time
 import zipfile
+from collections import OrderedDict
 from io import BytesIO
 from socket import AF_INET, SOCK_DGRAM, socket
-from subprocess import Popen
+from subprocess import PIPE, Popen
 
 import exifread
 from django.conf import settings
@@ -64,6 +69,22 @@ JOBDIR = {
 # Used for thumbnailing various things. This is a hidden directory so we
 # don't clutter Finder windows.
 THUMBNAIL_FOLDER_NAME = ".thumbnails"
+# Records which final file (by content hash) the thumbnails were made from.
+THUMBNAIL_MANIFEST_NAME = "manifest.json"
+
+# Modes for locked (read-only) and unlocked job folders.
+LOCKED_MODE = stat.S_IRUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH
+UNLOCKED_MODE = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
+# The initial wait (in seconds) for a GOLD FS server request to be
+# acknowledged. Requests are sent once by default, so a web request never
+# waits long on an unreachable server; bin scripts and daemons pass
+# retries=FS_SERVER_RETRIES to re-send with a growing wait.
+FS_SERVER_ACK_TIMEOUT = 0.5
+FS_SERVER_RETRIES = 3
+# Seconds a job file manifest is trusted before its folders are re-stat'ed.
+JOB_MANIFEST_REVALIDATE_SECONDS = 5
+# Number of job file manifests kept in memory per process.
+JOB_MANIFEST_CACHE_SIZE = 200
 
 RENDER_PATHS = {
     "jpgs_for_render": "jpgs_for_render",
@@ -215,27 +236,79 @@ def delete_job_folder(jobnum, fail_silently=True):
             raise
 
 
-def _recursive_chmod(root_path, permission_bits):
+def _chmod_tree(folder, permission_bits):
+    """
+    chmods everything below folder (but not folder itself), skipping entries
+    that already have the right mode. Symlinks are left alone, since chmod
+    would follow them out of the job folder. Returns the number of entries
+    changed.
+    """
+    changed = 0
+    pending = [folder]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_symlink():
+                    continue
+                if stat.S_IMODE(entry.stat(follow_symlinks=False).st_mode) != permission_bits:
+                    os.chmod(entry.path, permission_bits)
+                    changed += 1
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+            except OSError:
+                continue
+    return changed
+
+
+def _recursive_chmod(root_path, permission_bits, workers=1):
     """
     Recursively chmod all of the files and directories (including the top)
     root_path. permission_bits is the 'mode' argument outlined by Py docs.
+    Entries that already have the right mode aren't touched, so re-locking a
+    locked folder only costs a directory walk.
+
+    With workers > 1 the top-level sub-folders are handled in parallel,
+    which helps on network shares where every chmod is a round trip.
+    Returns the number of entries changed.
 
     Currently will ignore OSErrors on files and directories, but not the
     root path.
     """
-    os.chmod(root_path, permission_bits)
-    for root, dirs, files in os.walk(root_path):
-        for name in files:
-            try:
-                os.chmod(os.path.join(root, name), permission_bits)
-            except OSError:
-                continue
-        for name in dirs:
+    changed = 0
+    if stat.S_IMODE(os.stat(root_path).st_mode) != permission_bits:
+        os.chmod(root_path, permission_bits)
+        changed += 1
+
+    subfolders = []
+    with os.scandir(root_path) as entries:
+        for entry in entries:
             try:
-                os.chmod(os.path.join(root, name), permission_bits)
+                if entry.is_symlink():
+                    continue
+                if stat.S_IMODE(entry.stat(follow_symlinks=False).st_mode) != permission_bits:
+                    os.chmod(entry.path, permission_bits)
+                    changed += 1
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
             except OSError:
                 continue
 
+    if workers > 1 and len(subfolders) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(subfolders))) as executor:
+            changed += sum(executor.map(lambda folder: _chmod_tree(folder, permission_bits), subfolders))
+    else:
+        for folder in subfolders:
+            changed += _chmod_tree(folder, permission_bits)
+    return changed
+
 
 def _send_fs_server_datagram(message):
     """Sends the FS server running on master a datagram."""
@@ -250,47 +323,97 @@ def _send_fs_server_datagram(message):
     s.close()
 
 
+def _send_fs_server_request(message, retries=0, timeout=FS_SERVER_ACK_TIMEOUT):
+    """
+    Sends the FS server a command and waits for it to be acknowledged,
+    re-sending up to retries times with a growing timeout if the datagram or
+    its ack is lost. The server doesn't recognise a re-sent request: one that
+    is still waiting is merged with the first, but one arriving after it ran
+    runs the command again. Only retry commands that are safe to repeat, and
+    not from a view, where each retry keeps the request waiting.
+
+    Returns the text following the ack (empty for most commands), or None
+    if the server never answered or refused the command.
+    """
+    addr = (settings.FS_SERVER_HOST, settings.FS_SERVER_PORT)
+    request_id = os.urandom(6).hex()
+    payload = ("@%s %s" % (request_id, message)).encode()
+    s = socket(AF_INET, SOCK_DGRAM)
+    try:
+        for attempt in range(retries + 1):
+            s.sendto(payload, addr)
+            s.settimeout(timeout * (2**attempt))
+            try:
+                while True:
+                    reply = s.recv(65535).decode("utf-8", "replace")
+                    parts = reply.split(" ", 2)
+                    # Ignore stray replies to an earlier, timed out request.
+                    if len(parts) < 2 or parts[1] != request_id:
+                        continue
+                    if parts[0] == "nak":
+                        return None
+                    if parts[0] == "ack":
+                        return parts[2] if len(parts) == 3 else ""
+            except OSError:
+                # Timed out (or the port is unreachable); try again.
+                continue
+    finally:
+        s.close()
+    return None
+
+
 def restart_fs_server():
     """Restarts the FS server."""
     _send_fs_server_datagram("shutdown")
 
 
-def direct_lock_job_folder(jobnum):
+def get_fs_server_stats(retries=0):
+    """
+    Returns the GOLD FS server's queue depth and per-command latencies as a
+    dict, or None if the server didn't answer.
+    """
+    reply = _send_fs_server_request("stats", retries=retries)
+    if reply is None:
+        return None
+    return json.loads(reply)
+
+
+def direct_lock_job_folder(jobnum, workers=1):
     """
     Locks a job folder directly through filesystem calls.
-    This is typically only done by master.
+    This is typically only done by master. Returns the number of files and
+    folders whose mode was changed.
     """
     job_path = get_job_folder(jobnum)
-    permission_bits = stat.S_IRUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH
-    _recursive_chmod(job_path, permission_bits)
+    return _recursive_chmod(job_path, LOCKED_MODE, workers=workers)
 
 
-def lock_job_folder(jobnum):
+def lock_job_folder(jobnum, retries=0):
     """
     Calls on the GOLD FS server running on master to lock the specified
-    job folder.
+    job folder. Returns True once the server has queued the request.
     """
     message = "lock_job_folder %s" % jobnum
-    _send_fs_server_datagram(message)
+    return _send_fs_server_request(message, retries=retries) is not None
 
 
-def unlock_job_folder(jobnum):
+def unlock_job_folder(jobnum, retries=0):
     """
     Calls on the GOLD FS server running on master to unlock the specified
-    job folder.
+    job folder. Returns True once the server has queued the request.
     """
     message = "unlock_job_folder %s" % jobnum
-    _send_fs_server_datagram(message)
+    return _send_fs_server_request(message, retries=retries) is not None
 
 
-def direct_unlock_job_folder(jobnum):
+def direct_unlock_job_folder(jobnum, workers=1):
     """
     Unlocks a job folder directly through filesystem calls.
-    This is typically only done by master.
+    This is typically only done by master. Returns the number of files and
+    folders whose mode was changed.
     """
     job_path = get_job_folder(jobnum)
-    permission_bits = stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO
-    _recursive_chmod(job_path, permission_bits)
+    return _recursive_chmod(job_path, UNLOCKED_MODE, workers=workers)
 
 
 def strip_for_valid_filename(filename):
@@ -384,6 +507,37 @@ def _generic_item_file_search(folder, pattern, return_first=True, excluded_files
         return None
 
 
+def _newest_item_file_search(folder, pattern, excluded_files=[".DS_Store"]):
+    """
+    Returns the most recently modified file in folder matching pattern. This
+    is a single scandir pass that keeps a running newest entry, rather than
+    listing the folder and then stat-ing and sorting every match.
+    """
+    newest_path = None
+    newest_mtime = None
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name in excluded_files or not pattern.search(entry.name):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if newest_mtime is None or mtime > newest_mtime:
+                    newest_path = entry.path
+                    newest_mtime = mtime
+    except (TypeError, OSError):
+        # The value of 'folder' is probably an invalid path.
+        raise InvalidPath() from None
+
+    if newest_path is None:
+        raise NoResultsFound()
+    return newest_path
+
+
 def find_item_folder(jobnum, itemnum, search_dir="final_files"):
     """
     Returns the full path to the item's Final File subfolder.
@@ -581,21 +735,118 @@ def delete_item_deleteonoutput_folder(jobnum, itemnum):
         pass
 
 
-def make_thumbnail_item_finalfile(jobnum, itemnum, width=155):
+def file_sha1(path, chunk_size=1024 * 1024):
+    """Return the SHA-1 hex digest of a file, read in chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_thumbnail_manifest(thumbnail_folder):
     """
-    Generates a thumbnail of an items final file PDF. This is put in a
-    hidden directory under the item's final file folder.
+    Returns the thumbnail manifest for a .thumbnails folder, or an empty dict
+    if there isn't a readable one. Keys are:
+        sha1: Content hash of the final file the thumbnails were made from.
+        size, mtime_ns: Stat of that final file, used as a cheap validity check.
+        widths: Thumbnail widths rendered from that content.
+    """
+    try:
+        with open(os.path.join(thumbnail_folder, THUMBNAIL_MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_thumbnail_manifest(thumbnail_folder, manifest):
+    """Atomically replaces the manifest so readers never see a partial file."""
+    manifest_file = os.path.join(thumbnail_folder, THUMBNAIL_MANIFEST_NAME)
+    temp_file = manifest_file + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_file, manifest_file)
+
+
+def render_pdf_thumbnails(pdf_path, thumbnail_folder, widths):
+    """
+    Renders the first page of a PDF once and writes a thumb_<width>.png for
+    each of the given widths. Each thumbnail is written under a temporary name
+    and moved into place, so a half-written PNG is never served.
+    """
+    widths = sorted(set(int(width) for width in widths), reverse=True)
+    cmd_list = ["/usr/bin/convert", "%s[0]" % pdf_path]
+    temp_files = {}
+    for width in widths:
+        temp_file = os.path.join(thumbnail_folder, ".thumb_%d.png.tmp" % width)
+        temp_files[width] = temp_file
+        # Clone the decoded page for each size instead of decoding it again.
+        cmd_list += ["(", "+clone", "-thumbnail", str(width), "-write", "png:%s" % temp_file, "+delete", ")"]
+    cmd_list.append("null:")
+    proc = Popen(cmd_list, stdout=PIPE, stderr=PIPE)
+    stderr = proc.communicate()[1]
+    if proc.returncode != 0:
+        raise OSError("convert failed on %s: %s" % (pdf_path, stderr.decode(errors="replace").strip()))
+    for width, temp_file in temp_files.items():
+        os.replace(temp_file, os.path.join(thumbnail_folder, "thumb_%d.png" % width))
+
+
+def make_thumbnails_item_finalfile(jobnum, itemnum, widths=(155,), force=False):
+    """
+    Generates thumbnails of several widths from an item's final file PDF.
+    These are put in a hidden directory under the item's final file folder.
     For example: Final Files/51234-1 SMR-16/.thumbnails/
+
+    Thumbnails are only re-rendered when the final file's content changes.
+    The stat of the final file is checked first; if that has moved on, the
+    file is hashed, and a touched-but-identical file just refreshes the
+    manifest. Returns True if anything was rendered.
     """
     ff_file = get_item_finalfile(jobnum, itemnum)
-    ff_folder = get_item_finalfile_folder(jobnum, itemnum)
-    # Figure out where the .thumbnails folder should be.
-    thumbnail_folder = os.path.join(ff_folder, THUMBNAIL_FOLDER_NAME)
+    thumbnail_folder = os.path.join(os.path.dirname(ff_file), THUMBNAIL_FOLDER_NAME)
     # Create the .thumbnails folder if it doesn't already exist.
     g_mkdir(thumbnail_folder)
-    thumbnail_file = os.path.join(thumbnail_folder, "thumb_%d.png" % width)
-    cmd_list = ["/usr/bin/convert", "-thumbnail", str(width), ff_file, thumbnail_file]
-    Popen(cmd_list).communicate()
+
+    widths = set(int(width) for width in widths)
+    ff_stat = os.stat(ff_file)
+    manifest = read_thumbnail_manifest(thumbnail_folder)
+    have_widths = set(manifest.get("widths", []))
+    have_files = all(os.path.exists(os.path.join(thumbnail_folder, "thumb_%d.png" % width)) for width in widths)
+
+    if not force and have_files and widths <= have_widths:
+        if manifest.get("size") == ff_stat.st_size and manifest.get("mtime_ns") == ff_stat.st_mtime_ns:
+            return False
+        sha1 = file_sha1(ff_file)
+        if manifest.get("sha1") == sha1:
+            manifest.update(size=ff_stat.st_size, mtime_ns=ff_stat.st_mtime_ns)
+            _write_thumbnail_manifest(thumbnail_folder, manifest)
+            return False
+    else:
+        sha1 = file_sha1(ff_file)
+
+    if manifest.get("sha1") == sha1:
+        # Same content, just missing a size. Keep the widths we already have.
+        widths |= have_widths
+    render_pdf_thumbnails(ff_file, thumbnail_folder, widths)
+    _write_thumbnail_manifest(
+        thumbnail_folder,
+        {
+            "sha1": sha1,
+            "size": ff_stat.st_size,
+            "mtime_ns": ff_stat.st_mtime_ns,
+            "widths": sorted(widths),
+        },
+    )
+    return True
+
+
+def make_thumbnail_item_finalfile(jobnum, itemnum, width=155):
+    """
+    Generates a thumbnail of an items final file PDF. This is put in a
+    hidden directory under the item's final file folder.
+    For example: Final Files/51234-1 SMR-16/.thumbnails/
+    """
+    make_thumbnails_item_finalfile(jobnum, itemnum, widths=(width,))
 
 
 def get_thumbnail_item_finalfile(jobnum, itemnum, width=155):
@@ -616,6 +867,21 @@ def get_thumbnail_item_finalfile(jobnum, itemnum, width=155):
         return None
 
 
+def get_thumbnail_etag(thumbnail_file):
+    """
+    Returns an ETag for a thumbnail file. Thumbnails listed in the manifest
+    are keyed by the content hash of their final file; older thumbnails made
+    before the manifest existed fall back to the PNG's own size and mtime.
+    """
+    thumbnail_folder = os.path.dirname(thumbnail_file)
+    width = os.path.basename(thumbnail_file)[len("thumb_") : -len(".png")]
+    manifest = read_thumbnail_manifest(thumbnail_folder)
+    if manifest.get("sha1") and width.isdigit() and int(width) in manifest.get("widths", []):
+        return '"%s-%s"' % (manifest["sha1"][:20], width)
+    thumb_stat = os.stat(thumbnail_file)
+    return '"%x-%x"' % (thumb_stat.st_size, thumb_stat.st_mtime_ns)
+
+
 def get_item_proof_folder(jobnum, itemnum):
     """
     Returns the path to the item's proofs folder under the Job/Proofs folder.
@@ -723,6 +989,15 @@ def copy_item_proof_folder(jobnum, itemnum, proof_log_id):
     shutil.copytree(proof_folder, proof_copy_folder)
 
 
+def _item_proof_pattern(itemnum, quality=None):
+    """Returns the regexp matching an item's proof PDFs of the given quality."""
+    # If quality is 'l', 'h' or anything else, match that here.
+    if quality:
+        return re.compile(r"(.*)-(%s)( .*%s\.pdf$|%s\.pdf$)" % (itemnum, quality, quality))
+    # This is usually Foodservice, who has no -l.pdf suffix.
+    return re.compile(r"(.*)-(%s)( .*\.pdf$|\.pdf$)" % (itemnum))
+
+
 def get_item_proof(jobnum, itemnum, quality=None, proof_log_id=None, return_first=True):
     """
     Return an item's approval or print card proof file.
@@ -740,14 +1015,24 @@ def get_item_proof(jobnum, itemnum, quality=None, proof_log_id=None, return_firs
             str("%s %s_%s %s" % ("Previous Proofs", str(jobnum), str(itemnum), str(proof_log_id))),
         )
 
-    # If quality is 'l', 'h' or anything else, match that here.
-    if quality:
-        pattern = re.compile(r"(.*)-(%s)( .*%s\.pdf$|%s\.pdf$)" % (itemnum, quality, quality))
-    else:
-        # This is usually Foodservice, who has no -l.pdf suffix.
-        pattern = re.compile(r"(.*)-(%s)( .*\.pdf$|\.pdf$)" % (itemnum))
+    return _generic_item_file_search(item_subfolder, _item_proof_pattern(itemnum, quality), return_first=return_first)
+
+
+def get_newest_item_proof(jobnum, itemnum, quality=None, proof_log_id=None):
+    """
+    Return the most recently modified proof file for an item. Takes the same
+    arguments as get_item_proof(), and is used where a proofs folder can hold
+    several generations of the proof.
+    """
+    item_subfolder = get_item_proof_folder(jobnum, itemnum)
 
-    return _generic_item_file_search(item_subfolder, pattern, return_first=return_first)
+    if proof_log_id:
+        item_subfolder = os.path.join(
+            item_subfolder,
+            str("%s %s_%s %s" % ("Previous Proofs", str(jobnum), str(itemnum), str(proof_log_id))),
+        )
+
+    return _newest_item_file_search(item_subfolder, _item_proof_pattern(itemnum, quality))
 
 
 def get_item_approval_pdf(jobnum, itemnum):
@@ -797,6 +1082,169 @@ def get_item_print_seps(jobnum, itemnum):
     return _generic_item_file_search(folder, pattern)
 
 
+_JOB_FILE_MANIFESTS = OrderedDict()
+_JOB_FILE_MANIFESTS_LOCK = threading.Lock()
+
+
+class JobFileManifest(object):
+    """
+    A record of which proofs, final files, TIFFs, database documents and
+    thumbnails exist for every item in a job, built from one scandir pass
+    over the job's folders.
+
+    The get_item_*() functions each list one or two folders on the share per
+    call, which adds up quickly when a page shows links for every item in a
+    job. The manifest answers the same questions with the same patterns from
+    memory. Use get_job_file_manifest() rather than building one directly.
+    """
+
+    # Job folders holding one sub-folder per item.
+    ITEM_FOLDERS = ("proofs", "final_files", "tiffs")
+    # Job folders holding one file per item.
+    DOCUMENT_FOLDERS = ("2_approval_scans", "3_preview_art", "4_print_seps")
+
+    def __init__(self, jobnum):
+        self.jobnum = jobnum
+        self.job_folder = get_job_folder(jobnum)
+        # Modification time of every directory read, keyed by path. A
+        # directory's mtime changes whenever an entry is added or removed.
+        self.stamps = {}
+        # {folder key: {itemnum: (item folder path, [file names])}}
+        self.item_folders = {key: {} for key in self.ITEM_FOLDERS}
+        # {folder key: [file names]}
+        self.documents = {}
+        # {itemnum: {width: thumbnail path}}
+        self.thumbnails = {}
+        self._scan()
+        self.validated = time.monotonic()
+
+    def _listdir(self, path):
+        """Returns (file names, directory names) in path, recording its mtime."""
+        try:
+            # Stat before listing, so a change mid-listing fails validation.
+            self.stamps[path] = os.stat(path).st_mtime_ns
+            files, dirs = [], []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+            return files, dirs
+        except OSError:
+            self.stamps[path] = None
+            return [], []
+
+    def _scan(self):
+        item_pattern = re.compile(r"(%s)-(\d+)( |$)" % self.jobnum)
+        thumb_pattern = re.compile(r"^thumb_(\d+)\.png$")
+        for key in self.ITEM_FOLDERS:
+            folder = os.path.join(self.job_folder, JOBDIR[key])
+            for dir_name in self._listdir(folder)[1]:
+                match = item_pattern.search(dir_name)
+                # Like _generic_item_subfolder_search(), the first match wins.
+                if not match or int(match.group(2)) in self.item_folders[key]:
+                    continue
+                itemnum = int(match.group(2))
+                item_folder = os.path.join(folder, dir_name)
+                files, dirs = self._listdir(item_folder)
+                self.item_folders[key][itemnum] = (item_folder, files)
+                if key == "final_files" and THUMBNAIL_FOLDER_NAME in dirs:
+                    thumbnail_folder = os.path.join(item_folder, THUMBNAIL_FOLDER_NAME)
+                    for name in self._listdir(thumbnail_folder)[0]:
+                        thumb_match = thumb_pattern.match(name)
+                        if thumb_match:
+                            widths = self.thumbnails.setdefault(itemnum, {})
+                            widths[int(thumb_match.group(1))] = os.path.join(thumbnail_folder, name)
+        for key in self.DOCUMENT_FOLDERS:
+            self.documents[key] = self._listdir(os.path.join(self.job_folder, JOBDIR[key]))[0]
+
+    def is_fresh(self):
+        """
+        True if none of the scanned directories have changed. Only re-stats
+        them once every JOB_MANIFEST_REVALIDATE_SECONDS.
+        """
+        if time.monotonic() - self.validated < JOB_MANIFEST_REVALIDATE_SECONDS:
+            return True
+        for path, mtime in self.stamps.items():
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                return False
+        self.validated = time.monotonic()
+        return True
+
+    def _matches(self, names, pattern, excluded_files=(".DS_Store",)):
+        return any(pattern.search(name) for name in names if name not in excluded_files)
+
+    def _item_files(self, key, itemnum):
+        return self.item_folders[key].get(int(itemnum), (None, []))[1]
+
+    def has_proof(self, itemnum, quality=None):
+        """Same as get_item_proof() finding a file."""
+        return self._matches(self._item_files("proofs", itemnum), _item_proof_pattern(itemnum, quality))
+
+    def has_finalfile(self, itemnum):
+        """Same as get_item_finalfile() finding a file."""
+        pattern = re.compile(r"(.*)-(%s)( .*\.pdf$|\.pdf$)" % (itemnum))
+        return self._matches(self._item_files("final_files", itemnum), pattern)
+
+    def has_tiffs(self, itemnum):
+        """True if the item's TIFF folder holds any .tif or .len files."""
+        pattern = re.compile(r"(.*).tif|(.*).len")
+        return self._matches(self._item_files("tiffs", itemnum), pattern, excluded_files=())
+
+    def has_approval_pdf(self, itemnum):
+        """Same as get_item_approval_pdf() finding a file."""
+        pattern = re.compile(r"(.*)_(%s)[.](pdf)$" % itemnum)
+        return self._matches(self.documents["2_approval_scans"], pattern)
+
+    def has_preview_art(self, itemnum):
+        """Same as get_item_preview_art() finding a file."""
+        if not getattr(settings, "FS_ACCESS_ENABLED", True):
+            return False
+        pattern = re.compile(r"ap_(.*)_(%s)[.](pdf)$" % itemnum)
+        return self._matches(self.documents["3_preview_art"], pattern)
+
+    def has_print_seps(self, itemnum):
+        """Same as get_item_print_seps() finding a file."""
+        if not getattr(settings, "FS_ACCESS_ENABLED", True):
+            return False
+        pattern = re.compile(r"(.*)-(%s)_(.*)_Seps[.](pdf)$" % itemnum)
+        return self._matches(self.documents["4_print_seps"], pattern)
+
+    def get_thumbnail(self, itemnum, width=155):
+        """Same as get_thumbnail_item_finalfile(): the path, or None."""
+        return self.thumbnails.get(int(itemnum), {}).get(int(width))
+
+
+def get_job_file_manifest(jobnum):
+    """
+    Returns the JobFileManifest for a job. Manifests are kept in memory and
+    rebuilt when any of the job's scanned folders change, so a page showing
+    every item of a job lists each folder once rather than once per link.
+    """
+    jobnum = int(jobnum)
+    with _JOB_FILE_MANIFESTS_LOCK:
+        manifest = _JOB_FILE_MANIFESTS.get(jobnum)
+    if manifest is None or not manifest.is_fresh():
+        manifest = JobFileManifest(jobnum)
+    with _JOB_FILE_MANIFESTS_LOCK:
+        _JOB_FILE_MANIFESTS[jobnum] = manifest
+        _JOB_FILE_MANIFESTS.move_to_end(jobnum)
+        while len(_JOB_FILE_MANIFESTS) > JOB_MANIFEST_CACHE_SIZE:
+            _JOB_FILE_MANIFESTS.popitem(last=False)
+    return manifest
+
+
+def forget_job_file_manifest(jobnum):
+    """Drops a job's cached manifest, for callers that just changed its files."""
+    with _JOB_FILE_MANIFESTS_LOCK:
+        _JOB_FILE_MANIFESTS.pop(int(jobnum), None)
+
+
 def get_item_3drender(jobnum, itemnum):
     """
     Not sure where this will come from...
@@ -1058,38 +1506,57 @@ def get_zip_all_tiffs(jobnum, itemnum):
     return temp_file.getvalue()
 
 
-def get_ftp_plate_files(jobnum, itemnum):
+def ftp_plate_zip_sources(jobnum, itemnum):
     """
-    Return a zip file containing all of an items tiffs and the low res proof
-    file. Suitable for uploading to an FTP server.
+    Returns (file path, name in the zip, compression) for each file in an
+    item's FTP plate zip: its tiffs in name order, then the low res proof.
     """
     # Get the tiff info dictionary
-    tiff_list = list_item_tiffs(jobnum, itemnum)
-    # This is a file-like object that we can write() and read() from.
-    temp_file = BytesIO()
-    # zipfile uses the BytesIO object for storage
-    zipped_tiff_file = zipfile.ZipFile(temp_file, "w", zipfile.ZIP_DEFLATED)
+    tiff_list = sorted(list_item_tiffs(jobnum, itemnum) or [], key=lambda tiff: tiff["file_name"])
+    # This creates a zip file which unzips correctly (1 folder w/ tiffs inside)
+    sources = [(tiff["file_path"], tiff["file_name"], zipfile.ZIP_STORED) for tiff in tiff_list]
 
-    # Add each of the tiffs to the Zip file.
-    for tiff in tiff_list:
-        # This creates a zip file which unzips correctly (1 folder w/ tiffs inside)
-        zipped_tiff_file.write(tiff["file_path"], tiff["file_name"], zipfile.ZIP_DEFLATED)
-
-    # Add the low res proof to the Zip file.
+    # Returns the path to the item's low res proof.
     try:
-        # Returns the path to the item's low res proof.
         proof_file_path = get_item_proof(jobnum, itemnum, quality="l")
+    except Exception:
+        proof_file_path = None
+    if proof_file_path:
         # Yank the '-l' out of the file name for the remote copy.
         proof_remote_filename = os.path.split(proof_file_path)[1].replace("-l.pdf", ".pdf")
-        zipped_tiff_file.write(proof_file_path, proof_remote_filename, zipfile.ZIP_DEFLATED)
-    except Exception:
-        pass
+        sources.append((proof_file_path, proof_remote_filename, zipfile.ZIP_DEFLATED))
+    return sources
 
-    # Absolutely critical to close the zip file before reading it. Causes
-    # the reference tables to be written, resulting in a readable ZIP archive.
-    zipped_tiff_file.close()
-    # See BytesIO documentation. Reads contents of BytesIO without requiring
-    # that it be close()'d first.
+
+def write_ftp_plate_zip(jobnum, itemnum, fileobj, sources=None):
+    """
+    Write a zip file containing all of an items tiffs and the low res proof
+    file to fileobj as it is built, so the zip is never held in memory.
+    fileobj may be a stream that can't seek, like an SFTP upload. sources
+    is the ftp_plate_zip_sources() list, for callers that already have it.
+
+    The tiffs are stored rather than DEFLATEd, as they are already
+    compressed and deflating them again takes most of the time for little
+    gain. Entries are written in name order, so the same files always make
+    the same bytes (which lets an interrupted upload pick up where it left
+    off).
+    """
+    if sources is None:
+        sources = ftp_plate_zip_sources(jobnum, itemnum)
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED) as zipped_tiff_file:
+        for file_path, zip_name, compress_type in sources:
+            zipped_tiff_file.write(file_path, zip_name, compress_type)
+
+
+def get_ftp_plate_files(jobnum, itemnum):
+    """
+    Return a zip file containing all of an items tiffs and the low res proof
+    file. Suitable for uploading to an FTP server. See write_ftp_plate_zip()
+    for writing it straight to the upload instead.
+    """
+    # This is a file-like object that we can write() and read() from.
+    temp_file = BytesIO()
+    write_ftp_plate_zip(jobnum, itemnum, temp_file)
     return temp_file
 
 
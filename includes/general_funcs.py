@@ -4,8 +4,8 @@ import datetime
 
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth.models import Permission, User
-from django.core.mail import send_mail
+from django.contrib.auth.models import Group, User
+from django.core.mail import EmailMessage
 from django.db.models import Q
 from django.utils import timezone
 
@@ -17,10 +17,10 @@ def paginate_get_request(request):
     """
     extra_link = []
     for key in request.GET:
-        # Don't include the 'page' key, as these would pile up. We can't
-        # just delete the key from request.GET, it's immutable. Can't convert
-        # to dict and encode, unicode problem.
-        if key != "page":
+        # Don't include the 'page' key (or the keyset pagination cursors), as
+        # these would pile up. We can't just delete the key from request.GET,
+        # it's immutable. Can't convert to dict and encode, unicode problem.
+        if key not in ("page", "after", "before"):
             valuelist = request.GET.getlist(key)
             extra_link.extend(["%s=%s" % (key, val) for val in valuelist])
     # If there's something to return join the list together as a string with
@@ -65,27 +65,28 @@ def get_user_workflow_access(request):
     return view_workflows
 
 
+def _groups_with_permission(codename):
+    """Lazy Group queryset, so building a user filter doesn't hit the DB."""
+    return Group.objects.filter(permissions__codename=codename)
+
+
 def filter_query_same_perms(request, qset):
     """
     Takes a request object and a queryset, returns a queryset of users with same permissions as
-    the requesting user.
+    the requesting user. No queries are run until the result is evaluated.
     """
     qset_1 = User.objects.none()
     qset_2 = User.objects.none()
     qset_3 = User.objects.none()
     qset_4 = User.objects.none()
     if request.user.has_perm("accounts.beverage_access"):
-        workflow_permission = Permission.objects.get(codename="beverage_access")
-        qset_1 = qset.filter(Q(groups__in=workflow_permission.group_set.all())).values("id").query
+        qset_1 = qset.filter(Q(groups__in=_groups_with_permission("beverage_access"))).values("id").query
     if request.user.has_perm("accounts.foodservice_access"):
-        workflow_permission = Permission.objects.get(codename="foodservice_access")
-        qset_2 = qset.filter(Q(groups__in=workflow_permission.group_set.all())).values("id").query
+        qset_2 = qset.filter(Q(groups__in=_groups_with_permission("foodservice_access"))).values("id").query
     if request.user.has_perm("accounts.container_access"):
-        workflow_permission = Permission.objects.get(codename="container_access")
-        qset_3 = qset.filter(Q(groups__in=workflow_permission.group_set.all())).values("id").query
+        qset_3 = qset.filter(Q(groups__in=_groups_with_permission("container_access"))).values("id").query
     if request.user.has_perm("accounts.carton_access"):
-        workflow_permission = Permission.objects.get(codename="carton_access")
-        qset_4 = qset.filter(Q(groups__in=workflow_permission.group_set.all())).values("id").query
+        qset_4 = qset.filter(Q(groups__in=_groups_with_permission("carton_access"))).values("id").query
     # Return a query of users that appear in any of the 3 sub-qsets.
     return User.objects.filter(Q(id__in=qset_1) | Q(id__in=qset_2) | Q(id__in=qset_3) | Q(id__in=qset_4)).order_by("username")
 
@@ -132,14 +133,15 @@ def send_info_mail(subject, body, recipients, fail_silently=True):
     enable fail_silently and a few other things for all emails.
 
     This function is more aimed at general, informative messages rather than
-    critical stuff.
+    critical stuff. The message is queued in the email outbox rather than
+    sent right away, so callers don't wait on the mail relay.
 
     recipients: (list of str) Emails to send to.
     """
-    send_mail(
-        subject,
-        body,
-        settings.EMAIL_FROM_ADDRESS,
-        recipients,
-        fail_silently=fail_silently,
-    )
+    from gchub_db.apps.queues.outbox import enqueue_email
+
+    try:
+        enqueue_email(EmailMessage(subject, body, settings.EMAIL_FROM_ADDRESS, recipients))
+    except Exception:
+        if not fail_silently:
+            raise
@@ -0,0 +1,345 @@
+"""
+Hot folder watching.
+
+HotFolderWatcher watches drop folders and hands each new file to its
+folder's handler as soon as it has finished arriving, instead of a cron job
+listing the folder every so often. Local folders on Linux are watched with
+inotify (through ctypes, so there is no extra dependency). Network mounts,
+where inotify doesn't see writes made by other hosts, and systems without
+inotify fall back to polling the folder with os.scandir(), which is a
+single directory read.
+
+A file counts as arrived once its size and mtime have stayed the same for
+the folder's settle time, so half-copied files are left alone. Handled
+files are recorded in a SeenLedger by name, size and mtime, so restarting
+the watcher doesn't hand the same file over twice. A handler that fails, or
+raises RetryLater for a file it can't deal with yet, leaves the file
+unrecorded to be tried again on the next full scan.
+
+wait_for() is the same idea for code that waits on one expected file, like
+a barcode being rendered by Automation Engine.
+"""
+
+import ctypes
+import ctypes.util
+import dbm
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+# Seconds between reads of polled folders.
+HOT_FOLDER_POLL_INTERVAL = getattr(settings, "HOT_FOLDER_POLL_INTERVAL", 2.0)
+# Seconds between full re-reads of inotify watched folders, in case an event
+# was missed (or a handler failed and the file should be retried).
+HOT_FOLDER_RESCAN_INTERVAL = getattr(settings, "HOT_FOLDER_RESCAN_INTERVAL", 300.0)
+# Filesystem types that are polled rather than watched with inotify.
+NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smbfs", "smb3", "afpfs", "fuse.sshfs", "9p")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify(object):
+    """A minimal inotify instance: watch directories, then read the names written into them."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # Watch descriptor -> directory.
+        self._watches = {}
+
+    def add_watch(self, directory, mask=IN_CLOSE_WRITE | IN_MOVED_TO):
+        """Watches directory for files finished writing or moved into it."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._watches[wd] = directory
+
+    def read(self, timeout):
+        """Waits up to timeout seconds. Returns [(directory, file name)] for the files written."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name and wd in self._watches:
+                events.append((self._watches[wd], os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def is_network_mount(path):
+    """True if path is on a network filesystem, going by /proc/mounts (Linux only)."""
+    try:
+        with open("/proc/mounts") as mounts:
+            entries = [line.split()[1:3] for line in mounts]
+    except OSError:
+        return False
+    path = os.path.realpath(path)
+    best_mount, best_type = "", ""
+    for mount_point, fs_type in entries:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type in NETWORK_FILESYSTEMS
+
+
+def can_use_inotify(path):
+    return sys.platform.startswith("linux") and not is_network_mount(path)
+
+
+class RetryLater(Exception):
+    """
+    Raised by a handler for a file it can't handle yet, like a print record
+    for an item that hasn't been entered. The file is tried again on the
+    next full scan, without counting as a failure.
+    """
+
+
+class SeenLedger(object):
+    """
+    Persistent record of the files each hot folder has handled, by name and
+    (size, mtime). A file that is replaced with new contents is handled again.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = dbm.open(path, "c")
+
+    def _key(self, folder_name, file_name):
+        return "%s/%s" % (folder_name, file_name)
+
+    def seen(self, folder_name, file_name, stamp):
+        with self._lock:
+            record = self._db.get(self._key(folder_name, file_name))
+        return record is not None and json.loads(record) == list(stamp)
+
+    def mark(self, folder_name, file_name, stamp):
+        with self._lock:
+            self._db[self._key(folder_name, file_name)] = json.dumps(list(stamp))
+
+    def prune(self, folder_name, present_names):
+        """Forgets the folder's files that are no longer there."""
+        prefix = (folder_name + "/").encode()
+        present = {self._key(folder_name, name).encode() for name in present_names}
+        with self._lock:
+            for key in list(self._db.keys()):
+                if key.startswith(prefix) and key not in present:
+                    del self._db[key]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class HotFolder(object):
+    """
+    A watched folder and what to do with the files dropped into it.
+
+    handler(path) is called once per arrived file. accept(file name) picks
+    the files to handle and defaults to everything but .DS_Store. poll forces
+    (True) or forbids (False) polling; by default inotify is used wherever it
+    can be.
+    """
+
+    def __init__(self, name, path, handler, accept=None, settle=2.0, poll=None):
+        self.name = name
+        self.path = path
+        self.handler = handler
+        self.accept = accept or (lambda file_name: file_name != ".DS_Store")
+        self.settle = settle
+        self.poll = (not can_use_inotify(path)) if poll is None else poll
+
+    def __str__(self):
+        return "%s (%s, %s)" % (self.name, self.path, "polled" if self.poll else "inotify")
+
+
+class HotFolderWatcher(object):
+    """
+    Watches a set of HotFolders and hands their arrived files to a work
+    queue: anything with submit(key, command name, func), like the GOLD FS
+    daemon's WorkQueue. Without one, handlers run inline.
+    """
+
+    def __init__(self, folders, ledger=None, work_queue=None, poll_interval=HOT_FOLDER_POLL_INTERVAL):
+        self.folders = list(folders)
+        self.ledger = ledger
+        self.work_queue = work_queue
+        self.poll_interval = poll_interval
+        # Folder name -> {file name: ((size, mtime), when last changed)} for
+        # files that are still arriving.
+        self.pending = {folder.name: {} for folder in self.folders}
+        self.stats = {"handled": 0, "failed": 0, "latency": 0.0}
+        # (folder name, file name) for files handed over and not done yet.
+        self._in_flight = set()
+        # (folder name, file name) -> stamp for files whose handler failed.
+        # They are retried on the next full scan, or sooner if they change.
+        self._failed = {}
+        self._stopped = threading.Event()
+        self._inotify = None
+        self._watched = {}
+        for folder in self.folders:
+            if not folder.poll:
+                if self._inotify is None:
+                    self._inotify = Inotify()
+                self._inotify.add_watch(folder.path)
+                self._watched[folder.path] = folder
+
+    def scan(self, folder):
+        """Reads the whole folder, marking every file in it as pending. Returns the file names."""
+        with os.scandir(folder.path) as entries:
+            names = [entry.name for entry in entries if entry.is_file() and folder.accept(entry.name)]
+        pending = self.pending[folder.name]
+        for name in names:
+            pending.setdefault(name, None)
+        return names
+
+    def check_pending(self):
+        """Hands over the pending files whose size and mtime have settled."""
+        now = time.monotonic()
+        for folder in self.folders:
+            pending = self.pending[folder.name]
+            for name, last in list(pending.items()):
+                try:
+                    file_stat = os.stat(os.path.join(folder.path, name))
+                except FileNotFoundError:
+                    del pending[name]
+                    continue
+                stamp = (file_stat.st_size, file_stat.st_mtime_ns)
+                if last is None or last[0] != stamp:
+                    pending[name] = (stamp, now)
+                    continue
+                if now - last[1] < folder.settle:
+                    continue
+                del pending[name]
+                key = (folder.name, name)
+                if key in self._in_flight or self._failed.get(key) == stamp:
+                    continue
+                if self.ledger is None or not self.ledger.seen(folder.name, name, stamp):
+                    self._submit(folder, name, stamp, last[1])
+
+    def _submit(self, folder, name, stamp, arrived):
+        key = (folder.name, name)
+        self._in_flight.add(key)
+
+        def handle():
+            try:
+                folder.handler(os.path.join(folder.path, name))
+            except RetryLater:
+                self._failed[key] = stamp
+                return
+            except Exception:
+                self.stats["failed"] += 1
+                self._failed[key] = stamp
+                raise
+            finally:
+                self._in_flight.discard(key)
+            if self.ledger is not None:
+                self.ledger.mark(folder.name, name, stamp)
+            self.stats["handled"] += 1
+            self.stats["latency"] = time.monotonic() - arrived
+
+        if self.work_queue is None:
+            try:
+                handle()
+            except Exception as inst:
+                print("! %s %s failed: %s" % (folder.name, name, inst))
+        else:
+            self.work_queue.submit((folder.name, name), folder.name, handle)
+
+    def _wait_for_events(self, timeout):
+        if self._inotify is None:
+            self._stopped.wait(timeout)
+            return
+        for path, name in self._inotify.read(timeout):
+            folder = self._watched[path]
+            if folder.accept(name):
+                self.pending[folder.name].setdefault(name, None)
+
+    def _full_scan(self, folder):
+        names = self.scan(folder)
+        if self.ledger is not None:
+            self.ledger.prune(folder.name, names)
+
+    def run(self):
+        """Watches until stop() is called. Files already waiting are picked up first."""
+        for folder in self.folders:
+            print("* Watching %s" % folder)
+            self._full_scan(folder)
+        last_poll = last_rescan = time.monotonic()
+        while not self._stopped.is_set():
+            # Check back quickly while files are settling.
+            busy = any(self.pending.values())
+            self._wait_for_events(min(0.5, self.poll_interval) if busy else self.poll_interval)
+            now = time.monotonic()
+            if now - last_poll >= self.poll_interval:
+                for folder in self.folders:
+                    if folder.poll:
+                        self.scan(folder)
+                last_poll = now
+            if now - last_rescan >= HOT_FOLDER_RESCAN_INTERVAL:
+                self._failed.clear()
+                for folder in self.folders:
+                    self._full_scan(folder)
+                last_rescan = now
+            self.check_pending()
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def stop(self):
+        self._stopped.set()
+
+
+def wait_for(ready, directory, timeout, poll_interval=1.0):
+    """
+    Waits up to timeout seconds for ready() to return True, checking again
+    whenever a file is written into directory (or every poll_interval
+    seconds where inotify can't be used). Returns the last ready() result.
+    """
+    deadline = time.monotonic() + timeout
+    inotify = None
+    if can_use_inotify(directory):
+        try:
+            # Watch before the first check, so a file written in between is seen.
+            inotify = Inotify()
+            inotify.add_watch(directory)
+        except OSError:
+            inotify = None
+    try:
+        while not ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if inotify is not None:
+                # Re-check now and then anyway, in case an event is missed.
+                inotify.read(min(remaining, 5.0))
+            else:
+                time.sleep(min(remaining, poll_interval))
+        return True
+    finally:
+        if inotify is not None:
+            inotify.close()
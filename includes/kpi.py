@@ -0,0 +1,79 @@
+"""
+Small helpers for dashboard statistics (KPIs).
+
+grouped_counts() turns what would be one count() query per bucket into a
+single conditional-aggregation query, and year_bounds() gives index-friendly
+date ranges instead of __year lookups, which wrap the column in EXTRACT() and
+can't use an index. Statistics for years that have already closed can be
+cached permanently with cached_for_year().
+"""
+
+import datetime
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# Seconds to cache statistics for the year that is still in progress.
+OPEN_YEAR_TIMEOUT = 300
+
+
+def year_bounds(year, aware=True):
+    """
+    Returns the (start, end) of a calendar year for a half-open range filter,
+    for example filter(event_time__gte=start, event_time__lt=end). Pass
+    aware=False when filtering a DateField.
+    """
+    year = int(year)
+    if not aware:
+        return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.datetime(year, 1, 1), tz),
+        timezone.make_aware(datetime.datetime(year + 1, 1, 1), tz),
+    )
+
+
+def grouped_counts(queryset, buckets):
+    """
+    Counts a queryset once per bucket in a single query.
+
+    buckets maps a result key to a Q object (or a dict of lookups). A "total"
+    key holding the unfiltered count is always included. For example:
+
+        grouped_counts(errors, {"fsb": Q(job__workflow__name="Foodservice")})
+        => {"total": 120, "fsb": 64}
+    """
+    aggregates = {"total": Count("pk")}
+    for key, condition in buckets.items():
+        if isinstance(condition, dict):
+            condition = Q(**condition)
+        aggregates[key] = Count("pk", filter=condition)
+    return queryset.aggregate(**aggregates)
+
+
+def cached_for_year(cache_key, year, compute):
+    """
+    Returns compute() for a given year, caching the result. Years before the
+    current one can't change any more, so their results are cached forever;
+    the current year is only cached briefly.
+    """
+    key = "kpi_%s_%s" % (cache_key, year)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        timeout = None if int(year) < timezone.localdate().year else OPEN_YEAR_TIMEOUT
+        cache.set(key, result, timeout)
+    return result
+
+
+def invalidate_year(cache_key, year):
+    """Drops a cached_for_year() result, for the rare edit to a closed year."""
+    cache.delete("kpi_%s_%s" % (cache_key, year))
+
+
+def percent_without_errors(errors, total):
+    """Returns the percentage of total that was error free (100 when either is 0)."""
+    if errors and total:
+        return 100 - (float(errors) / total) * 100
+    return 100
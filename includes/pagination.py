@@ -0,0 +1,199 @@
+"""
+Keyset pagination for the long search result lists.
+
+Django's Paginator fetches page N with OFFSET, which makes the database
+walk every row before the page, and counts the whole result set for the
+pagination bar. KeysetPaginator fetches the page after (or before) one the
+user is looking at by its sort key instead - "WHERE id < <last id on this
+page> LIMIT 25" - so paging through a long list costs the same on page 400
+as on page 1. Jumping straight to a page number still uses OFFSET.
+
+ResultListMixin makes a ListView use it, counts the results no more than
+once per request (for the pagination bar), and redirects straight to a
+lone result after looking for just two.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404, HttpResponseRedirect
+from django.utils.functional import cached_property
+
+# Below this many (estimated) rows, count exactly even when an estimate is allowed.
+ESTIMATED_COUNT_MIN = getattr(settings, "ESTIMATED_COUNT_MIN", 100000)
+# Parameters carrying the sort key of the page the user came from.
+CURSOR_PARAMS = ("after", "before")
+CURSOR_SEPARATOR = ","
+
+
+class KeysetPage(Page):
+    """A Page that knows the sort keys of its first and last rows."""
+
+    def _cursor(self, row):
+        values = [getattr(row, name) for name in self.paginator.key_names]
+        if None in values:
+            return ""
+        return CURSOR_SEPARATOR.join(str(value) for value in values)
+
+    @property
+    def next_cursor(self):
+        """The after= value for the next page, or "" to go by page number."""
+        if not self.has_next() or not self.object_list:
+            return ""
+        return self._cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        """The before= value for the previous page, or "" to go by page number."""
+        if not self.has_previous() or not self.object_list:
+            return ""
+        return self._cursor(self.object_list[0])
+
+
+class KeysetPaginator(Paginator):
+    """
+    Paginates a queryset by its ordering. The ordering gets the primary key
+    added as a tie-breaker if it isn't there, since the sort key has to be
+    unique, and the fields in it must not be null.
+
+    With estimate_count, a total of at least ESTIMATED_COUNT_MIN rows is
+    taken from the PostgreSQL planner's estimate for the query rather than
+    counted; count_is_estimate says when that happened.
+    """
+
+    def __init__(self, object_list, per_page, estimate_count=False, **kwargs):
+        ordering = list(object_list.query.order_by)
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering.append("-id" if ordering and ordering[-1].startswith("-") else "id")
+        self.key_fields = [(field.lstrip("-"), field.startswith("-")) for field in ordering]
+        self.key_names = ["_keyset_%d" % num for num in range(len(self.key_fields))]
+        keys = dict((name, F(field)) for name, (field, descending) in zip(self.key_names, self.key_fields))
+        super(KeysetPaginator, self).__init__(object_list.order_by(*ordering).annotate(**keys), per_page, **kwargs)
+        self.estimate_count = estimate_count
+        self.count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        if self.estimate_count:
+            estimate = self._estimated_count()
+            if estimate >= ESTIMATED_COUNT_MIN:
+                self.count_is_estimate = True
+                return estimate
+        return super(KeysetPaginator, self).count
+
+    def _estimated_count(self):
+        """
+        The planner's row estimate: the table's statistics for an unfiltered
+        list, otherwise the EXPLAIN estimate for the filtered query.
+        """
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return 0
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                return int(row[0]) if row else 0
+            sql, params = queryset.order_by().values("pk").query.sql_with_params()
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _page_after(self, cursor, forward):
+        """The per_page rows after (or before) the row with the given cursor."""
+        values = cursor.split(CURSOR_SEPARATOR)
+        if len(values) != len(self.key_fields):
+            return None
+        seek = Q()
+        # (a, b) after (x, y) is a > x, or a = x and b > y; flipped for descending fields.
+        for position, (field, descending) in enumerate(self.key_fields):
+            lookup = "lt" if descending == forward else "gt"
+            matched = dict((earlier, value) for (earlier, _), value in zip(self.key_fields[:position], values))
+            matched["%s__%s" % (field, lookup)] = values[position]
+            seek |= Q(**matched)
+        try:
+            queryset = self.object_list.filter(seek)
+        except (ValueError, ValidationError):
+            # A cursor that doesn't fit the sort fields, edited by hand.
+            return None
+        if not forward:
+            queryset = queryset.reverse()
+        rows = list(queryset[: self.per_page])
+        if not forward:
+            rows.reverse()
+        return rows
+
+    def page(self, number, after=None, before=None):
+        """
+        Page number, fetched by keyset when after (or before) is the next_cursor
+        of the page before it (or the previous_cursor of the page after it).
+        """
+        number = self.validate_number(number)
+        rows = None
+        if after or before:
+            rows = self._page_after(after or before, forward=bool(after))
+        if not rows:
+            bottom = (number - 1) * self.per_page
+            top = bottom + self.per_page
+            if top + self.orphans >= self.count:
+                top = self.count
+            rows = list(self.object_list[bottom:top])
+        return KeysetPage(rows, number, self)
+
+
+class ResultListMixin(object):
+    """
+    For ListViews of search results, ahead of ListView in the bases. The
+    queryset is built once per request, pages are fetched with a
+    KeysetPaginator, and single_result_url() is where a search with just one
+    result goes instead of a list.
+    """
+
+    paginator_class = KeysetPaginator
+
+    def single_result_url(self, obj):
+        """Where to send the user when obj is the only result, or None to list it."""
+        return None
+
+    def count_is_estimable(self):
+        """Whether the total may be estimated by the query planner, for lists too long to count."""
+        return False
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(
+            queryset,
+            per_page,
+            estimate_count=self.count_is_estimable(),
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            **kwargs,
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size, orphans=self.get_paginate_orphans())
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            if page_number == "last":
+                page_number = paginator.num_pages
+            page = paginator.page(page_number, **dict((param, self.request.GET.get(param)) for param in CURSOR_PARAMS))
+        except InvalidPage as e:
+            raise Http404("Invalid page (%s): %s" % (page_number, e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        # LIMIT 2 is enough to tell a lone result from a list.
+        first_results = list(self.object_list[:2])
+        if len(first_results) == 1:
+            url = self.single_result_url(first_results[0])
+            if url:
+                return HttpResponseRedirect(url)
+        context = self.get_context_data()
+        return self.render_to_response(context)
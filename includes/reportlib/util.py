@@ -1,7 +1,11 @@
 """This module contains generally useful utility functions."""
 
+import functools
+
+from reportlab.graphics.shapes import Drawing, Group
 from reportlab.lib.colors import CMYKColor
 from reportlab.lib.textsplit import getCharWidths
+from svglib.svglib import svg2rlg
 
 
 def check_text_width(type_size, font, text):
@@ -36,3 +40,17 @@ def __loop_through_contents(obj, color):
 def convert_svg_to_color(object, color=CMYKColor(0, 0, 0, 1.0)):
     """Iterate through all the objects of an SVG and convert them to black CMYK."""
     __loop_through_contents(object, color)
+
+
+@functools.lru_cache(maxsize=32)
+def svg_drawing(file_name):
+    """
+    Return a Drawing of the SVG file, ready for renderPDF.draw(). The file is
+    only parsed the first time it's asked for in each process, so the same
+    Drawing is handed out to every caller and must not be modified.
+
+    file_name: (str) Path to the SVG file.
+    """
+    drawing = Drawing()
+    drawing.add(Group(svg2rlg(file_name)))
+    return drawing
@@ -0,0 +1,134 @@
+"""
+Template warm-up and render timing.
+
+With the cached template loader (which Django uses whenever no loaders
+are set) each process parses a template the first time it's used, which
+leaves the big pages (job detail, to-do lists) slow for whoever is first
+to open them after a restart. warm_templates() compiles every template
+the engines can find up front. "manage.py warm_templates" runs it before
+the workers start, failing on any template that doesn't compile, and
+apache/wsgi_conf.py runs it in each worker with strict=False, where a
+template that can't be compiled for any reason is logged and skipped
+rather than keeping the worker from starting.
+
+TemplateTimer records how long each template takes to render, for
+"manage.py template_timings". Included templates, inclusion tags and
+extended templates are counted under their own names.
+"""
+
+import logging
+import os
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Files in the template directories that are compiled by warm_templates().
+# Scripts and data files kept next to the templates are left out.
+TEMPLATE_EXTENSIONS = getattr(settings, "TEMPLATE_WARMUP_EXTENSIONS", (".html", ".txt", ".xml"))
+# The errors of a template that doesn't compile, as opposed to a bug in a tag.
+TEMPLATE_ERRORS = (TemplateSyntaxError, TemplateDoesNotExist, UnicodeDecodeError)
+
+
+def django_engines():
+    """The Engines of all the configured Django template backends."""
+    return [backend.engine for backend in engines.all() if isinstance(backend, DjangoTemplates)]
+
+
+def _loaders(loaders):
+    """The loaders given, with those wrapped by the cached loader in their place."""
+    for loader in loaders:
+        if hasattr(loader, "loaders"):
+            yield from _loaders(loader.loaders)
+        else:
+            yield loader
+
+
+def template_names(engine):
+    """The names of all the templates the engine's loaders can find, in order."""
+    names = set()
+    for loader in _loaders(engine.template_loaders):
+        if hasattr(loader, "templates_dict"):
+            names.update(loader.templates_dict)
+            continue
+        for template_dir in getattr(loader, "get_dirs", list)():
+            for path, dirs, files in os.walk(template_dir):
+                dirs[:] = [name for name in dirs if not name.startswith(".")]
+                for name in files:
+                    if name.startswith(".") or not name.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    names.add(os.path.relpath(os.path.join(path, name), template_dir).replace(os.sep, "/"))
+    return sorted(names)
+
+
+def warm_templates(strict=True):
+    """
+    Compiles every template the Django template engines can find. With the
+    cached loader they are then kept for the rest of the process. Returns
+    the number compiled and a dict of template name: error for those that
+    couldn't be. When strict, any error other than TEMPLATE_ERRORS is
+    raised; otherwise every error is logged and the next template tried.
+    """
+    compiled = 0
+    errors = {}
+    for engine in django_engines():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except Exception as error:
+                if strict and not isinstance(error, TEMPLATE_ERRORS):
+                    raise
+                if not strict:
+                    logger.warning("Could not compile template %s", name, exc_info=True)
+                errors[name] = error
+            else:
+                compiled += 1
+    return compiled, errors
+
+
+class TemplateTimer(object):
+    """
+    Times every template render while in use as a context manager. totals
+    maps each template name to [renders, seconds, own seconds], where own
+    time leaves out the templates it rendered in turn.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(lambda: [0, 0.0, 0.0])
+        # Time spent in the templates rendered by each one being rendered.
+        self._nested = []
+
+    def __enter__(self):
+        timer = self
+        render = self._render = Template._render
+
+        def timed_render(template, context):
+            timer._nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = timer._nested.pop()
+                if timer._nested:
+                    timer._nested[-1] += elapsed
+                totals = timer.totals[template.origin.template_name or template.origin.name]
+                totals[0] += 1
+                totals[1] += elapsed
+                totals[2] += elapsed - nested
+
+        Template._render = timed_render
+        return self
+
+    def __exit__(self, *exc_info):
+        Template._render = self._render
+
+    def report(self):
+        """Returns (name, renders, seconds, own seconds) for each template, slowest first."""
+        rows = [(name, renders, seconds, own) for name, (renders, seconds, own) in self.totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
@@ -1,7 +1,11 @@
 """Generic extra widgets that are not specific to one app."""
 
-from django.forms.widgets import SelectDateWidget
+from django.forms.widgets import Select, SelectDateWidget
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.html import escapejs
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
 
 
 class GCH_SelectDateWidget(SelectDateWidget):
@@ -15,3 +19,96 @@ class GCH_SelectDateWidget(SelectDateWidget):
 
         # Call the super class's init (SelectDateWidget) with modified values.
         super(GCH_SelectDateWidget, self).__init__(attrs=attrs, years=years)
+
+
+# Swaps the select box for a jQuery UI autocomplete text box. The select is
+# kept (hidden) so the form still submits the chosen id.
+AUTOCOMPLETE_SCRIPT = """<script type="text/javascript">
+(function ($) {
+    if (!$ || !$.fn.autocomplete) {
+        return;
+    }
+    $(function () {
+        var $select = $("#%(id)s");
+        if (!$select.length || $select.data("autocomplete-ready")) {
+            return;
+        }
+        $select.data("autocomplete-ready", true);
+        var $selected = $select.find("option:selected");
+        var $input = $('<input type="text" size="25" placeholder="Type to search...">');
+        $input.val($selected.val() ? $selected.text() : "");
+        $select.hide().after($input);
+        $input.autocomplete({
+            source: $select.data("autocomplete-url"),
+            minLength: %(min_length)d,
+            select: function (event, ui) {
+                $select.find("option[value!='']").remove();
+                $("<option>").val(ui.item.id).text(ui.item.label).appendTo($select);
+                $select.val(String(ui.item.id)).trigger("change");
+                $input.val(ui.item.label);
+                return false;
+            }
+        });
+        $input.on("change", function () {
+            if (!$input.val()) {
+                $select.val("").trigger("change");
+            }
+        });
+        if (%(min_length)d === 0) {
+            // Nothing to type before the first suggestions, so show them on focus.
+            $input.on("focus", function () {
+                $input.autocomplete("search", $input.val());
+            });
+        }
+    });
+})(window.$j || window.jQuery);
+</script>"""
+
+
+class AutocompleteSelect(Select):
+    """
+    Select box for ModelChoiceFields with too many options to render. Only the
+    empty and currently selected options are output; the rest are looked up as
+    the user types from the JSON view named by url_name, which should answer a
+    "term" GET parameter with [{"id": ..., "label": ..., "value": ...}, ...].
+    query is an optional dict of extra GET parameters for that view. With a
+    min_length of 0 the suggestions are shown as soon as the box has focus.
+    """
+
+    def __init__(self, url_name, query=None, min_length=2, attrs=None):
+        super(AutocompleteSelect, self).__init__(attrs=attrs)
+        self.url_name = url_name
+        self.query = query or {}
+        self.min_length = min_length
+
+    def get_url(self):
+        url = reverse(self.url_name)
+        if self.query:
+            url += "?" + urlencode(self.query)
+        return url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super(AutocompleteSelect, self).build_attrs(base_attrs, extra_attrs)
+        attrs["data-autocomplete-url"] = self.get_url()
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Only builds options for the empty choice and the selected value(s)."""
+        field = self.choices.field
+        selected = [v for v in value if v not in field.empty_values]
+        options = []
+        if field.empty_label is not None:
+            options.append(self.create_option(name, "", field.empty_label, not selected, 0))
+        if selected:
+            key = field.to_field_name or "pk"
+            for index, obj in enumerate(self.choices.queryset.filter(**{"%s__in" % key: selected}), start=1):
+                options.append(self.create_option(name, field.prepare_value(obj), field.label_from_instance(obj), True, index))
+        return [(None, options, 0)]
+
+    def render(self, name, value, attrs=None, renderer=None):
+        html = super(AutocompleteSelect, self).render(name, value, attrs, renderer)
+        widget_id = (attrs or {}).get("id") or self.attrs.get("id")
+        if not widget_id:
+            return html
+        script = AUTOCOMPLETE_SCRIPT % {"id": escapejs(widget_id), "min_length": self.min_length}
+        return mark_safe(html + script)
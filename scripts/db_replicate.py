@@ -7,6 +7,9 @@ PostgreSQL database to a target database with minimal storage overhead.
 
 Features:
 - Direct database-to-database replication (no intermediate files)
+- Parallel COPY streaming ordered by foreign key dependency
+- Incremental top-up of append-mostly tables (JobLog, Charge, TimeSheet)
+- In-stream masking of personal data
 - Selective table replication
 - Compressed data transfer
 - Automatic cleanup
@@ -16,13 +19,132 @@ Usage:
     python scripts/db_replicate.py --source gchub_db-postgres-dev-1 --target gold3-db-1
     python scripts/db_replicate.py --source host=localhost:5433 \
         --target host=localhost:5438
+    python scripts/db_replicate.py --source host=localhost:5433 \
+        --target host=localhost:5438 --method parallel --workers 6 --incremental
 """
 
 import argparse
+import os
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+
+# Append-mostly tables that can be topped up from the last replicated key
+# instead of being re-copied. Values are the monotonically increasing column
+# used as the high-water mark (an id or a timestamp).
+INCREMENTAL_TABLES = {
+    "joblog_joblog": "id",
+    "workflow_charge": "id",
+    "timesheet_timesheet": "id",
+}
+
+# SQL expressions used to mask personal data as it leaves the source. Each
+# expression receives the quoted column name via {col}. Blank and NULL values
+# are passed through untouched so optional fields stay optional.
+MASK_EXPRESSIONS = {
+    "phone": "'555-' || lpad((abs(hashtext({col})) % 10000)::text, 4, '0')",
+    "email": "'user' || substr(md5({col}), 1, 10) || '@example.com'",
+    "person_name": "'Person ' || substr(md5({col}), 1, 6)",
+    "address": "substr(md5({col}), 1, 4) || ' Example St'",
+}
+
+# Column name -> masking expression, mirroring comprehensive_field_masking.py.
+MASKED_COLUMNS = {
+    "phone": "phone",
+    "phone_number": "phone",
+    "cell_phone": "phone",
+    "email": "email",
+    "contact_email": "email",
+    "ship_to_email": "email",
+    "first_name": "person_name",
+    "last_name": "person_name",
+    "contact_name": "person_name",
+    "address1": "address",
+    "address2": "address",
+}
+
+# "name" is too generic to mask everywhere (plants, presses, inks...), so it
+# is only masked on tables where it holds a person's name.
+MASKED_TABLE_COLUMNS = {
+    "workflow_jobaddress": {"name": "person_name"},
+}
+
+
+def quote_ident(name: str) -> str:
+    """Quote a PostgreSQL identifier."""
+    return '"%s"' % name.replace('"', '""')
+
+
+def mask_expression(table: str, column: str, column_type: str) -> Optional[str]:
+    """Return the SQL expression that masks table.column, or None to copy it as-is."""
+    kind = MASKED_TABLE_COLUMNS.get(table, {}).get(column) or MASKED_COLUMNS.get(column)
+    if not kind:
+        return None
+    col = quote_ident(column)
+    masked = MASK_EXPRESSIONS[kind].format(col=col)
+    # Cast back to the column's own type so binary COPY stays compatible.
+    return f"(CASE WHEN nullif({col}, '') IS NULL THEN {col} ELSE ({masked})::{column_type} END)"
+
+
+def build_copy_out_sql(
+    table: str,
+    columns: List[tuple],
+    mask: bool = True,
+    key_column: Optional[str] = None,
+    after_key: Optional[str] = None,
+) -> str:
+    """
+    Build the COPY ... TO STDOUT statement for a table.
+
+    columns is a list of (name, sql_type) pairs in table order. When masking
+    is enabled, sensitive columns are replaced by their masking expression in
+    the projection, so masked values are what travel over the wire. key_column
+    and after_key (an already-quoted SQL literal) restrict the copy to rows
+    newer than the target's high-water mark.
+    """
+    projection = []
+    for name, column_type in columns:
+        expr = mask_expression(table, name, column_type) if mask else None
+        projection.append(f"{expr} AS {quote_ident(name)}" if expr else quote_ident(name))
+    query = "SELECT %s FROM %s" % (", ".join(projection), quote_ident(table))
+    if key_column and after_key is not None:
+        query += " WHERE %s > %s" % (quote_ident(key_column), after_key)
+    return "COPY (%s) TO STDOUT WITH (FORMAT binary)" % query
+
+
+def dependency_map(tables: List[str], foreign_keys: List[tuple]) -> Dict[str, Set[str]]:
+    """
+    Map each table to the set of selected tables it references.
+
+    foreign_keys is a list of (table, referenced_table) pairs. References to
+    tables outside the selection and self references are ignored since they
+    cannot be ordered within this run.
+    """
+    selected = set(tables)
+    deps = {table: set() for table in tables}
+    for table, referenced in foreign_keys:
+        if table in selected and referenced in selected and table != referenced:
+            deps[table].add(referenced)
+    return deps
+
+
+class _CountingWriter:
+    """File-like wrapper that counts the bytes psycopg2 writes through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.fileobj.write(data)
+
+    def close(self):
+        self.fileobj.close()
 
 
 class DatabaseReplicator:
@@ -156,6 +278,10 @@ class DatabaseReplicator:
             "auth_group_permissions",
             # Sites
             "django_site",
+            # Append-mostly history (see INCREMENTAL_TABLES)
+            "joblog_joblog",
+            "workflow_charge",
+            "timesheet_timesheet",
         ]
 
     def replicate_via_direct_connection(self) -> bool:
@@ -218,6 +344,306 @@ class DatabaseReplicator:
             print(f"❌ Replication failed: {e}")
             return False
 
+    def _connect(self, conn_str: str):
+        """Open a psycopg2 connection for one replication worker."""
+        import psycopg2
+
+        return psycopg2.connect(conn_str)
+
+    def _get_foreign_keys(self, source_conn_str: str) -> List[tuple]:
+        """Return (table, referenced_table) pairs for every FK in the source schema."""
+        conn = self._connect(source_conn_str)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT conrelid::regclass::text, confrelid::regclass::text
+                    FROM pg_constraint
+                    WHERE contype = 'f'
+                    """
+                )
+                return [(table.strip('"'), referenced.strip('"')) for table, referenced in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def _get_columns(self, cur, table: str) -> List[tuple]:
+        """Return (column, sql_type) pairs for a table in attribute order."""
+        cur.execute(
+            """
+            SELECT attname, format_type(atttypid, atttypmod)
+            FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum
+            """,
+            (quote_ident(table),),
+        )
+        return cur.fetchall()
+
+    def _get_primary_key(self, cur, table: str) -> List[str]:
+        """Return the primary key columns of a table."""
+        cur.execute(
+            """
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            """,
+            (quote_ident(table),),
+        )
+        return [row[0] for row in cur.fetchall()]
+
+    def _reset_sequences(self, cur, table: str):
+        """
+        Move the sequences owned by a table's columns past the largest value
+        copied, so the next row inserted on the target does not collide with
+        a copied one. An empty table's sequences are reset to start at 1.
+        """
+        cur.execute(
+            """
+            SELECT attname, pg_get_serial_sequence(%s, attname)
+            FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            AND pg_get_serial_sequence(%s, attname) IS NOT NULL
+            """,
+            (quote_ident(table), quote_ident(table), quote_ident(table)),
+        )
+        for column, sequence in cur.fetchall():
+            cur.execute(
+                "SELECT setval(%%s, COALESCE(max(%s), 1), max(%s) IS NOT NULL) FROM %s"
+                % (quote_ident(column), quote_ident(column), quote_ident(table)),
+                (sequence,),
+            )
+
+    def _stream_copy(self, source, target, copy_out_sql: str, copy_in_sql: str) -> tuple:
+        """
+        Pipe a COPY TO STDOUT on the source straight into a COPY FROM STDIN on
+        the target. The source side runs in a helper thread writing into an OS
+        pipe, so rows are never buffered in full. Returns (rows, bytes).
+        """
+        read_fd, write_fd = os.pipe()
+        writer = _CountingWriter(os.fdopen(write_fd, "wb"))
+        errors = []
+
+        def produce():
+            try:
+                with source.cursor() as cur:
+                    cur.copy_expert(copy_out_sql, writer)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                try:
+                    writer.close()
+                except OSError:
+                    pass
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            with os.fdopen(read_fd, "rb") as reader, target.cursor() as cur:
+                cur.copy_expert(copy_in_sql, reader)
+                rows = cur.rowcount
+        finally:
+            producer.join()
+        if errors:
+            raise errors[0]
+        return rows, writer.bytes_written
+
+    def _copy_table(
+        self,
+        table: str,
+        source_conn_str: str,
+        target_conn_str: str,
+        incremental: bool,
+        mask: bool,
+        snapshot: Optional[str] = None,
+    ) -> dict:
+        """
+        Copy one table and return its throughput stats. With snapshot (from
+        _export_snapshot), the source is read as of that snapshot, so every
+        table of a run sees the same point in time.
+        """
+        started = time.monotonic()
+        source = self._connect(source_conn_str)
+        target = self._connect(target_conn_str)
+        try:
+            source.set_session(isolation_level="REPEATABLE READ", readonly=True)
+            with source.cursor() as cur:
+                if snapshot:
+                    cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+                columns = self._get_columns(cur, table)
+            column_list = ", ".join(quote_ident(name) for name, _ in columns)
+            mode = "full"
+
+            with target.cursor() as cur:
+                key_column = INCREMENTAL_TABLES.get(table) if incremental else None
+                if key_column:
+                    cur.execute("SELECT max(%s) FROM %s" % (quote_ident(key_column), quote_ident(table)))
+                    high_water = cur.fetchone()[0]
+                    after_key = cur.mogrify("%s", (high_water,)).decode() if high_water is not None else None
+                    copy_out_sql = build_copy_out_sql(table, columns, mask, key_column, after_key)
+                    copy_in_sql = "COPY %s (%s) FROM STDIN WITH (FORMAT binary)" % (quote_ident(table), column_list)
+                    mode = "incremental" if after_key is not None else "full"
+                elif incremental:
+                    # Reference tables are refreshed through a staging table and
+                    # upserted, so rows referenced by incrementally copied tables
+                    # never disappear from under them.
+                    primary_key = self._get_primary_key(cur, table)
+                    cur.execute("CREATE TEMP TABLE _replica_stage (LIKE %s INCLUDING DEFAULTS) ON COMMIT DROP" % quote_ident(table))
+                    copy_out_sql = build_copy_out_sql(table, columns, mask)
+                    copy_in_sql = "COPY _replica_stage (%s) FROM STDIN WITH (FORMAT binary)" % column_list
+                    mode = "upsert"
+                else:
+                    copy_out_sql = build_copy_out_sql(table, columns, mask)
+                    copy_in_sql = "COPY %s (%s) FROM STDIN WITH (FORMAT binary)" % (quote_ident(table), column_list)
+
+            rows, nbytes = self._stream_copy(source, target, copy_out_sql, copy_in_sql)
+
+            if mode == "upsert":
+                with target.cursor() as cur:
+                    updates = [name for name, _ in columns if name not in primary_key]
+                    conflict = "DO NOTHING"
+                    if primary_key and updates:
+                        conflict = "(%s) DO UPDATE SET %s" % (
+                            ", ".join(quote_ident(name) for name in primary_key),
+                            ", ".join("%s = EXCLUDED.%s" % (quote_ident(name), quote_ident(name)) for name in updates),
+                        )
+                    elif primary_key:
+                        conflict = "(%s) DO NOTHING" % ", ".join(quote_ident(name) for name in primary_key)
+                    cur.execute(
+                        "INSERT INTO %s (%s) SELECT %s FROM _replica_stage ON CONFLICT %s"
+                        % (quote_ident(table), column_list, column_list, conflict)
+                    )
+            with target.cursor() as cur:
+                self._reset_sequences(cur, table)
+            target.commit()
+        finally:
+            source.close()
+            target.close()
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        return {"table": table, "mode": mode, "rows": rows, "bytes": nbytes, "seconds": elapsed}
+
+    def _export_snapshot(self, conn) -> str:
+        """
+        Start a REPEATABLE READ transaction on a source connection and export
+        its snapshot. Other sessions can read as of the snapshot for as long
+        as the connection's transaction stays open.
+        """
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_export_snapshot()")
+            return cur.fetchone()[0]
+
+    def _truncate_targets(self, target_conn_str: str, tables: List[str]):
+        """
+        Empty every full-copy table in one statement so FK order does not
+        matter. CASCADE also empties the target tables outside the selection
+        that reference them (user permissions, the many tables pointing at
+        workflow_job...), which would otherwise make the TRUNCATE fail.
+        """
+        conn = self._connect(target_conn_str)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE %s CASCADE" % ", ".join(quote_ident(table) for table in tables))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def replicate_in_parallel(self, workers: int = 4, incremental: bool = False, mask: bool = True) -> bool:
+        """
+        Replicate tables concurrently with binary COPY streaming.
+
+        A table is only started once every table it references has finished,
+        so the target's foreign keys are always satisfied. With incremental
+        set, INCREMENTAL_TABLES are topped up from the target's current
+        high-water mark and all other tables are upserted; otherwise every
+        table is truncated and fully re-copied. Rows deleted on the source are
+        not removed from the target in incremental mode.
+
+        Every table is read from one exported snapshot of the source, so a
+        source that is in use still gives a copy whose foreign keys match.
+        """
+        snapshot_conn = None
+        try:
+            print(f"⚡ Starting parallel replication with {workers} workers...")
+            source_conn_str = self.get_connection_string(self.source_conn, self.source_db, self.source_user, self.source_pass)
+            target_conn_str = self.get_connection_string(self.target_conn, self.target_db, self.target_user, self.target_pass)
+
+            tables = self.get_tables_to_replicate()
+            deps = dependency_map(tables, self._get_foreign_keys(source_conn_str))
+
+            if not incremental:
+                self._truncate_targets(target_conn_str, tables)
+            snapshot_conn = self._connect(source_conn_str)
+            snapshot = self._export_snapshot(snapshot_conn)
+
+            pending = list(tables)
+            done = set()
+            failed = set()
+            results = []
+            started = time.monotonic()
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                running = {}
+                while pending or running:
+                    ready = [table for table in pending if deps[table] <= done]
+                    blocked = [table for table in pending if deps[table] & failed]
+                    for table in blocked:
+                        pending.remove(table)
+                        failed.add(table)
+                        print(f"⏭️  Skipping {table}: a referenced table failed")
+                    if not ready and not running and pending:
+                        # A dependency cycle; copy what is left and let the
+                        # target report any genuine violations.
+                        ready = list(pending)
+                    for table in ready:
+                        if table in pending:
+                            pending.remove(table)
+                            future = pool.submit(
+                                self._copy_table, table, source_conn_str, target_conn_str, incremental, mask, snapshot
+                            )
+                            running[future] = table
+                    if not running:
+                        continue
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        table = running.pop(future)
+                        try:
+                            stats = future.result()
+                        except Exception as e:
+                            failed.add(table)
+                            print(f"❌ Error replicating {table}: {e}")
+                            continue
+                        done.add(table)
+                        results.append(stats)
+                        print(
+                            "✅ {table:<35} {mode:<11} {rows:>10,} rows {mb:>9.2f} MB "
+                            "{seconds:>7.2f}s {rate:>10,.0f} rows/s {mbps:>7.2f} MB/s".format(
+                                mb=stats["bytes"] / 1048576.0,
+                                rate=stats["rows"] / stats["seconds"],
+                                mbps=stats["bytes"] / 1048576.0 / stats["seconds"],
+                                **stats,
+                            )
+                        )
+
+            elapsed = max(time.monotonic() - started, 1e-6)
+            total_rows = sum(stats["rows"] for stats in results)
+            total_mb = sum(stats["bytes"] for stats in results) / 1048576.0
+            print(
+                f"🎉 Parallel replication finished: {len(done)} tables, {total_rows:,} rows, "
+                f"{total_mb:.2f} MB in {elapsed:.1f}s ({total_mb / elapsed:.2f} MB/s)"
+            )
+            if failed:
+                print(f"⚠️  {len(failed)} tables failed: {', '.join(sorted(failed))}")
+            return not failed
+
+        except Exception as e:
+            print(f"❌ Parallel replication failed: {e}")
+            return False
+        finally:
+            if snapshot_conn is not None:
+                snapshot_conn.close()
+
     def replicate_via_compressed_dump(self) -> bool:
         """Replicate data using compressed dump files (fallback method)."""
         try:
@@ -412,11 +838,27 @@ def main():
     )
     parser.add_argument(
         "--method",
-        choices=["direct", "compressed"],
+        choices=["direct", "compressed", "parallel"],
         default="direct",
         help="Replication method (default: direct)",
     )
     parser.add_argument("--verify", action="store_true", help="Verify replication after completion")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Concurrent table copies for the parallel method (default: 4)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Parallel method: top up append-mostly tables instead of re-copying everything",
+    )
+    parser.add_argument(
+        "--no-mask",
+        action="store_true",
+        help="Parallel method: copy personal data unmasked",
+    )
     parser.add_argument(
         "--source-db",
         default="gchub_dev",
@@ -468,6 +910,12 @@ def main():
         success = replicator.replicate_via_direct_connection()
     elif args.method == "compressed":
         success = replicator.replicate_via_compressed_dump()
+    elif args.method == "parallel":
+        success = replicator.replicate_in_parallel(
+            workers=args.workers,
+            incremental=args.incremental,
+            mask=not args.no_mask,
+        )
 
     if success and args.verify:
         replicator.verify_replication()